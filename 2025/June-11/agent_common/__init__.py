@@ -0,0 +1,6 @@
+"""Shared building blocks for the June-11 demo agents.
+
+Modules are imported explicitly (``from agent_common.http_clients import ...``)
+and nothing is imported here, so that pulling in one helper never drags in
+the heavy LangChain/OpenAI dependencies of another.
+"""
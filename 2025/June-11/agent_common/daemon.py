@@ -0,0 +1,439 @@
+"""Long-running agent daemon and a thin client over a Unix domain socket.
+
+Every run of an agent script pays for a fresh interpreter, the LangChain and
+OpenAI imports and client construction before the first answer. The daemon
+pays once: it keeps one agent per demo (with its HTTP pool, caches and memory)
+warm in a single process, and a client sends it questions over a Unix socket.
+
+Protocol: each message is a 4-byte big-endian length followed by that many
+bytes of UTF-8 JSON. Requests are ``{"op": "ask", "agent": "files", "input":
+"...", "cwd": "..."}``, ``{"op": "ping"}``, ``{"op": "stats"}``,
+``{"op": "metrics"}`` or ``{"op": "shutdown"}``; replies are ``{"ok": true,
+...}`` or ``{"ok": false, "error": "..."}``. A connection may carry any number
+of requests.
+
+    python agent_common/daemon.py serve [--preload files,calculator] [--idle-timeout 1800]
+    python agent_common/daemon.py ask files '{"action": "list", "path": "."}'
+    python agent_common/daemon.py status | stop
+
+The agent scripts take the same route with ``--daemon`` (or ``AGENT_DAEMON=1``)
+for one-shot questions, starting the daemon in the background if none is
+running. The socket is ``$AGENT_DAEMON_SOCKET``, by default
+``agents-<uid>.sock`` in ``$XDG_RUNTIME_DIR`` or, without one, in a private
+``agents-<uid>`` directory (mode 0700) in the temp directory; a directory that
+is not private to the user is refused. The socket is only accessible to the
+current user, and clients check that the process listening on it runs as the
+same user (``SO_PEERCRED``, or the socket file's owner) before sending
+anything.
+
+Only the standard library is imported here; the demos are imported by the
+daemon when a request for them first arrives.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+DEMO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER = struct.Struct("!I")
+MAX_FRAME = 16 * 1024 * 1024
+SPAWN_TIMEOUT = 30.0
+SPAWN_IDLE_TIMEOUT = 1800.0
+
+# name -> (demo directory, module, build(module) -> answer(question) callable)
+AGENTS: Dict[str, tuple] = {
+    "basic": ("demo-basic-agent", "basic_agent_tutorial", lambda m: m.BasicAgent().chat),
+    "calculator": ("calculator-demo", "calculator_agent", lambda m: m.CalculatorAgent()._get_response),
+    "files": ("files-demo", "files_agent", lambda m: m.FilesAgent()._get_response),
+    "tool_agent": ("tool-agent-tutorial", "basic_tool_agent", lambda m: m.answer),
+    "web_search": ("web-search-demo", "basic_web_search_agent", lambda m: m.answer),
+}
+
+# Agents whose input names paths relative to the caller's working directory
+CWD_AGENTS = {"files"}
+
+
+class DaemonError(RuntimeError):
+    """The daemon answered a request with an error."""
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket."""
+
+
+class DaemonUntrusted(PermissionError):
+    """The socket, its directory or the process behind it belongs to another user."""
+
+
+def _check_private(directory: str) -> None:
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise DaemonUntrusted(f"{directory} must be a directory owned by you with mode 0700")
+
+
+def runtime_dir() -> str:
+    """Private per-user directory for the socket and log.
+
+    ``$XDG_RUNTIME_DIR`` if set, else ``agents-<uid>`` in the shared temp
+    directory, created with mode 0700. Either is refused unless it is a real
+    directory owned by the user and closed to everyone else: in a shared
+    directory another user could plant the socket or a symlink as the log.
+    """
+    directory = os.getenv("XDG_RUNTIME_DIR")
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(), f"agents-{os.getuid()}")
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    _check_private(directory)
+    return directory
+
+
+def socket_path() -> str:
+    """Socket the daemon listens on: $AGENT_DAEMON_SOCKET or a per-user default."""
+    path = os.getenv("AGENT_DAEMON_SOCKET")
+    if path:
+        return path
+    return os.path.join(runtime_dir(), f"agents-{os.getuid()}.sock")
+
+
+def _peer_uid(sock: socket.socket, path: str) -> int:
+    """User id of the process on the other end of a connected Unix socket."""
+    if hasattr(socket, "SO_PEERCRED"):
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return struct.unpack("3i", creds)[1]
+    return os.stat(path).st_uid  # no peer credentials (macOS): trust the socket file's owner
+
+
+def _open_log(path: str) -> int:
+    """Open the daemon log for appending without following a planted symlink or hard link."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid() or st.st_nlink != 1:
+        os.close(fd)
+        raise DaemonUntrusted(f"refusing to log to {path}: not a regular file of yours")
+    return fd
+
+
+def send_frame(sock: socket.socket, message: dict) -> None:
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise EOFError("connection closed mid-frame" if chunks else "connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> dict:
+    (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if size > MAX_FRAME:
+        raise ValueError(f"frame of {size} bytes exceeds the {MAX_FRAME} byte limit")
+    return json.loads(_recv_exact(sock, size))
+
+
+# ---------------------------------------------------------------------------
+# Client
+
+
+class DaemonClient:
+    """One connection to the daemon; reusable for many requests."""
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None):
+        self.path = path or socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            self.sock.close()
+            raise DaemonUnavailable(f"no agent daemon at {self.path}") from e
+        uid = _peer_uid(self.sock, self.path)
+        if uid != os.getuid():
+            self.sock.close()
+            raise DaemonUntrusted(f"the daemon at {self.path} runs as user {uid}, not as you")
+
+    def request(self, message: dict) -> dict:
+        send_frame(self.sock, message)
+        reply = recv_frame(self.sock)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "unknown error"))
+        return reply
+
+    def ask(self, agent: str, question: str) -> str:
+        return self.request({"op": "ask", "agent": agent, "input": question, "cwd": os.getcwd()})["output"]
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def spawn(path: Optional[str] = None, idle_timeout: float = SPAWN_IDLE_TIMEOUT,
+          timeout: float = SPAWN_TIMEOUT) -> None:
+    """Start a daemon in the background and wait until it answers on ``path``."""
+    import subprocess
+
+    path = path or socket_path()
+    with os.fdopen(_open_log(path + ".log"), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve", "--socket", path,
+             "--idle-timeout", str(idle_timeout)],
+            cwd=DEMO_ROOT, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with DaemonClient(path, timeout=1.0) as client:
+                client.request({"op": "ping"})
+                return
+        except DaemonUnavailable:
+            time.sleep(0.05)
+    raise DaemonUnavailable(f"agent daemon did not start within {timeout:.0f}s (see {path}.log)")
+
+
+def ask(agent: str, question: str, path: Optional[str] = None, start: bool = True) -> str:
+    """Answer ``question`` with the daemon's ``agent``, starting the daemon if needed."""
+    try:
+        client = DaemonClient(path)
+    except DaemonUnavailable:
+        if not start:
+            raise
+        spawn(path)
+        client = DaemonClient(path)
+    with client:
+        return client.ask(agent, question)
+
+
+def run_cli(agent: str, answer: Callable[[str], str], interactive: Callable[[], None],
+            argv: Optional[list] = None) -> None:
+    """Command line of the agent scripts: interactive loop, or one question and exit."""
+    parser = argparse.ArgumentParser(description=f"{agent} agent")
+    parser.add_argument("question", nargs="*", help="answer this question and exit")
+    parser.add_argument("--daemon", action="store_true", default=os.getenv("AGENT_DAEMON") == "1",
+                        help="answer through the warm agent daemon, starting it if needed (AGENT_DAEMON=1)")
+    parser.add_argument("--socket", default=None, help="daemon socket (default: $AGENT_DAEMON_SOCKET)")
+    args = parser.parse_args(argv)
+
+    if args.question and args.daemon:
+        print(ask(agent, " ".join(args.question), path=args.socket))
+        return
+    # This session's requests share the provider quotas with other sessions
+    # as one tenant (see agent_common/scheduler.py)
+    from agent_common.scheduler import request_context
+
+    with request_context(tenant=os.getenv("AGENT_TENANT") or f"{agent}-{os.getpid()}"):
+        if not args.question:
+            interactive()
+        else:
+            print(answer(" ".join(args.question)))
+
+
+# ---------------------------------------------------------------------------
+# Server
+
+
+class AgentDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves framed requests; one lazily built agent per demo, one request at a time each."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, idle_timeout: float = 0.0):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.started = time.monotonic()
+        self.last_request = self.started
+        self.requests = 0
+        self.home = os.getcwd()
+        self.stopping = False
+        self._answers: Dict[str, Callable[[str], str]] = {}
+        self._locks = {name: threading.Lock() for name in AGENTS}
+        self._load_lock = threading.Lock()
+        # os.chdir is process-wide: agents that resolve paths against the
+        # caller's directory take turns
+        self._cwd_lock = threading.Lock()
+        _remove_stale_socket(path)
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def answer_function(self, name: str) -> Callable[[str], str]:
+        if name not in AGENTS:
+            raise KeyError(f"unknown agent {name!r}; choose from {', '.join(AGENTS)}")
+        with self._load_lock:
+            if name not in self._answers:
+                demo_dir, module, build = AGENTS[name]
+                directory = os.path.join(DEMO_ROOT, demo_dir)
+                if directory not in sys.path:
+                    sys.path.insert(0, directory)
+                self._answers[name] = build(importlib.import_module(module))
+            return self._answers[name]
+
+    def ask(self, name: str, question: str, cwd: Optional[str], tenant: str = "default") -> str:
+        from agent_common.scheduler import request_context
+
+        answer = self.answer_function(name)
+        with self._locks[name], request_context(tenant=tenant):
+            if name not in CWD_AGENTS or not cwd:
+                return answer(question)
+            with self._cwd_lock:
+                os.chdir(cwd)
+                try:
+                    return answer(question)
+                finally:
+                    os.chdir(self.home)
+
+    def dispatch(self, message: dict, tenant: str = "default") -> dict:
+        self.requests += 1
+        self.last_request = time.monotonic()
+        op = message.get("op")
+        if op == "ask":
+            start = time.perf_counter()
+            output = self.ask(message["agent"], message["input"], message.get("cwd"), tenant)
+            return {"ok": True, "output": output, "seconds": time.perf_counter() - start}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "stats":
+            return {"ok": True, "pid": os.getpid(), "uptime_seconds": time.monotonic() - self.started,
+                    "requests": self.requests, "agents": sorted(self._answers)}
+        if op == "metrics":
+            from agent_common.instrumentation import get_registry
+
+            return {"ok": True, "output": get_registry().render_prometheus()}
+        if op == "shutdown":
+            self.stopping = True  # the handler stops the server once the reply is out
+            return {"ok": True}
+        raise ValueError(f"unknown op {op!r}")
+
+    def watch_idle(self) -> None:
+        """Shut the daemon down after ``idle_timeout`` seconds without requests."""
+        while True:
+            idle = time.monotonic() - self.last_request
+            if idle >= self.idle_timeout:
+                self.shutdown()
+                return
+            time.sleep(min(self.idle_timeout - idle, 60.0))
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+_connection_ids = itertools.count(1)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        # Each connection is its own tenant of the request scheduler
+        tenant = f"connection-{next(_connection_ids)}"
+        while True:
+            try:
+                message = recv_frame(self.request)
+            except (EOFError, ConnectionError):
+                return
+            try:
+                reply = self.server.dispatch(message, tenant)
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            send_frame(self.request, reply)
+            if self.server.stopping:
+                self.server.shutdown()
+                return
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Unlink a socket left behind by a daemon that died; refuse if one is running."""
+    if not os.path.exists(path):
+        return
+    try:
+        with DaemonClient(path, timeout=1.0):
+            raise RuntimeError(f"an agent daemon is already listening on {path}")
+    except DaemonUnavailable:
+        os.unlink(path)
+
+
+def serve(path: Optional[str] = None, preload=(), idle_timeout: float = 0.0) -> None:
+    server = AgentDaemon(path or socket_path(), idle_timeout=idle_timeout)
+    for name in preload:
+        server.answer_function(name)
+    if idle_timeout > 0:
+        threading.Thread(target=server.watch_idle, daemon=True).start()
+    print(f"agent daemon {os.getpid()} listening on {server.path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=None, help="socket path (default: $AGENT_DAEMON_SOCKET)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the daemon in the foreground")
+    serve_parser.add_argument("--socket", dest="serve_socket", default=None)
+    serve_parser.add_argument("--preload", default="", help="comma-separated agents to build at startup")
+    serve_parser.add_argument("--idle-timeout", type=float, default=float(os.getenv("AGENT_DAEMON_IDLE_TIMEOUT", "0")),
+                              help="exit after this many seconds without requests (0: never)")
+    ask_parser = commands.add_parser("ask", help="answer one question with a daemon agent")
+    ask_parser.add_argument("agent", choices=sorted(AGENTS))
+    ask_parser.add_argument("question", nargs="+")
+    ask_parser.add_argument("--no-start", action="store_true", help="fail instead of starting a daemon")
+    commands.add_parser("status", help="show whether a daemon is running")
+    commands.add_parser("stop", help="stop the running daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        preload = [name for name in args.preload.split(",") if name]
+        serve(args.serve_socket or args.socket, preload=preload, idle_timeout=args.idle_timeout)
+        return 0
+    try:
+        if args.command == "ask":
+            print(ask(args.agent, " ".join(args.question), path=args.socket, start=not args.no_start))
+            return 0
+        with DaemonClient(args.socket, timeout=5.0) as client:
+            if args.command == "status":
+                print(json.dumps(client.request({"op": "stats"}), indent=2))
+            else:
+                client.request({"op": "shutdown"})
+                print("agent daemon stopped")
+        return 0
+    except (DaemonUnavailable, DaemonUntrusted, DaemonError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    # Run as a script: make the agent_common package importable
+    sys.path.insert(0, DEMO_ROOT)
+    sys.exit(main())
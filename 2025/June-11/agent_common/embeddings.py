@@ -0,0 +1,67 @@
+"""Local text embeddings that need no model download and no network.
+
+``HashingEmbedder`` is a feature-hashing vectorizer: words and word bigrams are
+hashed into a fixed number of signed buckets, weighted by log term frequency
+and L2-normalised, so the dot product of two vectors is their cosine
+similarity. It is deterministic, fast on CPU and good at keyword-level
+relevance, which is what file retrieval and conversation recall need.
+
+Requires NumPy; import this module lazily.
+"""
+
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]+|\d+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words, with snake_case and camelCase identifiers also split into parts."""
+    words = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        words.append(lower)
+        parts = [p for p in _CAMEL.sub("_", word).lower().split("_") if p]
+        if len(parts) > 1:
+            words.extend(parts)
+    return words
+
+
+class HashingEmbedder:
+    """Signed feature hashing of unigrams and bigrams into ``dim`` float32 dimensions."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterable[str]:
+        words = tokenize(text)
+        yield from words
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, text: str) -> np.ndarray:
+        counts = {}
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if counts:
+            buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            vector[buckets] = np.sign(values) * np.log1p(np.abs(values))
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
@@ -0,0 +1,232 @@
+"""Safe evaluation of arithmetic and boolean expressions.
+
+Used instead of ``eval`` for expressions supplied by the model. The expression
+is parsed with ``ast`` and checked against a whitelist: literals, names bound
+by the caller, arithmetic, comparisons, ``and``/``or``/``not``, conditional
+expressions and whitelisted function calls. Attribute access, subscripts,
+comprehensions, lambdas and keyword arguments are rejected before anything is
+evaluated. Powers, products and string repetition whose result would exceed
+``MAX_INT_BITS`` or ``MAX_SEQUENCE_LENGTH`` are refused before they are
+computed.
+
+The same expression can be evaluated element-wise over NumPy arrays with
+``vectorized=True``: ``and``/``or``/``not`` become logical array operations and
+``a if c else b`` becomes ``where(c, a, b)``. Callers supply array-aware
+functions in that mode.
+"""
+
+import ast
+import math
+import operator
+from typing import Any, Callable, Dict, Mapping, Optional, Set
+
+MAX_EXPRESSION_LENGTH = 2000
+MAX_INT_BITS = 100_000  # ~30k digits; Python will not even print ints past 4300 digits
+MAX_SEQUENCE_LENGTH = 100_000  # characters in a string result
+MAX_ARRAY_TEXT = 10_000_000  # characters across an array of strings (vectorized mode)
+
+
+class ExpressionError(ValueError):
+    """The expression is malformed, uses something not allowed, or cannot be evaluated."""
+
+
+# The size of every result is checked before it is computed: one power or
+# repetition would otherwise run for minutes or allocate gigabytes, and
+# nesting them compounds, e.g. (9**9999)**9999 or ("a"*10000)*10000
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_bits(bits: int) -> None:
+    if bits > MAX_INT_BITS:
+        raise ExpressionError(f"Result too large: about {bits:,} bits (limit {MAX_INT_BITS:,})")
+
+
+def _check_length(length: int, limit: int = MAX_SEQUENCE_LENGTH) -> None:
+    if length > limit:
+        raise ExpressionError(f"Result too large: {length:,} characters (limit {limit:,})")
+
+
+def _power(base, exponent):
+    if _is_int(base) and _is_int(exponent) and exponent > 1 and abs(base) > 1:
+        _check_bits(int(exponent * math.log2(abs(base))) + 1)
+    return operator.pow(base, exponent)
+
+
+def _multiply(left, right):
+    if _is_int(left) and _is_int(right):
+        _check_bits(left.bit_length() + right.bit_length())
+    for sequence, count in ((left, right), (right, left)):
+        if not _is_int(count) or count <= 1:
+            continue
+        if isinstance(sequence, str):
+            _check_length(len(sequence) * count)
+        elif getattr(sequence, "dtype", None) is not None and sequence.dtype.kind == "O":
+            # An array of strings repeats every element
+            text = sum(len(value) for value in sequence.flat if isinstance(value, str))
+            _check_length(text * count, MAX_ARRAY_TEXT)
+    return operator.mul(left, right)
+
+
+def _add(left, right):
+    if isinstance(left, str) and isinstance(right, str):
+        _check_length(len(left) + len(right))
+    return operator.add(left, right)
+
+
+_BINARY = {
+    ast.Add: _add, ast.Sub: operator.sub, ast.Mult: _multiply,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+
+MATH_FUNCTIONS: Dict[str, Callable] = {
+    "abs": abs, "round": round, "min": min, "max": max,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log10": math.log10,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "floor": math.floor, "ceil": math.ceil,
+}
+MATH_CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e}
+
+
+class Expression:
+    """A parsed and validated expression that can be evaluated many times."""
+
+    def __init__(self, text: str):
+        text = text.strip()
+        if not text:
+            raise ExpressionError("Empty expression")
+        if len(text) > MAX_EXPRESSION_LENGTH:
+            raise ExpressionError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+        try:
+            self.tree = ast.parse(text, mode="eval").body
+        except SyntaxError as e:
+            raise ExpressionError(f"Invalid expression {text!r}: {e.msg}")
+        self.text = text
+        self.names: Set[str] = set()
+        self.calls: Set[str] = set()
+        self._check(self.tree)
+
+    def _check(self, node: ast.AST) -> None:
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, str, bool, type(None))):
+                raise ExpressionError(f"Unsupported literal: {node.value!r}")
+        elif isinstance(node, ast.Name):
+            self.names.add(node.id)
+        elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.UnaryOp) and (type(node.op) in _UNARY or isinstance(node.op, ast.Not)):
+            self._check(node.operand)
+        elif isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+            self._check(node.left)
+            for comparator in node.comparators:
+                self._check(comparator)
+        elif isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._check(value)
+        elif isinstance(node, ast.IfExp):
+            for child in (node.test, node.body, node.orelse):
+                self._check(child)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            self.calls.add(node.func.id)
+            for arg in node.args:
+                if isinstance(arg, ast.Starred):
+                    raise ExpressionError("Starred arguments are not allowed")
+                self._check(arg)
+        else:
+            raise ExpressionError(f"Unsupported syntax in {self.text!r}: {type(node).__name__}")
+
+    def evaluate(self, names: Optional[Mapping[str, Any]] = None,
+                 functions: Optional[Mapping[str, Callable]] = None, vectorized: bool = False) -> Any:
+        """Evaluate with ``names`` bound (constants ``pi`` and ``e`` are always available)."""
+        env = dict(MATH_CONSTANTS)
+        env.update(names or {})
+        functions = MATH_FUNCTIONS if functions is None else functions
+        try:
+            return _Evaluator(env, functions, vectorized).visit(self.tree)
+        except ExpressionError:
+            raise
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise ExpressionError(f"Cannot evaluate {self.text!r}: {e}")
+
+    def __repr__(self) -> str:
+        return f"Expression({self.text!r})"
+
+
+class _Evaluator:
+    def __init__(self, env: Mapping[str, Any], functions: Mapping[str, Callable], vectorized: bool):
+        self.env = env
+        self.functions = functions
+        self.vectorized = vectorized
+        if vectorized:
+            import numpy as np
+
+            self.np = np
+
+    def visit(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id not in self.env:
+                raise ExpressionError(f"Unknown name: {node.id}")
+            return self.env[node.id]
+        if isinstance(node, ast.BinOp):
+            return _BINARY[type(node.op)](self.visit(node.left), self.visit(node.right))
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.Not):
+                return self.np.logical_not(operand) if self.vectorized else not operand
+            return _UNARY[type(node.op)](operand)
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.BoolOp):
+            return self._bool(node)
+        if isinstance(node, ast.IfExp):
+            if self.vectorized:
+                return self.np.where(self.visit(node.test), self.visit(node.body), self.visit(node.orelse))
+            return self.visit(node.body) if self.visit(node.test) else self.visit(node.orelse)
+        if isinstance(node, ast.Call):
+            name = node.func.id
+            if name not in self.functions:
+                raise ExpressionError(f"Unknown function: {name}() (available: {', '.join(sorted(self.functions))})")
+            return self.functions[name](*[self.visit(arg) for arg in node.args])
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    def _compare(self, node: ast.Compare) -> Any:
+        left = self.visit(node.left)
+        result = None
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self.visit(comparator)
+            value = _COMPARE[type(op)](left, right)
+            if self.vectorized:
+                result = value if result is None else self.np.logical_and(result, value)
+            elif not value:
+                return False
+            left = right
+        return result if self.vectorized else True
+
+    def _bool(self, node: ast.BoolOp) -> Any:
+        is_and = isinstance(node.op, ast.And)
+        if self.vectorized:
+            combine = self.np.logical_and if is_and else self.np.logical_or
+            result = self.visit(node.values[0])
+            for value in node.values[1:]:
+                result = combine(result, self.visit(value))
+            return result
+        for value in node.values:
+            result = self.visit(value)
+            if bool(result) != is_and:
+                return result
+        return result
+
+
+def evaluate(text: str, names: Optional[Mapping[str, Any]] = None) -> Any:
+    """Parse and evaluate ``text`` once, e.g. ``evaluate("2 * (3 + 4)") == 14``."""
+    return Expression(text).evaluate(names)
@@ -0,0 +1,250 @@
+"""Process-wide HTTP client shared by the LLM and search clients of every agent.
+
+All agents take their ``ChatOpenAI`` and Tavily clients from the factories in
+this module, so a REPL session reuses the same keep-alive connections (and TLS
+sessions) turn after turn instead of opening new ones per client.
+
+Settings come from environment variables (all optional):
+
+    AGENT_HTTP_CONNECT_TIMEOUT    seconds, default 5
+    AGENT_HTTP_READ_TIMEOUT       seconds, default 60
+    AGENT_HTTP_MAX_CONNECTIONS    pool size, default 20
+    AGENT_HTTP_MAX_KEEPALIVE      idle connections kept open, default 10
+    AGENT_HTTP_KEEPALIVE_EXPIRY   seconds, default 30
+    AGENT_HTTP_MAX_RETRIES        default 3
+    AGENT_HTTP_BACKOFF_BASE       seconds, default 0.5
+    AGENT_HTTP_BACKOFF_MAX        seconds, default 8
+    AGENT_HTTP_HTTP2              "0" to disable HTTP/2 (used only if ``h2`` is installed)
+
+Requests are rate limited and scheduled per provider before they are sent
+(``agent_common/scheduler.py``, configured with ``AGENT_RATE_*``).
+
+Retries never send a request twice that the server may already have acted
+on. Connect errors and 408/429/503 responses are retried for every request:
+the request was either never sent or refused unprocessed. A dropped
+connection or a 500/502/504 after the request was sent may come after the
+work was done (and billed), so those are retried only for idempotent methods
+or requests that carry an ``Idempotency-Key`` header. LLM and search calls
+are POSTs without one.
+"""
+
+import importlib.util
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from agent_common.scheduler import THROTTLE_STATUS_CODES, ScheduledTransport, scheduling_enabled
+
+# Status codes that say the request was not processed: retried for any method
+RETRY_STATUS_CODES = {408, 429, 503}
+# Failures that may come after the server acted on the request: retried only when repeating it is harmless
+UNSAFE_RETRY_STATUS_CODES = {500, 502, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    """Timeouts, pool limits and retry policy for the shared client."""
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls) -> "HttpSettings":
+        """Build settings from ``AGENT_HTTP_*`` environment variables."""
+        def env(name, default, cast=float):
+            value = os.getenv(f"AGENT_HTTP_{name}")
+            return cast(value) if value not in (None, "") else default
+
+        return cls(
+            connect_timeout=env("CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=env("READ_TIMEOUT", cls.read_timeout),
+            max_connections=env("MAX_CONNECTIONS", cls.max_connections, int),
+            max_keepalive_connections=env("MAX_KEEPALIVE", cls.max_keepalive_connections, int),
+            keepalive_expiry=env("KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            max_retries=env("MAX_RETRIES", cls.max_retries, int),
+            backoff_base=env("BACKOFF_BASE", cls.backoff_base),
+            backoff_max=env("BACKOFF_MAX", cls.backoff_max),
+            http2=env("HTTP2", "1", str) != "0",
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (0-based), with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class RetryTransport(httpx.BaseTransport):
+    """Transport that retries connection errors and retryable statuses with jittered backoff.
+
+    Only failures that cannot repeat work the server did are retried for POSTs
+    (see the module docstring).
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, settings: HttpSettings):
+        self._transport = transport
+        self._settings = settings
+        # The scheduler already holds throttled providers back until Retry-After
+        self._scheduled = isinstance(transport, ScheduledTransport)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        repeatable = _repeatable(request)
+        retry_statuses = RETRY_STATUS_CODES | UNSAFE_RETRY_STATUS_CODES if repeatable else RETRY_STATUS_CODES
+        attempt = 0
+        while True:
+            try:
+                response = self._transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # The connection was never made, so nothing reached the server
+                if attempt >= self._settings.max_retries:
+                    raise
+            except httpx.RemoteProtocolError:
+                # The server may have read the request before dropping the connection
+                if not repeatable or attempt >= self._settings.max_retries:
+                    raise
+            else:
+                if response.status_code not in retry_statuses or attempt >= self._settings.max_retries:
+                    return response
+                delay = _retry_after(response)
+                response.close()
+                if self._scheduled and response.status_code in THROTTLE_STATUS_CODES:
+                    attempt += 1
+                    continue
+                if delay is not None:
+                    time.sleep(min(delay, self._settings.backoff_max))
+                    attempt += 1
+                    continue
+            time.sleep(self._settings.backoff(attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _repeatable(request: httpx.Request) -> bool:
+    """Whether sending ``request`` again cannot repeat work the server already did."""
+    return request.method in IDEMPOTENT_METHODS or "idempotency-key" in request.headers
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds requested by a ``Retry-After`` header, if any."""
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_http_client(settings: Optional[HttpSettings] = None) -> httpx.Client:
+    """Create a new pooled, keep-alive client (most callers want ``get_http_client``)."""
+    settings = settings or HttpSettings.from_env()
+    limits = httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive_connections,
+        keepalive_expiry=settings.keepalive_expiry,
+    )
+    transport = httpx.HTTPTransport(limits=limits, http2=settings.http2 and http2_available())
+    if scheduling_enabled():
+        # Inside the retry loop, so every attempt (retries included) waits for the rate limits
+        transport = ScheduledTransport(transport)
+    timeout = httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout)
+    return httpx.Client(transport=RetryTransport(transport, settings), timeout=timeout)
+
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide shared client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = build_http_client()
+        return _client
+
+
+def close_http_client() -> None:
+    """Close the shared client (a new one is created on the next ``get_http_client``)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def make_chat_model(model: str, temperature: float = 0.1, **kwargs):
+    """Create a ``ChatOpenAI`` that sends its requests through the shared client."""
+    from langchain_openai import ChatOpenAI
+
+    kwargs.setdefault("openai_api_key", os.getenv("OPENAI_API_KEY"))
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=get_http_client(),
+        max_retries=0,  # retries and backoff are handled by RetryTransport
+        **kwargs,
+    )
+
+
+def make_search_tool(**kwargs):
+    """Create a ``TavilySearchResults`` tool that sends its requests through the shared client."""
+    from langchain.tools.tavily_search import TavilySearchResults
+
+    api_key = kwargs.pop("api_key", None) or os.getenv("TAVILY_API_KEY")
+    api_url = kwargs.pop("api_url", None) or os.getenv("TAVILY_API_URL")
+    wrapper = _pooled_tavily_wrapper_class()(tavily_api_key=api_key, **({"api_url": api_url} if api_url else {}))
+    return TavilySearchResults(api_wrapper=wrapper, **kwargs)
+
+
+_tavily_wrapper_class = None
+
+
+def _pooled_tavily_wrapper_class():
+    """Subclass of ``TavilySearchAPIWrapper`` that posts through the shared client."""
+    global _tavily_wrapper_class
+    if _tavily_wrapper_class is not None:
+        return _tavily_wrapper_class
+
+    from langchain_community.utilities.tavily_search import TAVILY_API_URL, TavilySearchAPIWrapper
+
+    class PooledTavilySearchAPIWrapper(TavilySearchAPIWrapper):
+        api_url: str = TAVILY_API_URL
+
+        def raw_results(self, query: str, max_results: Optional[int] = 5, search_depth: Optional[str] = "advanced",
+                        include_domains: Optional[list] = None, exclude_domains: Optional[list] = None,
+                        include_answer: Optional[bool] = False, include_raw_content: Optional[bool] = False,
+                        include_images: Optional[bool] = False) -> dict:
+            params = {
+                "api_key": self.tavily_api_key.get_secret_value(),
+                "query": query,
+                "max_results": max_results,
+                "search_depth": search_depth,
+                "include_domains": include_domains or [],
+                "exclude_domains": exclude_domains or [],
+                "include_answer": include_answer,
+                "include_raw_content": include_raw_content,
+                "include_images": include_images,
+            }
+            response = get_http_client().post(f"{self.api_url}/search", json=params)
+            response.raise_for_status()
+            return response.json()
+
+    _tavily_wrapper_class = PooledTavilySearchAPIWrapper
+    return _tavily_wrapper_class
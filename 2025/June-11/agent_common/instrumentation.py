@@ -0,0 +1,316 @@
+"""Per-step latency, token and cache instrumentation for the demo agents.
+
+Three pieces work together:
+
+* ``MetricsRegistry`` - in-process counters and latency histograms that can be
+  rendered in the Prometheus text exposition format.
+* ``TraceWriter`` - appends one JSON object per event to a JSONL trace file.
+* ``make_callback_handler`` - a LangChain callback handler that feeds both from
+  LLM calls (wall time, prompt/completion/cached tokens) and tool calls (latency).
+
+Only the standard library is imported here; LangChain is loaded when the
+callback handler is first created. Set ``AGENT_TRACE_FILE`` to enable the JSONL
+trace for the process-wide registry, and ``AGENT_METRICS_FILE`` to have its
+Prometheus text written there when the process exits.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Latency buckets in seconds, from local tool calls up to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prompt-size buckets in tokens
+TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as in Prometheus."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile (upper bound of the bucket holding it)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms keyed by name and labels."""
+
+    def __init__(self, trace: Optional["TraceWriter"] = None):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self.trace = trace
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels) -> None:
+        """Increase counter ``name`` by ``value``."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = "", buckets=DEFAULT_BUCKETS, **labels) -> None:
+        """Record ``value`` in histogram ``name`` (``buckets`` apply when the series is created)."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Count a cache lookup; the hit rate is hits / (hits + misses)."""
+        self.inc("agent_cache_requests_total", help="Cache lookups by result",
+                 cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_rate(self, cache: str) -> float:
+        with self._lock:
+            series = self._counters.get("agent_cache_requests_total", {})
+            hits = series.get(_label_key({"cache": cache, "result": "hit"}), 0)
+            misses = series.get(_label_key({"cache": cache, "result": "miss"}), 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def event(self, kind: str, **fields) -> None:
+        """Write a trace event if a trace file is configured."""
+        if self.trace is not None:
+            self.trace.write({"ts": time.time(), "event": kind, **fields})
+
+    @contextmanager
+    def timed(self, name: str, **labels) -> Iterator[None]:
+        """Time the block and record it in histogram ``name`` (and the trace)."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            self.event(name, seconds=round(elapsed, 6), error=error, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        le = 'le="%g"' % bound
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {count}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+class TraceWriter:
+    """Append-only JSONL trace file, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide registry (tracing to ``AGENT_TRACE_FILE`` if set)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            trace_path = os.getenv("AGENT_TRACE_FILE")
+            _registry = MetricsRegistry(TraceWriter(trace_path) if trace_path else None)
+            metrics_path = os.getenv("AGENT_METRICS_FILE")
+            if metrics_path:
+                atexit.register(write_prometheus, _registry, metrics_path)
+        return _registry
+
+
+def write_prometheus(registry: MetricsRegistry, path: str) -> None:
+    """Write the registry in Prometheus text format (e.g. for the node exporter textfile collector)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(registry.render_prometheus())
+
+
+_handler_class = None
+
+
+def _callback_handler_class():
+    """Build the handler class on first use so LangChain stays a lazy import."""
+    global _handler_class
+    if _handler_class is not None:
+        return _handler_class
+
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class InstrumentationHandler(BaseCallbackHandler):
+        """Records LLM and tool latency, token usage and agent steps."""
+
+        def __init__(self, registry: MetricsRegistry, agent: str):
+            self.registry = registry
+            self.agent = agent
+            self._started: Dict[object, Tuple[float, str]] = {}
+            # Prompt text per chat call, counted locally if the provider reports no usage
+            self._prompts: Dict[object, str] = {}
+
+        def _start(self, run_id, name: str) -> None:
+            self._started[run_id] = (time.perf_counter(), name)
+
+        def _finish(self, run_id) -> Tuple[float, str]:
+            start, name = self._started.pop(run_id, (time.perf_counter(), "unknown"))
+            return time.perf_counter() - start, name
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id, (kwargs.get("invocation_params") or {}).get("model_name", "llm"))
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            params = kwargs.get("invocation_params") or {}
+            self._start(run_id, params.get("model_name") or params.get("model") or "chat_model")
+            self._prompts[run_id] = "\n".join(str(m.content) for batch in messages for m in batch)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            elapsed, model = self._finish(run_id)
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_text = self._prompts.pop(run_id, "")
+            prompt_tokens = usage.get("prompt_tokens")
+            if prompt_tokens is None:
+                from agent_common.tokens import count_tokens
+
+                prompt_tokens = count_tokens(prompt_text)
+            completion_tokens = usage.get("completion_tokens", 0)
+            # Prompt tokens served from the provider's prefix cache (OpenAI reports them here)
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            self.registry.observe("agent_llm_seconds", elapsed, help="LLM call wall time",
+                                  agent=self.agent, model=model)
+            self.registry.inc("agent_llm_tokens_total", prompt_tokens, help="Tokens sent and received",
+                              agent=self.agent, model=model, kind="prompt")
+            self.registry.inc("agent_llm_tokens_total", completion_tokens,
+                              agent=self.agent, model=model, kind="completion")
+            self.registry.inc("agent_llm_tokens_total", cached_tokens,
+                              agent=self.agent, model=model, kind="cached")
+            self.registry.observe("agent_llm_prompt_tokens", prompt_tokens, help="Prompt tokens per LLM call",
+                                  buckets=TOKEN_BUCKETS, agent=self.agent, model=model)
+            self.registry.event("llm", agent=self.agent, model=model, seconds=round(elapsed, 6),
+                                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                cached_tokens=cached_tokens)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            elapsed, model = self._finish(run_id)
+            self._prompts.pop(run_id, None)
+            self.registry.inc("agent_llm_errors_total", help="Failed LLM calls", agent=self.agent, model=model)
+            self.registry.event("llm", agent=self.agent, model=model, seconds=round(elapsed, 6),
+                                error=type(error).__name__)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            self._start(run_id, (serialized or {}).get("name", "tool"))
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            elapsed, tool = self._finish(run_id)
+            self.registry.observe("agent_tool_seconds", elapsed, help="Tool call wall time",
+                                  agent=self.agent, tool=tool)
+            self.registry.event("tool", agent=self.agent, tool=tool, seconds=round(elapsed, 6))
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            elapsed, tool = self._finish(run_id)
+            self.registry.inc("agent_tool_errors_total", help="Failed tool calls", agent=self.agent, tool=tool)
+            self.registry.event("tool", agent=self.agent, tool=tool, seconds=round(elapsed, 6),
+                                error=type(error).__name__)
+
+        def on_agent_action(self, action, *, run_id, **kwargs):
+            self.registry.inc("agent_steps_total", help="Agent reasoning steps", agent=self.agent)
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+            if parent_run_id is None:
+                self._start(run_id, "turn")
+
+        def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+            if parent_run_id is None:
+                elapsed, _ = self._finish(run_id)
+                self.registry.observe("agent_turn_seconds", elapsed, help="Wall time per agent turn",
+                                      agent=self.agent)
+                self.registry.event("turn", agent=self.agent, seconds=round(elapsed, 6))
+
+        def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+            if parent_run_id is None:
+                self._finish(run_id)
+
+    _handler_class = InstrumentationHandler
+    return _handler_class
+
+
+def make_callback_handler(agent: str, registry: Optional[MetricsRegistry] = None):
+    """Create a LangChain callback handler that reports into ``registry``."""
+    return _callback_handler_class()(registry or get_registry(), agent)
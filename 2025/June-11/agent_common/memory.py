@@ -0,0 +1,105 @@
+"""Long-term conversation memory that recalls relevant exchanges instead of replaying them all.
+
+Every exchange (user message plus reply) is embedded with
+``HashingEmbedder`` into a preallocated float32 matrix that doubles when
+full, so adding a turn costs one embedding and recalling costs one
+matrix-vector product. A prompt gets the last few exchanges verbatim plus the
+top-k older exchanges most similar to the new message. Prompt size then
+depends on ``recent`` and ``top_k``, not on how long the conversation has been
+going, and a fact from a hundred turns ago can still be recalled.
+
+With a ``path`` the exchanges are also appended to a JSONL file and reloaded
+(and re-embedded, which is cheap) on start, so memory survives restarts.
+
+Requires NumPy; import this module lazily.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from agent_common.embeddings import HashingEmbedder
+
+DIM = 256
+INITIAL_CAPACITY = 64
+
+
+@dataclass(frozen=True)
+class Exchange:
+    user: str
+    assistant: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.user}\n{self.assistant}"
+
+
+class ConversationMemory:
+    """Exchanges of one conversation with a vector index over them."""
+
+    def __init__(self, recent: int = 3, top_k: int = 4, min_score: float = 0.15, path: Optional[str] = None,
+                 embedder: Optional[HashingEmbedder] = None):
+        self.recent = recent
+        self.top_k = top_k
+        self.min_score = min_score
+        self.path = path
+        self.embedder = embedder or HashingEmbedder(DIM)
+        self.exchanges: List[Exchange] = []
+        self._vectors = np.zeros((INITIAL_CAPACITY, self.embedder.dim), dtype=np.float32)
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def _load(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a torn last line from an interrupted write
+                self._append(Exchange(record["user"], record["assistant"]))
+
+    def _append(self, exchange: Exchange) -> None:
+        count = len(self.exchanges)
+        if count == len(self._vectors):
+            grown = np.zeros((2 * count, self._vectors.shape[1]), dtype=np.float32)
+            grown[:count] = self._vectors
+            self._vectors = grown
+        self._vectors[count] = self.embedder.embed(exchange.text)
+        self.exchanges.append(exchange)
+
+    def add(self, user: str, assistant: str) -> None:
+        exchange = Exchange(user, assistant)
+        self._append(exchange)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"user": user, "assistant": assistant}) + "\n")
+
+    def clear(self) -> None:
+        self.exchanges.clear()
+        self._vectors[:] = 0
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def recall(self, query: str, k: Optional[int] = None) -> List[Tuple[float, int]]:
+        """Older exchanges (not among the recent ones) most similar to ``query``, best first."""
+        k = self.top_k if k is None else k
+        older = len(self.exchanges) - self.recent
+        if older <= 0 or k <= 0:
+            return []
+        scores = self._vectors[:older] @ self.embedder.embed(query)
+        k = min(k, older)
+        top = np.argpartition(-scores, k - 1)[:k]
+        ranked = sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+        return [(score, index) for score, index in ranked if score >= self.min_score]
+
+    def context(self, query: str) -> Tuple[List[Exchange], List[Exchange]]:
+        """(recalled older exchanges in conversation order, the last ``recent`` exchanges)."""
+        recalled = sorted(index for _, index in self.recall(query))
+        recent = self.exchanges[-self.recent:] if self.recent else []
+        return [self.exchanges[i] for i in recalled], recent
@@ -0,0 +1,112 @@
+"""Prompt assembly with a byte-stable prefix and per-request tool documentation.
+
+Providers cache the longest prompt prefix they have seen recently (OpenAI does
+it automatically from 1024 tokens and bills cached tokens at a discount), but
+only if the prefix is byte-for-byte identical. So everything that is the same
+on every call comes first and never changes:
+
+    tool schemas, system prompt            <- stable prefix (cacheable)
+    conversation history                   <- grows, but only at the end
+    user turn + docs of relevant actions   <- variable
+
+``ActionCatalog`` keeps a multi-action tool's documentation in two tiers: a
+one-line summary per action, which goes into the tool description (part of the
+stable prefix), and the full usage notes, which are added to the user turn only
+for the actions the request is about. ``PromptAssembler`` puts the pieces in
+that order.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+@dataclass(frozen=True)
+class ToolAction:
+    name: str
+    summary: str  # one line, always in the tool description
+    details: str = ""  # fields and usage notes, sent only when relevant
+    keywords: Tuple[str, ...] = ()  # words or phrases that point at this action
+
+
+class ActionCatalog:
+    """Two-tier documentation of a tool's actions."""
+
+    def __init__(self, actions: Sequence[ToolAction], preamble: str = "", example: str = ""):
+        self.actions = tuple(actions)
+        self.preamble = preamble
+        self.example = example
+        self._by_name = {action.name: action for action in self.actions}
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(self._by_name)
+
+    def summary(self) -> str:
+        """Compact, deterministic tool description: preamble, one line per action, example."""
+        lines = [self.preamble] if self.preamble else []
+        lines.extend(f"- {action.name}: {action.summary}" for action in self.actions)
+        if self.example:
+            lines.append(f"Example: {self.example}")
+        return "\n".join(lines)
+
+    def full(self) -> str:
+        """Every action with its details (the old all-in-one description)."""
+        lines = [self.preamble] if self.preamble else []
+        lines.extend(f"- {action.name}: {action.summary}" + (f". {action.details}" if action.details else "")
+                     for action in self.actions)
+        if self.example:
+            lines.append(f"Example: {self.example}")
+        return "\n".join(lines)
+
+    def relevant(self, text: str, limit: int = 3) -> List[ToolAction]:
+        """Actions the request is most likely about, best first (none if nothing matches).
+
+        An action scores for its name and for each keyword found in the
+        request; multi-word keywords are matched as phrases.
+        """
+        lowered = text.lower()
+        words = set(_WORD.findall(lowered))
+        scored = []
+        for position, action in enumerate(self.actions):
+            score = 2 * (action.name in words or action.name.replace("_", " ") in lowered)
+            score += sum(1 for keyword in action.keywords
+                         if (keyword in lowered if " " in keyword else keyword in words))
+            if score:
+                scored.append((-score, position, action))
+        scored.sort(key=lambda item: item[:2])
+        return [action for _, _, action in scored[:limit]]
+
+    def details_for(self, text: str, limit: int = 3) -> str:
+        """Usage notes of the relevant actions, or "" when none match."""
+        lines = [f"- {action.name}: {action.details}" for action in self.relevant(text, limit) if action.details]
+        return "Relevant actions:\n" + "\n".join(lines) if lines else ""
+
+
+class PromptAssembler:
+    """Orders prompt parts so the system prompt (and tool schemas) form a stable prefix."""
+
+    def __init__(self, system_prompt: str, catalog: Optional[ActionCatalog] = None, max_actions: int = 3):
+        self.system_prompt = system_prompt
+        self.catalog = catalog
+        self.max_actions = max_actions
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of the stable prefix; it must not change between calls."""
+        prefix = self.system_prompt + (self.catalog.summary() if self.catalog else "")
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:12]
+
+    def user_turn(self, text: str) -> str:
+        """The user's request followed by the documentation it needs."""
+        details = self.catalog.details_for(text, self.max_actions) if self.catalog else ""
+        return f"{text}\n\n{details}" if details else text
+
+    def messages(self, text: str, history: Iterable = ()) -> list:
+        """Chat messages: system prompt, history, then the user turn."""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        return [SystemMessage(content=self.system_prompt), *history, HumanMessage(content=self.user_turn(text))]
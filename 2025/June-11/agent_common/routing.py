@@ -0,0 +1,257 @@
+"""Send easy turns to a small, fast model and hard ones to a large model.
+
+``classify`` scores a request locally, with no model call: long requests,
+several steps, code, and words such as "explain", "compare" or "debug" make a
+turn hard, and bare arithmetic or JSON commands make it easy. ``ModelRouter``
+runs the turn on the model for that route. If the small model's answer looks
+unsure (empty, "I'm not sure", an error, an agent that gave up), it re-runs
+the turn on the large model, unless the first attempt made a tool call that
+cannot safely run twice (the agent says which, e.g. file writes): the tools
+have already run, and a re-run would apply their changes again. Latency, tokens and cost are recorded per route
+in the instrumentation registry (``agent_route_*`` metrics and ``route``
+trace events).
+
+Configuration, per agent (``<AGENT>`` is the agent name in upper case, e.g.
+``FILES``), all optional:
+
+    AGENT_ROUTER                   "0" disables routing (every turn uses the large model)
+    AGENT_ROUTER_THRESHOLD         score from which a turn is hard, default 0.4
+    AGENT_ROUTER_<AGENT>_SMALL     model for easy turns
+    AGENT_ROUTER_<AGENT>_LARGE     model for hard turns and escalations
+    AGENT_ROUTER_<AGENT>_THRESHOLD overrides AGENT_ROUTER_THRESHOLD
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent_common.instrumentation import MetricsRegistry, get_registry
+from agent_common.tokens import count_tokens
+
+ROUTES = ("small", "large")
+DEFAULT_THRESHOLD = 0.4
+
+# USD per million (prompt, completion) tokens; unknown models are costed at 0
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+_HARD_WORDS = (
+    "why", "explain", "compare", "analy", "design", "plan", "debug", "refactor", "optimi", "prove",
+    "trade-off", "tradeoff", "step by step", "architecture", "review", "summar", "implement", "write a",
+    "pros and cons", "difference between", "best way",
+)
+_STEP_MARKERS = re.compile(r";|\bthen\b|\bafter that\b|\bfinally\b|^\s*\d+[.)]\s", re.IGNORECASE | re.MULTILINE)
+_CODE = re.compile(r"```|\bdef \w+\(|\bclass \w+[:(]|\bimport \w+|[{};]\s*$", re.MULTILINE)
+_ARITHMETIC = re.compile(r"^[\d\s.+\-*/()%^]+$")
+# Only the start of an answer is checked: an explanation may mention errors later on
+_UNSURE = re.compile(
+    r"^\W*(error|sorry)\b|i'?m not sure|i am not sure|i don'?t know|i do not know|not certain|"
+    r"i(?: am|'m)? unable to|i can(?:'|no)t (?:answer|help|determine)|agent stopped due to|could not parse",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    route: str
+    score: float
+    reasons: Tuple[str, ...] = ()
+
+
+def classify(text: str, threshold: float = DEFAULT_THRESHOLD) -> RouteDecision:
+    """Score how hard ``text`` is (0 = trivial) and pick a route."""
+    stripped = text.strip()
+    if not stripped or _ARITHMETIC.match(stripped):
+        return RouteDecision("small", 0.0, ("arithmetic",) if stripped else ())
+    if stripped.startswith("{") and stripped.endswith("}"):
+        return RouteDecision("small", 0.0, ("structured command",))
+
+    score = 0.0
+    reasons: List[str] = []
+    tokens = count_tokens(stripped)
+    if tokens > 80:
+        score += 0.4
+        reasons.append(f"{tokens} tokens")
+    elif tokens > 30:
+        score += 0.2
+        reasons.append(f"{tokens} tokens")
+    lowered = stripped.lower()
+    hard = [word for word in _HARD_WORDS if word in lowered]
+    if hard:
+        score += min(0.5, 0.25 * len(hard))
+        reasons.append("asks for " + "/".join(hard[:3]))
+    steps = len(_STEP_MARKERS.findall(stripped))
+    if steps >= 2:
+        score += 0.3
+        reasons.append(f"{steps + 1} steps")
+    if _CODE.search(stripped):
+        score += 0.3
+        reasons.append("code")
+    score = round(min(score, 1.0), 2)
+    return RouteDecision("large" if score >= threshold else "small", score, tuple(reasons))
+
+
+def low_confidence(output: str) -> bool:
+    """True when an answer looks unsure or failed, so a bigger model should retry."""
+    return not output.strip() or _UNSURE.search(output[:300]) is not None
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@dataclass
+class RouteResult:
+    output: str
+    route: str  # route that produced the output ("large" after an escalation)
+    decision: RouteDecision
+    escalated: bool = False
+    seconds: float = 0.0
+    cost_usd: float = 0.0
+    usage: Dict[str, int] = field(default_factory=dict)
+    # (tool name, input) of the tool calls made by the attempt that produced the output
+    tool_calls: List[Tuple[str, Any]] = field(default_factory=list)
+
+
+_collector_class = None
+
+
+def _usage_collector_class():
+    """Callback handler summing token usage per model and recording tool calls; built on first use (LangChain is lazy)."""
+    global _collector_class
+    if _collector_class is not None:
+        return _collector_class
+
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class UsageCollector(BaseCallbackHandler):
+        def __init__(self, default_model: str):
+            self.default_model = default_model
+            self.by_model: Dict[str, List[int]] = {}
+            self.tool_calls: List[Tuple[str, Any]] = []
+
+        def on_tool_start(self, serialized, input_str, *, inputs=None, **kwargs):
+            # Structured tools pass their arguments as ``inputs``, string tools only ``input_str``
+            self.tool_calls.append((serialized.get("name", ""), inputs if inputs is not None else input_str))
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            output = response.llm_output or {}
+            usage = output.get("token_usage") or {}
+            totals = self.by_model.setdefault(output.get("model_name") or self.default_model, [0, 0])
+            totals[0] += usage.get("prompt_tokens", 0)
+            totals[1] += usage.get("completion_tokens", 0)
+
+        def cost(self) -> float:
+            return sum(cost_usd(model, prompt, completion) for model, (prompt, completion) in self.by_model.items())
+
+        def tokens(self) -> Dict[str, int]:
+            return {"prompt_tokens": sum(t[0] for t in self.by_model.values()),
+                    "completion_tokens": sum(t[1] for t in self.by_model.values())}
+
+    _collector_class = UsageCollector
+    return _collector_class
+
+
+class ModelRouter:
+    """Picks the small or large model per turn, escalates unsure answers, and records cost per route.
+
+    ``models`` maps each route to a model name; chat models are created with
+    ``factory(model_name)`` on first use, unless ready ones are given in
+    ``llms`` (e.g. benchmark stubs).
+    """
+
+    def __init__(self, agent: str, models: Dict[str, str], factory: Optional[Callable] = None,
+                 llms: Optional[Dict[str, object]] = None, threshold: float = DEFAULT_THRESHOLD,
+                 registry: Optional[MetricsRegistry] = None):
+        self.agent = agent
+        self.models = dict(models)
+        self.threshold = threshold
+        self._factory = factory
+        self._llms = dict(llms or {})
+        self._registry = registry
+
+    @classmethod
+    def from_env(cls, agent: str, small: str, large: str, factory: Callable) -> Optional["ModelRouter"]:
+        """Router configured from ``AGENT_ROUTER*`` variables, or None if routing is disabled."""
+        if os.getenv("AGENT_ROUTER", "1") == "0":
+            return None
+        prefix = f"AGENT_ROUTER_{agent.upper()}_"
+        threshold = os.getenv(prefix + "THRESHOLD") or os.getenv("AGENT_ROUTER_THRESHOLD")
+        return cls(agent, {"small": os.getenv(prefix + "SMALL") or small, "large": os.getenv(prefix + "LARGE") or large},
+                   factory=factory, threshold=float(threshold) if threshold else DEFAULT_THRESHOLD)
+
+    @property
+    def registry(self) -> MetricsRegistry:
+        return self._registry or get_registry()
+
+    def llm(self, route: str):
+        """Chat model for ``route``, created on first use."""
+        if route not in self._llms:
+            self._llms[route] = self._factory(self.models[route])
+        return self._llms[route]
+
+    def decide(self, text: str) -> RouteDecision:
+        return classify(text, self.threshold)
+
+    def run(self, text: str, call: Callable[[str, list], str],
+            repeatable: Optional[Callable[[str, Any], bool]] = None) -> RouteResult:
+        """Answer ``text`` with ``call(route, callbacks)``, escalating unsure small-model answers.
+
+        ``call`` runs the turn on ``self.llm(route)`` (or an executor built on
+        it) and must pass ``callbacks`` on, so that token usage can be costed
+        and tool calls seen. ``repeatable(tool_name, tool_input)`` tells whether
+        a tool call may run again; an unsure answer is only escalated if every
+        tool call of the first attempt may. Without it, tools are taken to have
+        no side effects (calculators, searches).
+        """
+        decision = self.decide(text)
+        result = self._attempt(decision.route, text, call, decision)
+        outcome = "ok"
+        if decision.route == "small" and low_confidence(result.output):
+            if repeatable is not None and not all(repeatable(name, args) for name, args in result.tool_calls):
+                # Re-running would repeat the changes the first attempt's tools made
+                outcome = "unsure"
+            else:
+                first = result
+                result = self._attempt("large", text, call, decision)
+                # The turn cost both attempts
+                result.escalated = True
+                result.seconds += first.seconds
+                result.cost_usd += first.cost_usd
+                outcome = "escalated"
+        self.registry.inc("agent_route_requests_total", help="Routed turns by route and outcome",
+                          agent=self.agent, route=result.route, outcome=outcome)
+        return result
+
+    def _attempt(self, route: str, text: str, call: Callable[[str, list], str], decision: RouteDecision) -> RouteResult:
+        collector = _usage_collector_class()(self.models.get(route, route))
+        start = time.perf_counter()
+        try:
+            output = call(route, [collector])
+        except Exception as e:
+            if route == "large":
+                raise
+            # A failing small model is just another reason to escalate
+            output = f"Error: {e}"
+        elapsed = time.perf_counter() - start
+        cost = collector.cost()
+        registry = self.registry
+        registry.observe("agent_route_seconds", elapsed, help="Wall time per routed attempt",
+                         agent=self.agent, route=route)
+        registry.inc("agent_route_cost_usd_total", cost, help="Estimated model cost per route (USD)",
+                     agent=self.agent, route=route)
+        registry.event("route", agent=self.agent, route=route, model=self.models.get(route),
+                       score=decision.score, reasons=list(decision.reasons), seconds=round(elapsed, 6),
+                       cost_usd=round(cost, 8), **collector.tokens())
+        return RouteResult(output, route, decision, seconds=elapsed, cost_usd=cost, usage=collector.tokens(),
+                           tool_calls=collector.tool_calls)
@@ -0,0 +1,413 @@
+"""Client-side rate limiting and fair scheduling of LLM and search requests.
+
+Every request made through the shared HTTP client (``http_clients``) goes
+through a ``RequestScheduler`` per provider (OpenAI, Tavily, ... keyed by
+host) before it is sent:
+
+* Two token buckets, requests/min and tokens/min, hold requests back before
+  the provider would answer 429. Tokens are estimated from the request body
+  (about four bytes per token, plus ``max_tokens``). When the provider sends
+  ``x-ratelimit-remaining-*`` headers the buckets are corrected to match.
+* Waiting requests are queued by priority (0 first). Within a priority, tenants
+  (agent sessions) take turns, so one heavy session cannot starve the others.
+* A request whose deadline would pass before it could be sent is dropped at
+  once with ``DeadlineExceeded`` (an ``httpx.PoolTimeout``) instead of going
+  out late. The deadline is the caller's (``request_context``) or the
+  client's pool timeout.
+* Concurrency adapts to observed latency with AIMD. The limit grows by one per
+  round of fast responses, shrinks when latency climbs well above the best
+  seen, and halves on 429/503. A 429 also pauses the provider for its
+  ``Retry-After``, so retries queue up behind the pause instead of storming.
+
+Tenants are set with ``request_context``: the agent scripts run each session
+(``daemon.run_cli``) and the daemon each client connection as its own tenant.
+
+Settings per provider (``<NAME>`` is ``OPENAI``, ``TAVILY`` or the host in
+upper case with dots as underscores), all optional:
+
+    AGENT_SCHEDULER                 "0" disables scheduling
+    AGENT_RATE_<NAME>_RPM           requests per minute (unlimited if unset or 0)
+    AGENT_RATE_<NAME>_TPM           tokens per minute (unlimited if unset or 0)
+    AGENT_RATE_<NAME>_CONCURRENCY   initial concurrent requests, default 8
+    AGENT_RATE_<NAME>_MAX_CONCURRENCY  upper bound for the adaptive limit, default 64
+    AGENT_RATE_<NAME>_BURST_SECONDS    largest burst, in seconds of quota, default 10
+"""
+
+import contextvars
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional
+
+import httpx
+
+from agent_common.instrumentation import get_registry
+
+# Completion tokens assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 256
+BYTES_PER_TOKEN = 4
+THROTTLE_STATUS_CODES = {429, 503}
+
+_PROVIDERS = {"api.openai.com": "openai", "api.tavily.com": "tavily"}
+
+
+class DeadlineExceeded(httpx.PoolTimeout):
+    """The request could not be sent before its deadline and was dropped."""
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    tenant: str = "default"
+    priority: int = 0  # lower runs first
+    deadline: Optional[float] = None  # time.monotonic() value
+
+
+_context: contextvars.ContextVar = contextvars.ContextVar("agent_request_context", default=None)
+
+
+@contextmanager
+def request_context(tenant: Optional[str] = None, priority: Optional[int] = None,
+                    timeout: Optional[float] = None) -> Iterator[RequestContext]:
+    """Tag the requests made in this block with a tenant, priority and deadline.
+
+    Unset values are inherited from an enclosing block, and a deadline can
+    only get earlier. Outside any block the tenant is ``$AGENT_TENANT``
+    ("default" if unset).
+    """
+    outer = current_context()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if outer.deadline is not None:
+        deadline = outer.deadline if deadline is None else min(deadline, outer.deadline)
+    context = RequestContext(tenant=outer.tenant if tenant is None else tenant,
+                             priority=outer.priority if priority is None else priority,
+                             deadline=deadline)
+    token = _context.set(context)
+    try:
+        yield context
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> RequestContext:
+    return _context.get() or RequestContext(tenant=os.getenv("AGENT_TENANT", "default"))
+
+
+class TokenBucket:
+    """Refills at ``rate`` per second up to ``capacity``; not thread-safe (the scheduler locks)."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0):
+        if per_minute <= 0 or burst_seconds <= 0:
+            raise ValueError(f"rate and burst must be positive, not {per_minute}/min over {burst_seconds}s")
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # oversized requests wait for a full bucket
+        wait = max(0.0, self.paused_until - now)
+        if self.level < amount:
+            wait = max(wait, (amount - self.level) / self.rate)
+        return wait
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def correct(self, remaining: float, now: float) -> None:
+        """Lower the level to what the provider says is left."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+    def pause(self, seconds: float, now: float) -> None:
+        self._refill(now)
+        self.level = 0.0
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    concurrency: int = 8
+    max_concurrency: int = 64
+    # Bucket size in seconds of quota: how large a burst may go out at once
+    burst_seconds: float = 10.0
+
+    def __post_init__(self):
+        for name in ("requests_per_minute", "tokens_per_minute"):
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative, not {value}")
+        if self.concurrency < 1 or self.max_concurrency < self.concurrency or self.burst_seconds <= 0:
+            raise ValueError(f"invalid concurrency {self.concurrency} (max {self.max_concurrency}) "
+                             f"or burst {self.burst_seconds}s")
+
+    @classmethod
+    def from_env(cls, provider: str) -> "RateLimits":
+        prefix = f"AGENT_RATE_{provider.upper().replace('.', '_').replace('-', '_')}_"
+
+        def env(name, cast, default=None):
+            value = os.getenv(prefix + name)
+            return cast(value) if value else default
+
+        return cls(requests_per_minute=env("RPM", float), tokens_per_minute=env("TPM", float),
+                   concurrency=env("CONCURRENCY", int, cls.concurrency),
+                   max_concurrency=env("MAX_CONCURRENCY", int, cls.max_concurrency),
+                   burst_seconds=env("BURST_SECONDS", float, cls.burst_seconds))
+
+
+@dataclass
+class Permit:
+    tenant: str
+    tokens: float
+    queued_seconds: float
+    started: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Waiter:
+    context: RequestContext
+    tokens: float
+    enqueued: float
+    dropped: bool = False
+
+
+class RequestScheduler:
+    """Token buckets, per-tenant priority queues and adaptive concurrency for one provider."""
+
+    def __init__(self, name: str, limits: Optional[RateLimits] = None):
+        self.name = name
+        self.limits = limits or RateLimits()
+        limits = self.limits
+        # A limit of 0 (or None) means unlimited
+        self.requests = TokenBucket(limits.requests_per_minute, limits.burst_seconds) if limits.requests_per_minute else None
+        self.tokens = TokenBucket(limits.tokens_per_minute, limits.burst_seconds) if limits.tokens_per_minute else None
+        self.concurrency = float(self.limits.concurrency)
+        self.in_flight = 0
+        self._min_latency: Optional[float] = None
+        self._cond = threading.Condition()
+        # priority -> tenant -> waiters; tenants take turns in _turns[priority]
+        self._queues: Dict[int, Dict[str, Deque[_Waiter]]] = {}
+        self._turns: Dict[int, Deque[str]] = {}
+        self._priorities: List[int] = []
+
+    def _buckets(self):
+        return [b for b in (self.requests, self.tokens) if b is not None]
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        priority, tenant = waiter.context.priority, waiter.context.tenant
+        tenants = self._queues.setdefault(priority, {})
+        if priority not in self._turns:
+            self._turns[priority] = deque()
+            heapq.heappush(self._priorities, priority)
+        if tenant not in tenants:
+            tenants[tenant] = deque()
+            self._turns[priority].append(tenant)
+        tenants[tenant].append(waiter)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        priority, tenant = waiter.context.priority, waiter.context.tenant
+        queue = self._queues[priority][tenant]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[priority][tenant]
+            self._turns[priority].remove(tenant)
+            if not self._turns[priority]:
+                del self._turns[priority], self._queues[priority]
+                self._priorities.remove(priority)
+                heapq.heapify(self._priorities)
+
+    def _head(self) -> Optional[_Waiter]:
+        """Next waiter to send: the lowest priority number, then the tenant whose turn it is."""
+        if not self._priorities:
+            return None
+        priority = self._priorities[0]
+        return self._queues[priority][self._turns[priority][0]][0]
+
+    def _wait_time(self, waiter: _Waiter, now: float) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.wait_time(1, now)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(waiter.tokens, now))
+        return wait
+
+    def acquire(self, tokens: float = 0, context: Optional[RequestContext] = None) -> Permit:
+        """Block until the request may be sent; raises ``DeadlineExceeded`` if it cannot be in time."""
+        context = context or current_context()
+        now = time.monotonic()
+        waiter = _Waiter(context, tokens, now)
+        with self._cond:
+            self._enqueue(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    deadline = context.deadline
+                    if self._head() is waiter and self.in_flight < int(self.concurrency):
+                        wait = self._wait_time(waiter, now)
+                        if wait <= 0:
+                            self._dispatch(waiter, now)
+                            return Permit(context.tenant, tokens, now - waiter.enqueued)
+                        if deadline is not None and now + wait > deadline:
+                            raise self._drop(waiter, f"rate limit would delay it {wait:.1f}s past its deadline")
+                        timeout = wait
+                    else:
+                        timeout = None
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise self._drop(waiter, "deadline passed while queued")
+                        timeout = deadline - now if timeout is None else min(timeout, deadline - now)
+                    self._cond.wait(timeout)
+            except BaseException:
+                if not waiter.dropped:
+                    self._remove(waiter)
+                self._cond.notify_all()
+                raise
+
+    def _dispatch(self, waiter: _Waiter, now: float) -> None:
+        priority, tenant = waiter.context.priority, waiter.context.tenant
+        self._remove(waiter)
+        turns = self._turns.get(priority)
+        if turns and turns[0] == tenant:
+            turns.rotate(-1)  # the next tenant goes first next time
+        for bucket, amount in ((self.requests, 1), (self.tokens, waiter.tokens)):
+            if bucket is not None:
+                bucket.take(amount, now)
+        self.in_flight += 1
+        self._cond.notify_all()  # another waiter may now be at the head
+        # Not labelled by tenant: the daemon makes a new one for every connection
+        get_registry().observe("agent_scheduler_wait_seconds", now - waiter.enqueued,
+                               help="Time requests spent queued before sending",
+                               provider=self.name)
+
+    def _drop(self, waiter: _Waiter, reason: str) -> DeadlineExceeded:
+        self._remove(waiter)
+        waiter.dropped = True
+        get_registry().inc("agent_scheduler_dropped_total", help="Requests dropped because of their deadline",
+                           provider=self.name)
+        return DeadlineExceeded(f"{self.name} request dropped: {reason}")
+
+    def release(self, permit: Permit, status: Optional[int] = None, headers: Optional[httpx.Headers] = None) -> None:
+        """Report the outcome of a sent request and free its concurrency slot."""
+        now = time.monotonic()
+        latency = now - permit.started
+        with self._cond:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUS_CODES:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                pause = _retry_after(headers) if headers is not None else None
+                for bucket in self._buckets():
+                    bucket.pause(pause if pause is not None else 1.0, now)
+                get_registry().inc("agent_scheduler_throttled_total", help="Responses telling us to slow down",
+                                   provider=self.name, status=str(status))
+            elif status is not None and status < 500:
+                self._adapt(latency)
+                if headers is not None:
+                    self._sync_with_headers(headers, now)
+            self._cond.notify_all()
+
+    def _adapt(self, latency: float) -> None:
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+        else:
+            # Let the baseline drift up slowly, so one lucky response does not pin it forever
+            self._min_latency *= 1.01
+        if latency > 2 * self._min_latency:
+            self.concurrency = max(1.0, self.concurrency * 0.9)
+        else:
+            self.concurrency = min(float(self.limits.max_concurrency), self.concurrency + 1 / self.concurrency)
+
+    def _sync_with_headers(self, headers: httpx.Headers, now: float) -> None:
+        for bucket, name in ((self.requests, "requests"), (self.tokens, "tokens")):
+            value = headers.get(f"x-ratelimit-remaining-{name}")
+            if bucket is not None and value:
+                try:
+                    bucket.correct(float(value), now)
+                except ValueError:
+                    pass
+
+
+def _retry_after(headers: httpx.Headers) -> Optional[float]:
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def provider_name(host: str) -> str:
+    return _PROVIDERS.get(host, host)
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> RequestScheduler:
+    """Process-wide scheduler for ``provider``, configured from the environment on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            scheduler = _schedulers[provider] = RequestScheduler(provider, RateLimits.from_env(provider))
+        return scheduler
+
+
+def scheduling_enabled() -> bool:
+    return os.getenv("AGENT_SCHEDULER", "1") != "0"
+
+
+def estimate_tokens(request: httpx.Request) -> float:
+    """Prompt plus completion tokens a request may use, from its JSON body."""
+    body = request.content
+    if not body:
+        return 0
+    tokens = len(body) / BYTES_PER_TOKEN
+    if request.url.path.endswith("/completions"):
+        try:
+            payload = json.loads(body)
+            tokens += payload.get("max_tokens") or payload.get("max_completion_tokens") or DEFAULT_COMPLETION_TOKENS
+        except (ValueError, AttributeError):
+            tokens += DEFAULT_COMPLETION_TOKENS
+    return tokens
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """Transport that asks the provider's scheduler before each request is sent."""
+
+    def __init__(self, transport: httpx.BaseTransport, schedulers=get_scheduler):
+        self._transport = transport
+        self._schedulers = schedulers
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        scheduler = self._schedulers(provider_name(request.url.host))
+        context = current_context()
+        pool_timeout = (request.extensions.get("timeout") or {}).get("pool")
+        if pool_timeout is not None:
+            # Waiting in our queue counts against the client's pool timeout
+            limit = time.monotonic() + pool_timeout
+            context = RequestContext(context.tenant, context.priority,
+                                     limit if context.deadline is None else min(limit, context.deadline))
+        permit = scheduler.acquire(estimate_tokens(request), context)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            scheduler.release(permit)
+            raise
+        scheduler.release(permit, response.status_code, response.headers)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
@@ -0,0 +1,64 @@
+"""Local token counting for prompt budgeting.
+
+Uses ``tiktoken`` (installed with ``langchain-openai``) when its encoding is
+available locally; otherwise falls back to an estimate of four characters per
+token, which is close enough to decide what fits in a budget. The tokenizer is
+loaded on first use, so importing this module is cheap.
+"""
+
+import os
+import threading
+from typing import Optional
+
+DEFAULT_ENCODING = os.getenv("AGENT_TOKEN_ENCODING", "cl100k_base")
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Return the tiktoken encoding, or None if tiktoken or its data is unavailable."""
+    global _encoding, _encoding_loaded
+    with _lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception:
+                _encoding = None
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text``."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, from_end: bool = False) -> str:
+    """Keep at most ``max_tokens`` tokens from the start (or the end) of ``text``."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text[-limit:] if from_end else text[:limit]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    kept = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
+    return encoding.decode(kept)
+
+
+def tokenizer_name() -> Optional[str]:
+    """Name of the tokenizer in use (None when estimating)."""
+    encoding = _get_encoding()
+    return encoding.name if encoding is not None else None
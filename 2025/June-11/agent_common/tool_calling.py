@@ -0,0 +1,86 @@
+"""Agent executors built on native tool (function) calling.
+
+The demos used ``AgentType.ZERO_SHOT_REACT_DESCRIPTION``: the model writes
+``Thought:/Action:/Action Input:`` text that LangChain parses with regexes, a
+malformed reply costs an extra round-trip, and each step carries reasoning
+prose. With tool calling the model returns structured calls that are checked
+against each tool's JSON schema, independent calls come back together in one
+reply, and no text has to be parsed.
+
+``AGENT_MODE=react`` switches the demos back to the text-parsed ReAct agent,
+for models without tool calling or to compare the two
+(``benchmarks/tool_calling.py``).
+"""
+
+import copy
+import os
+from typing import Callable, List, Optional
+
+AGENT_MODES = ("tools", "react")
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a helpful assistant. Use the tools when they help answer the question. "
+    "When several tool calls do not depend on each other, make them in the same step."
+)
+
+
+def agent_mode(mode: Optional[str] = None) -> str:
+    """``mode`` or ``$AGENT_MODE`` ("tools" by default), validated."""
+    mode = (mode or os.getenv("AGENT_MODE") or "tools").lower()
+    if mode not in AGENT_MODES:
+        raise ValueError(f"Unknown agent mode {mode!r}; use one of {', '.join(AGENT_MODES)}")
+    return mode
+
+
+def single_input_tool(name: str, description: str, func: Callable[[str], str], field: str = "query",
+                      field_description: str = ""):
+    """A tool with one typed string argument.
+
+    Tool-calling models see a real JSON schema (``{"expression": "..."}``
+    instead of LangChain's ``__arg1``), and since the tool still has a single
+    input it also works with the ReAct agent.
+    """
+    from langchain_core.pydantic_v1 import Field, create_model
+    from langchain_core.tools import StructuredTool
+
+    schema = create_model(f"{name.title().replace('_', '')}Input",
+                          **{field: (str, Field(..., description=field_description or field))})
+
+    def run(*args, **kwargs) -> str:
+        # ReAct passes the Action Input positionally, tool calls pass the named field
+        return func(args[0] if args else kwargs[field])
+
+    return StructuredTool.from_function(func=run, name=name, description=description, args_schema=schema)
+
+
+def _escape_braces(tool):
+    escaped = copy.copy(tool)  # BaseModel.copy() would drop exclude=True fields such as callbacks
+    escaped.description = tool.description.replace("{", "{{").replace("}", "}}")
+    return escaped
+
+
+def build_executor(llm, tools: List, verbose: bool = True, mode: Optional[str] = None,
+                   system_prompt: str = DEFAULT_SYSTEM_PROMPT):
+    """Agent executor for ``tools``: tool calling by default, ReAct with ``mode="react"``."""
+    from langchain.agents import AgentExecutor
+
+    if agent_mode(mode) == "react":
+        from langchain.agents import AgentType, initialize_agent
+
+        # ReAct pastes tool descriptions into a format-string prompt, so literal
+        # braces (JSON examples) must be escaped
+        tools = [_escape_braces(tool) for tool in tools]
+        # Without handle_parsing_errors a malformed Action aborts the whole run
+        return initialize_agent(tools=tools, llm=llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+                                verbose=verbose, handle_parsing_errors=True)
+
+    from langchain.agents import create_tool_calling_agent
+    from langchain_core.messages import SystemMessage
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=system_prompt),  # a message, not a template: braces stay literal
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+    agent = create_tool_calling_agent(llm, tools, prompt)
+    return AgentExecutor(agent=agent, tools=tools, verbose=verbose)
@@ -0,0 +1,103 @@
+"""One-shot command latency with and without the agent daemon.
+
+Times a file-agent command (``{"action": "list"}``, which needs no model or
+API key) run as a fresh process each time, and the same command answered by
+a warm daemon (``agent_common/daemon.py``) on a private socket:
+
+* ``local``: ``python files_agent.py '<json>'``, a new interpreter per command.
+* ``script --daemon``: the same script forwarding to the daemon.
+* ``thin client``: ``python agent_common/daemon.py ask files '<json>'``.
+* ``persistent client``: one ``DaemonClient`` connection, request/reply only.
+
+Also reported: the LangChain/OpenAI import time that every local run with a
+model pays and the daemon pays once. Exits with status 1 if a warm daemon round
+trip takes more than 5 ms at p50.
+
+Usage:
+    python daemon_latency.py [--runs 10] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from demos import DEMO_ROOT
+
+sys.path.insert(0, str(DEMO_ROOT))
+
+from agent_common.daemon import DaemonClient, spawn  # noqa: E402
+
+COMMAND = json.dumps({"action": "list", "path": "."})
+FILES_SCRIPT = str(DEMO_ROOT / "files-demo" / "files_agent.py")
+DAEMON_SCRIPT = str(DEMO_ROOT / "agent_common" / "daemon.py")
+LANGCHAIN_IMPORTS = "import langchain_openai, langchain.agents"
+ROUND_TRIP_BUDGET_MS = 5.0
+
+
+def _time_process(argv, env, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, env=env, cwd=str(DEMO_ROOT / "files-demo"), check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(timings: list) -> dict:
+    return {"p50_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sock = os.path.join(tmp, "agents.sock")
+        env = dict(os.environ, AGENT_DAEMON_SOCKET=sock, AGENT_MODE="direct")
+        os.environ["AGENT_MODE"] = "direct"  # inherited by the daemon
+        spawn(sock, idle_timeout=300)
+        try:
+            with DaemonClient(sock) as client:
+                client.ask("files", COMMAND)  # build the agent
+                round_trips = []
+                for _ in range(args.runs * 10):
+                    start = time.perf_counter()
+                    client.ask("files", COMMAND)
+                    round_trips.append(time.perf_counter() - start)
+
+            results = {
+                "local": _summary(_time_process([sys.executable, FILES_SCRIPT, COMMAND], env, args.runs)),
+                "script --daemon": _summary(_time_process(
+                    [sys.executable, FILES_SCRIPT, "--daemon", COMMAND], env, args.runs)),
+                "thin client": _summary(_time_process(
+                    [sys.executable, DAEMON_SCRIPT, "ask", "files", COMMAND], env, args.runs)),
+                "persistent client": _summary(round_trips),
+                "langchain import": _summary(_time_process(
+                    [sys.executable, "-c", LANGCHAIN_IMPORTS], env, max(1, args.runs // 2))),
+            }
+        finally:
+            with DaemonClient(sock) as client:
+                client.request({"op": "shutdown"})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'run':<20}{'p50 ms':>10}{'min ms':>10}")
+        for name, r in results.items():
+            print(f"{name:<20}{r['p50_ms']:>10.2f}{r['min_ms']:>10.2f}")
+
+    if results["persistent client"]["p50_ms"] > ROUND_TRIP_BUDGET_MS:
+        print(f"❌ daemon round trip {results['persistent client']['p50_ms']:.2f} ms exceeds {ROUND_TRIP_BUDGET_MS} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Import the demo agent scripts from their (hyphenated) directories."""
+
+import importlib
+import sys
+from pathlib import Path
+
+DEMO_ROOT = Path(__file__).resolve().parent.parent
+
+DEMOS = {
+    "basic": ("demo-basic-agent", "basic_agent_tutorial"),
+    "calculator": ("calculator-demo", "calculator_agent"),
+    "files": ("files-demo", "files_agent"),
+    "tool_agent": ("tool-agent-tutorial", "basic_tool_agent"),
+    "web_search": ("web-search-demo", "basic_web_search_agent"),
+}
+
+if str(DEMO_ROOT) not in sys.path:
+    sys.path.insert(0, str(DEMO_ROOT))
+
+
+def load_demo(name: str):
+    """Import and return the module for demo ``name`` (a key of ``DEMOS``)."""
+    demo_dir, module = DEMOS[name]
+    path = str(DEMO_ROOT / demo_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
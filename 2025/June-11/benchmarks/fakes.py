@@ -0,0 +1,174 @@
+"""Deterministic stand-ins for the OpenAI and Tavily backends.
+
+``ScriptedChatModel`` is a LangChain chat model that never touches the
+network. For ReAct prompts it answers like a well-behaved model: an
+``Action`` for the most suitable tool per sub-question (sub-questions are
+separated by ";"), then a ``Final Answer`` once every one has an
+``Observation``. With tools bound (``bind_tools``) it returns native tool
+calls instead, all sub-questions in one reply, as tool-calling models do for
+independent calls. For plain chat it returns a short echo. Token usage is
+reported (about four characters per token) so instrumentation and cost
+accounting see realistic numbers.
+
+A request may end with the JSON arguments a real model would choose
+(``"total sales per region {"action": "query_data", ...}"``), which lets
+benchmarks send plain-language requests to multi-action tools.
+
+``react_error_rate`` makes that share of ReAct replies malformed (no
+``Action Input``), to model the parsing retries of text-parsed agents, and
+``unsure_rate`` makes that share of final answers a hedge ("I'm not sure"),
+to model a small model that a router has to escalate.
+"""
+
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+SEARCH_TOOL_NAME = "tavily_search_results_json"
+
+_TOOL_LIST = re.compile(r"should be one of \[(.*?)\]")
+_OBSERVATION = re.compile(r"\nObservation:(.*?)(?=\nThought:|\Z)", re.S)
+_MATH = re.compile(r"^[\d\s.+\-*/()%]+$")
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline chat model with scripted ReAct / tool-calling behaviour and a fixed latency."""
+
+    latency: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    react_error_rate: float = 0.0
+    unsure_rate: float = 0.0
+    seed: int = 0
+    model_name: str = "scripted"  # reported with the usage, e.g. for cost accounting
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, tools: Optional[List[Dict]] = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(m.content) for m in messages)
+        if tools:
+            message = self._tool_reply(messages, tools)
+            reply = message.content or json.dumps(message.additional_kwargs["tool_calls"])
+        else:
+            reply = self._reply(prompt)
+            message = AIMessage(content=reply)
+        usage = {"prompt_tokens": approx_tokens(prompt + json.dumps(tools or [])),
+                 "completion_tokens": approx_tokens(reply)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.prompt_tokens += usage["prompt_tokens"]
+        self.completion_tokens += usage["completion_tokens"]
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": usage, "model_name": self.model_name})
+
+    def _chance(self, rate: float, salt: int = 0) -> bool:
+        # Seeded per call, so runs are repeatable
+        return bool(rate) and random.Random(self.seed * 1_000_003 + self.calls + salt).random() < rate
+
+    def _malformed(self) -> bool:
+        return self._chance(self.react_error_rate)
+
+    def _final(self, answer: str) -> str:
+        """``answer``, or with ``unsure_rate`` a hedge that routers treat as low confidence."""
+        return "I'm not sure about that." if self._chance(self.unsure_rate, salt=500_009) else answer
+
+    def _reply(self, prompt: str) -> str:
+        tools = _TOOL_LIST.search(prompt)
+        if not tools:
+            # Plain conversation: answer the last line
+            last_line = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+            return self._final(f"You said: {last_line[:200]}")
+
+        question = prompt.rsplit("Question:", 1)[-1]
+        parts = _parts(question.split("\n", 1)[0])
+        observations = question.count("\nObservation:")
+        # Parsing-error retries also come back as observations; only real ones count
+        observations -= question.count("Invalid Format")
+        if observations >= len(parts):
+            # Same answer as the tool-calling reply: every result, in order
+            results = [o.strip() for o in _OBSERVATION.findall(question) if not o.startswith(" Invalid Format")]
+            return f"Thought: I now know the final answer\nFinal Answer: {self._final('; '.join(r[:200] for r in results))}"
+
+        names = [name.strip() for name in tools.group(1).split(",")]
+        query = parts[observations]
+        query = _tool_input(query)
+        tool = _pick_tool(query, names)
+        if self._malformed():
+            return f"Thought: I should use {tool} with {query}"
+        return f"Thought: I should use {tool}\nAction: {tool}\nAction Input: {query}"
+
+    def _tool_reply(self, messages: List[BaseMessage], tools: List[Dict]) -> AIMessage:
+        if isinstance(messages[-1], ToolMessage):
+            results = [str(m.content) for m in messages if isinstance(m, ToolMessage)]
+            return AIMessage(content=self._final("; ".join(result[:200] for result in results)))
+
+        question = next((str(m.content) for m in reversed(messages) if m.type == "human"), "")
+        question = question.split("\n", 1)[0]  # the request; documentation may follow
+        functions = {tool["function"]["name"]: tool["function"] for tool in tools}
+        calls = []
+        for i, query in enumerate(map(_tool_input, _parts(question))):
+            name = _pick_tool(query, list(functions))
+            calls.append({"id": f"call_{self.calls}_{i}", "type": "function",
+                          "function": {"name": name, "arguments": json.dumps(_arguments(query, functions[name]))}})
+        return AIMessage(content="", additional_kwargs={"tool_calls": calls})
+
+
+def _parts(question: str) -> List[str]:
+    return [part.strip() for part in question.split(";") if part.strip()] or [question.strip()]
+
+
+def _tool_input(query: str) -> str:
+    """A request ending in a JSON object ("total per region {...}") stands for those tool arguments."""
+    start = query.find("{")
+    if start > 0 and query.endswith("}"):
+        return query[start:]
+    return query
+
+
+def _pick_tool(query: str, names: List[str]) -> str:
+    if "calculator" in names and _MATH.match(query):
+        return "calculator"
+    if SEARCH_TOOL_NAME in names and not query.startswith("{"):
+        return SEARCH_TOOL_NAME
+    return names[0]
+
+
+def _arguments(query: str, function: Dict) -> Dict:
+    """JSON questions are taken as the arguments; otherwise the first property gets the text."""
+    if query.startswith("{"):
+        return json.loads(query)
+    properties = list(function.get("parameters", {}).get("properties", {}))
+    return {properties[0] if properties else "__arg1": query}
+
+
+def fake_search_tool(latency: float = 0.0) -> StructuredTool:
+    """Search tool with the Tavily tool's name that returns canned results."""
+    def search(query: str) -> str:
+        if latency:
+            time.sleep(latency)
+        return json.dumps([{"url": "https://example.com/frederick-python",
+                            "content": f"Canned result for {query[:100]}"}])
+
+    return StructuredTool.from_function(func=search, name=SEARCH_TOOL_NAME,
+                                        description="A search engine. Input should be a search query.")
@@ -0,0 +1,193 @@
+"""Concurrent load generator for the FileExplorerTool action layer.
+
+Replays a weighted mix of actions from N threads or processes against a
+scratch directory, then checks the results for consistency:
+
+* every ``read`` must return only whole records (no torn writes),
+* every appended or prepended record must be in the final file exactly once
+  (no lost updates), unless ``write_file`` is part of the mix.
+
+Per-action throughput and p50/p99/max latency are reported. The exit status
+is 1 if any consistency check fails.
+
+Usage:
+    python files_load.py                                    # 8 threads, default mix
+    python files_load.py --mode process --workers 4
+    python files_load.py --mix read=5,update_file=3,prepend=1,query_file=1 --files 2
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+DEFAULT_MIX = "read=4,update_file=3,prepend=1,query_file=1,list=1"
+RECORD = re.compile(r"^w\d{3}-\d{7}$")
+SEPARATOR = "-" * 40
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))] if ordered else 0.0
+
+
+def read_content(result: str):
+    """Extract the file content from a ``read`` response, or None on error."""
+    if not result.startswith("📄"):
+        return None
+    body = result.split(SEPARATOR + "\n", 1)[1]
+    return body.rsplit("\n" + SEPARATOR, 1)[0]
+
+
+def run_worker(worker: int, paths: list, mix: dict, ops: int, seed: int) -> dict:
+    """Run ``ops`` random actions and report latencies, written records and anomalies."""
+    from demos import load_demo
+
+    tool = load_demo("files").FileExplorerTool()
+    rng = random.Random(seed + worker)
+    actions, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    written = defaultdict(list)
+    anomalies = []
+
+    for seq in range(ops):
+        action = rng.choices(actions, weights)[0]
+        path = rng.choice(paths)
+        record = f"w{worker:03d}-{seq:07d}\n"
+        if action == "update_file":
+            request = {"action": "update_file", "path": path, "content": record, "mode": "append"}
+        elif action == "prepend":
+            request = {"action": "update_file", "path": path, "content": record, "mode": "prepend"}
+        elif action == "write_file":
+            request = {"action": "write_file", "path": path, "content": record}
+        elif action == "list":
+            request = {"action": "list", "path": str(Path(path).parent)}
+        elif action == "query_file":
+            request = {"action": "query_file", "path": path, "query": f"w{worker:03d}-"}
+        else:
+            request = {"action": action, "path": path}
+
+        start = time.perf_counter()
+        result = tool._execute_action(request)
+        latencies[action].append(time.perf_counter() - start)
+
+        if result.startswith("❌"):
+            anomalies.append(f"{action} failed: {result[:120]}")
+        elif action in ("update_file", "prepend", "write_file"):
+            written[path].append(record.strip())
+        elif action == "read":
+            content = read_content(result)
+            bad = [line for line in (content or "").splitlines() if not RECORD.match(line)]
+            if content is None or bad:
+                anomalies.append(f"torn read of {path}: {bad[:3]!r}")
+
+    return {"latencies": dict(latencies), "written": dict(written), "anomalies": anomalies}
+
+
+def check_final_state(paths: list, results: list, exact: bool) -> list:
+    """Compare final file contents with every record the workers wrote."""
+    anomalies = []
+    for path in paths:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+        malformed = [line for line in lines if not RECORD.match(line)]
+        if malformed:
+            anomalies.append(f"{path}: {len(malformed)} malformed lines, e.g. {malformed[:3]!r}")
+        if len(lines) != len(set(lines)):
+            anomalies.append(f"{path}: duplicated records")
+        if exact:
+            expected = {record for r in results for record in r["written"].get(path, [])}
+            lost = expected - set(lines)
+            if lost:
+                anomalies.append(f"{path}: {len(lost)} lost updates")
+    return anomalies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--ops", type=int, default=500, help="actions per worker")
+    parser.add_argument("--files", type=int, default=4, help="number of shared files")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated action=weight pairs "
+                        "(read, update_file, prepend, write_file, query_file, list)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    scratch = Path(tempfile.mkdtemp(prefix="files-load-"))
+    # Confine the agent to the scratch directory, which also holds its undo journal; inherited by worker processes
+    os.environ["FILE_AGENT_ROOT"] = str(scratch)
+    paths = [str(scratch / f"shared_{i}.log") for i in range(args.files)]
+    for path in paths:
+        Path(path).touch()
+
+    pool_class = ThreadPoolExecutor if args.mode == "thread" else ProcessPoolExecutor
+    started = time.perf_counter()
+    try:
+        with pool_class(max_workers=args.workers) as pool:
+            futures = [pool.submit(run_worker, w, paths, mix, args.ops, args.seed) for w in range(args.workers)]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - started
+        anomalies = [a for r in results for a in r["anomalies"]]
+        anomalies += check_final_state(paths, results, exact="write_file" not in mix)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    per_action = defaultdict(list)
+    for r in results:
+        for action, values in r["latencies"].items():
+            per_action[action].extend(values)
+    report = {
+        "mode": args.mode,
+        "workers": args.workers,
+        "total_ops": sum(len(v) for v in per_action.values()),
+        "ops_per_s": round(sum(len(v) for v in per_action.values()) / elapsed, 1),
+        "actions": {
+            action: {
+                "count": len(values),
+                "ops_per_s": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+            for action, values in sorted(per_action.items())
+        },
+        "anomalies": anomalies,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['total_ops']} ops from {args.workers} {args.mode}s: {report['ops_per_s']} ops/s")
+        print(f"{'action':<12} {'count':>7} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for action, stats in report["actions"].items():
+            print(f"{action:<12} {stats['count']:>7} {stats['ops_per_s']:>9} {stats['p50_ms']:>9} "
+                  f"{stats['p99_ms']:>9} {stats['max_ms']:>9}")
+        for anomaly in anomalies[:20]:
+            print(f"❌ {anomaly}")
+        if not anomalies:
+            print("✅ No torn reads or lost updates")
+    return 1 if anomalies else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
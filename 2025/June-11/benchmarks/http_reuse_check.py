@@ -0,0 +1,128 @@
+"""Prove that the shared HTTP client reuses connections across agent turns.
+
+Starts a local mock server that speaks just enough of the OpenAI chat
+completions and Tavily search APIs, then drives ``ChatOpenAI`` and the Tavily
+tool from ``agent_common.http_clients`` for several turns. The server records
+every TCP connection it accepts; with keep-alive working, all turns share one.
+It also checks that retryable 503 responses are retried with backoff.
+
+Usage:
+    python http_reuse_check.py [--turns 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Keep-alive HTTP/1.1 server that counts connections and requests."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockApiHandler)
+        self.connections = set()
+        self.requests = 0
+        self.failures_left = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+            self.server.requests += 1
+            fail = self.server.failures_left > 0
+            if fail:
+                self.server.failures_left -= 1
+
+        if fail:
+            self._send(503, {"error": "try again"})
+        elif self.path.endswith("/chat/completions"):
+            self._send(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "pong"}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+            })
+        elif self.path.endswith("/search"):
+            self._send(200, {"query": body.get("query"), "results": [
+                {"title": "Mock", "url": "https://example.com", "content": "mock result", "score": 1.0}]})
+        else:
+            self._send(404, {"error": "unknown endpoint"})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    # Keep backoff short so the retry check runs quickly
+    os.environ.setdefault("AGENT_HTTP_BACKOFF_BASE", "0.01")
+    from agent_common.http_clients import close_http_client, make_chat_model, make_search_tool
+
+    server = MockApiServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failures = []
+    try:
+        llm = make_chat_model("gpt-mock", openai_api_key="test", base_url=f"{server.base_url}/v1")
+        search = make_search_tool(api_key="test", api_url=server.base_url)
+
+        for _ in range(args.turns):
+            llm.invoke("ping")
+            search.invoke("frederick python")
+
+        print(f"{server.requests} requests over {len(server.connections)} connection(s)")
+        if server.requests != 2 * args.turns:
+            failures.append(f"expected {2 * args.turns} requests, server saw {server.requests}")
+        if len(server.connections) != 1:
+            failures.append("connections were not reused across turns")
+
+        server.failures_left = 2
+        requests_before = server.requests
+        reply = llm.invoke("ping")
+        if reply.content != "pong" or server.requests - requests_before != 3:
+            failures.append("503 responses were not retried")
+        else:
+            print("503 responses retried with backoff")
+    finally:
+        close_http_client()
+        server.shutdown()
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ LLM and search clients share one keep-alive connection")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Import-time regression gate for the demo agent entry points.
+
+Runs each entry point under ``python -X importtime`` in a fresh interpreter,
+parses the timing report and fails when
+
+* a heavy dependency (LangChain, OpenAI, Tavily, ...) is imported eagerly, or
+* the total import time exceeds the budget.
+
+Usage:
+    python import_time.py                 # check every entry point
+    python import_time.py --budget-ms 300 # custom budget
+    python import_time.py --json          # machine-readable report
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+DEMO_ROOT = Path(__file__).resolve().parent.parent
+
+# (demo directory, module name) for every runnable agent script
+ENTRY_POINTS = [
+    ("demo-basic-agent", "basic_agent_tutorial"),
+    ("calculator-demo", "calculator_agent"),
+    ("files-demo", "files_agent"),
+    ("tool-agent-tutorial", "basic_tool_agent"),
+    ("web-search-demo", "basic_web_search_agent"),
+]
+
+# Top-level packages that must only be imported on first use
+HEAVY_MODULES = {
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_community",
+    "openai",
+    "tiktoken",
+    "tavily",
+    "numpy",
+    "httpx",
+}
+
+DEFAULT_BUDGET_MS = 250.0
+
+
+def measure_import(demo_dir: str, module: str) -> dict:
+    """Import ``module`` from ``demo_dir`` in a fresh interpreter and parse -X importtime."""
+    directory = DEMO_ROOT / demo_dir
+    code = f"import sys; sys.path.insert(0, {str(directory)!r}); import {module}"
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    total_us = 0
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()[1:]  # drop the separator space, keep the nesting indent
+        # Only top-level entries (no indentation) contribute to the total
+        if not name.startswith("  "):
+            total_us += int(cumulative_us)
+        imported.add(name.strip().split(".")[0])
+
+    return {
+        "entry_point": f"{demo_dir}/{module}.py",
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else "",
+        "total_ms": round(total_us / 1000, 1),
+        "heavy_imports": sorted(imported & HEAVY_MODULES),
+    }
+
+
+def check(results: list, budget_ms: float) -> list:
+    """Return a list of human-readable failures."""
+    failures = []
+    for result in results:
+        name = result["entry_point"]
+        if not result["ok"]:
+            failures.append(f"{name}: import failed ({result['error']})")
+            continue
+        if result["heavy_imports"]:
+            failures.append(f"{name}: eagerly imports {', '.join(result['heavy_imports'])}")
+        if result["total_ms"] > budget_ms:
+            failures.append(f"{name}: {result['total_ms']} ms exceeds budget of {budget_ms} ms")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help="maximum cumulative import time per entry point")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [measure_import(demo_dir, module) for demo_dir, module in ENTRY_POINTS]
+    failures = check(results, args.budget_ms)
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results, "failures": failures}, indent=2))
+    else:
+        for result in results:
+            status = "ok" if result["ok"] else "FAILED"
+            print(f"{result['entry_point']:<45} {result['total_ms']:>8.1f} ms  {status}")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print(f"✅ All entry points import within {args.budget_ms} ms without heavy dependencies")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Cost of making file-agent changes undoable: journal vs copying the workspace.
+
+Builds a scratch workspace (``--files`` files of ``--size-kib`` KiB in a few
+folders) and times:
+
+* ``workspace copy``: the old workaround, ``copy_tree`` of the whole workspace
+  before a risky run.
+* per action with the journal (``files-demo/journal.py``): ``write_file``,
+  ``update_file`` (append), ``delete_file``, ``move_file`` and a recursive
+  ``delete_folder`` on the workspace, each followed by ``undo`` and ``redo``.
+
+Also reported: the journal's disk use after all of it. Exits with status 1 if
+an undo does not restore the original content.
+
+Usage:
+    python journal_undo.py [--files 2000] [--size-kib 64] [--json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from demos import load_demo
+
+
+def _disk_usage(path: str) -> int:
+    total, seen = 0, set()
+    for root, _, files in os.walk(path):
+        for name in files:
+            st = os.lstat(os.path.join(root, name))
+            if (st.st_dev, st.st_ino) not in seen:  # hardlinked objects take no extra space
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kib", type=int, default=64)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    files_agent = load_demo("files")
+    scratch = tempfile.mkdtemp(prefix="journal-undo-")
+    workspace = os.path.join(scratch, "workspace")
+    os.environ["FILE_AGENT_ROOT"] = workspace
+    try:
+        payload = os.urandom(args.size_kib * 1024)
+        for i in range(args.files):
+            folder = os.path.join(workspace, f"dir{i % 10}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"file{i}.bin"), "wb") as f:
+                f.write(payload[i % 64:] + payload[:i % 64])
+        with open(os.path.join(workspace, "notes.txt"), "w") as f:
+            f.write("original\n" * 1000)
+
+        start = time.perf_counter()
+        files_agent.copy_tree(workspace, os.path.join(scratch, "backup"))
+        results = {"workspace copy": {"action_ms": (time.perf_counter() - start) * 1000}}
+        shutil.rmtree(os.path.join(scratch, "backup"))
+
+        tool = files_agent.FileExplorerTool()
+        run = lambda **action: tool._run(json.dumps(action))  # noqa: E731
+        notes = os.path.join(workspace, "notes.txt")
+        target = os.path.join(workspace, "dir1", "file1.bin")
+        actions = {
+            "write_file": {"action": "write_file", "path": notes, "content": "replaced\n"},
+            "update_file": {"action": "update_file", "path": notes, "content": "appended\n"},
+            "delete_file": {"action": "delete_file", "path": target},
+            "move_file": {"action": "move_file", "source": target, "destination": target + ".moved"},
+            "delete_folder": {"action": "delete_folder", "path": os.path.join(workspace, "dir2"), "recursive": True},
+        }
+        failures = []
+        for name, action in actions.items():
+            before = {p: open(p, "rb").read() for p in (notes, target)}
+            timings = {}
+            for step, request in (("action", action), ("undo", {"action": "undo"}), ("redo", {"action": "redo"}),
+                                  ("undo again", {"action": "undo"})):
+                start = time.perf_counter()
+                result = run(**request)
+                timings[f"{step.replace(' ', '_')}_ms"] = (time.perf_counter() - start) * 1000
+                if not result.startswith("✅"):
+                    failures.append(f"{name} {step}: {result}")
+            if any(open(p, "rb").read() != content for p, content in before.items()) or \
+                    len(os.listdir(os.path.join(workspace, "dir2"))) != args.files // 10:
+                failures.append(f"{name}: undo did not restore the workspace")
+            results[name] = timings
+        results["journal disk"] = {"bytes": _disk_usage(os.path.join(workspace, ".file_agent_journal"))}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'operation':<16}{'action ms':>11}{'undo ms':>10}{'redo ms':>10}")
+        for name, r in results.items():
+            if "action_ms" in r:
+                undo_redo = "".join(f"{r[key]:>10.2f}" if key in r else f"{'-':>10}" for key in ("undo_ms", "redo_ms"))
+                print(f"{name:<16}{r['action_ms']:>11.2f}{undo_redo}")
+        print(f"journal disk use: {results['journal disk']['bytes'] / 1024:.0f} KiB "
+              f"(workspace: {args.files * args.size_kib} KiB)")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Size and latency of file-agent results in the text, JSON and TSV output formats.
+
+Builds a scratch workspace (``--files`` small text files in a few folders) and
+runs the record-producing actions (``list``, ``grep_tree``, ``find_duplicates``,
+``query_data``) and a ``read`` in each output format (``files-demo/output.py``),
+plus one ``batch`` of all of them. Reported per action and format: result
+tokens and p50 latency.
+
+Exits with status 1 if a TSV result has more tokens than the text one (JSON
+pays for quoting; it is there for strict parsers, not size).
+
+Usage:
+    python output_formats.py [--files 200] [--runs 20] [--json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from demos import DEMO_ROOT, load_demo
+
+sys.path.insert(0, str(DEMO_ROOT))
+
+from agent_common.tokens import count_tokens  # noqa: E402
+
+FORMATS = ("text", "json", "tsv")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    files_agent = load_demo("files")
+    scratch = tempfile.mkdtemp(prefix="output-formats-")
+    os.environ["FILE_AGENT_ROOT"] = scratch
+    try:
+        for i in range(args.files):
+            folder = os.path.join(scratch, f"dir{i % 5}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"notes_{i}.txt"), "w") as f:
+                f.write(f"item {i % 20}\nstatus: open\nowner: team {i % 3}\n")
+        with open(os.path.join(scratch, "orders.csv"), "w") as f:
+            f.write("region,qty,price\n" + "".join(f"r{i % 7},{i % 11},{i % 13}.5\n" for i in range(2000)))
+
+        actions = {
+            "list": {"action": "list", "path": os.path.join(scratch, "dir0")},
+            "grep_tree": {"action": "grep_tree", "path": scratch, "query": "status", "max_matches": 50},
+            "find_duplicates": {"action": "find_duplicates", "path": scratch},
+            "query_data": {"action": "query_data", "path": os.path.join(scratch, "orders.csv"),
+                           "select": ["region", "sum(qty) as qty"], "group_by": ["region"]},
+            "read": {"action": "read", "path": os.path.join(scratch, "dir0", "notes_0.txt")},
+        }
+        actions["batch"] = {"action": "batch", "actions": list(actions.values())}
+
+        tool = files_agent.FileExplorerTool()
+        results, failures = {}, []
+        for name, action in actions.items():
+            results[name] = {}
+            for fmt in FORMATS:
+                query = json.dumps(dict(action, output=fmt))
+                timings = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    result = tool._run(query)
+                    timings.append(time.perf_counter() - start)
+                results[name][fmt] = {"tokens": count_tokens(result), "p50_ms": statistics.median(timings) * 1000}
+            if results[name]["tsv"]["tokens"] > results[name]["text"]["tokens"]:
+                failures.append(f"{name}: tsv result is larger than text")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'action':<17}" + "".join(f"{fmt + ' tok':>11}{fmt + ' ms':>10}" for fmt in FORMATS))
+        for name, r in results.items():
+            print(f"{name:<17}" + "".join(f"{r[fmt]['tokens']:>11}{r[fmt]['p50_ms']:>10.2f}" for fmt in FORMATS))
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Prompt tokens per model call for the files agent: full action catalogue vs assembled prompts.
+
+"full" is the old layout: the tool description lists every action with all of
+its fields on every call. "assembled" is ``agent_common/prompts.py``: a
+one-line-per-action description in a byte-stable prefix, plus the details of
+the two or three actions the request is about in the user turn.
+
+For both ``AGENT_MODE``s it sends the same plain-language requests through
+``FilesAgent`` and ``fakes.ScriptedChatModel``, records every prompt (tool
+schemas included), and reports prompt tokens per call and the size and number
+of distinct stable prefixes (system prompt plus tool schemas, or for ReAct the
+text before the question). Exits with status 1 if the assembled prefix changes
+between calls or the assembled prompts are not smaller.
+
+Usage:
+    python prompt_size.py [--json]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+from demos import load_demo
+from fakes import ScriptedChatModel
+
+MODES = ("react", "tools")
+VARIANTS = ("full", "assembled")
+
+
+def _tasks(root: Path):
+    """(plain-language request, the arguments a model would choose for it)."""
+    (root / "sales.csv").write_text("region,qty,price\nEU,3,2.5\nUS,5,1.0\nEU,1,4.0\n", encoding="utf-8")
+    (root / "a.txt").write_text("alpha\nbeta\n", encoding="utf-8")
+    (root / "b.txt").write_text("alpha\ngamma\n", encoding="utf-8")
+    (root / "app.log").write_text("".join(f"line {i}\n" for i in range(100)), encoding="utf-8")
+    path = lambda name: str(root / name)  # noqa: E731
+    return [
+        ("what is the total quantity per region in sales.csv",
+         {"action": "query_data", "path": path("sales.csv"), "select": ["region", "sum(qty) as qty"],
+          "group_by": ["region"]}),
+        ("what changed between a.txt and b.txt", {"action": "diff", "path": path("a.txt"), "other_path": path("b.txt")}),
+        ("show the last 5 lines of app.log", {"action": "tail", "path": path("app.log"), "lines": 5}),
+        ("which files mention gamma", {"action": "grep_tree", "query": "gamma", "path": str(root)}),
+        ("rename a.txt to c.txt", {"action": "move_file", "source": path("a.txt"), "destination": path("c.txt")}),
+        ("list the folder", {"action": "list", "path": str(root)}),
+    ]
+
+
+def _recorder_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class PromptRecorder(BaseCallbackHandler):
+        """Keeps the stable prefix and the full text of every chat-model prompt."""
+
+        def __init__(self):
+            self.prompts = []
+            self.prefixes = []
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            tools = json.dumps((kwargs.get("invocation_params") or {}).get("tools") or [], sort_keys=True)
+            batch = messages[0]
+            text = "\n".join(str(m.content) for m in batch)
+            if batch[0].type == "system":
+                prefix = str(batch[0].content)
+            else:
+                # ReAct: one human message; everything before the question is fixed
+                prefix = text.split("\nQuestion:", 1)[0]
+            self.prefixes.append(tools + prefix)
+            self.prompts.append(tools + text)
+
+    return PromptRecorder
+
+
+def run_variant(mode: str, variant: str, tasks) -> dict:
+    from agent_common.tokens import count_tokens
+
+    files = load_demo("files")
+    agent = files.FilesAgent(llm=ScriptedChatModel(), mode=mode)
+    if variant == "full":
+        agent.tools[0].description = files.FILE_ACTIONS.full()
+        agent.prompts.catalog = None
+    recorder = _recorder_class()()
+    for request, arguments in tasks:
+        # The fake model reads the arguments from the end of the request line;
+        # the documentation is chosen from the request alone
+        turn = agent.prompts.user_turn(request).replace(request, f"{request} {json.dumps(arguments)}", 1)
+        agent.agent.invoke({"input": turn}, config={"callbacks": [recorder]})
+
+    tokens = [count_tokens(prompt) for prompt in recorder.prompts]
+    prefixes = set(recorder.prefixes)
+    return {
+        "calls": len(tokens),
+        "prompt_tokens_mean": statistics.mean(tokens),
+        "prompt_tokens_max": max(tokens),
+        "prefix_tokens": max(count_tokens(prefix) for prefix in prefixes),
+        "distinct_prefixes": len(prefixes),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message=".*initialize_agent.*")
+    root = Path(tempfile.mkdtemp(prefix="bench-prompt-size-"))
+    try:
+        results = {}
+        for mode in MODES:
+            for variant in VARIANTS:
+                # Fresh files per run: move_file changes the tree
+                tasks = _tasks(root)
+                results[f"{mode}/{variant}"] = run_variant(mode, variant, tasks)
+                shutil.rmtree(root, ignore_errors=True)
+                root.mkdir()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'run':<18}{'calls':>7}{'tok/call':>10}{'max tok':>9}{'prefix tok':>12}{'prefixes':>10}")
+        for name, r in results.items():
+            print(f"{name:<18}{r['calls']:>7}{r['prompt_tokens_mean']:>10.0f}{r['prompt_tokens_max']:>9}"
+                  f"{r['prefix_tokens']:>12}{r['distinct_prefixes']:>10}")
+
+    failures = []
+    for mode in MODES:
+        full, assembled = results[f"{mode}/full"], results[f"{mode}/assembled"]
+        if assembled["distinct_prefixes"] != 1:
+            failures.append(f"{mode}: the stable prefix changed between calls")
+        if assembled["prompt_tokens_mean"] >= full["prompt_tokens_mean"]:
+            failures.append(f"{mode}: assembled prompts are not smaller than the full catalogue")
+        elif not args.json:
+            saved = 1 - assembled["prompt_tokens_mean"] / full["prompt_tokens_mean"]
+            print(f"✅ {mode}: {saved:.0%} fewer prompt tokens per call")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Throughput, 429s and fairness under a provider quota, with and without the scheduler.
+
+An in-process fake provider enforces a requests/s and tokens/s quota (with one
+second of burst) and answers 429 with ``Retry-After`` beyond it; its latency
+grows once too many requests run at once. A heavy tenant (many threads sending
+back to back) and a few light tenants (one thread each, with think time) send
+chat-completion-sized requests through ``RetryTransport``:
+
+* ``retry``: retries with backoff only, as before the scheduler.
+* ``scheduled``: ``ScheduledTransport`` in front (``agent_common/scheduler.py``),
+  configured with the same quota.
+
+Reported per strategy: successful requests/s against the quota, 429s received,
+requests that failed after all retries, and p50/p95 latency of the light
+tenants. Exits with status 1 if the scheduler keeps less than 90% of the quota
+or gets 429s for more than 2% of its requests.
+
+Usage:
+    python rate_limit.py [--seconds 5] [--rps 20] [--heavy-threads 16] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_common.http_clients import HttpSettings, RetryTransport  # noqa: E402
+from agent_common.scheduler import RateLimits, RequestScheduler, ScheduledTransport, request_context  # noqa: E402
+
+URL = "https://api.openai.com/v1/chat/completions"
+PROMPT = "x" * 400  # ~100 prompt tokens
+MAX_TOKENS = 100
+
+
+class FakeProvider(httpx.BaseTransport):
+    """Quota-enforcing chat endpoint: token buckets with one second of burst."""
+
+    def __init__(self, rps: float, tps: float, base_latency: float = 0.02, comfortable_concurrency: int = 16):
+        self.rps, self.tps = rps, tps
+        self.requests, self.tokens = rps, tps
+        self.updated = time.monotonic()
+        self.base_latency = base_latency
+        self.comfortable = comfortable_concurrency
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.throttled = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        cost = len(request.content) / 4 + payload.get("max_tokens", 0)
+        with self.lock:
+            now = time.monotonic()
+            elapsed, self.updated = now - self.updated, now
+            self.requests = min(self.rps, self.requests + elapsed * self.rps)
+            self.tokens = min(self.tps, self.tokens + elapsed * self.tps)
+            if self.requests < 1 or self.tokens < cost:
+                self.throttled += 1
+                return httpx.Response(429, headers={"retry-after": "0.2"}, json={"error": "rate limited"})
+            self.requests -= 1
+            self.tokens -= cost
+            self.accepted += 1
+            self.in_flight += 1
+            overload = max(0, self.in_flight - self.comfortable) / 4
+        time.sleep(self.base_latency * (1 + overload))
+        with self.lock:
+            self.in_flight -= 1
+        return httpx.Response(200, headers={"x-ratelimit-remaining-requests": str(int(self.requests))},
+                              json={"choices": [{"message": {"content": "ok"}}]})
+
+
+def run(strategy: str, args) -> dict:
+    provider = FakeProvider(args.rps, args.rps * 250)
+    settings = HttpSettings(max_retries=3, backoff_base=0.05, backoff_max=1.0)
+    transport: httpx.BaseTransport = provider
+    if strategy == "scheduled":
+        scheduler = RequestScheduler("openai", RateLimits(requests_per_minute=args.rps * 60,
+                                                          tokens_per_minute=args.rps * 250 * 60, burst_seconds=1.0))
+        transport = ScheduledTransport(provider, schedulers=lambda name: scheduler)
+    client = httpx.Client(transport=RetryTransport(transport, settings), timeout=httpx.Timeout(30.0))
+    stop = time.monotonic() + args.seconds
+    results = {"ok": 0, "failed": 0, "light_latencies": []}
+    lock = threading.Lock()
+
+    def worker(tenant: str, think: float):
+        with request_context(tenant=tenant):
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    response = client.post(URL, json={"messages": [{"role": "user", "content": PROMPT}],
+                                                      "max_tokens": MAX_TOKENS})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                with lock:
+                    results["ok" if ok else "failed"] += 1
+                    if ok and tenant != "heavy":
+                        results["light_latencies"].append(elapsed)
+                if think:
+                    time.sleep(think)
+
+    threads = [threading.Thread(target=worker, args=("heavy", 0)) for _ in range(args.heavy_threads)]
+    threads += [threading.Thread(target=worker, args=(f"light-{i}", 0.05)) for i in range(args.light_tenants)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    client.close()
+
+    light = sorted(results["light_latencies"]) or [0.0]
+    return {
+        "ok_per_second": results["ok"] / elapsed,
+        "quota_per_second": args.rps,
+        "quota_used": results["ok"] / elapsed / args.rps,
+        "throttled_429": provider.throttled,
+        "sent": provider.accepted + provider.throttled,
+        "failed": results["failed"],
+        "light_requests": len(results["light_latencies"]),
+        "light_p50_ms": statistics.median(light) * 1000,
+        "light_p95_ms": light[int(len(light) * 0.95) - 1 if len(light) > 1 else 0] * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rps", type=float, default=20.0, help="provider quota in requests per second")
+    parser.add_argument("--heavy-threads", type=int, default=16)
+    parser.add_argument("--light-tenants", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {strategy: run(strategy, args) for strategy in ("retry", "scheduled")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'strategy':<11}{'ok/s':>8}{'quota':>8}{'429s':>7}{'sent':>7}{'failed':>8}{'light p50':>11}{'light p95':>11}")
+        for name, r in results.items():
+            print(f"{name:<11}{r['ok_per_second']:>8.1f}{r['quota_used']:>8.0%}{r['throttled_429']:>7}{r['sent']:>7}"
+                  f"{r['failed']:>8}{r['light_p50_ms']:>9.0f}ms{r['light_p95_ms']:>9.0f}ms")
+
+    scheduled = results["scheduled"]
+    failures = []
+    if scheduled["quota_used"] < 0.9:
+        failures.append(f"scheduler used only {scheduled['quota_used']:.0%} of the quota")
+    if scheduled["throttled_429"] > 0.02 * scheduled["sent"]:
+        failures.append(f"scheduler still got {scheduled['throttled_429']} 429s")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
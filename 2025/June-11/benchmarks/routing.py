@@ -0,0 +1,124 @@
+"""Cost and latency of routed turns vs always using the large model.
+
+Sends a mix of easy and hard requests to BasicAgent and CalculatorAgent twice:
+once with every turn on the large model, once through ``agent_common/routing.py``
+with a small, fast model for easy turns. Both models are
+``fakes.ScriptedChatModel`` stubs with their own latency and model name (for
+the price table); the small one hedges on ``--unsure-rate`` of its answers,
+which the router escalates to the large model.
+
+Reported per agent and strategy: turns on each route, escalations, p50 and
+mean latency per turn and estimated cost per 1000 turns. Exits with status 1
+if routing is not cheaper than the large model alone.
+
+Usage:
+    python routing.py [--small-latency 0.01] [--large-latency 0.05] [--unsure-rate 0.1] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+import warnings
+
+from demos import load_demo
+from fakes import ScriptedChatModel
+
+SMALL_MODEL = "gpt-4.1-mini"
+LARGE_MODEL = "gpt-4.1"
+
+CHAT_TURNS = [
+    "Hi! What time does the meetup start?",
+    "What is a Python list?",
+    "Explain the difference between a list and a tuple, and when to use each",
+    "Thanks!",
+    "Why does my generator only yield once? def gen():\n    yield from items",
+    "Recommend a book",
+    "Compare asyncio and threads for I/O bound work, step by step",
+    "What is PEP 8?",
+]
+CALCULATOR_TURNS = [
+    "2 + 2",
+    "15 * 7 + 2",
+    "(3 ** 4) / 9",
+    "100 / 8",
+    "12 * 12",
+]
+
+
+def _models(args):
+    small = ScriptedChatModel(model_name=SMALL_MODEL, latency=args.small_latency, unsure_rate=args.unsure_rate)
+    large = ScriptedChatModel(model_name=LARGE_MODEL, latency=args.large_latency)
+    return small, large
+
+
+def run(agent_name: str, routed: bool, args) -> dict:
+    from agent_common.instrumentation import MetricsRegistry
+    from agent_common.routing import ModelRouter, cost_usd
+
+    small, large = _models(args)
+    registry = MetricsRegistry()
+    router = ModelRouter(agent_name, {"small": SMALL_MODEL, "large": LARGE_MODEL},
+                         llms={"small": small, "large": large}, registry=registry) if routed else None
+    if agent_name == "basic":
+        agent = load_demo("basic").BasicAgent(llm=large, router=router)
+        turns, ask = CHAT_TURNS, agent.chat
+    else:
+        agent = load_demo("calculator").CalculatorAgent(llm=large, router=router)
+        turns, ask = CALCULATOR_TURNS, agent._get_response
+
+    latencies = []
+    for _ in range(args.rounds):
+        for question in turns:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # the calculator's executor is verbose
+                ask(question)
+            latencies.append(time.perf_counter() - start)
+
+    cost = sum(cost_usd(model.model_name, model.prompt_tokens, model.completion_tokens) for model in (small, large))
+    routed_turns = lambda route, outcome: int(registry.counter(  # noqa: E731
+        "agent_route_requests_total", agent=agent_name, route=route, outcome=outcome))
+    return {
+        "turns": len(latencies),
+        "small_turns": routed_turns("small", "ok"),
+        "large_turns": routed_turns("large", "ok") if routed else len(latencies),
+        "escalated": routed_turns("large", "escalated"),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "usd_per_1k_turns": cost / len(latencies) * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small-latency", type=float, default=0.01, help="seconds per small-model call")
+    parser.add_argument("--large-latency", type=float, default=0.05, help="seconds per large-model call")
+    parser.add_argument("--unsure-rate", type=float, default=0.1, help="share of small-model answers that hedge")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the request mix")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message=".*initialize_agent.*")
+    results = {f"{agent}/{'routed' if routed else 'large'}": run(agent, routed, args)
+               for agent in ("basic", "calculator") for routed in (False, True)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'run':<18}{'turns':>7}{'small':>7}{'large':>7}{'escal.':>8}{'p50 ms':>9}{'mean ms':>9}{'$/1k turns':>12}")
+        for name, r in results.items():
+            print(f"{name:<18}{r['turns']:>7}{r['small_turns']:>7}{r['large_turns']:>7}{r['escalated']:>8}"
+                  f"{r['p50_ms']:>9.1f}{r['mean_ms']:>9.1f}{r['usd_per_1k_turns']:>12.4f}")
+
+    failures = [f"{agent}: routing cost more than the large model alone" for agent in ("basic", "calculator")
+                if results[f"{agent}/routed"]["usd_per_1k_turns"] >= results[f"{agent}/large"]["usd_per_1k_turns"]]
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Offline benchmark suite for the June-11 demo agents.
+
+Every agent is driven against ``fakes.ScriptedChatModel`` and a canned search
+tool, so runs are deterministic and need no API keys or network. Each
+workload runs in its own interpreter so peak RSS is measured per workload.
+
+Reported per workload: p50/p99/mean latency per turn, throughput, peak RSS,
+and traced allocation per turn (sampled with tracemalloc after the timed run).
+Results are written to ``results/<timestamp>-<profile>.json`` and compared
+with a previous run.
+
+Usage:
+    python run_benchmarks.py                          # quick profile, all workloads
+    python run_benchmarks.py --profile standard       # 1000-turn chats, 10k file ops, 1 GB search
+    python run_benchmarks.py --only file_ops calculator
+    python run_benchmarks.py --compare latest         # diff against the previous stored run
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+PROFILES = {
+    "quick": {"chat_turns": 100, "agent_turns": 100, "file_ops": 1000, "search_mb": 16, "llm_latency": 0.0},
+    "standard": {"chat_turns": 1000, "agent_turns": 1000, "file_ops": 10000, "search_mb": 1024, "llm_latency": 0.0},
+}
+
+# Turns sampled with tracemalloc after the timed run
+ALLOC_SAMPLE_TURNS = 20
+
+
+# ---------------------------------------------------------------------------
+# Workloads: each returns (turn(i), number of timed turns, cleanup())
+# ---------------------------------------------------------------------------
+
+def basic_chat(params):
+    from demos import load_demo
+    from fakes import ScriptedChatModel
+
+    agent = load_demo("basic").BasicAgent(llm=ScriptedChatModel(latency=params["llm_latency"]))
+    return (lambda i: agent.chat(f"Tell me fact number {i} about Python")), params["chat_turns"], None
+
+
+def calculator(params):
+    from demos import load_demo
+    from fakes import ScriptedChatModel
+
+    agent = load_demo("calculator").CalculatorAgent(llm=ScriptedChatModel(latency=params["llm_latency"]))
+    agent.agent.verbose = False
+    return (lambda i: agent._get_response(f"{i} * 7 + 3")), params["agent_turns"], None
+
+
+def tool_agent(params):
+    from demos import load_demo
+    from fakes import ScriptedChatModel, fake_search_tool
+
+    module = load_demo("tool_agent")
+    executor = module.build_agent(llm=ScriptedChatModel(latency=params["llm_latency"]),
+                                  tools=[module.calculator.as_langchain_tool(), fake_search_tool()],
+                                  verbose=False)
+
+    def turn(i):
+        query = f"{i} + 1" if i % 2 else f"Frederick Python meetup topic {i}"
+        return executor.invoke({"input": query})["output"]
+
+    return turn, params["agent_turns"], None
+
+
+def web_search(params):
+    from demos import load_demo
+    from fakes import ScriptedChatModel, fake_search_tool
+
+    executor = load_demo("web_search").build_agent(llm=ScriptedChatModel(latency=params["llm_latency"]),
+                                                   tools=[fake_search_tool()], verbose=False)
+    return (lambda i: executor.invoke({"input": f"news about Python {i}"})["output"]), params["agent_turns"], None
+
+
+def file_ops(params):
+    from demos import load_demo
+
+    tool = load_demo("files").FileExplorerTool()
+    root = Path(tempfile.mkdtemp(prefix="bench-files-"))
+    (root / "copies").mkdir()
+    # Confine the agent to the scratch files, which also holds its undo journal
+    os.environ["FILE_AGENT_ROOT"] = str(root)
+
+    def turn(i):
+        path = str(root / f"file_{(i // 6) % 500}.txt")
+        step = i % 6
+        if step == 0:
+            action = {"action": "write_file", "path": path, "content": f"line {i}\n" * 20}
+        elif step == 1:
+            action = {"action": "read", "path": path}
+        elif step == 2:
+            action = {"action": "update_file", "path": path, "content": f"appended {i}\n"}
+        elif step == 3:
+            action = {"action": "query_file", "path": path, "query": "appended"}
+        elif step == 4:
+            action = {"action": "copy_file", "source": path, "destination": str(root / "copies" / f"{i}.txt")}
+        else:
+            action = {"action": "list", "path": str(root)}
+        return tool._run(json.dumps(action))
+
+    return turn, params["file_ops"], lambda: shutil.rmtree(root, ignore_errors=True)
+
+
+def file_search(params):
+    from demos import load_demo
+
+    tool = load_demo("files").FileExplorerTool()
+    root = Path(tempfile.mkdtemp(prefix="bench-search-"))
+    path = root / "big.log"
+    line = "2025-06-11 12:00:00 INFO request handled in 12ms by worker-7 for /api/files\n"
+    block = line * (1024 * 1024 // len(line))
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(params["search_mb"]):
+            f.write(block)
+        f.write("2025-06-11 12:00:01 ERROR needle found at the end\n")
+
+    def turn(i):
+        return tool._run(json.dumps({"action": "query_file", "path": str(path), "query": "needle"}))
+
+    return turn, 3, lambda: shutil.rmtree(root, ignore_errors=True)
+
+
+WORKLOADS = {
+    "basic_chat": basic_chat,
+    "calculator": calculator,
+    "tool_agent": tool_agent,
+    "web_search": web_search,
+    "file_ops": file_ops,
+    "file_search": file_search,
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_worker(name: str, params: dict) -> dict:
+    """Run one workload in this process and return its measurements."""
+    turn, count, cleanup = WORKLOADS[name](params)
+    try:
+        turn(0)  # warm-up: first-use imports and client construction
+        latencies = []
+        started = time.perf_counter()
+        for i in range(1, count + 1):
+            t0 = time.perf_counter()
+            turn(i)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        peak_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        samples = min(ALLOC_SAMPLE_TURNS, count)
+        tracemalloc.start()
+        allocated = []
+        for i in range(count + 1, count + 1 + samples):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            turn(i)
+            _, peak = tracemalloc.get_traced_memory()
+            allocated.append(peak - before)
+        tracemalloc.stop()
+    finally:
+        if cleanup:
+            cleanup()
+
+    return {
+        "turns": count,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_per_s": round(count / elapsed, 2) if elapsed else None,
+        "peak_rss_mib": round(peak_rss_kib / 1024, 1),
+        "alloc_kib_per_turn": round(statistics.fmean(allocated) / 1024, 1) if allocated else 0.0,
+    }
+
+
+def run_isolated(name: str, profile: str) -> dict:
+    """Run a workload in a fresh interpreter and parse its JSON result."""
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__)), "--worker", name, "--profile", profile],
+        cwd=BENCH_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------------------
+# Storage and comparison
+# ---------------------------------------------------------------------------
+
+def git_revision() -> str:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def save_results(report: dict) -> Path:
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['profile']}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def load_previous(compare: str, profile: str, exclude: Path) -> dict:
+    if compare != "latest":
+        return json.loads(Path(compare).read_text())
+    candidates = sorted(p for p in RESULTS_DIR.glob(f"*-{profile}.json") if p != exclude)
+    return json.loads(candidates[-1].read_text()) if candidates else {}
+
+
+def print_report(report: dict, previous: dict) -> None:
+    old = previous.get("workloads", {})
+    print(f"{'workload':<12} {'p50 ms':>10} {'p99 ms':>10} {'turns/s':>10} {'RSS MiB':>9} {'KiB/turn':>9}")
+    for name, result in report["workloads"].items():
+        if "error" in result:
+            print(f"{name:<12} ❌ {result['error']}")
+            continue
+        print(f"{name:<12} {result['p50_ms']:>10} {result['p99_ms']:>10} {result['throughput_per_s']:>10} "
+              f"{result['peak_rss_mib']:>9} {result['alloc_kib_per_turn']:>9}")
+        before = old.get(name)
+        if before and "error" not in before and before.get("p50_ms"):
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            print(f"{'':<12} p50 {change:+.1f}% vs {previous.get('revision', '?')}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="+", choices=sorted(WORKLOADS), help="run a subset of workloads")
+    parser.add_argument("--compare", help="'latest' or a results JSON file to compare against")
+    parser.add_argument("--no-save", action="store_true", help="do not store the results")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    params = dict(PROFILES[args.profile])
+    if os.getenv("BENCH_LLM_LATENCY"):
+        params["llm_latency"] = float(os.environ["BENCH_LLM_LATENCY"])
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, params)))
+        return 0
+
+    report = {
+        "profile": args.profile,
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "workloads": {name: run_isolated(name, args.profile) for name in (args.only or WORKLOADS)},
+    }
+    saved = None if args.no_save else save_results(report)
+    previous = load_previous(args.compare, args.profile, saved) if args.compare else {}
+    print_report(report, previous)
+    if saved:
+        print(f"\nResults saved to {saved.relative_to(BENCH_DIR)}")
+    return 1 if any("error" in r for r in report["workloads"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
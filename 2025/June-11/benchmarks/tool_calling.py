@@ -0,0 +1,128 @@
+"""Compare native tool calling with text-parsed ReAct: round-trips and tokens per task.
+
+Runs the same tasks through the calculator, tool and files agents in both
+``AGENT_MODE``s against ``fakes.ScriptedChatModel``. Tasks with independent
+sub-questions (separated by ";") show the structural difference: ReAct takes
+one model round-trip per tool call plus one for the answer, while a
+tool-calling model issues the independent calls together. ``--react-error-rate``
+adds malformed ReAct replies to show the cost of parsing retries.
+
+Reported per mode: model calls per task, prompt and completion tokens per task,
+and wall time per task (including ``--llm-latency`` per model call). Exits
+with status 1 if tool calling needs more round-trips than ReAct or a task's
+answer is wrong.
+
+Usage:
+    python tool_calling.py [--llm-latency 0.05] [--react-error-rate 0.1] [--json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+from demos import load_demo
+from fakes import ScriptedChatModel, fake_search_tool
+
+MODES = ("react", "tools")
+
+
+def _tasks(root: Path):
+    """(agent, input, expected substring of the answer)."""
+    (root / "notes.txt").write_text("alpha\nbeta\ngamma\n", encoding="utf-8")
+    (root / "todo.txt").write_text("write benchmarks\n", encoding="utf-8")
+    read = lambda name: json.dumps({"action": "read", "path": str(root / name)})  # noqa: E731
+    return [
+        ("calculator", "15 * 7 + 2", "107"),
+        ("tool_agent", "2 ** 10", "1024"),
+        ("tool_agent", "Frederick Python meetup schedule", "Canned result"),
+        ("tool_agent", "12 * 12; Frederick Python meetup schedule", "144"),
+        ("tool_agent", "1 + 1; 2 + 2; 3 + 3", "6"),
+        ("files", json.dumps({"action": "list", "path": str(root)}), "notes.txt"),
+        ("files", f"{read('notes.txt')}; {read('todo.txt')}", "write benchmarks"),
+    ]
+
+
+def _executor(agent: str, mode: str, llm: ScriptedChatModel):
+    if agent == "calculator":
+        calculator = load_demo("calculator").CalculatorTool()
+        tools = [calculator.as_langchain_tool()]
+    elif agent == "tool_agent":
+        module = load_demo("tool_agent")
+        tools = [module.calculator.as_langchain_tool(), fake_search_tool()]
+    else:
+        return load_demo("files").FilesAgent(llm=llm, mode=mode).agent
+
+    from agent_common.tool_calling import build_executor
+
+    return build_executor(llm, tools, verbose=False, mode=mode)
+
+
+def run_mode(mode: str, tasks, llm_latency: float, react_error_rate: float) -> dict:
+    llm = ScriptedChatModel(latency=llm_latency, react_error_rate=react_error_rate)
+    executors = {}
+    wrong = []
+    start = time.perf_counter()
+    for agent, question, expected in tasks:
+        if agent not in executors:
+            executors[agent] = _executor(agent, mode, llm)
+        output = str(executors[agent].invoke({"input": question})["output"])
+        if expected not in output:
+            wrong.append(f"{agent}: {question[:60]!r} -> {output[:80]!r}")
+    elapsed = time.perf_counter() - start
+    count = len(tasks)
+    return {
+        "tasks": count,
+        "model_calls": llm.calls,
+        "calls_per_task": llm.calls / count,
+        "prompt_tokens_per_task": llm.prompt_tokens / count,
+        "completion_tokens_per_task": llm.completion_tokens / count,
+        "ms_per_task": elapsed * 1000 / count,
+        "wrong_answers": wrong,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds added to every model call")
+    parser.add_argument("--react-error-rate", type=float, default=0.0,
+                        help="share of ReAct replies that are malformed (parsing retries)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message=".*initialize_agent.*")
+    root = Path(tempfile.mkdtemp(prefix="bench-tool-calling-"))
+    os.environ["FILE_AGENT_ROOT"] = str(root)  # the files agent may only touch the scratch directory
+    try:
+        tasks = _tasks(root)
+        results = {mode: run_mode(mode, tasks, args.llm_latency, args.react_error_rate) for mode in MODES}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'mode':<8}{'tasks':>7}{'calls':>7}{'calls/task':>12}{'prompt tok':>12}"
+              f"{'compl tok':>11}{'ms/task':>10}")
+        for mode, r in results.items():
+            print(f"{mode:<8}{r['tasks']:>7}{r['model_calls']:>7}{r['calls_per_task']:>12.2f}"
+                  f"{r['prompt_tokens_per_task']:>12.0f}{r['completion_tokens_per_task']:>11.0f}{r['ms_per_task']:>10.1f}")
+
+    failures = [f"{mode}: wrong answer {w}" for mode, r in results.items() for w in r["wrong_answers"]]
+    if results["tools"]["model_calls"] > results["react"]["model_calls"]:
+        failures.append("tool calling needed more model round-trips than ReAct")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures and not args.json:
+        saved = results["react"]["model_calls"] - results["tools"]["model_calls"]
+        print(f"✅ Tool calling saved {saved} of {results['react']['model_calls']} model round-trips")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
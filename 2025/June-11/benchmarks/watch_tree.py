@@ -0,0 +1,124 @@
+"""Cost of noticing new files in a large tree: list polling vs the watch action.
+
+Builds a scratch tree (``--dirs`` folders of ``--files`` files each) and measures:
+
+* ``list every folder``: one pass of ``list`` over all folders, what an agent
+  looking for new files had to repeat.
+* ``watch (no changes)``: a ``watch`` call with a cursor when nothing changed.
+* ``watch setup``: the first ``watch``, which adds one inotify watch per folder.
+* ``idle CPU``: process CPU time while the watcher waits ``--idle`` seconds.
+* ``detect``: time from creating a file in a deep folder to a waiting
+  ``watch`` (with ``timeout``) returning it, debounce included.
+
+Runs with the inotify backend and, with ``--polling``, the polling fallback
+(``FILE_AGENT_WATCH_BACKEND=polling``).
+Exits with status 1 if a change is missed or the idle watcher uses more than
+20 ms of CPU per second.
+
+Usage:
+    python watch_tree.py [--dirs 500] [--files 20] [--idle 2] [--polling] [--json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from demos import load_demo
+
+IDLE_CPU_BUDGET = 0.02  # CPU seconds per idle second
+
+
+def _timed(func, runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=500)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--idle", type=float, default=2.0)
+    parser.add_argument("--polling", action="store_true", help="also measure the polling fallback")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    files_agent = load_demo("files")
+    scratch = tempfile.mkdtemp(prefix="watch-tree-")
+    os.environ["FILE_AGENT_ROOT"] = scratch
+    results, failures = {}, []
+    try:
+        folders = []
+        for i in range(args.dirs):
+            folder = os.path.join(scratch, f"group{i % 10}", f"dir{i}")
+            os.makedirs(folder)
+            folders.append(folder)
+            for j in range(args.files):
+                with open(os.path.join(folder, f"file{j}.txt"), "w") as f:
+                    f.write("x")
+
+        tool = files_agent.FileExplorerTool()
+        run = lambda **action: tool._run(json.dumps(dict(action, output="json")))  # noqa: E731
+        results["list every folder"] = {"ms": _timed(lambda: [run(action="list", path=f) for f in folders], 3)}
+
+        backends = ["inotify"] + (["polling"] if args.polling else [])
+        for backend in backends:
+            os.environ["FILE_AGENT_WATCH_BACKEND"] = backend
+            tool = files_agent.FileExplorerTool()
+            start = time.perf_counter()
+            first = json.loads(run(action="watch", path=scratch).splitlines()[0])
+            setup_ms = (time.perf_counter() - start) * 1000
+            cursor = first["cursor"]
+            results[f"watch setup ({first['backend']})"] = {"ms": setup_ms}
+            results[f"watch, no changes ({first['backend']})"] = {
+                "ms": _timed(lambda: run(action="watch", path=scratch, cursor=cursor))}
+
+            cpu = time.process_time()
+            time.sleep(args.idle)
+            idle_cpu = (time.process_time() - cpu) / args.idle
+            results[f"idle CPU ({first['backend']})"] = {"ms_per_s": idle_cpu * 1000}
+            if first["backend"] == "inotify" and idle_cpu > IDLE_CPU_BUDGET:
+                failures.append(f"idle watcher used {idle_cpu * 1000:.1f} ms CPU per second")
+
+            target = os.path.join(folders[-1], f"new-{backend}.txt")
+            created = {}
+
+            def create():
+                time.sleep(0.2)
+                created["at"] = time.perf_counter()
+                with open(target, "w") as f:
+                    f.write("new")
+
+            threading.Thread(target=create).start()
+            reply = run(action="watch", path=scratch, cursor=cursor, timeout=10).splitlines()
+            detect_ms = (time.perf_counter() - created.get("at", time.perf_counter())) * 1000
+            results[f"detect ({first['backend']})"] = {"ms": detect_ms}
+            if not any(os.path.relpath(target, scratch) in line for line in reply[1:]):
+                failures.append(f"{backend}: new file not reported: {reply}")
+    finally:
+        os.environ.pop("FILE_AGENT_WATCH_BACKEND", None)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"tree: {args.dirs} folders, {args.dirs * args.files} files")
+        for name, r in results.items():
+            unit, value = next(iter(r.items()))
+            print(f"{name:<32}{value:>10.2f} {unit.replace('_', ' ')}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,65 +1,118 @@
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from typing import Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import BaseTool, Tool
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import initialize_agent, AgentType
+from typing import TYPE_CHECKING, Optional
+
+# LangChain is imported lazily so that starting the script (or importing the
+# tool on its own) does not pay for the LangChain/OpenAI import graph.
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from langchain_core.tools import StructuredTool
 
 # Load environment variables
 load_dotenv()
 
+# Shared helpers for the June-11 demos (HTTP client pool, ...) live in ../agent_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_common.expressions import evaluate
 
-class CalculatorTool(BaseTool):
+
+class CalculatorTool:
     name: str = "calculator"
     description: str = "Useful for mathematical calculations. Input should be a mathematical expression."
 
     def _run(self, query: str) -> str:
         """Run the calculator tool."""
         try:
-            # Evaluate the mathematical expression
-            result = eval(query)
+            # Evaluate the mathematical expression without handing model output to eval()
+            result = evaluate(query)
             return str(result)
         except Exception as e:
             return f"Error calculating expression: {str(e)}"
 
     async def _arun(self, query: str) -> str:
         raise NotImplementedError("This tool does not support async")
-        # The core logic of our tool is result = eval(query). This is a purely CPU-bound operation. 
+        # The core logic of our tool is result = evaluate(query). This is a purely CPU-bound operation. 
         # The processor is actively engaged in calculating the mathematical result. There is no waiting period.
 
+    def as_langchain_tool(self) -> "StructuredTool":
+        """Wrap this tool for a LangChain agent (imports LangChain on first use)."""
+        from agent_common.tool_calling import single_input_tool
 
-class CalculatorAgent:
-    def __init__(self):
-        # Initialize the OpenAI chat model
-        # Initialize the calculator agent with the OpenAI model and tools."""
-        self.llm = ChatOpenAI(
-            model="gpt-4.1",  # Using GPT-4.1 for better performance
-            temperature=0.1,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        return single_input_tool(self.name, self.description, self._run, field="expression",
+                                 field_description="Arithmetic expression, e.g. (15 * 7) + 2")
 
+
+class CalculatorAgent:
+    def __init__(self, llm=None, router=None):
         # Initialize tools
         self.tools = [CalculatorTool()]
 
-        # Initialize the agent
-        self.agent = self._initialize_agent()
-
-    def _initialize_agent(self):
-        """Initialize the agent with the calculator tool."""
-        # Create the agent
-        agent = initialize_agent(
-            tools=self.tools,
-            llm=self.llm,
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            verbose=True
-        )
-        return agent
+        # The OpenAI chat model and the agent are built on first use
+        # (pass llm to use another chat model, e.g. the benchmark stub)
+        self._llm = llm
+        self._agent = None
+        self._callbacks = None
+
+        # Plain arithmetic goes to a small model, word problems to gpt-4.1
+        # (see agent_common/routing.py; AGENT_ROUTER=0 turns routing off)
+        if router is None and llm is None:
+            from agent_common.routing import ModelRouter
+
+            router = ModelRouter.from_env("calculator", small="gpt-4.1-mini", large="gpt-4.1",
+                                          factory=self._make_llm)
+        self.router = router
+        self._routed_agents = {}
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """OpenAI chat model, created on first access."""
+        if self._llm is None:
+            self._llm = self._make_llm("gpt-4.1")  # Using GPT-4.1 for better performance
+        return self._llm
+
+    def _make_llm(self, model: str) -> "ChatOpenAI":
+        from agent_common.http_clients import make_chat_model
+
+        return make_chat_model(model=model, temperature=0.1)
+
+    @property
+    def agent(self):
+        """LangChain agent executor, created on first access."""
+        if self._agent is None:
+            self._agent = self._initialize_agent()
+        return self._agent
+
+    @property
+    def callbacks(self) -> list:
+        """Callback handlers passed on each run; they record per-step latency and tokens."""
+        if self._callbacks is None:
+            from agent_common.instrumentation import make_callback_handler
+
+            self._callbacks = [make_callback_handler("calculator")]
+        return self._callbacks
+
+    def _initialize_agent(self, llm=None):
+        """Initialize the agent with the calculator tool (tool calling, or ReAct with AGENT_MODE=react)."""
+        from agent_common.tool_calling import build_executor
+
+        return build_executor(llm or self.llm, [tool.as_langchain_tool() for tool in self.tools], verbose=True)
+
+    def _routed_agent(self, route: str):
+        """Agent executor on the router's model for ``route``."""
+        if route not in self._routed_agents:
+            self._routed_agents[route] = self._initialize_agent(self.router.llm(route))
+        return self._routed_agents[route]
 
     def _get_response(self, user_input: str) -> str:
         """Get response from the agent."""
         try:
-            response = self.agent.invoke({"input": user_input})
+            if self.router is not None:
+                return self.router.run(user_input, lambda route, callbacks: self._routed_agent(route).invoke(
+                    {"input": user_input}, config={"callbacks": self.callbacks + callbacks})["output"]).output
+            response = self.agent.invoke({"input": user_input}, config={"callbacks": self.callbacks})
             return response.get("output", "No response generated")
         except Exception as e:
             return f"Error processing request: {str(e)}"
@@ -92,9 +145,11 @@ class CalculatorAgent:
 
 
 def main():
-    """Main function to run the calculator agent."""
-    agent = CalculatorAgent()
-    agent.run()
+    """Main function to run the calculator agent (or answer one expression and exit)."""
+    from agent_common.daemon import run_cli
+
+    run_cli("calculator", lambda question: CalculatorAgent()._get_response(question),
+            lambda: CalculatorAgent().run())
 
 
 if __name__ == "__main__":
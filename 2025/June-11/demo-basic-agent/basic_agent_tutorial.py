@@ -2,80 +2,128 @@
 # Frederick Python Meetup - AI Agents Workshop
 
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
 
 # Load environment variables
 load_dotenv()
 
+# Shared helpers for the June-11 demos (HTTP client pool, ...) live in ../agent_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 class BasicAgent:
     """
     A simple conversational agent with memory.
     Perfect for beginners to understand agent basics.
     """
     
-    def __init__(self):
-        # Initialize the OpenAI chat model
-        # Using GPT-3.5-turbo for cost efficiency in demos
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature=0.7,  # Some creativity, but not too much
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+    def __init__(self, llm=None, router=None, recent_turns: int = 3, recall_k: int = 4):
+        # NumPy (for the memory index) is imported here rather than at module
+        # level, so running the script only loads it once an agent is created.
+        from agent_common.memory import ConversationMemory
+
+        # The OpenAI chat model is created on first use (see the llm property)
+        # unless another chat model is passed in, e.g. the benchmark stub
+        self._llm = llm
+
+        # Easy turns go to gpt-4.1-nano; hard ones, and answers it is unsure
+        # of, to gpt-4.1 (see agent_common/routing.py; AGENT_ROUTER=0 turns
+        # routing off)
+        if router is None and llm is None:
+            from agent_common.routing import ModelRouter
+
+            router = ModelRouter.from_env("basic", small="gpt-4.1-nano", large="gpt-4.1",
+                                          factory=self._make_llm)
+        self.router = router
         
-        # Initialize memory to remember conversation history
-        self.memory = ConversationBufferMemory(
-            return_messages=True,
-            memory_key="chat_history"
+        # Long-term memory: each prompt gets the last few exchanges plus the
+        # older ones most relevant to the new message, not the whole history.
+        # Set BASIC_AGENT_MEMORY_FILE to keep it across runs.
+        self.memory = ConversationMemory(
+            recent=recent_turns,
+            top_k=recall_k,
+            path=os.getenv("BASIC_AGENT_MEMORY_FILE")
         )
         
         # System prompt to define agent personality
         self.system_prompt = """You are a helpful AI assistant for the Frederick Python Meetup.
-        You're knowledgeable about Python, AI, and programming in general.
-        Be friendly, encouraging, and provide practical examples when possible.
-        If you don't know something, say so honestly."""
+You're knowledgeable about Python, AI, and programming in general.
+Be friendly, encouraging, and provide practical examples when possible.
+If you don't know something, say so honestly."""
+
+        # Sends the system prompt first and unchanged on every turn, so the
+        # provider can reuse its cached prefix (see agent_common/prompts.py)
+        from agent_common.prompts import PromptAssembler
+
+        self.prompts = PromptAssembler(self.system_prompt)
+    
+    @property
+    def llm(self):
+        """OpenAI chat model, created on first access."""
+        if self._llm is None:
+            # Using GPT-3.5-turbo for cost efficiency in demos
+            self._llm = self._make_llm("gpt-3.5-turbo")
+        return self._llm
+
+    def _make_llm(self, model: str):
+        from agent_common.http_clients import make_chat_model
+        from agent_common.instrumentation import make_callback_handler
+
+        return make_chat_model(
+            model=model,
+            temperature=0.7,  # Some creativity, but not too much
+            callbacks=[make_callback_handler("basic")]
+        )
     
     def chat(self, user_input: str) -> str:
         """
         Main chat method - processes user input and returns response
         """
         try:
-            # Get conversation history from memory
-            chat_history = self.memory.chat_memory.messages
+            # Prepare messages for the LLM: system prompt, remembered context, then the new input
+            messages = self.prompts.messages(user_input, self._history(user_input))
             
-            # Prepare messages for the LLM
-            messages = [HumanMessage(content=self.system_prompt)]
-            messages.extend(chat_history)
-            messages.append(HumanMessage(content=user_input))
-            
-            # Get response from OpenAI
-            response = self.llm.invoke(messages)
+            # Get response from OpenAI (from the model the router picks for this turn)
+            if self.router is None:
+                answer = self.llm.invoke(messages).content
+            else:
+                answer = self.router.run(user_input, lambda route, callbacks: self.router.llm(route).invoke(
+                    messages, config={"callbacks": callbacks}).content).output
             
             # Save to memory
-            self.memory.chat_memory.add_user_message(user_input)
-            self.memory.chat_memory.add_ai_message(response.content)
+            self.memory.add(user_input, answer)
             
-            return response.content
+            return answer
             
         except Exception as e:
             return f"Sorry, I encountered an error: {str(e)}"
     
+    def _history(self, user_input: str) -> list:
+        """Recalled older exchanges (as one system note) followed by the recent turns."""
+        from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+        recalled, recent = self.memory.context(user_input)
+        history = []
+        if recalled:
+            notes = "\n".join(f"User: {e.user}\nAssistant: {e.assistant}" for e in recalled)
+            history.append(SystemMessage(content=f"Relevant earlier conversation:\n{notes}"))
+        for exchange in recent:
+            history.append(HumanMessage(content=exchange.user))
+            history.append(AIMessage(content=exchange.assistant))
+        return history
+
     def get_conversation_summary(self) -> str:
         """
         Get a summary of the conversation so far
         """
-        messages = self.memory.chat_memory.messages
-        if not messages:
+        if not self.memory.exchanges:
             return "No conversation yet."
         
         conversation = ""
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                conversation += f"Human: {msg.content}\n"
-            elif isinstance(msg, AIMessage):
-                conversation += f"AI: {msg.content}\n"
+        for exchange in self.memory.exchanges:
+            conversation += f"Human: {exchange.user}\n"
+            conversation += f"AI: {exchange.assistant}\n"
         
         return conversation
 
@@ -129,8 +177,10 @@ if __name__ == "__main__":
         print("OPENAI_API_KEY=your_api_key_here")
         exit(1)
     
-    # Run the demo
-    demo_basic_agent()
+    # Run the demo (or answer one question: python basic_agent_tutorial.py [--daemon] "question")
+    from agent_common.daemon import run_cli
+
+    run_cli("basic", lambda question: BasicAgent().chat(question), demo_basic_agent)
 
 # Practice Exercises for Meetup Participants:
 """
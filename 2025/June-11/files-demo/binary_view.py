@@ -0,0 +1,255 @@
+"""Encoding detection, hex/base64 windows and byte-level search for FileExplorerTool.
+
+``sniff`` classifies a file from its first block: a byte-order mark decides
+outright, known binary signatures and NUL/control-byte density mark binary
+files, valid UTF-8 is UTF-8, and anything else goes through statistical
+detection (``charset_normalizer``, installed with ``requests``) with a
+preference for cp1252 when the text reads as a Western language.
+
+Windows and searches work directly on an ``mmap`` of the file, so a 2 GB binary
+costs the bytes that are shown, not a decode of the whole file.
+"""
+
+import base64
+import codecs
+import mmap
+import re
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+SNIFF_BYTES = 64 * 1024
+HEX_WIDTH = 16
+MAX_WINDOW_BYTES = 64 * 1024
+COUNT_CHUNK = 4 * 1024 * 1024
+
+# UTF-32 LE's BOM starts with UTF-16 LE's, so it must be checked first
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"), (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "PNG image"), (b"\xff\xd8\xff", "JPEG image"), (b"GIF8", "GIF image"),
+    (b"%PDF-", "PDF document"), (b"PK\x03\x04", "ZIP archive (also docx/xlsx/jar)"),
+    (b"\x7fELF", "ELF executable"), (b"MZ", "Windows executable"), (b"SQLite format 3\x00", "SQLite database"),
+    (b"\x00asm", "WebAssembly module"), (b"RIFF", "RIFF media (WAV/AVI/WebP)"),
+)
+# Bytes that appear in text files besides printable characters: \b \t \n \f \r ESC
+_TEXT_CONTROLS = frozenset(b"\x08\t\n\x0c\r\x1b")
+# Non-ASCII punctuation that says nothing about the language
+_NEUTRAL = frozenset("“”‘’„–—…•€«»°§©®™·×÷¡¿\xa0")
+
+
+@dataclass
+class Sniff:
+    binary: bool
+    encoding: Optional[str] = None  # None for binary files
+    confidence: float = 1.0
+    description: str = ""  # e.g. "PNG image" for recognised binary formats
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[bytes]:
+    """Read-only ``mmap`` of ``path`` (empty files, which cannot be mapped, give ``b""``).
+
+    A shared ``flock`` is held while mapped: writers using ``locked_open`` take
+    an exclusive one, and truncating a mapped file would crash the reader
+    with SIGBUS.
+    """
+    with open(path, "rb") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        f.seek(0, 2)
+        if f.tell() == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _looks_western(text: str) -> bool:
+    """True when non-ASCII letters sit inside mostly ASCII words (French, German, Spanish, ...).
+
+    Cyrillic or Greek bytes decoded as cp1252 also come out as letters, but as
+    whole words of accented letters, and Central European text decoded as
+    cp1252 is full of symbols such as ``¿`` and ``³``.
+    """
+    letters = anchored = symbols = 0
+    for i, char in enumerate(text):
+        if char.isascii() or char in _NEUTRAL:
+            continue
+        if not char.isalpha():
+            symbols += 1
+            continue
+        letters += 1
+        before = text[i - 1] if i else ""
+        after = text[i + 1] if i + 1 < len(text) else ""
+        if (before.isascii() and before.isalpha()) or (after.isascii() and after.isalpha()):
+            anchored += 1
+    if not letters:
+        return symbols == 0
+    return symbols <= letters // 5 and anchored >= letters * 0.6
+
+
+def _detect_statistically(block: bytes) -> Tuple[str, float]:
+    try:
+        western = block.decode("cp1252")
+    except UnicodeDecodeError:
+        western = None
+    if western is not None and _looks_western(western):
+        return "cp1252", 0.9
+    try:
+        from charset_normalizer import from_bytes
+
+        best = from_bytes(block).best()
+        if best is not None:
+            return best.encoding, round(1.0 - best.chaos, 2)
+    except ImportError:
+        pass
+    # latin-1 decodes any byte sequence, so it is the last resort
+    return ("cp1252", 0.5) if western is not None else ("latin-1", 0.3)
+
+
+def sniff_bytes(block: bytes) -> Sniff:
+    """Classify a file from its first block."""
+    for bom, encoding in _BOMS:
+        if block.startswith(bom):
+            return Sniff(False, encoding)
+    for signature, description in _SIGNATURES:
+        if block.startswith(signature):
+            return Sniff(True, description=description)
+    if not block:
+        return Sniff(False, "utf-8")
+
+    if b"\x00" in block:
+        # BOM-less UTF-16: ASCII text has a zero in every other byte
+        even, odd = block[0::2], block[1::2]
+        if odd.count(0) > len(odd) * 0.4 and even.count(0) < len(even) * 0.05:
+            return Sniff(False, "utf-16-le", 0.8)
+        if even.count(0) > len(even) * 0.4 and odd.count(0) < len(odd) * 0.05:
+            return Sniff(False, "utf-16-be", 0.8)
+        return Sniff(True, description="binary data")
+
+    controls = sum(1 for byte in block if byte < 0x20 and byte not in _TEXT_CONTROLS)
+    if controls > len(block) * 0.05:
+        return Sniff(True, description="binary data")
+
+    try:
+        # final=False: the block may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(block, final=False)
+        return Sniff(False, "utf-8")
+    except UnicodeDecodeError:
+        pass
+    encoding, confidence = _detect_statistically(block)
+    return Sniff(False, encoding, confidence)
+
+
+def sniff(path: str) -> Sniff:
+    with mapped(path) as mm:
+        return sniff_bytes(mm[:SNIFF_BYTES])
+
+
+def hex_window(data: bytes, offset: int = 0) -> str:
+    """``xxd``-style dump of ``data``, with addresses starting at ``offset``."""
+    lines = []
+    for start in range(0, len(data), HEX_WIDTH):
+        row = data[start:start + HEX_WIDTH]
+        pairs = row.hex()
+        groups = " ".join(pairs[i:i + 4] for i in range(0, len(pairs), 4))
+        text = "".join(chr(b) if 0x20 <= b < 0x7f else "." for b in row)
+        lines.append(f"{offset + start:08x}: {groups:<39}  {text}")
+    return "\n".join(lines)
+
+
+def base64_window(data: bytes) -> str:
+    encoded = base64.b64encode(data).decode("ascii")
+    return "\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+
+
+def read_window(path: str, offset: int, length: int) -> Tuple[bytes, int]:
+    """Up to ``length`` bytes (capped at ``MAX_WINDOW_BYTES``) at ``offset``; also returns the file size."""
+    with mapped(path) as mm:
+        offset = max(0, min(offset, len(mm)))
+        return bytes(mm[offset:offset + min(length, MAX_WINDOW_BYTES)]), len(mm)
+
+
+def compile_query(query: str, encoding: Optional[str] = None, ignore_case: bool = True) -> "re.Pattern[bytes]":
+    """Byte regex for ``query``: ``hex:de ad be ef`` is raw bytes, anything else is text.
+
+    Text is encoded in the file's encoding. Case is folded per character, so
+    ``MÜNCHEN`` matches ``München`` in Latin-1 and UTF-8 alike, which a bytes
+    ``re.IGNORECASE`` (ASCII only) would not.
+    """
+    if query.lower().startswith("hex:"):
+        try:
+            return re.compile(re.escape(bytes.fromhex(query[4:])))
+        except ValueError:
+            raise ValueError(f"Invalid hex pattern: {query[4:]!r}")
+    if not query:
+        raise ValueError("Empty search pattern")
+    encoding = encoding or "utf-8"
+    parts = []
+    for char in query:
+        encoded = {char.encode(encoding)}
+        for variant in ({char.lower(), char.upper()} if ignore_case else ()):
+            try:
+                encoded.add(variant.encode(encoding))
+            except UnicodeEncodeError:
+                pass  # e.g. no uppercase form in this code page
+        escaped = [re.escape(e) for e in sorted(encoded)]
+        parts.append(escaped[0] if len(escaped) == 1 else b"(?:" + b"|".join(escaped) + b")")
+    return re.compile(b"".join(parts))
+
+
+def _count_newlines(mm, start: int, end: int) -> int:
+    count = 0
+    for position in range(start, end, COUNT_CHUNK):
+        count += mm[position:min(end, position + COUNT_CHUNK)].count(b"\n")
+    return count
+
+
+@dataclass
+class ByteMatch:
+    offset: int
+    line_number: int
+    line: bytes
+
+
+def search(path: str, regex: "re.Pattern[bytes]", max_matches: int = 10,
+           lines: bool = True) -> Tuple[List[ByteMatch], int]:
+    """Find ``regex`` (see ``compile_query``) in the mapped file.
+
+    With ``lines`` (text files) each matching line is reported once, with its
+    number; otherwise every occurrence is reported with a little context.
+    Returns the first ``max_matches`` matches and the total count.
+    """
+    matches: List[ByteMatch] = []
+    total = 0
+    with mapped(path) as mm:
+        position = 0
+        line_number, counted_to = 1, 0
+        while True:
+            found = regex.search(mm, position)
+            if found is None:
+                break
+            total += 1
+            start = found.start()
+            if lines:
+                line_start = mm.rfind(b"\n", 0, start) + 1
+                line_end = mm.find(b"\n", start)
+                line_end = len(mm) if line_end < 0 else line_end
+                if len(matches) < max_matches:
+                    line_number += _count_newlines(mm, counted_to, line_start)
+                    counted_to = line_start
+                    matches.append(ByteMatch(start, line_number, bytes(mm[line_start:line_end])))
+                position = line_end + 1
+            else:
+                if len(matches) < max_matches:
+                    context = bytes(mm[max(0, start - 8):found.end() + 8])
+                    matches.append(ByteMatch(start, 0, context))
+                position = start + 1
+    return matches, total
@@ -0,0 +1,286 @@
+"""Transparent reading of gzip, xz, bzip2 and zstd files for FileExplorerTool.
+
+Compression is detected from magic bytes, not file extensions, so rotated
+logs such as ``app.log.1`` are handled too. Files are stream-decompressed in
+chunks and never written to disk; searches stop as soon as enough matches are
+found.
+
+zstd needs the optional ``zstandard`` package. A zstd file made of several
+independent frames (``zstd --rsyncable``, concatenated rotations, seekable
+zstd) is split at frame boundaries by parsing the frame headers, and the
+frames are decompressed on a thread pool while lines are consumed in order.
+"""
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 256 * 1024
+MAX_READ_BYTES = 4 * 1024 * 1024
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bzip2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".file_agent_index", ".file_agent_journal"}
+
+_ZSTD_MAGIC = 0xFD2FB528
+_ZSTD_SKIPPABLE = 0x184D2A50  # low four bits are free
+_FCS_SIZES = (0, 2, 4, 8)
+_DID_SIZES = (0, 1, 2, 4)
+
+
+@dataclass
+class Match:
+    line_number: int
+    line: str
+
+
+def detect(path: str) -> Optional[str]:
+    """Return ``"gzip"``, ``"xz"``, ``"bzip2"`` or ``"zstd"`` for a compressed file, else None."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd files need the 'zstandard' package: pip install zstandard")
+    return zstandard
+
+
+def zstd_frames(data) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` of every zstd frame in ``data``, skipping skippable frames.
+
+    Only headers are parsed: each block header gives the size of the block
+    that follows, so frame boundaries are found without decompressing.
+    """
+    frames = []
+    position = 0
+    size = len(data)
+    while position + 4 <= size:
+        magic = int.from_bytes(data[position:position + 4], "little")
+        if magic & 0xFFFFFFF0 == _ZSTD_SKIPPABLE:
+            length = int.from_bytes(data[position + 4:position + 8], "little")
+            position += 8 + length
+            continue
+        if magic != _ZSTD_MAGIC:
+            raise ValueError(f"Not a zstd frame at byte {position}")
+
+        start = position
+        descriptor = data[position + 4]
+        single_segment = descriptor & 0x20
+        fcs_size = _FCS_SIZES[descriptor >> 6] or (1 if single_segment else 0)
+        position += 5 + (0 if single_segment else 1) + _DID_SIZES[descriptor & 0x03] + fcs_size
+
+        while True:
+            if position + 3 > size:
+                raise ValueError("Truncated zstd frame")
+            header = int.from_bytes(data[position:position + 3], "little")
+            block_type = (header >> 1) & 0x03
+            block_size = header >> 3
+            position += 3 + (1 if block_type == 1 else block_size)  # RLE blocks store a single byte
+            if header & 0x01:
+                break
+        if descriptor & 0x04:
+            position += 4  # content checksum
+        frames.append((start, position))
+    return frames
+
+
+def _decompress_frame(data) -> bytes:
+    # Decompressor contexts are not thread-safe, so each frame gets its own
+    return _zstandard().ZstdDecompressor().decompressobj().decompress(data)
+
+
+def _zstd_chunks(path: str, workers: Optional[int]) -> Iterator[bytes]:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        frames = zstd_frames(mm)
+        if len(frames) < 2:
+            with _zstandard().ZstdDecompressor().stream_reader(f) as reader:
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        workers = workers or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of frames in flight so memory stays flat
+            pending = deque()
+            frames = iter(frames)
+            try:
+                for start, end in frames:
+                    pending.append(pool.submit(_decompress_frame, mm[start:end]))
+                    if len(pending) >= workers * 2:
+                        break
+                while pending:
+                    yield pending.popleft().result()
+                    for start, end in frames:
+                        pending.append(pool.submit(_decompress_frame, mm[start:end]))
+                        break
+            finally:
+                # The consumer may stop early (a search found enough matches)
+                for future in pending:
+                    future.cancel()
+
+
+def iter_chunks(path: str, kind: Optional[str] = None, workers: Optional[int] = None) -> Iterator[bytes]:
+    """Yield decompressed content of ``path`` in chunks."""
+    kind = kind or detect(path)
+    if kind == "zstd":
+        yield from _zstd_chunks(path, workers)
+        return
+
+    opener = {"gzip": gzip.open, "xz": lzma.open, "bzip2": bz2.open}.get(kind)
+    if opener is None:
+        opener = open
+    with opener(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_lines(path: str, kind: Optional[str] = None, workers: Optional[int] = None) -> Iterator[str]:
+    """Yield decoded lines (without line endings) of a possibly compressed file."""
+    rest = b""
+    for chunk in iter_chunks(path, kind, workers):
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+    if rest:
+        yield rest.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def read_text(path: str, max_bytes: int = MAX_READ_BYTES, offset: int = 0,
+              kind: Optional[str] = None) -> Tuple[str, bool]:
+    """Decompress ``max_bytes`` of ``path`` starting at decompressed ``offset``.
+
+    Returns ``(text, truncated)``. Bytes before ``offset`` are decompressed and
+    discarded, since compressed streams cannot be seeked.
+    """
+    parts = []
+    total = 0
+    skip = offset
+    truncated = False
+    for chunk in iter_chunks(path, kind):
+        if skip:
+            dropped = min(skip, len(chunk))
+            chunk = chunk[dropped:]
+            skip -= dropped
+        parts.append(chunk)
+        total += len(chunk)
+        if total > max_bytes:
+            truncated = True
+            break
+    data = b"".join(parts)[:max_bytes]
+    return data.decode("utf-8", errors="replace"), truncated
+
+
+def tail_lines(path: str, n: int = 10, kind: Optional[str] = None) -> List[str]:
+    """Last ``n`` lines of a compressed file (compressed streams can only be read forwards)."""
+    return list(deque(iter_lines(path, kind), maxlen=n)) if n > 0 else []
+
+
+def search(path: str, query: str, max_matches: int = 10, kind: Optional[str] = None,
+           workers: Optional[int] = None) -> Tuple[List[Match], bool]:
+    """Case-insensitive line search; returns ``(matches, more)`` and stops after ``max_matches``."""
+    needle = query.lower()
+    matches = []
+    for number, line in enumerate(iter_lines(path, kind, workers), 1):
+        if needle in line.lower():
+            if len(matches) == max_matches:
+                return matches, True
+            matches.append(Match(number, line.strip()))
+    return matches, False
+
+
+def is_searchable(path: str) -> bool:
+    """True for compressed files and for files that look like text."""
+    with open(path, "rb") as f:
+        head = f.read(8192)
+    return any(head.startswith(magic) for magic, _ in _MAGIC) or b"\0" not in head
+
+
+def grep_tree(root: str, query: str, max_matches: int = 50, skip_dirs=SKIP_DIRS,
+              workers: Optional[int] = None) -> Tuple[List[Tuple[str, Match]], int, bool]:
+    """Search every text or compressed file under ``root``.
+
+    Files are searched on a thread pool (zlib, lzma, bz2 and zstd release the
+    GIL while decompressing) and results are collected in walk order, so the
+    output is deterministic. Returns ``(matches, files_searched, more)``.
+    """
+    def walk():
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    entries = sorted(entries, key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in skip_dirs and not entry.name.startswith(".trash-"):
+                        subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path
+            stack.extend(reversed(subdirs))
+
+    def search_one(path):
+        try:
+            if not is_searchable(path):
+                return None
+            # Each file needs at most the remaining budget, but that is only known
+            # in order, so each one collects up to the overall limit
+            return search(path, query, max_matches, workers=1)
+        except Exception:
+            return None  # unreadable or corrupt files are skipped, not fatal
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    results = []
+    searched = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        paths = walk()
+        for path in paths:
+            pending.append((path, pool.submit(search_one, path)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            path, future = pending.popleft()
+            found = future.result()
+            if found is not None:
+                searched += 1
+                matches, more = found
+                for match in matches:
+                    if len(results) == max_matches:
+                        more = True
+                        break
+                    results.append((path, match))
+                if len(results) == max_matches:
+                    more = more or bool(pending) or next(paths, None) is not None
+                    for _, waiting in pending:
+                        waiting.cancel()
+                    return results, searched, more
+            for path in paths:
+                pending.append((path, pool.submit(search_one, path)))
+                break
+    return results, searched, False
@@ -0,0 +1,434 @@
+"""Streaming filter / project / aggregate / group-by over CSV and JSONL files.
+
+Backs FileExplorerTool's ``query_data`` action so questions like "sum amount
+where region == 'EU'" are answered by code instead of by the model reading the
+file. Rows are parsed in chunks of ``CHUNK_ROWS`` and each column of a chunk
+becomes one NumPy array, so ``where`` filters and derived columns are
+evaluated once per chunk, not once per row. Memory is bounded by the chunk
+size plus the number of groups (or ``limit`` rows); only the small result is
+returned.
+
+Expressions use ``agent_common.expressions`` (the calculator's evaluator):
+column names are variables, and ``col("name")`` reaches columns whose names are
+not identifiers. Compressed files are read through ``compressed.iter_lines``.
+"""
+
+import ast
+import csv
+import heapq
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+import compressed
+from agent_common.expressions import Expression, ExpressionError
+
+CHUNK_ROWS = 65536
+MAX_GROUPS = 100_000
+DEFAULT_LIMIT = 20
+
+AGGREGATES = ("count", "sum", "mean", "avg", "min", "max")
+_ALIAS = re.compile(r"^(.*\S)\s+as\s+([A-Za-z_]\w*)$", re.IGNORECASE | re.DOTALL)
+_ORDER = re.compile(r"^(.*?)(?:\s+(asc|desc))?$", re.IGNORECASE | re.DOTALL)
+_COMPRESSED_SUFFIXES = (".gz", ".xz", ".bz2", ".zst")
+
+
+def _vector_functions(env: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    def col(name):
+        if name not in env:
+            raise ExpressionError(f"Unknown column: {name!r}")
+        return env[name]
+
+    return {
+        "col": col, "abs": np.abs, "round": np.round, "sqrt": np.sqrt, "exp": np.exp,
+        "log": np.log, "log10": np.log10, "floor": np.floor, "ceil": np.ceil,
+        "min": np.minimum, "max": np.maximum,
+    }
+
+
+@dataclass
+class QueryResult:
+    columns: List[str]
+    rows: List[tuple]
+    rows_scanned: int
+    rows_matched: int
+    truncated: bool = False  # more result rows than ``limit``
+    scan_complete: bool = True  # False when the first ``limit`` rows were found before the end of the file
+
+
+@dataclass
+class _Item:
+    label: str
+    expression: Optional[Expression]  # None for count()
+    aggregate: Optional[str] = None
+
+
+def _parse_item(text: str) -> _Item:
+    text = text.strip()
+    alias = None
+    match = _ALIAS.match(text)
+    if match:
+        text, alias = match.group(1), match.group(2)
+    expression = Expression(text)
+    tree = expression.tree
+    if isinstance(tree, ast.Call) and tree.func.id in AGGREGATES:
+        name = "mean" if tree.func.id == "avg" else tree.func.id
+        if len(tree.args) > 1 or (not tree.args and name != "count"):
+            raise ExpressionError(f"{tree.func.id}() takes one expression: {text!r}")
+        inner = Expression(ast.unparse(tree.args[0])) if tree.args else None
+        if inner is not None and inner.calls & set(AGGREGATES):
+            raise ExpressionError(f"Nested aggregates are not supported: {text!r}")
+        return _Item(alias or text, inner, name)
+    if expression.calls & set(AGGREGATES):
+        raise ExpressionError(f"Aggregates must be the whole select item (use one item per aggregate): {text!r}")
+    return _Item(alias or text, expression)
+
+
+def _detect_format(path: str) -> str:
+    name = path.lower()
+    for suffix in _COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    extension = os.path.splitext(name)[1]
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if extension == ".tsv":
+        return "tsv"
+    if extension == ".csv":
+        return "csv"
+    for line in compressed.iter_lines(path):
+        if line.strip():
+            return "jsonl" if line.lstrip().startswith("{") else "csv"
+    return "csv"
+
+
+def _cell(value: Any) -> Any:
+    """One value of a mixed (object) column, converted as a numeric chunk would convert it."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return float(value) if isinstance(value, (bool, int, float)) else value
+
+
+def _to_array(values: list) -> np.ndarray:
+    """Numeric columns become float64 arrays (blanks are NaN); anything else stays object.
+
+    Types are inferred per chunk, so in an object array numbers and numeric
+    text become floats and blanks None, as they would in a numeric chunk: a
+    value then groups, compares and filters the same in every chunk.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        pass
+    if not any(isinstance(v, (list, dict)) for v in values):
+        try:
+            return np.array([np.nan if v == "" or v is None else v for v in values], dtype=np.float64)
+        except (ValueError, TypeError):
+            pass
+    array = np.empty(len(values), dtype=object)
+    array[:] = [_cell(v) for v in values]
+    return array
+
+
+def iter_chunks(path: str, chunk_rows: int = CHUNK_ROWS, fmt: Optional[str] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield ``{column: array}`` for each block of up to ``chunk_rows`` rows."""
+    fmt = fmt or _detect_format(path)
+    lines = compressed.iter_lines(path)
+    if fmt == "jsonl":
+        batch: List[dict] = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}")
+            batch.append(record if isinstance(record, dict) else {"value": record})
+            if len(batch) == chunk_rows:
+                yield _jsonl_chunk(batch)
+                batch = []
+        if batch:
+            yield _jsonl_chunk(batch)
+        return
+
+    reader = csv.reader(lines, delimiter="\t" if fmt == "tsv" else ",")
+    header = next(reader, None)
+    if not header:
+        return
+    header = [name.strip() for name in header]
+    width = len(header)
+    rows: List[list] = []
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        rows.append(row)
+        if len(rows) == chunk_rows:
+            yield _csv_chunk(header, rows)
+            rows = []
+    if rows:
+        yield _csv_chunk(header, rows)
+
+
+def _csv_chunk(header: List[str], rows: List[list]) -> Dict[str, np.ndarray]:
+    columns = list(zip(*rows))
+    return {name: _to_array(list(values)) for name, values in zip(header, columns)}
+
+
+def _jsonl_chunk(records: List[dict]) -> Dict[str, np.ndarray]:
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    return {name: _to_array([record.get(name) for record in records]) for name in names}
+
+
+def _evaluate(expression: Expression, env: Dict[str, np.ndarray], size: int, sparse: bool = False) -> np.ndarray:
+    missing = expression.names - env.keys() - {"pi", "e"}
+    if missing and sparse:
+        # JSONL records may omit keys; a key absent from a whole chunk is all-missing there
+        env = dict(env, **{name: np.full(size, np.nan) for name in missing})
+    elif missing:
+        raise ExpressionError(f"Unknown column(s): {', '.join(sorted(missing))}. "
+                              f"Columns: {', '.join(env)}")
+    value = expression.evaluate(env, _vector_functions(env), vectorized=True)
+    value = np.asarray(value)
+    return np.broadcast_to(value, (size,)) if value.ndim == 0 else value
+
+
+def _python_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer() and abs(value) < 1e15:
+            return int(value)
+    return value
+
+
+def _sort_key(value: Any):
+    return (0, value, "") if isinstance(value, (int, float)) else (1, 0, str(value))
+
+
+def _top(rows: Sequence[tuple], index: int, descending: bool, limit: Optional[int]) -> List[tuple]:
+    """Rows ordered by column ``index``; missing values always sort last."""
+    present = [row for row in rows if row[index] is not None]
+    missing = [row for row in rows if row[index] is None]
+    key = lambda row: _sort_key(row[index])  # noqa: E731
+    if limit is None:
+        ordered = sorted(present, key=key, reverse=descending)
+    else:
+        ordered = (heapq.nlargest if descending else heapq.nsmallest)(limit, present, key=key)
+    ordered += missing
+    return ordered if limit is None else ordered[:limit]
+
+
+class _Groups:
+    """Running aggregates per group, stored as arrays indexed by group id."""
+
+    def __init__(self, items: List[_Item]):
+        self.items = items
+        self.ids: Dict[tuple, int] = {}
+        self.sums = [np.zeros(0) for _ in items]
+        self.counts = [np.zeros(0) for _ in items]
+        self.mins = [np.zeros(0) for _ in items]
+        self.maxs = [np.zeros(0) for _ in items]
+
+    def codes(self, keys: List[np.ndarray], size: int) -> np.ndarray:
+        if not keys:
+            self.ids.setdefault((), 0)
+            return np.zeros(size, dtype=np.intp)
+        columns = [[_python_value(v) for v in key.tolist()] for key in keys]
+        ids = self.ids
+        codes = np.fromiter((ids.setdefault(k, len(ids)) for k in zip(*columns)), dtype=np.intp, count=size)
+        if len(ids) > MAX_GROUPS:
+            raise ValueError(f"More than {MAX_GROUPS} groups; group by fewer or coarser columns")
+        return codes
+
+    def _grow(self) -> None:
+        size = len(self.ids)
+        for arrays, fill in ((self.sums, 0.0), (self.counts, 0.0), (self.mins, np.inf), (self.maxs, -np.inf)):
+            for i, array in enumerate(arrays):
+                if len(array) < size:
+                    arrays[i] = np.concatenate([array, np.full(size - len(array), fill)])
+
+    def add(self, codes: np.ndarray, values: List[Optional[np.ndarray]]) -> None:
+        self._grow()
+        size = len(self.ids)
+        for i, (item, value) in enumerate(zip(self.items, values)):
+            if value is None:
+                # count() counts rows
+                self.counts[i] += np.bincount(codes, minlength=size)
+                continue
+            if value.dtype == object:
+                if item.aggregate != "count":
+                    raise ExpressionError(f"{item.label} needs numbers, but the column contains text")
+                present = np.array([v is not None and v != "" for v in value], dtype=bool)
+                self.counts[i] += np.bincount(codes[present], minlength=size)
+                continue
+            present = ~np.isnan(value)
+            codes_present, value_present = codes[present], value[present]
+            self.counts[i] += np.bincount(codes_present, minlength=size)
+            if item.aggregate in ("sum", "mean"):
+                self.sums[i] += np.bincount(codes_present, weights=value_present, minlength=size)
+            elif item.aggregate == "min":
+                np.minimum.at(self.mins[i], codes_present, value_present)
+            elif item.aggregate == "max":
+                np.maximum.at(self.maxs[i], codes_present, value_present)
+
+    def rows(self, key_count: int) -> List[tuple]:
+        self._grow()
+        rows = []
+        for key, g in self.ids.items():
+            values = []
+            for i, item in enumerate(self.items):
+                count = self.counts[i][g]
+                if item.aggregate == "count":
+                    values.append(int(count))
+                elif not count:
+                    values.append(None)
+                elif item.aggregate == "sum":
+                    values.append(_python_value(self.sums[i][g]))
+                elif item.aggregate == "mean":
+                    values.append(_python_value(self.sums[i][g] / count))
+                elif item.aggregate == "min":
+                    values.append(_python_value(self.mins[i][g]))
+                else:
+                    values.append(_python_value(self.maxs[i][g]))
+            rows.append(tuple(key[:key_count]) + tuple(values))
+        return rows
+
+
+def query(path: str, select: Optional[Sequence[str]] = None, where: Optional[str] = None,
+          group_by: Optional[Sequence[str]] = None, order_by: Optional[str] = None,
+          limit: int = DEFAULT_LIMIT, chunk_rows: int = CHUNK_ROWS) -> QueryResult:
+    """Run a query against a CSV/TSV/JSONL file (optionally compressed).
+
+    ``select`` items are column names, expressions (``price * qty as total``)
+    or aggregates (``sum(price * qty)``, ``count()``, ``mean(x)``, ``min``,
+    ``max``). With aggregates, the other select items must appear in
+    ``group_by``. ``order_by`` names a result column, optionally followed by
+    ``asc``/``desc``.
+    """
+    if isinstance(select, str):
+        select = [select]
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    group_by = [g.strip() for g in group_by or []]
+    items = [_parse_item(text) for text in (select or [])]
+    aggregating = bool(group_by) or any(item.aggregate for item in items)
+    if aggregating:
+        if not items:
+            items = [_parse_item(g) for g in group_by] + [_parse_item("count()")]
+        plain = [item for item in items if not item.aggregate]
+        for item in plain:
+            if item.expression.text not in group_by and item.label not in group_by:
+                raise ExpressionError(f"'{item.label}' must be an aggregate or listed in group_by")
+        group_items = [_parse_item(g) for g in group_by]
+    condition = Expression(where) if where else None
+    limit = max(1, int(limit))
+
+    descending = False
+    if order_by:
+        match = _ORDER.match(order_by.strip())
+        name, direction = match.group(1).strip(), (match.group(2) or "asc").lower()
+        descending = direction == "desc"
+    scanned = matched = 0
+    fmt = _detect_format(path)
+    evaluate = partial(_evaluate, sparse=fmt == "jsonl")
+
+    if aggregating:
+        aggregates = [item for item in items if item.aggregate]
+        groups = _Groups(aggregates)
+        for env in iter_chunks(path, chunk_rows, fmt):
+            size = len(next(iter(env.values()))) if env else 0
+            scanned += size
+            mask = evaluate(condition, env, size).astype(bool) if condition else None
+            keys = [evaluate(g.expression, env, size) for g in group_items]
+            values = [evaluate(item.expression, env, size) if item.expression else None for item in aggregates]
+            if mask is not None:
+                keys = [k[mask] for k in keys]
+                values = [v[mask] if v is not None else None for v in values]
+                size = int(mask.sum())
+            matched += size
+            if size:
+                groups.add(groups.codes(keys, size), values)
+        if not group_items:
+            groups.codes([], 0)  # a global aggregate has one row even when nothing matched
+        columns = [g.label for g in group_items] + [item.label for item in aggregates]
+        rows = groups.rows(len(group_items))
+        # Present the select items in the order they were asked for
+        wanted = [item.label if item.aggregate else _group_label(item, group_items) for item in items]
+        positions = [columns.index(label) for label in wanted]
+        rows = [tuple(row[p] for p in positions) for row in rows]
+        columns = [item.label for item in items]
+        if order_by:
+            rows = _top(rows, _column_index(columns, name), descending, None)
+        return QueryResult(columns, rows[:limit], scanned, matched, len(rows) > limit)
+
+    rows: List[tuple] = []
+    columns: List[str] = []
+    for env in iter_chunks(path, chunk_rows, fmt):
+        size = len(next(iter(env.values()))) if env else 0
+        scanned += size
+        if not items:
+            items = [_parse_item(name) if name.isidentifier() else _Item(name, Expression(f"col({name!r})"))
+                     for name in env]
+        columns = [item.label for item in items]
+        mask = evaluate(condition, env, size).astype(bool) if condition else None
+        values = [evaluate(item.expression, env, size) for item in items]
+        if mask is not None:
+            values = [v[mask] for v in values]
+        matched += len(values[0]) if values else 0
+        if not order_by:
+            # Only the first rows are needed, so convert no more than that
+            values = [v[:limit + 1 - len(rows)] for v in values]
+        chunk = [tuple(_python_value(v) for v in row) for row in zip(*(v.tolist() for v in values))]
+        if order_by:
+            rows = _top(rows + chunk, _column_index(columns, name), descending, limit + 1)
+        else:
+            rows.extend(chunk)
+            if len(rows) > limit:
+                # No ordering requested, so the first rows are the answer: stop reading
+                return QueryResult(columns, rows[:limit], scanned, matched, True, scan_complete=False)
+    truncated = len(rows) > limit or (order_by is not None and matched > limit)
+    return QueryResult(columns, rows[:limit], scanned, matched, truncated)
+
+
+def _group_label(item: _Item, group_items: List[_Item]) -> str:
+    for group in group_items:
+        if item.expression.text in (group.label, group.expression.text) or item.label == group.label:
+            return group.label
+    return item.label
+
+
+def _column_index(columns: List[str], name: str) -> int:
+    if name in columns:
+        return columns.index(name)
+    raise ExpressionError(f"order_by must name a result column: {', '.join(columns)}")
+
+
+def format_table(result: QueryResult, max_width: int = 40) -> str:
+    """Render a result as an aligned plain-text table."""
+    def cell(value):
+        text = "" if value is None else str(round(value, 6) if isinstance(value, float) else value)
+        return text if len(text) <= max_width else text[:max_width - 3] + "..."
+
+    table = [[cell(c) for c in result.columns]] + [[cell(v) for v in row] for row in result.rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(result.columns))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in table]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,188 @@
+"""Parallel recursive delete for FileExplorerTool.
+
+``rmtree`` walks the tree with ``os.scandir`` on directory file descriptors
+and unlinks entries relative to those descriptors (``unlink(name, dir_fd=...)``),
+one directory per task on a thread pool. Each subdirectory is opened by name
+relative to its parent's descriptor with ``O_NOFOLLOW``, and removed through
+it, so symlinks are unlinked, never followed, and renaming an ancestor while
+the delete runs cannot redirect it elsewhere. Progress counts are reported
+through a callback while the delete runs.
+
+``trash_and_reap`` renames the directory to a hidden sibling (an atomic
+rename on the same filesystem) and deletes it on a background thread, so the
+caller gets an answer immediately.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+# dirfd-relative operations need O_DIRECTORY/O_NOFOLLOW and scandir(fd) (Linux, BSD, macOS)
+DIRFD_SUPPORTED = (os.scandir in os.supports_fd and os.unlink in os.supports_dir_fd
+                   and hasattr(os, "O_DIRECTORY") and hasattr(os, "O_NOFOLLOW"))
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+TRASH_PREFIX = ".trash-"
+
+
+@dataclass
+class DeleteProgress:
+    """Running totals of a delete, updated as directories are emptied."""
+
+    path: str
+    files_deleted: int = 0
+    dirs_deleted: int = 0
+    started: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.finished is not None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+
+class _Directory:
+    """A directory being deleted: its open fd, and how many subdirectories are still left."""
+
+    __slots__ = ("fd", "path", "name", "parent", "left")
+
+    def __init__(self, fd: int, path: str, name: str, parent: Optional["_Directory"]):
+        self.fd = fd
+        self.path = path
+        self.name = name
+        self.parent = parent
+        self.left = 0
+
+
+def _empty_directory(parent_fd: int, name: str, path: str,
+                     progress: DeleteProgress) -> Tuple[int, List[str], int]:
+    """Open ``name`` under ``parent_fd`` and unlink its non-directory entries.
+
+    Returns the open directory fd, the names of its subdirectories and the unlink count.
+    """
+    fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+    subdirs = []
+    deleted = 0
+    try:
+        with os.scandir(fd) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                try:
+                    os.unlink(entry.name, dir_fd=fd)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    progress.errors.append(f"{os.path.join(path, entry.name)}: {e}")
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd, subdirs, deleted
+
+
+def rmtree(path: str, workers: Optional[int] = None,
+           on_progress: Optional[Callable[[DeleteProgress], None]] = None,
+           progress: Optional[DeleteProgress] = None, report_every: float = 0.5) -> DeleteProgress:
+    """Delete the directory ``path`` and everything below it using a thread pool.
+
+    Only ``path``'s parent is opened by path. Every directory below it is
+    opened relative to its parent's fd and removed through that fd once it is
+    empty, so renaming an ancestor while the delete runs cannot redirect it.
+    Subdirectories are taken depth first and at most two per worker are in
+    flight, which keeps the number of open fds near the depth of the tree.
+    """
+    path = os.path.abspath(path)
+    progress = progress or DeleteProgress(path)
+
+    if not DIRFD_SUPPORTED:
+        shutil.rmtree(path, onerror=lambda func, p, exc: progress.errors.append(f"{p}: {exc[1]}"))
+        progress.finished = time.time()
+        return progress
+
+    parent_path, name = os.path.split(path)
+    # The root's parent may itself be reached through a symlink the caller chose
+    top = _Directory(os.open(parent_path, os.O_RDONLY | os.O_DIRECTORY), parent_path, "", None)
+    top.left = 1
+    open_dirs = {top}
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    def finish(directory: _Directory) -> None:
+        # Remove emptied directories bottom-up through their parents' fds
+        while directory.left == 0 and directory.parent is not None:
+            os.close(directory.fd)
+            open_dirs.discard(directory)
+            parent = directory.parent
+            try:
+                os.rmdir(directory.name, dir_fd=parent.fd)
+                progress.dirs_deleted += 1
+            except OSError as e:
+                progress.errors.append(f"{directory.path}: {e}")
+            parent.left -= 1
+            directory = parent
+
+    todo = [(top, name, path)]
+    last_report = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            while todo or pending:
+                while todo and len(pending) < 2 * workers:
+                    parent, child, child_path = todo.pop()
+                    future = pool.submit(_empty_directory, parent.fd, child, child_path, progress)
+                    pending[future] = (parent, child, child_path)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent, child, child_path = pending.pop(future)
+                    # Totals and the tree are only updated here, on the coordinating thread
+                    try:
+                        fd, subdirs, deleted = future.result()
+                    except OSError as e:
+                        progress.errors.append(f"{child_path}: {e}")
+                        parent.left -= 1
+                        finish(parent)
+                        continue
+                    directory = _Directory(fd, child_path, child, parent)
+                    open_dirs.add(directory)
+                    progress.files_deleted += deleted
+                    directory.left = len(subdirs)
+                    todo.extend((directory, sub, os.path.join(child_path, sub)) for sub in subdirs)
+                    finish(directory)
+                if on_progress and time.monotonic() - last_report >= report_every:
+                    on_progress(progress)
+                    last_report = time.monotonic()
+    finally:
+        for directory in open_dirs:
+            os.close(directory.fd)
+
+    progress.finished = time.time()
+    if on_progress:
+        on_progress(progress)
+    return progress
+
+
+def trash_and_reap(path: str, workers: Optional[int] = None,
+                   on_progress: Optional[Callable[[DeleteProgress], None]] = None) -> DeleteProgress:
+    """Rename ``path`` out of the way and delete it on a background thread.
+
+    Returns immediately with a ``DeleteProgress`` that the reaper keeps updating.
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    trash = os.path.join(parent, f"{TRASH_PREFIX}{name}-{uuid.uuid4().hex[:8]}")
+    os.rename(path, trash)
+
+    progress = DeleteProgress(trash)
+    # Not a daemon thread: an exiting interpreter waits for the reaper instead of leaving trash behind
+    threading.Thread(target=rmtree, name=f"reaper-{name}", args=(trash, workers, on_progress, progress)).start()
+    return progress
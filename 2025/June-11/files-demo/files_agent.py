@@ -1,49 +1,297 @@
 import os
 import json
+import logging
 import shutil
+import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional, Union
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import BaseTool
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import initialize_agent, AgentType
-from langchain_core.messages import HumanMessage, AIMessage
+try:
+    import fcntl  # advisory file locks (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# LangChain and the OpenAI client are heavy to import, so they are only loaded
+# when an LLM or LangChain tool is actually needed. File commands never pay for them.
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from langchain_core.tools import StructuredTool, Tool
 
 # Load environment variables
 load_dotenv()
 
+# Shared helpers for the June-11 demos (HTTP client pool, ...) live in ../agent_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_common.instrumentation import get_registry
+from copy_engine import copy_file, copy_tree, format_size
+import delete_engine
+from hashing import ALGORITHMS, Hasher
+import tailing
+import watching
+import summarize
+import patching
+import compressed
+import binary_view
+import journal
+import output
+import workspace
+from agent_common.tokens import count_tokens, truncate_to_tokens
+from agent_common.prompts import ActionCatalog, PromptAssembler, ToolAction
+
+logger = logging.getLogger(__name__)
+
+# Token budget for a single 'read' result; larger files are summarized instead
+READ_TOKEN_BUDGET = int(os.getenv("FILE_AGENT_READ_TOKENS", "4000"))
+
+# A folder not watched for this long stops being watched (its inotify watches are freed)
+WATCH_IDLE_SECONDS = float(os.getenv("FILE_AGENT_WATCH_IDLE", "1800"))
+
+
+# Typed arguments of the file_explorer tool for tool-calling agents; which
+# fields each action uses is listed in FILE_ACTIONS
+ACTION_FIELDS = {
+    "path": (str, "File or directory the action works on"),
+    "content": (str, "Text to write, append, prepend or insert"),
+    "mode": (str, "update_file mode: append, prepend or replace"),
+    "query": (str, "Text to search for or question to answer"),
+    "source": (str, "Source path for copy/move actions"),
+    "destination": (str, "Destination path for copy/move actions"),
+    "other_path": (str, "Second file for diff"),
+    "offset": (int, "Byte offset for a range read"),
+    "length": (int, "Number of bytes for a range read"),
+    "max_tokens": (int, "Token budget for read"),
+    "format": (str, "read output: text, hex or base64"),
+    "lines": (int, "Number of lines for tail"),
+    "cursor": (str, "Cursor returned by a previous tail/follow/watch"),
+    "diff": (str, "Unified diff to apply with patch"),
+    "start_line": (int, "First line replaced by patch (1-based)"),
+    "end_line": (int, "Last line replaced by patch; start_line - 1 inserts"),
+    "context": (int, "Context lines for diff"),
+    "select": (List[str], "query_data columns, expressions or aggregates"),
+    "where": (str, "query_data filter expression"),
+    "group_by": (List[str], "query_data grouping columns"),
+    "order_by": (str, "query_data result column to sort by, optionally followed by desc"),
+    "limit": (int, "Maximum result rows for query_data, changes for watch"),
+    "max_matches": (int, "Maximum matches for grep_tree"),
+    "k": (int, "Number of passages for semantic_search"),
+    "recursive": (bool, "delete_folder: delete non-empty folders"),
+    "background": (bool, "delete_folder: delete in the background"),
+    "algorithm": (str, "hash_file algorithm: blake2b, sha256 or xxh3"),
+    "min_size": (int, "find_duplicates: ignore smaller files (bytes)"),
+    "workers": (int, "copy_tree: parallel copy threads"),
+    "resume": (bool, "copy_tree: continue an interrupted copy"),
+    "steps": (int, "undo/redo: number of actions"),
+    "timeout": (float, "watch: seconds to wait for a change"),
+    "actions": (List[Dict[str, Any]], "batch: actions to run in order"),
+    "output": (str, "Result format: text, json or tsv"),
+}
+
 
 class FileOperationError(Exception):
     """Custom exception for file operation errors."""
     pass
 
 
-class FileExplorerTool(BaseTool):
+@contextmanager
+def locked_open(path: str, mode: str = "r", encoding: str = "utf-8"):
+    """Open a text file holding an advisory lock for the duration of the block.
+
+    Reads take a shared lock and everything else an exclusive one, so concurrent
+    agent sessions (threads or processes) never see a half-written file or lose
+    an update. Mode "w" truncates only after the lock is held; "r+" is used for
+    read-modify-write updates such as prepend. A writer that waited while
+    ``patch`` renamed a new version into place reopens the path, so its update
+    is not lost on the replaced file.
+    """
+    while True:
+        if mode in ("w", "r+"):
+            flags = os.O_RDWR | (os.O_CREAT if mode == "w" else 0)
+            f = os.fdopen(os.open(path, flags, 0o666), "r+", encoding=encoding)
+        else:
+            f = open(path, mode, encoding=encoding)
+        if fcntl is None:
+            break
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if mode == "r" else fcntl.LOCK_EX)
+        if mode == "r":
+            break
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                break
+        except FileNotFoundError:
+            break
+        f.close()
+    with f:
+        if mode == "w":
+            f.truncate(0)
+        yield f
+
+
+FILES_SYSTEM_PROMPT = (
+    "You manage files in the current directory with the file_explorer tool. "
+    "Pick the action that answers the request directly (query_data for numbers in CSV/JSONL files, "
+    "grep_tree or query_file for searches, patch for small edits) rather than reading whole files, "
+    "and make independent calls in the same step."
+)
+
+# The tool description (sent on every model call, so part of the cached prompt
+# prefix) has one line per action; the details are added to the user turn only
+# for the actions a request is about (see agent_common/prompts.py)
+FILE_ACTIONS = ActionCatalog([
+    ToolAction("create_test", "Creates test directory and file"),
+    ToolAction("list", "Lists directory contents", "requires 'path'",
+               ("ls", "contents", "directory", "folder")),
+    ToolAction("read", "Reads file contents",
+               "requires 'path'; optional 'max_tokens', or 'offset' and 'length' for a byte range. Large files "
+               "return head, tail and an outline. Binary files are shown as a hex dump window; optional 'format' "
+               "('hex' or 'base64') forces a byte view",
+               ("open", "show", "view", "cat", "contents", "hex", "base64", "bytes")),
+    ToolAction("tail", "Last lines of a file", "requires 'path', optional 'lines'",
+               ("last", "end", "log", "recent")),
+    ToolAction("follow", "Text appended since a cursor",
+               "requires 'path', optional 'cursor' from a previous tail/follow",
+               ("appended", "new lines", "since", "cursor", "log")),
+    ToolAction("create_file", "Creates a new file", "requires 'path', optional 'content'",
+               ("create", "new file", "touch")),
+    ToolAction("create_folder", "Creates a directory", "requires 'path'",
+               ("mkdir", "new folder", "directory")),
+    ToolAction("write_file", "Overwrites a file", "requires 'path' and 'content'",
+               ("write", "save", "overwrite")),
+    ToolAction("update_file", "Appends, prepends or replaces file content",
+               "requires 'path' and 'content', optional 'mode' (append, prepend or replace)",
+               ("append", "prepend", "add", "update")),
+    ToolAction("patch", "Edits part of a file in place",
+               "requires 'path' and either 'diff' (unified diff) or 'start_line', 'end_line' and 'content'; "
+               "use it instead of rewriting a file through write_file",
+               ("edit", "change", "fix", "replace", "line", "lines", "insert")),
+    ToolAction("diff", "Unified diff between two files", "requires 'path' and 'other_path', optional 'context'",
+               ("compare", "difference", "differences", "changed", "between")),
+    ToolAction("query_file", "Searches one file",
+               "requires 'path' and 'query'; works on binary files, and 'query' may be raw bytes written as "
+               "\"hex:de ad be ef\"",
+               ("search", "find", "grep", "contains", "occurrences")),
+    ToolAction("grep_tree", "Searches every file under a directory",
+               "requires 'query', optional 'path' and 'max_matches'",
+               ("search", "find", "grep", "everywhere", "recursively", "which files", "all files")),
+    ToolAction("delete_file", "Deletes a file", "requires 'path'", ("delete", "remove", "rm")),
+    ToolAction("delete_folder", "Deletes a directory", "requires 'path', optional 'recursive' and 'background'",
+               ("delete", "remove", "rmdir", "folder", "directory")),
+    ToolAction("delete_status", "Progress of background deletes", "", ("progress", "status", "background")),
+    ToolAction("hash_file", "Content checksum of a file", "requires 'path', optional 'algorithm'",
+               ("hash", "checksum", "digest", "sha256", "blake2b", "md5")),
+    ToolAction("find_duplicates", "Finds identical files under a directory", "requires 'path', optional 'min_size'",
+               ("duplicate", "duplicates", "identical", "same content")),
+    ToolAction("semantic_search", "Finds passages related to a question across a directory",
+               "requires 'query', optional 'path' and 'k'",
+               ("about", "related", "mention", "mentions", "discuss", "explain", "where", "how")),
+    ToolAction("query_data", "Computes answers from CSV/TSV/JSONL files instead of reading them",
+               "requires 'path'; optional 'select' (list of columns, expressions like \"price * qty as total\" or "
+               "aggregates count(), sum(x), mean(x), min(x), max(x)), 'where' (expression like "
+               "\"region == 'EU' and qty > 10\"), 'group_by' (list), 'order_by' (e.g. \"total desc\") and 'limit'. "
+               "Use col(\"name\") for column names with spaces",
+               ("csv", "tsv", "jsonl", "sum", "total", "average", "mean", "count", "how many", "per",
+                "group", "top", "max", "min", "rows")),
+    ToolAction("copy_file", "Copies a file", "requires 'source' and 'destination'", ("copy", "duplicate", "cp")),
+    ToolAction("copy_tree", "Copies a directory tree",
+               "requires 'source' and 'destination', optional 'workers' and 'resume'",
+               ("copy", "backup", "folder", "directory", "tree")),
+    ToolAction("move_file", "Moves or renames a file", "requires 'source' and 'destination'",
+               ("move", "rename", "mv")),
+    ToolAction("undo", "Reverts the last file changes", "optional 'steps'",
+               ("undo", "revert", "restore", "back", "mistake")),
+    ToolAction("redo", "Reapplies undone file changes", "optional 'steps'", ("redo", "again", "reapply")),
+    ToolAction("history", "Recent file changes that can be undone", "",
+               ("history", "journal", "changes", "changed", "undo")),
+    ToolAction("watch", "Files created, modified, deleted or moved under a folder since a cursor",
+               "requires 'path'; the first call starts watching and returns a 'cursor', later calls with it "
+               "return only newer changes; optional 'timeout' (seconds to wait for a change) and 'limit'",
+               ("watch", "monitor", "wait", "new files", "appear", "arrive", "changes", "changed")),
+    ToolAction("batch", "Runs several actions in one call",
+               "requires 'actions', a list of action objects; results come back in order",
+               ("batch", "several", "multiple", "all", "each")),
+], preamble="File and folder operations. Input is a JSON object with an 'action' field and optional 'output' "
+            "('json' or 'tsv' for compact results). Actions:",
+   example='{"action": "create_file", "path": "example.txt", "content": "Hello World"}')
+
+
+def _copy_target(source: str, destination: str) -> str:
+    """Where copy_file/move_file put ``source``: into ``destination`` if it is a directory."""
+    if os.path.isdir(destination):
+        return os.path.join(destination, os.path.basename(source))
+    return destination
+
+
+# Actions recorded in the undo journal (move_file and delete_folder record
+# themselves): the paths they change, and how the old versions are kept (see
+# journal.Journal.run): "unlink" for paths the action removes, "link" for
+# files it renames over, "copy" (a reflink where supported) for files
+# rewritten in place, "append" for files only appended to (update_file's
+# other modes rewrite: "copy")
+JOURNALED_ACTIONS = {
+    "create_file": (lambda data: [data.get("path", "")], "copy"),
+    "create_folder": (lambda data: [data.get("path", "")], "copy"),
+    "write_file": (lambda data: [data.get("path", "")], "copy"),
+    "update_file": (lambda data: [data.get("path", "")], "append"),
+    "patch": (lambda data: [data.get("path", "")], "link"),
+    "delete_file": (lambda data: [data.get("path", "")], "unlink"),
+    "copy_file": (lambda data: [_copy_target(data.get("source", ""), data.get("destination", ""))], "copy"),
+    # Only a new destination: undo then removes the copy in one rename
+    "copy_tree": (lambda data: [] if os.path.exists(data.get("destination", "")) else [data.get("destination", "")],
+                  "link"),
+}
+
+
+# Fields naming paths, resolved against the workspace root before any handler
+# runs; actions that change the files they name invalidate those paths in the
+# workspace cache (undo and redo can touch anything: the whole cache)
+PATH_FIELDS = ("path", "source", "destination", "other_path")
+MUTATING_ACTIONS = set(JOURNALED_ACTIONS) | {"move_file", "delete_folder", "create_test"}
+
+# Actions that change no files, so a turn that only used these can be re-run
+# on a larger model when the small one's answer is unsure (see routing.py)
+READ_ONLY_ACTIONS = {"list", "read", "tail", "follow", "diff", "query_file", "grep_tree", "delete_status",
+                     "hash_file", "find_duplicates", "semantic_search", "query_data", "history", "watch", "help"}
+
+
+def _repeatable_call(tool_name: str, tool_input: Any) -> bool:
+    """Whether a file_explorer call may run again: only read-only actions may."""
+    if isinstance(tool_input, str):
+        try:
+            tool_input = json.loads(tool_input)
+        except ValueError:
+            return False  # plain language could ask for anything
+    if not isinstance(tool_input, dict):
+        return False
+    if tool_input.get("action") == "batch":
+        return all(_repeatable_call(tool_name, step) for step in tool_input.get("actions") or [])
+    return tool_input.get("action") in READ_ONLY_ACTIONS
+
+
+class FileExplorerTool:
     name: str = "file_explorer"
-    description: str = """Useful for file and folder operations. Input should be a JSON string with an 'action' field.
-    
-Available actions:
-- create_test: Creates test directory and file
-- list: Lists directory contents (requires 'path' field)
-- read: Reads file contents (requires 'path' field)
-- create_file: Creates new file (requires 'path' and optional 'content' fields)
-- create_folder: Creates new directory (requires 'path' field)
-- write_file: Writes to file (requires 'path' and 'content' fields)
-- update_file: Updates file (requires 'path', 'content', and optional 'mode' fields)
-- query_file: Searches in file (requires 'path' and 'query' fields)
-- delete_file: Deletes file (requires 'path' field)
-- delete_folder: Deletes directory (requires 'path' field, optional 'recursive' field)
-- copy_file: Copies file (requires 'source' and 'destination' fields)
-- move_file: Moves/renames file (requires 'source' and 'destination' fields)
-
-Example: {"action": "create_file", "path": "example.txt", "content": "Hello World"}"""
+    description: str = FILE_ACTIONS.summary()
+
+    ACTIONS = FILE_ACTIONS.names + ("help",)
+
+    def __init__(self):
+        # Progress of delete_folder calls running in the background
+        self._background_deletes = []
+        # Digests are cached by (inode, mtime, size) across calls and runs
+        self._hasher = Hasher(on_cache=lambda hit: get_registry().record_cache("file_hash", hit))
+        # Outlines of large files, keyed by file identity
+        self._outlines = summarize.OutlineCache(on_lookup=lambda hit: get_registry().record_cache("file_outline", hit))
+        # Semantic indexes by workspace root (loaded on first semantic_search)
+        self._semantic_indexes = {}
+        # Change watchers by folder (started on the first watch of each)
+        self._watchers: Dict[str, "watching.TreeWatcher"] = {}
 
     def _run(self, query: str) -> str:
         """Main entry point for file operations."""
         try:
-            print(f"DEBUG: Tool received query: {repr(query)}")
+            logger.debug("Tool received query: %r", query)
 
             # Parse input and execute action
             parsed_data = self._parse_input(query)
@@ -51,7 +299,7 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
 
         except Exception as e:
             error_msg = f"Error in file explorer tool: {str(e)}"
-            print(f"DEBUG: {error_msg}")
+            logger.debug(error_msg)
             return error_msg
 
     def _parse_input(self, query: str) -> Dict[str, Any]:
@@ -63,11 +311,11 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
             if not action:
                 raise ValueError("No 'action' field specified in JSON")
 
-            print(f"DEBUG: Parsed JSON - action: {action}")
+            logger.debug("Parsed JSON - action: %s", action)
             return query_data
 
         except json.JSONDecodeError:
-            print(f"DEBUG: JSON parse failed, trying natural language")
+            logger.debug("JSON parse failed, trying natural language")
             return self._parse_natural_language(query.strip())
 
     def _parse_natural_language(self, query: str) -> Dict[str, Any]:
@@ -78,6 +326,10 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         if any(word in query_lower for word in ["commands", "help", "what can", "available", "actions"]):
             return {"action": "help"}
 
+        # Journal commands
+        elif query_lower in ("undo", "redo", "history"):
+            return {"action": query_lower}
+
         # Test creation
         elif "create test" in query_lower:
             return {"action": "create_test"}
@@ -104,6 +356,15 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
                 path = "."
             return {"action": "list", "path": path}
 
+        # Tail operations
+        elif query_lower.startswith("tail "):
+            return {"action": "tail", "path": query.strip().split(None, 1)[1]}
+
+        # Change events
+        elif query_lower == "watch" or query_lower.startswith("watch "):
+            parts = query.strip().split(None, 1)
+            return {"action": "watch", "path": parts[1] if len(parts) > 1 else "."}
+
         # Read operations
         elif query_lower.startswith("read") or "show content" in query_lower:
             if "test" in query_lower and "file" in query_lower:
@@ -136,6 +397,13 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
                 query_lower, ["delete folder", "remove folder"])
             return {"action": "delete_folder", "path": foldername, "recursive": False}
 
+        # Directory tree copy
+        elif any(phrase in query_lower for phrase in ["copy folder", "copy directory"]) and " to " in query_lower:
+            parsed = self._parse_copy_move_query(query.replace("folder", "", 1).replace("directory", "", 1), "copy")
+            if parsed.get("action") == "copy_file":
+                parsed["action"] = "copy_tree"
+            return parsed
+
         # Copy operations
         elif "copy" in query_lower and "to" in query_lower:
             return self._parse_copy_move_query(query, "copy")
@@ -266,44 +534,161 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
 
     def _execute_action(self, data: Dict[str, Any]) -> str:
         """Execute the parsed action."""
+        try:
+            fmt = output.check_format(data.get("output"))
+        except ValueError as e:
+            return f"❌ {e}"
+        if data.get("action") == "batch":
+            return self._batch(data.get("actions"), fmt)
+        return self._perform(data, fmt)
+
+    def _perform(self, data: Dict[str, Any], fmt: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        """Run one action and render its result in ``fmt`` (``extra``: see output.render)."""
         action = data.get("action", "unknown")
 
         # Route to appropriate handler
         action_handlers = {
             "create_test": lambda: self._create_test(),
             "list": lambda: self._list_directory(data.get("path", ".")),
-            "read": lambda: self._read_file(data.get("path", "")),
+            "read": lambda: self._read_file(data.get("path", ""), data.get("offset"), data.get("length"),
+                                            data.get("max_tokens"), data.get("format")),
+            "tail": lambda: self._tail_file(data.get("path", ""), data.get("lines", 10)),
+            "follow": lambda: self._follow_file(data.get("path", ""), data.get("cursor")),
+            "watch": lambda: self._watch(data.get("path", "."), data.get("cursor"), data.get("timeout", 0),
+                                         data.get("limit", 200)),
             "create_file": lambda: self._create_file(data.get("path", ""), data.get("content", "")),
             "create_folder": lambda: self._create_folder(data.get("path", "")),
             "write_file": lambda: self._write_file(data.get("path", ""), data.get("content", "")),
             "update_file": lambda: self._update_file(data.get("path", ""), data.get("content", ""), data.get("mode", "append")),
+            "patch": lambda: self._patch_file(data.get("path", ""), data.get("diff"), data.get("start_line"),
+                                              data.get("end_line"), data.get("content", "")),
+            "diff": lambda: self._diff_files(data.get("path", ""), data.get("other_path", ""), data.get("context", 3)),
             "query_file": lambda: self._query_file(data.get("path", ""), data.get("query", "")),
+            "grep_tree": lambda: self._grep_tree(data.get("query", ""), data.get("path", "."),
+                                                 data.get("max_matches", 50)),
             "delete_file": lambda: self._delete_file(data.get("path", "")),
-            "delete_folder": lambda: self._delete_folder(data.get("path", ""), data.get("recursive", False)),
+            "delete_folder": lambda: self._delete_folder(data.get("path", ""), data.get("recursive", False),
+                                                         data.get("background", False)),
+            "delete_status": lambda: self._delete_status(),
+            "hash_file": lambda: self._hash_file(data.get("path", ""), data.get("algorithm", "blake2b")),
+            "find_duplicates": lambda: self._find_duplicates(data.get("path", "."), data.get("min_size", 1)),
+            "semantic_search": lambda: self._semantic_search(data.get("query", ""), data.get("path", "."),
+                                                             data.get("k", 5)),
+            "query_data": lambda: self._query_data(data.get("path", ""), data.get("select"), data.get("where"),
+                                                   data.get("group_by"), data.get("order_by"),
+                                                   data.get("limit", 20)),
             "copy_file": lambda: self._copy_file(data.get("source", ""), data.get("destination", "")),
+            "copy_tree": lambda: self._copy_tree(data.get("source", ""), data.get("destination", ""),
+                                                 data.get("workers"), data.get("resume", False)),
             "move_file": lambda: self._move_file(data.get("source", ""), data.get("destination", "")),
+            "undo": lambda: self._undo(data.get("steps", 1)),
+            "redo": lambda: self._redo(data.get("steps", 1)),
+            "history": lambda: self._history(),
             "help": lambda: self._get_help()
         }
 
         if action in action_handlers:
-            return action_handlers[action]()
+            # Per-action latency histogram, exported with the other agent metrics
+            with get_registry().timed("file_tool_action_seconds", action=action):
+                root = self._workspace()
+                root.begin_action()
+                try:
+                    self._sandbox(data)
+                except OSError as e:
+                    return output.render(f"❌ {e}", fmt, extra)
+                result = None
+                if action in JOURNALED_ACTIONS:
+                    targets, snapshot = JOURNALED_ACTIONS[action]
+                    if snapshot == "append" and data.get("mode", "append") != "append":
+                        snapshot = "copy"
+                    paths = [p.strip() for p in targets(data) if p and p.strip()]
+                    workspace_journal = self._journal(paths)
+                    if workspace_journal is not None and paths:
+                        result = workspace_journal.run(action, paths, action_handlers[action], snapshot)
+                if result is None:
+                    result = action_handlers[action]()
+                self._invalidate(root, action, data, result if isinstance(result, str) else "")
+                # Table rows are produced while rendering, so this stays inside the timed block
+                return output.render(result, fmt, extra)
         else:
             error_msg = data.get("error", f"Unknown action: {action}")
-            return f"❌ {error_msg}. Use 'help' to see available commands."
+            return output.render(f"❌ {error_msg}. Use 'help' to see available commands.", fmt, extra)
 
     # Helper methods for path operations
+    def _workspace(self) -> "workspace.Workspace":
+        """Workspace the tool's paths are confined to (``FILE_AGENT_ROOT`` or the working directory)."""
+        return workspace.open_workspace()
+
+    def _sandbox(self, data: Dict[str, Any]) -> None:
+        """Resolve the path fields of ``data`` in place.
+
+        Raises PathEscapeError for paths outside the root, and PermissionError
+        for paths in the undo journal, which only undo and redo may change.
+        """
+        root = self._workspace()
+        journal_dir = self._journal_dir()
+        for field in PATH_FIELDS:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                resolved = root.resolve(value.strip())
+                real = root.root if resolved.rel == "." else os.path.join(root.root, resolved.rel)
+                if os.path.islink(resolved.path):
+                    real = os.path.realpath(resolved.path)  # writes go through the link
+                if os.path.commonpath([real, journal_dir]) == journal_dir:
+                    raise PermissionError(f"Path is in the undo journal (use undo/redo): {value.strip()}")
+                data[field] = resolved.path
+
+    def _invalidate(self, root: "workspace.Workspace", action: str, data: Dict[str, Any], result: str) -> None:
+        """Drop cached path lookups that ``action`` changed, or all of them after a failure we cannot place."""
+        if action in ("undo", "redo", "create_test"):
+            root.invalidate()
+        elif action in MUTATING_ACTIONS or result.startswith("❌"):
+            for field in PATH_FIELDS:
+                if data.get(field):
+                    root.invalidate(data[field])
+            if action in ("copy_file", "move_file") and data.get("source") and data.get("destination"):
+                root.invalidate(_copy_target(data["source"], data["destination"]))
+
     def _validate_path(self, path: str, operation: str = "") -> str:
-        """Validate and normalize file path."""
+        """Validate and normalize file path, confining it to the workspace."""
         if not path or path.strip() == "":
             raise FileOperationError(f"Path required for {operation}")
-        return path.strip()
+        try:
+            return self._workspace().resolve(path.strip()).path
+        except workspace.PathEscapeError as e:
+            raise FileOperationError(str(e)) from e
+
+    def _exists(self, path: str) -> bool:
+        return self._workspace().kind(path) is not None
+
+    def _isdir(self, path: str) -> bool:
+        return self._workspace().kind(path) == "dir"
+
+    def _isfile(self, path: str) -> bool:
+        return self._workspace().kind(path) == "file"
+
+    def _journal_dir(self) -> str:
+        """Directory of the undo journal of the current workspace."""
+        return os.path.realpath(os.getenv("FILE_AGENT_JOURNAL_DIR") or
+                                os.path.join(self._workspace().root, journal.JOURNAL_DIR))
+
+    def _journal(self, paths: List[str]) -> Optional["journal.Journal"]:
+        """Undo journal of the current workspace, or None if off or ``paths`` touch the journal itself."""
+        if os.getenv("FILE_AGENT_JOURNAL", "1") == "0":
+            return None
+        directory = self._journal_dir()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.commonpath([path, directory]) in (path, directory):
+                return None
+        return journal.open_journal(directory, hasher=self._hasher)
 
     def _ensure_directory(self, path: str) -> None:
         """Ensure directory exists for the given file path."""
         dir_path = os.path.dirname(path)
         if dir_path:
             os.makedirs(dir_path, exist_ok=True)
-            print(f"DEBUG: Created directory: {dir_path}")
+            logger.debug("Created directory: %s", dir_path)
 
     def _safe_file_operation(self, operation_func, *args, **kwargs) -> str:
         """Safely execute file operations with error handling."""
@@ -321,7 +706,7 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
     # Individual action implementations
     def _create_test(self) -> str:
         """Create test directory and file."""
-        test_dir = os.path.join(os.getcwd(), "test")
+        test_dir = os.path.join(self._workspace().root, "test")
         os.makedirs(test_dir, exist_ok=True)
         test_file = os.path.join(test_dir, "test_file.txt")
 
@@ -330,56 +715,211 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
 
         return f"✅ Created test directory and file at: {test_file}"
 
-    def _list_directory(self, path: str) -> str:
+    def _list_directory(self, path: str) -> Union[str, output.Table]:
         """List directory contents."""
         try:
             path = self._validate_path(path, "list directory")
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ Directory not found: {path}"
 
-            if not os.path.isdir(path):
+            if not self._isdir(path):
                 return f"❌ Path is not a directory: {path}"
 
-            contents = os.listdir(path)
+            # scandir's entry types come with the listing: one stat per file (for its size), none per folder
+            with os.scandir(path) as it:
+                contents = sorted(it, key=lambda entry: entry.name)
             if not contents:
                 return f"📁 Directory '{path}' is empty"
 
-            file_info = []
-            for item in sorted(contents):
-                item_path = os.path.join(path, item)
-                if os.path.isfile(item_path):
-                    size = os.path.getsize(item_path)
-                    file_info.append(f"📄 {item} ({size} bytes)")
-                elif os.path.isdir(item_path):
-                    file_info.append(f"📁 {item}/")
+            def rows():
+                # Folders are marked by a trailing slash and have no size
+                for entry in contents:
+                    if entry.is_file():
+                        yield entry.name, entry.stat().st_size
+                    elif entry.is_dir():
+                        yield entry.name + "/", None
 
-            return f"📁 Contents of '{path}':\n" + "\n".join(file_info)
+            return output.Table(("name", "size"), rows(), f"📁 Contents of '{path}':",
+                                lambda row: f"📁 {row[0]}" if row[1] is None else f"📄 {row[0]} ({row[1]} bytes)",
+                                details={"path": path}, error="Error listing directory")
 
         except Exception as e:
             return f"❌ Error listing directory: {e}"
 
-    def _read_file(self, path: str) -> str:
-        """Read file contents."""
+    def _read_file(self, path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                   max_tokens: Optional[int] = None, output_format: Optional[str] = None) -> str:
+        """Read file contents, a byte range, or a head/tail/outline summary of a large file."""
         try:
             path = self._validate_path(path, "read file")
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ File not found: {path}"
 
-            if os.path.isdir(path):
+            if self._isdir(path):
                 return f"❌ Cannot read directory as file: {path}"
 
-            with open(path, "r", encoding='utf-8') as f:
-                content = f.read()
+            max_tokens = int(max_tokens or READ_TOKEN_BUDGET)
+            size = os.path.getsize(path)
+
+            if output_format not in (None, "text", "hex", "base64"):
+                return f"❌ Unknown format: {output_format} (use 'text', 'hex' or 'base64')"
+
+            kind = compressed.detect(path)
+            if kind and output_format in (None, "text"):
+                return self._read_compressed(path, kind, offset, length, max_tokens)
+
+            info = binary_view.sniff(path)
+            if output_format in ("hex", "base64") or (info.binary and output_format is None):
+                return self._read_binary(path, info, offset, length, output_format or "hex", max_tokens)
+            encoding = info.encoding or "utf-8"
+            decoded = "" if encoding in ("utf-8", "ascii") else f" (decoded as {encoding})"
+
+            if offset is not None or length is not None:
+                start = int(offset or 0)
+                text, _ = summarize.read_range(path, start, int(length or 8192), encoding)
+                text = truncate_to_tokens(text, max_tokens)
+                end = start + len(text.encode(encoding, errors="replace"))
+                return (f"📄 Bytes {start}-{end} of '{path}' ({size} bytes){decoded}:\n"
+                        f"{'-' * 40}\n{text}\n{'-' * 40}")
 
-            return f"📄 Contents of '{path}':\n{'-' * 40}\n{content}\n{'-' * 40}"
+            # Even very repetitive text rarely packs more than ~16 bytes into a token
+            if size <= max_tokens * 16:
+                with locked_open(path, "r", encoding) as f:
+                    content = f.read()
+                if count_tokens(content) <= max_tokens:
+                    return f"📄 Contents of '{path}'{decoded}:\n{'-' * 40}\n{content}\n{'-' * 40}"
+
+            return summarize.budgeted_view(path, max_tokens, self._outlines, encoding)
 
         except UnicodeDecodeError:
-            return f"❌ Cannot read binary file: {path}"
+            return (f"❌ Cannot decode {path} as text; read it with "
+                    f"{{\"action\": \"read\", \"path\": \"{path}\", \"format\": \"hex\"}}")
         except Exception as e:
             return f"❌ Error reading file: {e}"
 
+    def _read_binary(self, path: str, info: "binary_view.Sniff", offset: Optional[int], length: Optional[int],
+                     output_format: str, max_tokens: int) -> str:
+        """Show a window of raw bytes as a hex dump or base64."""
+        start = int(offset or 0)
+        # A hex dump line costs ~30 tokens per 16 bytes; base64 packs about twice as much
+        length = min(int(length or max_tokens // (2 if output_format == "hex" else 1)), binary_view.MAX_WINDOW_BYTES)
+        while True:
+            data, size = binary_view.read_window(path, start, max(length, 1))
+            text = binary_view.hex_window(data, start) if output_format == "hex" else binary_view.base64_window(data)
+            if count_tokens(text) <= max_tokens or length <= 16:
+                break
+            length //= 2
+        end = start + len(data)
+        kind = info.description or (f"text, {info.encoding}" if info.encoding else "binary")
+        footer = f"\nNext window: offset {end}" if end < size else ""
+        return (f"🔢 Bytes {start}-{end} of '{path}' ({size} bytes, {kind}) as {output_format}:\n"
+                f"{'-' * 40}\n{text}\n{'-' * 40}{footer}")
+
+    def _read_compressed(self, path: str, kind: str, offset: Optional[int], length: Optional[int],
+                         max_tokens: int) -> str:
+        """Stream-decompress the start (or a decompressed byte range) of a compressed file."""
+        start = int(offset or 0)
+        text, truncated = compressed.read_text(path, int(length or max_tokens * 16), start, kind)
+        shown = truncate_to_tokens(text, max_tokens)
+        label = f"bytes {start}-{start + len(shown.encode('utf-8'))} of " if start or length else ""
+        footer = ""
+        if truncated or shown != text:
+            footer = "\n... more content follows, read again with 'offset' and 'length' or use 'query_file'"
+        return (f"📄 Contents of {label}'{path}' ({kind}-compressed):\n{'-' * 40}\n{shown}\n{'-' * 40}"
+                f"{footer}")
+
+    def _tail_file(self, path: str, lines: int = 10) -> str:
+        """Return the last lines of a file without reading all of it."""
+        try:
+            path = self._validate_path(path, "tail file")
+
+            if not self._isfile(path):
+                return f"❌ File not found: {path}"
+
+            kind = compressed.detect(path)
+            if kind:
+                # Compressed streams cannot be read backwards, so this decompresses the whole file
+                last_lines = compressed.tail_lines(path, int(lines), kind)
+                return (f"📜 Last {len(last_lines)} lines of '{path}' ({kind}-compressed):\n"
+                        f"{'-' * 40}\n" + "\n".join(last_lines) + f"\n{'-' * 40}")
+
+            last_lines, cursor = tailing.tail_lines(path, int(lines))
+            return (f"📜 Last {len(last_lines)} lines of '{path}' (cursor: {cursor}):\n"
+                    f"{'-' * 40}\n" + "\n".join(last_lines) + f"\n{'-' * 40}")
+
+        except Exception as e:
+            return f"❌ Error reading end of file: {e}"
+
+    def _follow_file(self, path: str, cursor: Optional[str] = None) -> str:
+        """Return only what was appended to a file since the cursor."""
+        try:
+            path = self._validate_path(path, "follow file")
+
+            if not self._isfile(path):
+                return f"❌ File not found: {path}"
+
+            if compressed.detect(path):
+                return f"❌ Cannot follow a compressed file: {path} (use 'tail' instead)"
+
+            result = tailing.follow(path, cursor)
+            header = f"📜 New in '{path}' (cursor: {result.cursor})"
+            if result.note:
+                header += f" - {result.note}"
+            if not result.text:
+                return header + ": nothing new"
+            footer = "\n... more available, call follow again with the new cursor" if result.truncated else ""
+            return f"{header}:\n{result.text.rstrip(chr(10))}{footer}"
+
+        except ValueError as e:
+            return f"❌ {e}"
+        except Exception as e:
+            return f"❌ Error following file: {e}"
+
+    def _watch(self, path: str, cursor: Optional[str] = None, timeout: float = 0,
+               limit: int = 200) -> Union[str, output.Table]:
+        """Changes under a folder since a cursor, from inotify (or a polling fallback)."""
+        try:
+            path = self._validate_path(path, "watch")
+
+            if not self._isdir(path):
+                return f"❌ Folder not found: {path}"
+
+            # Stop watching folders nobody asked about for a while
+            now = time.monotonic()
+            for root, idle in list(self._watchers.items()):
+                if now - idle.last_used > WATCH_IDLE_SECONDS:
+                    idle.close()
+                    del self._watchers[root]
+
+            root = os.path.abspath(path)
+            watcher = self._watchers.get(root)
+            if watcher is None:
+                watcher = self._watchers[root] = watching.TreeWatcher(root)
+            changes = watcher.changes(cursor, float(timeout or 0), int(limit))
+
+            details = {"cursor": changes.cursor, "backend": watcher.backend}
+            if cursor is None:
+                message = f"👀 Watching '{path}' ({watcher.backend}"
+                message += f", {watcher.watches} folders)" if watcher.backend == "inotify" else ")"
+                return output.Table(("event", "path", "source"), (), "", str,
+                                    empty=f"{message}. Pass cursor {changes.cursor} to get changes", details=details)
+
+            note = changes.note and f"⚠️ {changes.note}"
+            if changes.more:
+                note = "\n".join(filter(None, [note, "... more changes, call watch again with the new cursor"]))
+            return output.Table(("event", "path", "source"), changes.events,
+                                f"👀 {len(changes.events)} changes under '{path}' (cursor: {changes.cursor}):",
+                                lambda row: f"{row[0]} {row[1]}" + (f" (from {row[2]})" if row[2] else ""),
+                                empty=f"📭 No changes under '{path}' (cursor: {changes.cursor})" +
+                                      (f"\n⚠️ {changes.note}" if changes.note else ""),
+                                note=note, details=details)
+
+        except ValueError as e:
+            return f"❌ {e}"
+        except Exception as e:
+            return f"❌ Error watching folder: {e}"
+
     def _create_file(self, path: str, content: str = "") -> str:
         """Create a new file with optional content."""
         try:
@@ -389,7 +929,7 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
             self._ensure_directory(path)
 
             # Check if file already exists
-            if os.path.exists(path):
+            if self._exists(path):
                 return f"⚠️ File already exists: {path}. Use 'write_file' to overwrite or 'update_file' to modify."
 
             with open(path, "w", encoding='utf-8') as f:
@@ -405,8 +945,8 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         try:
             path = self._validate_path(path, "create folder")
 
-            if os.path.exists(path):
-                if os.path.isdir(path):
+            if self._exists(path):
+                if self._isdir(path):
                     return f"⚠️ Directory already exists: {path}"
                 else:
                     return f"❌ Path exists as file, cannot create directory: {path}"
@@ -425,9 +965,9 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
             # Create directory structure if needed
             self._ensure_directory(path)
 
-            action = "Updated" if os.path.exists(path) else "Created"
+            action = "Updated" if self._exists(path) else "Created"
 
-            with open(path, "w", encoding='utf-8') as f:
+            with locked_open(path, "w") as f:
                 f.write(content)
 
             return f"✅ {action} file: {path} ({len(content)} characters)"
@@ -440,24 +980,26 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         try:
             path = self._validate_path(path, "update file")
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ File not found: {path}. Use 'create_file' first."
 
             if mode == "replace":
-                with open(path, "w", encoding='utf-8') as f:
+                with locked_open(path, "w") as f:
                     f.write(content)
                 return f"✅ Replaced content in: {path}"
 
             elif mode == "append":
-                with open(path, "a", encoding='utf-8') as f:
+                with locked_open(path, "a") as f:
                     f.write(content)
                 return f"✅ Appended to: {path}"
 
             elif mode == "prepend":
-                with open(path, "r", encoding='utf-8') as f:
+                # Read and rewrite under one exclusive lock so concurrent appends are not lost
+                with locked_open(path, "r+") as f:
                     existing_content = f.read()
-                with open(path, "w", encoding='utf-8') as f:
+                    f.seek(0)
                     f.write(content + existing_content)
+                    f.truncate()
                 return f"✅ Prepended to: {path}"
             else:
                 return f"❌ Invalid mode: {mode}. Use 'append', 'prepend', or 'replace'"
@@ -465,6 +1007,51 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         except Exception as e:
             return f"❌ Error updating file: {e}"
 
+    def _patch_file(self, path: str, diff: Optional[str] = None, start_line: Optional[int] = None,
+                    end_line: Optional[int] = None, content: str = "") -> str:
+        """Apply a unified diff or a line-range replacement by streaming through a temp file."""
+        try:
+            path = self._validate_path(path, "patch file")
+
+            if not self._isfile(path):
+                return f"❌ File not found: {path}"
+
+            if diff:
+                result = patching.apply_unified_diff(path, diff)
+            elif start_line is not None:
+                start = int(start_line)
+                end = int(end_line) if end_line is not None else start
+                result = patching.replace_lines(path, start, end, content)
+            else:
+                return "❌ Provide 'diff' (unified diff) or 'start_line'/'end_line' with 'content'"
+
+            return f"✅ Patched {path}: {result.hunks} hunk(s), +{result.added} -{result.removed} lines"
+
+        except patching.PatchError as e:
+            return f"❌ Patch does not apply to {path}: {e}"
+        except Exception as e:
+            return f"❌ Error patching file: {e}"
+
+    def _diff_files(self, path: str, other_path: str, context: int = 3) -> str:
+        """Show the differences between two files with bounded memory."""
+        try:
+            path = self._validate_path(path, "diff")
+            other_path = self._validate_path(other_path, "diff")
+
+            for p in (path, other_path):
+                if not self._isfile(p):
+                    return f"❌ File not found: {p}"
+
+            diff, truncated = patching.stream_diff(path, other_path, context=int(context))
+            if not diff:
+                return f"✅ Files are identical: {path} and {other_path}"
+            if truncated:
+                diff += "... diff truncated, narrow it with 'read' offsets or compare smaller files\n"
+            return f"🔀 Differences between '{path}' and '{other_path}':\n{diff.rstrip(chr(10))}"
+
+        except Exception as e:
+            return f"❌ Error comparing files: {e}"
+
     def _query_file(self, path: str, query: str) -> str:
         """Search for text in file."""
         try:
@@ -473,44 +1060,90 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
             if not query:
                 return "❌ Query text required"
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ File not found: {path}"
 
-            if os.path.isdir(path):
+            if self._isdir(path):
                 return f"❌ Cannot query directory: {path}"
 
-            with open(path, "r", encoding='utf-8') as f:
-                content = f.read()
-
-            if query.lower() in content.lower():
-                lines = content.split('\n')
-                matches = []
-                for i, line in enumerate(lines, 1):
-                    if query.lower() in line.lower():
-                        matches.append(f"Line {i}: {line.strip()}")
-
-                result = f"🔍 Found '{query}' in {path}:\n" + \
-                    "\n".join(matches[:10])
-                if len(matches) > 10:
-                    result += f"\n... and {len(matches) - 10} more matches"
+            kind = compressed.detect(path)
+            if kind:
+                # Decompress in chunks and stop at the first 10 matches
+                matches, more = compressed.search(path, query, 10, kind)
+                if not matches:
+                    return f"🔍 '{query}' not found in {path}"
+                result = f"🔍 Found '{query}' in {path} ({kind}-compressed):\n" + \
+                    "\n".join(f"Line {m.line_number}: {m.line}" for m in matches)
+                if more:
+                    result += "\n... and more matches"
                 return result
+
+            info = binary_view.sniff(path)
+            encoding = info.encoding or "utf-8"
+            matches = []
+            if encoding.startswith(("utf-16", "utf-32")):
+                # Newlines are several bytes wide in these encodings, so search the decoded stream
+                total = 0
+                with locked_open(path, "r", encoding) as f:
+                    for i, line in enumerate(f, 1):
+                        if query.lower() in line.lower():
+                            total += 1
+                            if len(matches) < 10:
+                                matches.append(f"Line {i}: {line.strip()}")
             else:
+                # Search the mapped bytes; only matching lines are decoded
+                binary = info.binary or query.lower().startswith("hex:")
+                regex = binary_view.compile_query(query, encoding)
+                found, total = binary_view.search(path, regex, 10, lines=not binary)
+                for m in found:
+                    if binary:
+                        matches.append(f"Offset {m.offset} (0x{m.offset:x}): {m.line.hex(' ')}")
+                    else:
+                        matches.append(f"Line {m.line_number}: {m.line.decode(encoding, errors='replace').strip()}")
+
+            if not matches:
                 return f"🔍 '{query}' not found in {path}"
+            result = f"🔍 Found '{query}' in {path}:\n" + "\n".join(matches)
+            if total > 10:
+                result += f"\n... and {total - 10} more matches"
+            return result
 
-        except UnicodeDecodeError:
-            return f"❌ Cannot search binary file: {path}"
         except Exception as e:
             return f"❌ Error querying file: {e}"
 
+    def _grep_tree(self, query: str, path: str = ".", max_matches: int = 50) -> Union[str, output.Table]:
+        """Search all text and compressed files under a folder."""
+        try:
+            path = self._validate_path(path, "grep tree")
+
+            if not query:
+                return "❌ Query text required"
+
+            if not self._isdir(path):
+                return f"❌ Folder not found: {path}"
+
+            matches, searched, more = compressed.grep_tree(path, query, int(max_matches))
+            if not matches:
+                return f"🔍 '{query}' not found in {searched} files under {path}"
+
+            note = f"... stopped after {len(matches)} matches, narrow the query or the folder" if more else ""
+            return output.Table(("file", "line", "text"),
+                                ((os.path.relpath(file, path), m.line_number, m.line) for file, m in matches),
+                                f"🔍 Found '{query}' under {path}:", lambda row: f"{row[0]}:{row[1]}: {row[2]}",
+                                note=note, details={"path": path, "files_searched": searched})
+
+        except Exception as e:
+            return f"❌ Error searching folder: {e}"
+
     def _delete_file(self, path: str) -> str:
         """Delete a file."""
         try:
             path = self._validate_path(path, "delete file")
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ File not found: {path}"
 
-            if os.path.isdir(path):
+            if self._isdir(path):
                 return f"❌ Cannot delete directory as file: {path}. Use 'delete_folder'"
 
             os.remove(path)
@@ -519,20 +1152,37 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         except Exception as e:
             return f"❌ Error deleting file: {e}"
 
-    def _delete_folder(self, path: str, recursive: bool = False) -> str:
-        """Delete a directory."""
+    def _delete_folder(self, path: str, recursive: bool = False, background: bool = False) -> str:
+        """Delete a directory (recursively on a thread pool, or in the background via a trash rename)."""
         try:
             path = self._validate_path(path, "delete folder")
 
-            if not os.path.exists(path):
+            if not self._exists(path):
                 return f"❌ Directory not found: {path}"
 
-            if not os.path.isdir(path):
+            if not self._isdir(path):
                 return f"❌ Path is not a directory: {path}. Use 'delete_file'"
 
+            if recursive and background:
+                progress = delete_engine.trash_and_reap(path, on_progress=self._log_delete_progress)
+                self._background_deletes.append(progress)
+                return f"✅ Moved {path} to trash; contents are being deleted in the background (see 'delete_status')"
+
+            # With the journal on, the folder is renamed into it (instant) and can be undone;
+            # its space is reclaimed when the entry leaves the journal, so background deletes
+            # and trees over FILE_AGENT_JOURNAL_MAX_TREE entries go to the delete engine
+            workspace_journal = self._journal([path])
+            if (workspace_journal is not None and (recursive or not os.listdir(path))
+                    and workspace_journal.remove_tree(path)):
+                return f"✅ Deleted directory: {path} (use 'undo' to restore it)"
+
             if recursive:
-                shutil.rmtree(path)
-                return f"✅ Deleted directory and contents: {path}"
+                progress = delete_engine.rmtree(path, on_progress=self._log_delete_progress)
+                if progress.errors:
+                    return (f"⚠️ Deleted {progress.files_deleted} files and {progress.dirs_deleted} directories "
+                            f"from {path}, {len(progress.errors)} failed:\n" + "\n".join(progress.errors[:10]))
+                return (f"✅ Deleted directory and contents: {path} ({progress.files_deleted} files, "
+                        f"{progress.dirs_deleted} directories in {progress.seconds:.2f}s)")
             else:
                 try:
                     os.rmdir(path)
@@ -543,45 +1193,295 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
         except Exception as e:
             return f"❌ Error deleting directory: {e}"
 
+    def _log_delete_progress(self, progress: "delete_engine.DeleteProgress") -> None:
+        """Stream delete progress to the log and the metrics registry."""
+        logger.info("Deleting %s: %d files, %d directories so far",
+                    progress.path, progress.files_deleted, progress.dirs_deleted)
+        if progress.done:
+            get_registry().inc("file_tool_deleted_entries_total", progress.files_deleted + progress.dirs_deleted,
+                               help="Files and directories removed by delete_folder")
+
+    def _delete_status(self) -> Union[str, output.Table]:
+        """Report progress of background deletes started by this tool."""
+        if not self._background_deletes:
+            return "📭 No background deletes"
+
+        rows = [(p.path, "done" if p.done else "running", p.files_deleted, p.dirs_deleted, round(p.seconds, 1),
+                 len(p.errors)) for p in self._background_deletes]
+        # Forget finished jobs once they have been reported
+        self._background_deletes = [p for p in self._background_deletes if not p.done]
+
+        def line(row):
+            text = f"🗑️ {row[0]}: {row[1]}, {row[2]} files, {row[3]} directories, {row[4]:.1f}s"
+            return text + (f", {row[5]} errors" if row[5] else "")
+
+        # The text form has no title line, just one line per delete
+        return output.Table(("path", "state", "files", "directories", "seconds", "errors"), rows, "", line,
+                            text=lambda: "\n".join(line(row) for row in rows))
+
+    def _hash_file(self, path: str, algorithm: str = "blake2b") -> str:
+        """Return the content hash of a file."""
+        try:
+            path = self._validate_path(path, "hash file")
+
+            if not self._isfile(path):
+                return f"❌ File not found: {path}"
+
+            if algorithm not in ALGORITHMS:
+                return f"❌ Unsupported algorithm: {algorithm}. Use one of: {', '.join(ALGORITHMS)}"
+
+            digest = self._hasher.hash_file(path, algorithm)
+            self._hasher.cache.checkpoint()
+            return f"🔑 {algorithm}:{digest}  {path} ({format_size(os.path.getsize(path))})"
+
+        except Exception as e:
+            return f"❌ Error hashing file: {e}"
+
+    def _find_duplicates(self, path: str, min_size: int = 1) -> Union[str, output.Table]:
+        """Find groups of files with identical content under a directory."""
+        try:
+            path = self._validate_path(path, "find duplicates")
+
+            if not self._isdir(path):
+                return f"❌ Directory not found: {path}"
+
+            groups = self._hasher.find_duplicates(path, min_size=int(min_size))
+            if not groups:
+                return f"✅ No duplicate files found under '{path}'"
+
+            wasted = sum(size * (len(paths) - 1) for size, _, paths in groups)
+
+            def rows():
+                # One row per copy; only a group's first row carries its digest, size and count
+                for size, digest, paths in groups[:20]:
+                    yield digest[:12], size, len(paths), paths[0]
+                    for p in paths[1:]:
+                        yield None, None, None, p
+
+            def line(row):
+                digest, size, count, p = row
+                if digest is None:
+                    return f"   {p}"
+                return f"{format_size(size)} × {count}  [{digest}]\n   {p}"
+
+            return output.Table(("digest", "size", "copies", "path"), rows(),
+                                f"🔁 {len(groups)} groups of duplicates under '{path}' "
+                                f"({format_size(wasted)} reclaimable):", line,
+                                note=f"... and {len(groups) - 20} more groups" if len(groups) > 20 else "",
+                                details={"path": path, "groups": len(groups), "reclaimable_bytes": wasted})
+
+        except Exception as e:
+            return f"❌ Error finding duplicates: {e}"
+
+    def _semantic_search(self, query: str, path: str = ".", k: int = 5) -> Union[str, output.Table]:
+        """Find the passages most related to a query across the files under a directory."""
+        try:
+            if not query:
+                return "❌ Query text required"
+
+            path = self._validate_path(path, "semantic search")
+            if not self._isdir(path):
+                return f"❌ Directory not found: {path}"
+
+            try:
+                from semantic_index import SemanticIndex
+            except ImportError:
+                return "❌ semantic_search requires numpy (pip install numpy)"
+
+            root = os.path.abspath(path)
+            index = self._semantic_indexes.get(root)
+            if index is None:
+                index = self._semantic_indexes[root] = SemanticIndex(root)
+            embedded, removed = index.refresh()
+            if embedded or removed:
+                logger.info("Semantic index of %s: %d files embedded, %d removed", root, embedded, removed)
+
+            hits = index.search(query, int(k))
+            if not hits:
+                return f"🔍 No indexed text files under '{path}'"
+
+            return output.Table(("score", "path", "start_line", "end_line", "snippet"),
+                                ((round(hit.score, 4), os.path.join(path, hit.path), hit.start_line, hit.end_line,
+                                  hit.snippet) for hit in hits),
+                                f"🔍 Top {len(hits)} passages for '{query}' under '{path}':",
+                                lambda row: f"{row[0]:.2f}  {row[1]} lines {row[2]}-{row[3]}: {row[4]}",
+                                note="Use 'read' with 'offset'/'length' or 'query_file' to see more.")
+
+        except Exception as e:
+            return f"❌ Error in semantic search: {e}"
+
+    def _query_data(self, path: str, select=None, where: Optional[str] = None, group_by=None,
+                    order_by: Optional[str] = None, limit: int = 20) -> Union[str, output.Table]:
+        """Filter, project and aggregate a CSV/TSV/JSONL file without reading it into the conversation."""
+        try:
+            path = self._validate_path(path, "query data")
+
+            if not self._isfile(path):
+                return f"❌ File not found: {path}"
+
+            try:
+                import data_query
+            except ImportError:
+                return "❌ query_data requires numpy (pip install numpy)"
+
+            result = data_query.query(path, select, where, group_by, order_by, int(limit))
+            matched = result.rows_matched if result.scan_complete else f"at least {result.rows_matched}"
+            header = f"📊 Query on '{path}' (scanned {result.rows_scanned} rows, {matched} matched):"
+            if not result.rows:
+                return f"{header}\nNo matching rows"
+            footer = ""
+            if result.truncated:
+                footer = f"\n... showing the first {len(result.rows)} result rows, raise 'limit' or aggregate to see more"
+            # The text form aligns columns, so it needs all rows; the compact forms stream them
+            return output.Table(result.columns, result.rows, header, str, note=footer.lstrip("\n"),
+                                details={"rows_scanned": result.rows_scanned, "rows_matched": result.rows_matched},
+                                text=lambda: f"{header}\n{data_query.format_table(result)}{footer}")
+
+        except ValueError as e:
+            # Includes ExpressionError: bad column names or unsupported syntax
+            return f"❌ {e}"
+        except Exception as e:
+            return f"❌ Error querying data: {e}"
+
     def _copy_file(self, source: str, destination: str) -> str:
         """Copy a file."""
         try:
             if not source or not destination:
                 return "❌ Both source and destination required"
 
-            if not os.path.exists(source):
+            if not self._exists(source):
                 return f"❌ Source file not found: {source}"
 
-            if os.path.isdir(source):
-                return f"❌ Cannot copy directory as file: {source}"
+            if self._isdir(source):
+                return f"❌ Cannot copy directory as file: {source}. Use 'copy_tree'"
+
+            # Like shutil.copy2, copying into an existing directory keeps the file name
+            target = _copy_target(source, destination)
 
             # Create destination directory if needed
-            self._ensure_directory(destination)
+            self._ensure_directory(target)
 
-            shutil.copy2(source, destination)
-            return f"✅ Copied {source} → {destination}"
+            result = copy_file(source, target)
+            return (f"✅ Copied {source} → {destination} ({format_size(result.bytes_copied)} via {result.method}, "
+                    f"{result.throughput_mib_s:.1f} MiB/s)")
 
         except Exception as e:
             return f"❌ Error copying file: {e}"
 
+    def _copy_tree(self, source: str, destination: str, workers: Optional[int] = None, resume: bool = False) -> str:
+        """Copy a directory tree in parallel, optionally resuming an interrupted copy."""
+        try:
+            if not source or not destination:
+                return "❌ Both source and destination required"
+
+            if not self._isdir(source):
+                return f"❌ Source directory not found: {source}"
+
+            result = copy_tree(source, destination, workers=workers, resume=bool(resume))
+            message = (f"✅ Copied tree {source} → {destination}: {result.files_copied} files, "
+                       f"{format_size(result.bytes_copied)} in {result.seconds:.2f}s "
+                       f"({result.throughput_mib_s:.1f} MiB/s)")
+            if result.files_skipped:
+                message += f", {result.files_skipped} already complete"
+            if result.errors:
+                message += f"\n⚠️ {len(result.errors)} files failed:\n" + "\n".join(result.errors[:10])
+            return message
+
+        except FileExistsError as e:
+            return f"❌ {e}"
+        except Exception as e:
+            return f"❌ Error copying directory: {e}"
+
     def _move_file(self, source: str, destination: str) -> str:
         """Move/rename a file."""
         try:
             if not source or not destination:
                 return "❌ Both source and destination required"
 
-            if not os.path.exists(source):
+            if not self._exists(source):
                 return f"❌ Source not found: {source}"
 
             # Create destination directory if needed
             self._ensure_directory(destination)
 
-            shutil.move(source, destination)
+            workspace_journal = self._journal([source, _copy_target(source, destination)])
+            if workspace_journal is not None:
+                workspace_journal.move(source, destination)
+            else:
+                shutil.move(source, destination)
             return f"✅ Moved {source} → {destination}"
 
         except Exception as e:
             return f"❌ Error moving file: {e}"
 
+    def _undo(self, steps: int = 1) -> str:
+        """Revert the last ``steps`` journaled actions."""
+        workspace_journal = self._journal([])
+        if workspace_journal is None:
+            return "❌ The undo journal is off (FILE_AGENT_JOURNAL=0)"
+        try:
+            undone = workspace_journal.undo(int(steps))
+        except journal.JournalError as e:
+            return "\n".join([f"✅ Undid: {summary}" for summary in e.done] + [f"⚠️ {e}"])
+        except Exception as e:
+            return f"❌ Error undoing: {e}"
+        if not undone:
+            return "📭 Nothing to undo"
+        return "\n".join(f"✅ Undid: {summary}" for summary in undone)
+
+    def _redo(self, steps: int = 1) -> str:
+        """Reapply the next ``steps`` undone actions."""
+        workspace_journal = self._journal([])
+        if workspace_journal is None:
+            return "❌ The undo journal is off (FILE_AGENT_JOURNAL=0)"
+        try:
+            redone = workspace_journal.redo(int(steps))
+        except journal.JournalError as e:
+            return "\n".join([f"✅ Redid: {summary}" for summary in e.done] + [f"⚠️ {e}"])
+        except Exception as e:
+            return f"❌ Error redoing: {e}"
+        if not redone:
+            return "📭 Nothing to redo"
+        return "\n".join(f"✅ Redid: {summary}" for summary in redone)
+
+    def _history(self) -> Union[str, output.Table]:
+        """List recent journaled actions, newest first."""
+        workspace_journal = self._journal([])
+        if workspace_journal is None:
+            return "❌ The undo journal is off (FILE_AGENT_JOURNAL=0)"
+        entries = workspace_journal.history()
+        if not entries:
+            return "📭 No recorded changes"
+        return output.Table(("time", "summary", "undone"),
+                            ((time.strftime("%H:%M:%S", time.localtime(entry["time"])), entry["summary"], entry["undone"])
+                             for entry in entries),
+                            "🕘 Recent changes (newest first):",
+                            lambda row: f"  {row[0]} {row[1]}" + (" (undone)" if row[2] else ""))
+
+    def _batch(self, actions: Any, fmt: str) -> str:
+        """Run several actions in order and return all their results in one response."""
+        if not isinstance(actions, list) or not actions:
+            return output.render("❌ 'actions' must be a non-empty list of action objects", fmt)
+
+        def chunks():
+            for step, data in enumerate(actions, 1):
+                valid = isinstance(data, dict) and data.get("action") not in (None, "batch")
+                name = data.get("action", "unknown") if isinstance(data, dict) else "unknown"
+                separator = "" if step == 1 else "\n\n" if fmt == "text" else "\n"
+                if fmt == "text":
+                    yield f"{separator}[{step}] {name}\n"
+                elif fmt == "tsv":
+                    yield f"{separator}# {step} {name}\n"
+                else:
+                    yield separator  # the step and action are in each status object
+                extra = {"step": step, "action": name}
+                if not valid:
+                    yield output.render("❌ Each step needs an 'action' (batches do not nest)", fmt, extra)
+                else:
+                    yield self._perform(dict(data), fmt, extra)
+
+        return "".join(chunks())
+
     def _get_help(self) -> str:
         """Return help information."""
         return """🔧 File System Agent Commands:
@@ -589,25 +1489,53 @@ Example: {"action": "create_file", "path": "example.txt", "content": "Hello Worl
 📁 DIRECTORY OPERATIONS:
   • create_folder - Create directory
   • list - List directory contents
-  • delete_folder - Delete directory
+  • delete_folder - Delete directory (recursive, optionally in the background)
+  • delete_status - Progress of background deletes
 
 📄 FILE OPERATIONS:  
   • create_file - Create new file
   • write_file - Write to file (overwrite)
-  • read - Read file contents
+  • read - Read file contents (any text encoding; binary files as hex or base64 windows)
+  • tail - Last lines of a file (cheap on huge logs)
+  • follow - Only the lines appended since the last tail/follow cursor
+  • watch - Files created/modified/deleted/moved under a folder since the last watch cursor
   • update_file - Modify file (append/prepend/replace)
-  • query_file - Search in file
+  • patch - Apply a unified diff or replace a line range
+  • diff - Compare two files
+  • query_file - Search in file (gzip/xz/bzip2/zstd files are searched without unpacking)
   • delete_file - Delete file
   • copy_file - Copy file
   • move_file - Move/rename file
+  • semantic_search - Find related passages across many files
+  • query_data - Filter/sum/count/group CSV and JSONL files (answers computed, not read)
+  • hash_file - Checksum a file (blake2b, sha256, xxh3)
+  • find_duplicates - Find identical files under a folder
+
+↩️ UNDO:
+  • undo - Revert the last file change (optional "steps")
+  • redo - Reapply an undone change
+  • history - Recent changes that can be undone
+
+📂 TREE OPERATIONS:
+  • copy_tree - Copy a directory tree (parallel, resumable)
+  • grep_tree - Search text in every file under a folder, compressed logs included
 
 🔧 UTILITY:
   • create_test - Create test directory/file
+  • batch - Run several actions in one call ("actions": [...])
+  Any action takes "output": "json" or "tsv" for compact, machine-readable results
 
 📝 JSON EXAMPLES:
   {"action": "create_file", "path": "readme.txt", "content": "Hello"}
   {"action": "create_folder", "path": "documents"}
   {"action": "copy_file", "source": "file1.txt", "destination": "backup/file1.txt"}
+  {"action": "copy_tree", "source": "documents", "destination": "backup/documents", "resume": true}
+  {"action": "patch", "path": "app.py", "start_line": 12, "end_line": 12, "content": "x = 2"}
+  {"action": "grep_tree", "path": "logs", "query": "timeout"}
+  {"action": "watch", "path": "inbox", "cursor": "3f2a9c1e:42", "timeout": 30}
+  {"action": "read", "path": "image.png", "format": "hex", "offset": 0, "length": 256}
+  {"action": "query_data", "path": "sales.csv", "select": ["region", "sum(price * qty) as revenue"], "where": "qty > 10", "group_by": ["region"]}
+  {"action": "batch", "output": "tsv", "actions": [{"action": "list", "path": "logs"}, {"action": "tail", "path": "logs/app.log"}]}
   
 💬 NATURAL LANGUAGE:
   "create file called example.txt"
@@ -623,26 +1551,122 @@ Type 'exit' to quit."""
     async def _arun(self, query: str) -> str:
         raise NotImplementedError("This tool does not support async")
 
+    def as_langchain_tool(self) -> "Tool":
+        """Wrap this tool for a LangChain agent (imports LangChain on first use)."""
+        from langchain_core.tools import Tool
+
+        return Tool(name=self.name, description=self.description, func=self._run)
+
+    def as_structured_tool(self) -> "StructuredTool":
+        """Wrap this tool with a typed JSON schema for tool-calling agents.
+
+        The model fills in named, typed fields instead of writing a JSON string
+        (or free text for _parse_natural_language), so arguments arrive
+        validated and go straight to _execute_action.
+        """
+        from typing import Literal
+
+        from langchain_core.pydantic_v1 import Field, create_model
+        from langchain_core.tools import StructuredTool
+
+        fields = {name: (Optional[kind], Field(None, description=text)) for name, (kind, text) in ACTION_FIELDS.items()}
+        schema = create_model("FileExplorerInput",
+                              action=(Literal[self.ACTIONS], Field(..., description="Operation to perform")),
+                              **fields)
+
+        def run(**kwargs) -> str:
+            try:
+                return self._execute_action({key: value for key, value in kwargs.items() if value is not None})
+            except Exception as e:
+                return f"Error in file explorer tool: {e}"
+
+        return StructuredTool.from_function(func=run, name=self.name, description=self.description,
+                                            args_schema=schema)
+
 
 class FilesAgent:
     """Main agent class for file operations."""
 
-    def __init__(self):
-        self.llm = self._initialize_llm()
+    def __init__(self, llm=None, mode: Optional[str] = None, router=None):
+        self._llm = llm
         self.tools = [FileExplorerTool()]
-
-    def _initialize_llm(self) -> ChatOpenAI:
+        # "tools" (native tool calling), "react" (text-parsed ReAct) or "direct"
+        # (no model: JSON or rule-based parsing of the input by the tool itself)
+        self.mode = mode or os.getenv("AGENT_MODE", "tools")
+        # System prompt and tool description stay byte-identical across calls
+        # (provider prompt caching); action details ride along with the user turn
+        self.prompts = PromptAssembler(FILES_SYSTEM_PROMPT, FILE_ACTIONS)
+        self._agent = None
+        self._callbacks = None
+        # Single-action requests go to a small model, multi-step ones to gpt-4
+        # (see agent_common/routing.py; AGENT_ROUTER=0 turns routing off)
+        if router is None and llm is None:
+            from agent_common.routing import ModelRouter
+
+            router = ModelRouter.from_env("files", small="gpt-4.1-mini", large="gpt-4",
+                                          factory=self._initialize_llm)
+        self.router = router
+        self._routed_agents = {}
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """Language model, created on first access."""
+        if self._llm is None:
+            self._llm = self._initialize_llm()
+        return self._llm
+
+    def _initialize_llm(self, model: str = "gpt-4") -> "ChatOpenAI":
         """Initialize the language model."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
 
-        return ChatOpenAI(
-            model="gpt-4",
+        from agent_common.http_clients import make_chat_model
+
+        return make_chat_model(
+            model=model,
             temperature=0.1,
-            openai_api_key=api_key
+            openai_api_key=api_key,
         )
 
+    @property
+    def agent(self):
+        """Agent executor over the file tool, created on first access."""
+        if self._agent is None:
+            self._agent = self._build_agent(self.llm)
+        return self._agent
+
+    def _build_agent(self, llm):
+        from agent_common.tool_calling import build_executor
+
+        tool = self.tools[0]
+        # ReAct needs a single-input tool; tool calling gets the typed schema
+        lc_tool = tool.as_langchain_tool() if self.mode == "react" else tool.as_structured_tool()
+        return build_executor(llm, [lc_tool], verbose=False, mode=self.mode,
+                              system_prompt=self.prompts.system_prompt)
+
+    def _routed_agent(self, route: str):
+        """Agent executor on the router's model for ``route``."""
+        if route not in self._routed_agents:
+            self._routed_agents[route] = self._build_agent(self.router.llm(route))
+        return self._routed_agents[route]
+
+    def _ask_agent(self, user_input: str) -> str:
+        turn = {"input": self.prompts.user_turn(user_input)}
+        if self.router is None:
+            return self.agent.invoke(turn, config={"callbacks": self.callbacks}).get("output", "No response generated")
+        return self.router.run(user_input, lambda route, callbacks: self._routed_agent(route).invoke(
+            turn, config={"callbacks": self.callbacks + callbacks})["output"], repeatable=_repeatable_call).output
+
+    @property
+    def callbacks(self) -> list:
+        """Callback handlers passed on each run; they record per-step latency and tokens."""
+        if self._callbacks is None:
+            from agent_common.instrumentation import make_callback_handler
+
+            self._callbacks = [make_callback_handler("files")]
+        return self._callbacks
+
     def help(self):
         """Display available commands and their usage."""
         help_text = """
@@ -652,9 +1676,11 @@ class FilesAgent:
 - create file [name] - Create a new file
 - write to [file] [content] - Write content to a file
 - read [file] - Read file contents
+- tail [file] - Show the last lines of a file
 - update [file] [content] - Update file contents
 - delete file [name] - Delete a file
 - copy [source] to [destination] - Copy a file
+- copy folder [source] to [destination] - Copy a folder and its contents
 - move [source] to [destination] - Move/rename a file
 
 📁 FOLDER OPERATIONS:
@@ -669,6 +1695,9 @@ class FilesAgent:
 🔧 SPECIAL COMMANDS:
 - create test - Create test directory and file
 - help - Display this help message
+- metrics - Show tool latency metrics (Prometheus format)
+- undo / redo - Revert or reapply the last file change
+- history - Recent file changes
 - exit - Quit the program
 
 📝 EXAMPLES:
@@ -691,14 +1720,28 @@ class FilesAgent:
     def _get_response(self, user_input: str) -> str:
         """Process user input and return response."""
         try:
-            print(f"DEBUG: Processing input: {repr(user_input)}")
+            logger.debug("Processing input: %r", user_input)
 
             # Handle help command
             if user_input.lower() in ["help", "commands", "?", "what can you do"]:
                 return self.help()
 
-            # Use the tool directly for all processing
-            return self.tools[0]._run(user_input)
+            # Latency histograms and counters in Prometheus text format
+            if user_input.lower() == "metrics":
+                return get_registry().render_prometheus()
+
+            # JSON commands need no model; free text goes to the agent, which picks the action
+            if self.mode == "direct" or user_input.lstrip().startswith("{"):
+                return self.tools[0]._run(user_input)
+            try:
+                # Creating the model fails early without an API key
+                self.router.llm("large") if self.router is not None else self.llm
+            except ValueError as e:
+                # No API key: fall back to the tool's rule-based parsing of the input
+                logger.warning("%s; falling back to direct mode", e)
+                self.mode = "direct"
+                return self.tools[0]._run(user_input)
+            return self._ask_agent(user_input)
 
         except Exception as e:
             return f"❌ Error processing request: {str(e)}"
@@ -745,9 +1788,13 @@ class FilesAgent:
 
 def main():
     """Main function to run the file system agent."""
+    # Set AGENT_LOG_LEVEL=DEBUG to see how each request is parsed
+    logging.basicConfig(level=os.getenv("AGENT_LOG_LEVEL", "WARNING"))
+    from agent_common.daemon import run_cli
+
     try:
-        agent = FilesAgent()
-        agent.run()
+        # python files_agent.py [--daemon] '{"action": "list"}' answers once and exits
+        run_cli("files", lambda question: FilesAgent()._get_response(question), lambda: FilesAgent().run())
     except Exception as e:
         print(f"❌ Failed to initialize agent: {e}")
         print("💡 Please check your OpenAI API key and dependencies.")
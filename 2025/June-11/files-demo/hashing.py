@@ -0,0 +1,246 @@
+"""Content hashing and duplicate detection for FileExplorerTool.
+
+Files are hashed through ``mmap`` in large zero-copy slices; ``hashlib``
+releases the GIL on big updates, so a thread pool hashes on all cores.
+Digests are cached by file identity ``(device, inode, mtime_ns, size)`` and
+persisted between runs (the most recently used ``FILE_AGENT_HASH_CACHE_SIZE``
+of them), so repeat runs over large trees only hash what changed.
+
+``find_duplicates`` narrows candidates cheaply before reading whole files:
+files are grouped by size, then by a hash of their first and last block, and
+only the remaining candidates get a full hash.
+
+BLAKE2b (standard library) is the default; xxHash (``pip install xxhash``)
+is used for ``algorithm="xxh3"`` when installed.
+"""
+
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+CHUNK_SIZE = 8 * 1024 * 1024
+PARTIAL_BLOCK = 64 * 1024  # bytes hashed from each end of a file in the partial pass
+
+# Digests kept in the persistent cache (least recently used are dropped first)
+CACHE_ENTRIES = int(os.getenv("FILE_AGENT_HASH_CACHE_SIZE", "100000"))
+SAVE_BATCH = 256  # new digests that trigger a save from checkpoint()
+SAVE_INTERVAL = 30.0  # seconds after which checkpoint() saves any new digest
+
+ALGORITHMS = ["blake2b", "sha256"] + (["xxh3"] if xxhash is not None else [])
+
+# The undo journal keeps old versions of workspace files; they are not duplicates
+SKIP_DIRS = {".file_agent_journal"}
+
+FileKey = Tuple[int, int, int, int]
+
+
+def file_key(st: os.stat_result) -> FileKey:
+    """Identity of a file's current content: changes whenever the file is modified."""
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _new_hasher(algorithm: str):
+    if algorithm == "xxh3":
+        if xxhash is None:
+            raise ValueError("xxh3 requires the 'xxhash' package")
+        return xxhash.xxh3_128()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algorithm in hashlib.algorithms_available:
+        return hashlib.new(algorithm)
+    raise ValueError(f"Unsupported algorithm: {algorithm}. Use one of {', '.join(ALGORITHMS)}")
+
+
+def _digest(path: str, size: int, algorithm: str, partial: bool) -> str:
+    hasher = _new_hasher(algorithm)
+    if size == 0:
+        return hasher.hexdigest()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            if partial and size > 2 * PARTIAL_BLOCK:
+                hasher.update(view[:PARTIAL_BLOCK])
+                hasher.update(view[size - PARTIAL_BLOCK:])
+            else:
+                for offset in range(0, size, CHUNK_SIZE):
+                    hasher.update(view[offset:offset + CHUNK_SIZE])
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """Digest cache keyed by file identity, persisted as JSON.
+
+    Holds at most ``max_entries`` digests and evicts the least recently used
+    first; the JSON file keeps that order, so it survives restarts. Changes
+    are written by ``save()`` (once per ``find_duplicates``), by
+    ``checkpoint()`` once ``SAVE_BATCH`` digests are pending or ``SAVE_INTERVAL``
+    seconds have passed, and at exit. Each write goes to a temp file of its
+    own and replaces the cache atomically, so processes sharing the cache
+    never mix their writes (the last one wins).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        self.path = Path(path or os.getenv("FILE_AGENT_HASH_CACHE") or
+                         os.path.join(cache_home, "files-agent", "hashes.json"))
+        self.max_entries = max_entries or CACHE_ENTRIES
+        self._entries: Optional["OrderedDict[str, str]"] = None
+        self._pending = 0
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.save)
+
+    def _load(self) -> "OrderedDict[str, str]":
+        if self._entries is None:
+            try:
+                self._entries = OrderedDict(json.loads(self.path.read_text()))
+            except (OSError, ValueError):
+                self._entries = OrderedDict()
+            self._evict()
+        return self._entries
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    @staticmethod
+    def _key(key: FileKey, algorithm: str, partial: bool) -> str:
+        return f"{algorithm}{'/p' if partial else ''}:{key[0]}:{key[1]}:{key[2]}:{key[3]}"
+
+    def get(self, key: FileKey, algorithm: str, partial: bool) -> Optional[str]:
+        with self._lock:
+            entries = self._load()
+            name = self._key(key, algorithm, partial)
+            digest = entries.get(name)
+            if digest is not None:
+                entries.move_to_end(name)
+            return digest
+
+    def put(self, key: FileKey, algorithm: str, partial: bool, digest: str) -> None:
+        with self._lock:
+            entries = self._load()
+            name = self._key(key, algorithm, partial)
+            entries[name] = digest
+            entries.move_to_end(name)
+            self._evict()
+            self._pending += 1
+
+    def checkpoint(self) -> None:
+        """Save if enough digests are pending or the last save is old enough."""
+        with self._lock:
+            due = self._pending >= SAVE_BATCH or (
+                self._pending and time.monotonic() - self._saved_at >= SAVE_INTERVAL)
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed (atomically, via a temp file)."""
+        with self._lock:
+            if not self._pending:
+                return
+            data = json.dumps(self._entries)
+            self._pending = 0
+            self._saved_at = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            # A cache that cannot be written is only slower next time
+            with self._lock:
+                self._pending += 1
+
+
+class Hasher:
+    """Hashes files with caching; ``on_cache(hit)`` is called for every lookup."""
+
+    def __init__(self, cache: Optional[HashCache] = None, workers: Optional[int] = None, on_cache=None):
+        self.cache = cache or HashCache()
+        self.workers = workers or os.cpu_count() or 1
+        self.on_cache = on_cache
+
+    def hash_file(self, path: str, algorithm: str = "blake2b", partial: bool = False,
+                  st: Optional[os.stat_result] = None) -> str:
+        st = st or os.stat(path)
+        if partial and st.st_size <= 2 * PARTIAL_BLOCK:
+            partial = False  # the partial hash would read the whole file anyway
+        key = file_key(st)
+        digest = self.cache.get(key, algorithm, partial)
+        if self.on_cache:
+            self.on_cache(digest is not None)
+        if digest is None:
+            digest = _digest(path, st.st_size, algorithm, partial)
+            self.cache.put(key, algorithm, partial, digest)
+        return digest
+
+    def _hash_many(self, files: List[Tuple[str, os.stat_result]], algorithm: str, partial: bool) -> List[str]:
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(lambda item: self.hash_file(item[0], algorithm, partial, item[1]), files))
+
+    def find_duplicates(self, root: str, algorithm: str = "blake2b", min_size: int = 1) -> List[Tuple[int, str, List[str]]]:
+        """Return ``(size, digest, paths)`` for every group of identical files under ``root``.
+
+        Groups are sorted by wasted space (size x extra copies), largest first.
+        Hard links to the same inode count as one file.
+        """
+        by_size: Dict[int, List[Tuple[str, os.stat_result]]] = defaultdict(list)
+        seen_inodes = set()
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_size >= min_size and (st.st_dev, st.st_ino) not in seen_inodes:
+                                seen_inodes.add((st.st_dev, st.st_ino))
+                                by_size[st.st_size].append((entry.path, st))
+            except OSError:
+                continue
+
+        groups = []
+        # Only sizes shared by several files can hold duplicates
+        for group in (g for g in by_size.values() if len(g) > 1):
+            for candidates in self._split(group, algorithm, partial=True):
+                for digest, files in self._split_with_digest(candidates, algorithm, partial=False):
+                    groups.append((files[0][1].st_size, digest, sorted(path for path, _ in files)))
+
+        self.cache.save()
+        groups.sort(key=lambda g: g[0] * (len(g[2]) - 1), reverse=True)
+        return groups
+
+    def _split(self, files, algorithm, partial):
+        return [files for _, files in self._split_with_digest(files, algorithm, partial)]
+
+    def _split_with_digest(self, files, algorithm, partial):
+        buckets = defaultdict(list)
+        for item, digest in zip(files, self._hash_many(files, algorithm, partial)):
+            buckets[digest].append(item)
+        return [(digest, group) for digest, group in buckets.items() if len(group) > 1]
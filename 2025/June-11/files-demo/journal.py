@@ -0,0 +1,522 @@
+"""Undo/redo journal of the workspace changes made by FileExplorerTool.
+
+Before a mutating action runs, the journal snapshots what it is about to
+change, so the action can be undone (and the undo redone) later:
+
+* Files go into a content-addressed object store (``objects/<digest>``), so
+  identical versions are kept once. A file the action is about to unlink or
+  rename over (delete, move, patch) is hardlinked into the store, which takes
+  no time or space: the workspace name is gone right after, so nothing can
+  write through it into the snapshot. Anything else (write, update, copy onto
+  it, create) is copied with ``copy_engine.copy_file``: a reflink on
+  copy-on-write filesystems, a kernel copy elsewhere. When the action fails,
+  the hardlinks it took are dropped at once.
+* An action that writes through a symlink (write, update, patch, copy onto
+  it) changes its target, so the target is what gets snapshotted; only
+  delete and move act on the link itself.
+* A file that is only appended to keeps its old length; undo truncates it.
+* A deleted directory is renamed into ``trees/`` instead of being deleted
+  (one atomic rename); a created one is recorded as absent before. Its space
+  is only reclaimed when the entry leaves the journal, so trees with more than
+  ``FILE_AGENT_JOURNAL_MAX_TREE`` entries (default 10000) are not journaled
+  and ``remove_tree`` leaves them to ``delete_engine``.
+
+Undo and redo only touch the paths of one entry, so they cost O(changed
+files). What an undo overwrites is captured at undo time, so recording an
+action only pays for the version before it. Undo refuses to clobber a path
+that was changed outside the journal after the recorded action.
+
+The last ``FILE_AGENT_JOURNAL_KEEP`` (default 100) entries are kept. Objects
+and trees no longer referenced by any entry are deleted on a background
+thread. Set ``FILE_AGENT_JOURNAL=0`` to turn the journal off.
+
+The journal is an append-only JSONL log, one line per recorded action, and
+is rewritten as a single snapshot line on undo, redo and trims. Threads share
+one ``Journal`` per directory (``open_journal``); processes take turns
+through a lock file and replay the log when another one changed it.
+Paths are recorded absolute, so undo works from any working directory.
+"""
+
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl  # serializes agents in several processes (not available on Windows)
+except ImportError:
+    fcntl = None
+
+from copy_engine import copy_file
+import delete_engine
+from hashing import Hasher
+
+JOURNAL_DIR = ".file_agent_journal"
+DEFAULT_KEEP = 100
+DEFAULT_MAX_TREE = 10000
+# Entries beyond ``keep`` are trimmed (and garbage collected) in batches of this share of ``keep``
+TRIM_SLACK = 0.25
+
+ABSENT = {"kind": "absent"}
+
+
+class JournalError(Exception):
+    """An undo or redo cannot be applied; ``done`` lists the steps applied before it."""
+
+    def __init__(self, message: str, done: Optional[List[str]] = None):
+        super().__init__(message)
+        self.done = done or []
+
+
+def identity(path: str) -> Optional[list]:
+    """What is at ``path`` right now, cheaply: changes when a file is rewritten or replaced."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return None
+    if stat.S_ISDIR(st.st_mode):
+        return ["dir"]
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _larger_than(path: str, limit: int) -> bool:
+    """Whether the tree under ``path`` has more than ``limit`` entries (stops counting there)."""
+    count, pending = 0, [path]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                count += 1
+                if count > limit:
+                    return True
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+    return False
+
+
+class Journal:
+    """Journal of one workspace, stored in ``directory``; use ``open_journal`` to share it."""
+
+    def __init__(self, directory: str, hasher: Optional[Hasher] = None, keep: Optional[int] = None):
+        self.directory = os.path.abspath(directory)
+        self.objects = os.path.join(self.directory, "objects")
+        self.trees = os.path.join(self.directory, "trees")
+        self.log_path = os.path.join(self.directory, "journal.jsonl")
+        self.lock_path = os.path.join(self.directory, "lock")
+        self.hasher = hasher or Hasher()
+        self.keep = keep if keep is not None else int(os.getenv("FILE_AGENT_JOURNAL_KEEP", str(DEFAULT_KEEP)))
+        self.max_tree = int(os.getenv("FILE_AGENT_JOURNAL_MAX_TREE", str(DEFAULT_MAX_TREE)))
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._loaded: Optional[list] = None
+        self._collector: Optional[threading.Thread] = None
+        self.entries: List[dict] = []
+        self.position = 0
+        self._make_layout()
+
+    def _make_layout(self) -> None:
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.trees, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the journal across threads and processes, with the state up to date."""
+        with self._lock:
+            self._depth += 1
+            lock_file = None
+            try:
+                if self._depth == 1:
+                    # Recreated if the directory was removed behind our back
+                    # (by hand, or with the workspace): its history is gone then
+                    self._make_layout()
+                    if fcntl is not None:
+                        lock_file = open(self.lock_path, "a")
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    self._reload()
+                yield
+            finally:
+                self._depth -= 1
+                if lock_file is not None:
+                    lock_file.close()  # releases the flock
+
+    def _reload(self) -> None:
+        """Replay the log if another process (or a restart) changed it since we last read it."""
+        stamp = identity(self.log_path)
+        if stamp == self._loaded:
+            return
+        entries, position = [], 0
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a torn last line from an interrupted write
+                    if "snapshot" in record:
+                        entries, position = record["snapshot"]["entries"], record["snapshot"]["position"]
+                    else:
+                        entries = entries[:position] + [record["record"]]
+                        position = len(entries)
+        except FileNotFoundError:
+            pass
+        self.entries, self.position = entries, position
+        self._loaded = stamp
+
+    # -- snapshots -----------------------------------------------------------
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def _store(self, path: str, st: os.stat_result, link: bool) -> str:
+        """Put the content of the file ``path`` in the object store; return its digest."""
+        digest = self.hasher.hash_file(path, st=st)
+        target = self._object_path(digest)
+        if os.path.exists(target):
+            return digest
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if link and st.st_nlink == 1:
+            try:
+                os.link(path, target)
+                return digest
+            except FileExistsError:
+                return digest
+            except OSError:
+                pass  # cross-device or no hardlinks here: copy instead
+        partial = f"{target}.{uuid.uuid4().hex[:8]}.partial"
+        copy_file(path, partial)
+        os.replace(partial, target)
+        return digest
+
+    def _capture(self, path: str, link: bool, detach: bool = False) -> dict:
+        """Snapshot what is at ``path``; with ``detach`` also remove it from the workspace.
+
+        ``link`` may hardlink files, for when the caller unlinks or renames over
+        them next. Without ``detach`` a directory is recorded as just a
+        directory (its contents are not snapshotted).
+        """
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return dict(ABSENT)
+        if stat.S_ISLNK(st.st_mode):
+            state = {"kind": "symlink", "target": os.readlink(path)}
+            if detach:
+                os.unlink(path)
+        elif stat.S_ISDIR(st.st_mode):
+            if not detach:
+                return {"kind": "dir"}
+            if not os.listdir(path):
+                os.rmdir(path)
+                return {"kind": "dir"}
+            state = {"kind": "tree", "tree": uuid.uuid4().hex}
+            os.rename(path, os.path.join(self.trees, state["tree"]))
+        else:
+            state = {"kind": "file", "object": self._store(path, st, link or detach),
+                     "mode": stat.S_IMODE(st.st_mode)}
+            if detach:
+                os.unlink(path)
+        return state
+
+    def _restore(self, path: str, state: dict) -> None:
+        """Recreate ``state`` at ``path``, which must be free (captured with ``detach``)."""
+        kind = state["kind"]
+        if kind == "absent":
+            return
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if kind == "dir":
+            os.makedirs(path, exist_ok=True)
+        elif kind == "tree":
+            os.rename(os.path.join(self.trees, state["tree"]), path)
+        elif kind == "symlink":
+            os.symlink(state["target"], path)
+        else:
+            # Copy, never link, out of the store: the workspace file may be rewritten in place
+            copy_file(self._object_path(state["object"]), path)
+            os.chmod(path, state["mode"])
+
+    # -- recording -----------------------------------------------------------
+
+    def _snapshot(self, path: str, snapshot: str) -> dict:
+        if snapshot == "append" and os.path.isfile(path):
+            return {"kind": "prefix", "size": os.path.getsize(path)}
+        return self._capture(path, link=snapshot in ("link", "unlink"))
+
+    def run(self, action: str, paths: List[str], operation: Callable[[], str], snapshot: str = "copy") -> str:
+        """Run ``operation`` (a file action) and record it if it succeeds (returns "✅ ...").
+
+        ``snapshot`` is how the action changes existing files: "unlink" if it
+        removes the paths themselves, "link" if it renames over them (a
+        hardlink keeps the old version in both cases), "copy" if it rewrites
+        them in place, "append" if it only appends. Except with "unlink",
+        symlinks among ``paths`` are written through and their targets recorded.
+        """
+        with self._locked():
+            changes = []
+            for path in paths:
+                if snapshot != "unlink" and os.path.islink(path):
+                    path = os.path.realpath(path)
+                changes.append({"path": os.path.abspath(path), "before": self._snapshot(path, snapshot)})
+            result = operation()
+            if result.startswith("✅"):
+                self._commit(action, changes)
+            else:
+                self._discard(changes)
+            return result
+
+    def _discard(self, changes: List[dict]) -> None:
+        """Drop the snapshots of an action that failed.
+
+        Hardlinked ones go now: the workspace file is still there and may be
+        written in place, which would change the object under its digest.
+        """
+        objects, _ = self._referenced()
+        for change in changes:
+            state = change["before"]
+            if state.get("kind") == "file" and state["object"] not in objects:
+                try:
+                    os.unlink(self._object_path(state["object"]))
+                except FileNotFoundError:
+                    pass
+        self._collect_garbage()
+
+    def remove_tree(self, path: str, action: str = "delete_folder") -> bool:
+        """Delete the directory ``path`` by moving it into the journal.
+
+        False if it is on another device or has more than ``max_tree`` entries;
+        the caller then deletes it for good.
+        """
+        with self._locked():
+            tree = uuid.uuid4().hex
+            try:
+                if _larger_than(path, self.max_tree):
+                    return False
+                os.rename(path, os.path.join(self.trees, tree))
+            except OSError:
+                return False
+            self._commit(action, [{"path": os.path.abspath(path), "before": {"kind": "tree", "tree": tree}}])
+            return True
+
+    def move(self, source: str, destination: str, action: str = "move_file") -> None:
+        """Move ``source`` to ``destination`` (like ``shutil.move``) and record it."""
+        with self._locked():
+            target = destination
+            if os.path.isdir(destination):
+                target = os.path.join(destination, os.path.basename(source.rstrip(os.sep)))
+            # Detached first: across devices shutil.move copies into an existing
+            # target in place, which would write through a hardlinked snapshot
+            replaced = self._capture(target, link=True, detach=not os.path.isdir(target))
+            try:
+                shutil.move(source, target)
+            except BaseException:
+                if not os.path.lexists(target):
+                    self._restore(target, replaced)
+                raise
+            self._commit(action, [{"rename": [os.path.abspath(source), os.path.abspath(target)],
+                                   "replaced": replaced}])
+
+    def _commit(self, action: str, changes: List[dict]) -> None:
+        for change in changes:
+            change["check"] = identity(change["rename"][1] if "rename" in change else change["path"])
+        workspace = os.path.dirname(self.directory)
+        paths = [" → ".join(os.path.relpath(p, workspace) for p in c.get("rename", [c.get("path")]))
+                 for c in changes]
+        entry = {"id": uuid.uuid4().hex[:8], "time": time.time(), "action": action,
+                 "summary": f"{action} {', '.join(paths)}", "changes": changes}
+        dropped = len(self.entries) - self.position  # redo history ends with a new action
+        self.entries = self.entries[:self.position] + [entry]
+        self.position = len(self.entries)
+        if len(self.entries) > self.keep * (1 + TRIM_SLACK):
+            dropped += len(self.entries) - self.keep
+            self.entries = self.entries[-self.keep:]
+            self.position = len(self.entries)
+            self._save()
+        else:
+            self._append({"record": entry})
+        if dropped:
+            self._collect_garbage()
+
+    def _append(self, record: dict) -> None:
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._loaded = identity(self.log_path)
+
+    def _save(self) -> None:
+        """Replace the log with one snapshot line of the current state."""
+        tmp = f"{self.log_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"snapshot": {"entries": self.entries, "position": self.position}}) + "\n")
+        os.replace(tmp, self.log_path)
+        self._loaded = identity(self.log_path)
+
+    # -- undo / redo ---------------------------------------------------------
+
+    @staticmethod
+    def _checked_path(change: dict, undo: bool) -> str:
+        """Path whose identity must still match ``change["check"]`` before the next undo/redo."""
+        if "rename" in change:
+            return change["rename"][1] if undo else change["rename"][0]
+        return change["path"]
+
+    def _check(self, entry: dict, undo: bool, done: List[str]) -> None:
+        """Refuse to apply ``entry`` if its paths were changed since the journal last touched them."""
+        verb = "undo" if undo else "redo"
+        for change in entry["changes"]:
+            path = self._checked_path(change, undo)
+            if "rename" in change:
+                other = self._checked_path(change, not undo)
+                if os.path.lexists(other):
+                    raise JournalError(f"Cannot {verb} '{entry['summary']}': {other} exists", done)
+            if identity(path) != change["check"]:
+                raise JournalError(f"Cannot {verb} '{entry['summary']}': {path} was changed since", done)
+
+    @staticmethod
+    def _paths(entry: dict) -> set:
+        return {path for change in entry["changes"] for path in change.get("rename", [change.get("path")])}
+
+    def _refresh_checks(self, touched: set, neighbours: List[dict], undo: bool) -> None:
+        """Re-key the nearest neighbouring entry on each path just rewritten by an undo or redo.
+
+        The path now holds exactly what that entry left (or found) there, but
+        as a new file, so its recorded identity would no longer match.
+        """
+        for entry in neighbours:
+            if not touched:
+                return
+            for change in entry["changes"]:
+                path = self._checked_path(change, undo)
+                if path in touched:
+                    change["check"] = identity(path)
+            touched = touched - self._paths(entry)
+
+    def _undo_change(self, change: dict) -> None:
+        if "rename" in change:
+            source, target = change["rename"]
+            shutil.move(target, source)
+            self._restore(target, change["replaced"])
+            change["check"] = identity(source)
+        elif change["before"]["kind"] == "prefix":
+            change["after"] = self._capture(change["path"], link=False)
+            os.truncate(change["path"], change["before"]["size"])
+            change["check"] = identity(change["path"])
+        else:
+            change["after"] = self._capture(change["path"], link=True, detach=True)
+            self._restore(change["path"], change["before"])
+            change["check"] = identity(change["path"])
+
+    def _redo_change(self, change: dict) -> None:
+        if "rename" in change:
+            source, target = change["rename"]
+            change["replaced"] = self._capture(target, link=True, detach=True)
+            shutil.move(source, target)
+            change["check"] = identity(target)
+        else:
+            change["before"] = self._capture(change["path"], link=True, detach=True)
+            self._restore(change["path"], change["after"])
+            change["check"] = identity(change["path"])
+
+    def undo(self, steps: int = 1) -> List[str]:
+        """Undo the last ``steps`` recorded actions; return their summaries."""
+        done = []
+        with self._locked():
+            try:
+                for _ in range(steps):
+                    if self.position == 0:
+                        break
+                    entry = self.entries[self.position - 1]
+                    self._check(entry, undo=True, done=done)
+                    for change in reversed(entry["changes"]):
+                        self._undo_change(change)
+                    self.position -= 1
+                    self._refresh_checks(self._paths(entry), self.entries[self.position - 1::-1]
+                                         if self.position else [], undo=True)
+                    done.append(entry["summary"])
+            finally:
+                self._save()
+        return done
+
+    def redo(self, steps: int = 1) -> List[str]:
+        """Redo the next ``steps`` undone actions; return their summaries."""
+        done = []
+        with self._locked():
+            try:
+                for _ in range(steps):
+                    if self.position == len(self.entries):
+                        break
+                    entry = self.entries[self.position]
+                    self._check(entry, undo=False, done=done)
+                    for change in entry["changes"]:
+                        self._redo_change(change)
+                    self.position += 1
+                    self._refresh_checks(self._paths(entry), self.entries[self.position:], undo=False)
+                    done.append(entry["summary"])
+            finally:
+                self._save()
+        return done
+
+    def history(self, limit: int = 20) -> List[dict]:
+        """The most recent entries, newest first, each with ``undone`` set for redoable ones."""
+        with self._locked():
+            start = max(0, len(self.entries) - limit)
+            return [dict(entry, undone=index >= self.position)
+                    for index, entry in reversed(list(enumerate(self.entries[start:], start)))]
+
+    # -- garbage collection --------------------------------------------------
+
+    def _referenced(self):
+        objects, trees = set(), set()
+        for entry in self.entries:
+            for change in entry["changes"]:
+                for key in ("before", "after", "replaced"):
+                    state = change.get(key) or {}
+                    if state.get("kind") == "file":
+                        objects.add(state["object"])
+                    elif state.get("kind") == "tree":
+                        trees.add(state["tree"])
+        return objects, trees
+
+    def _collect_garbage(self) -> None:
+        """Delete unreferenced objects and trees on a background thread."""
+        if self._collector is not None and self._collector.is_alive():
+            return
+        # Not a daemon thread, like delete_engine's reaper: exit waits for it
+        self._collector = threading.Thread(target=self.collect, name="journal-gc")
+        self._collector.start()
+
+    def collect(self) -> int:
+        """Delete objects and trees no entry refers to; return how many were removed."""
+        removed = 0
+        with self._locked():
+            # Objects can be referenced again by the next snapshot, so they go under the lock
+            objects, trees = self._referenced()
+            for shard in os.scandir(self.objects):
+                if not shard.is_dir():
+                    continue
+                for obj in os.scandir(shard.path):
+                    if obj.name not in objects:
+                        os.unlink(obj.path)
+                        removed += 1
+            # Tree ids are never reused, so their (slow) deletes can run unlocked
+            unreferenced = [entry.path for entry in os.scandir(self.trees) if entry.name not in trees]
+        for path in unreferenced:
+            delete_engine.rmtree(path)
+            removed += 1
+        return removed
+
+
+_journals: Dict[str, Journal] = {}
+_journals_lock = threading.Lock()
+
+
+def open_journal(directory: str, hasher: Optional[Hasher] = None) -> Journal:
+    """The process-wide ``Journal`` stored in ``directory``."""
+    directory = os.path.abspath(directory)
+    with _journals_lock:
+        if directory not in _journals:
+            _journals[directory] = Journal(directory, hasher=hasher)
+        return _journals[directory]
@@ -0,0 +1,194 @@
+"""Output formats for FileExplorerTool results.
+
+Handlers describe their results for people: an emoji status, ``📄 name (12
+bytes)`` lines, file contents between dashed rules. An agent pays for that
+decoration in tokens and then parses it back out of the text. With
+``"output": "json"`` or ``"output": "tsv"`` on an action (``FILE_AGENT_OUTPUT``
+sets the default for all of them) results come back compact instead:
+
+* ``json``: a status object on the first line, ``{"status": "ok", ...}``, with
+  ``message``, ``content`` (a file body), ``fields`` and other details; for
+  record results, one compact JSON array per record follows, in ``fields``
+  order.
+* ``tsv``: the status, the message and any details as ``key=value`` on the
+  first line, tab separated; for record results a header row of field names
+  and one row per record follow; for a file body, the body itself. Tabs,
+  newlines and backslashes in values are escaped as ``\\t``, ``\\n`` and
+  ``\\\\``.
+
+The status is ``ok``, ``error``, ``warning`` or ``empty``.
+
+Actions that produce records (list, grep_tree, find_duplicates, ...) return a
+:class:`Table`. Its rows come from a generator and are written into the one
+result string as they are produced, in every format, so no per-format copy of
+the result is built. Other actions return their text, which is converted by
+its emoji prefix.
+"""
+
+import json
+import os
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+FORMATS = ("text", "json", "tsv")
+DEFAULT_FORMAT = os.getenv("FILE_AGENT_OUTPUT", "text")
+
+RULE = "-" * 40
+
+# Leading emoji of handler messages and the status they stand for; any other
+# leading symbol (📄, 🔍, 📜, ...) is decoration on a successful result
+_STATUSES = (("✅", "ok"), ("❌", "error"), ("⚠️", "warning"), ("📭", "empty"))
+
+_compact = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+_END = object()
+
+
+class Table:
+    """Records an action produced, rendered lazily in the requested format.
+
+    ``rows`` is any iterable (usually a generator) of sequences in ``fields``
+    order. ``line`` renders one row as text under ``title``; ``empty`` is the
+    whole text result when there are no rows and ``note`` a last text line
+    (``"... and 5 more"``). ``details`` go into the status object of the
+    compact formats. ``error`` prefixes exceptions raised while the rows are
+    produced. ``text`` replaces the title/line rendering when the text form
+    needs all rows at once (aligned columns).
+    """
+
+    def __init__(self, fields: Sequence[str], rows: Iterable[Sequence[Any]], title: str,
+                 line: Callable[[Sequence[Any]], str], empty: Optional[str] = None, note: str = "",
+                 details: Optional[Dict[str, Any]] = None, error: str = "Error",
+                 text: Optional[Callable[[], str]] = None):
+        self.fields = list(fields)
+        self.rows = rows
+        self.title = title
+        self.line = line
+        self.empty = empty
+        self.note = note
+        self.details = details or {}
+        self.error = error
+        self.text = text
+
+    def chunks(self, fmt: str, extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        if fmt == "text" and self.text is not None:
+            yield self.text()
+            return
+        rows = iter(self.rows)
+        first = next(rows, _END)
+        if first is _END and self.empty is not None:
+            yield from message_chunks(self.empty, fmt, dict(extra or {}, **self.details))
+            return
+        rows = rows if first is _END else chain((first,), rows)
+        if fmt == "text":
+            yield self.title
+            for row in rows:
+                yield "\n" + self.line(row)
+            if self.note:
+                yield "\n" + self.note
+            return
+        status = dict(status="ok", **(extra or {}), **self.details)
+        if self.note:
+            status["note"] = strip(self.note)
+        if fmt == "json":
+            status["fields"] = self.fields
+            yield _compact(status)
+            for row in rows:
+                yield "\n" + _compact(list(row))
+        else:
+            yield _tsv_status(status, "note")
+            yield "\n" + "\t".join(self.fields)
+            for row in rows:
+                yield "\n" + "\t".join(_tsv(value) for value in row)
+
+
+def strip(text: str) -> str:
+    """``text`` without the leading status emoji or symbol and list markers."""
+    text = text.lstrip("\n .")
+    if text and ord(text[0]) > 0x2000:
+        text = text.split(" ", 1)[1] if " " in text else ""
+    return text.strip()
+
+
+def split_status(text: str) -> Tuple[str, str]:
+    """(status, message without its emoji) of a handler message."""
+    for prefix, status in _STATUSES:
+        if text.startswith(prefix):
+            return status, text[len(prefix):].strip()
+    return "ok", strip(text)
+
+
+def _framed(message: str) -> Optional[Tuple[str, str, str]]:
+    """(title, body, note) of a ``title:\\n----\\nbody\\n----\\nnote`` message, or None."""
+    start = message.find(":\n" + RULE + "\n")
+    end = message.rfind("\n" + RULE)
+    body_start = start + len(RULE) + 3
+    if start < 0 or end < body_start:
+        return None
+    return message[:start], message[body_start:end], message[end + len(RULE) + 1:]
+
+
+def _tsv(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        value = round(value, 6)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _tsv_status(status: Dict[str, Any], message_key: str) -> str:
+    """First TSV line: status, message, then the other details as key=value."""
+    details = (f"{key}={_tsv(value)}" for key, value in status.items() if key not in ("status", message_key))
+    return "\t".join([status["status"], _tsv(status.get(message_key, "")), *details])
+
+
+def message_chunks(text: str, fmt: str, extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """A handler's text message in ``fmt``."""
+    if fmt == "text":
+        yield text
+        return
+    status, message = split_status(text)
+    body = note = None
+    framed = _framed(message) if status == "ok" else None
+    if framed is not None:
+        message, body, note = framed
+    result = dict(status=status, **(extra or {}), message=message)
+    if note and note.strip():
+        result["note"] = strip(note)
+    if fmt == "json":
+        if body is not None:
+            result["content"] = body
+        yield _compact(result)
+        return
+    yield _tsv_status(result, "message")
+    if body is not None:
+        yield "\n" + body
+
+
+def chunks(result, fmt: str, extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """A handler result (text or Table) in ``fmt``, piece by piece."""
+    if isinstance(result, Table):
+        return result.chunks(fmt, extra)
+    return message_chunks(result, fmt, extra)
+
+
+def render(result, fmt: str = "text", extra: Optional[Dict[str, Any]] = None) -> str:
+    """A handler result (text or Table) as one string in ``fmt``.
+
+    ``extra`` fields (e.g. the action of a batch step) are added to the status
+    object of the compact formats.
+    """
+    try:
+        return "".join(chunks(result, fmt, extra))
+    except Exception as e:
+        # A Table's rows are produced here, after its handler returned
+        error = getattr(result, "error", "Error")
+        return "".join(message_chunks(f"❌ {error}: {e}", fmt, extra))
+
+
+def check_format(fmt: Optional[str]) -> str:
+    """The output format to use for ``fmt`` (None: the default); raises ValueError if unknown."""
+    fmt = (fmt or DEFAULT_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output: {fmt} (use {', '.join(FORMATS)})")
+    return fmt
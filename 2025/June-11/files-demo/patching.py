@@ -0,0 +1,302 @@
+"""Streaming edits and diffs for FileExplorerTool.
+
+``apply_unified_diff`` and ``replace_lines`` stream the original file line by
+line into a temporary file in the same directory, then atomically rename it
+over the original. Memory use is independent of file size, readers see either
+the old or the new file, and a failed patch leaves the original untouched.
+Files are read in their detected encoding (``binary_view.sniff``), so
+Latin-1, UTF-16 and files with stray undecodable bytes can be patched too.
+
+``stream_diff`` compares two files with bounded memory: equal lines are
+consumed in lock-step, and after a mismatch both sides are buffered only up to
+a look-ahead window to find where they line up again. The result is a unified
+diff; for large rewrites it can be less minimal than ``difflib``, but it
+never loads either file whole.
+"""
+
+import io
+import os
+import re
+import shutil
+import stat
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import binary_view
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+RESYNC_WINDOW = 200     # lines buffered per side while looking for the next match
+RESYNC_CONFIRM = 2      # consecutive equal lines needed to accept a resync point
+
+_UNDECODED = re.compile("[\udc80-\udcff]")  # bytes kept by surrogateescape
+
+
+class PatchError(Exception):
+    """The patch does not apply to the file."""
+    pass
+
+
+@dataclass
+class PatchResult:
+    hunks: int
+    added: int
+    removed: int
+
+
+def _encoding(block: bytes) -> str:
+    """Encoding to decode a file with, from its first block (binary files as UTF-8)."""
+    return binary_view.sniff_bytes(block).encoding or "utf-8"
+
+
+def _same(original: str, text: str) -> bool:
+    """Whether a line of the file matches a diff line, ignoring the line ending.
+
+    Bytes that did not decode are kept as surrogates (``surrogateescape``) but
+    appear as U+FFFD in diffs shown to the model, so they match that too.
+    """
+    original, text = original.rstrip("\r\n"), text.rstrip("\r\n")
+    return original == text or _UNDECODED.sub("\ufffd", original) == text
+
+
+@contextmanager
+def _atomic_rewrite(path: str) -> Iterator[Tuple[TextIO, TextIO]]:
+    """Yield (source, temp) files; the temp file replaces ``path`` if the block succeeds.
+
+    A symlink's target is rewritten and the link kept. The file is decoded in
+    its detected encoding, and bytes that do not decode are written back
+    unchanged. An exclusive ``flock`` is held until the rename, like the
+    ``locked_open`` writers, and the temp file gets the original's mode and,
+    where permitted, its owner.
+    """
+    path = os.path.realpath(path)
+    directory, name = os.path.split(path)
+    with open(path, "rb") as raw:
+        if fcntl is not None:
+            fcntl.flock(raw.fileno(), fcntl.LOCK_EX)
+        st = os.fstat(raw.fileno())
+        encoding = _encoding(os.pread(raw.fileno(), binary_view.SNIFF_BYTES, 0))
+        fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".patch", dir=directory)
+        try:
+            os.fchmod(fd, stat.S_IMODE(st.st_mode))
+            try:
+                os.fchown(fd, st.st_uid, st.st_gid)
+            except OSError:
+                pass  # only root may give files away; the temp file stays ours
+            with io.TextIOWrapper(raw, encoding, errors="surrogateescape", newline="") as src, \
+                    os.fdopen(fd, "w", encoding=encoding, errors="surrogateescape", newline="") as dst:
+                yield src, dst
+            os.replace(tmp, path)
+        except UnicodeEncodeError as e:
+            os.unlink(tmp)
+            raise PatchError(f"{e.object[e.start:e.end]!r} cannot be written to a {encoding} file")
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def _parse_hunks(diff: str) -> List[Tuple[int, List[str]]]:
+    """Return ``(old_start, lines)`` for each hunk; lines keep their ' ', '-', '+' prefix."""
+    hunks = []
+    current = None
+    for line in diff.splitlines(keepends=True):
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = []
+            hunks.append((int(match.group(1)), current))
+        elif current is not None and line[:1] in (" ", "-", "+"):
+            current.append(line)
+        elif current is not None and line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            if current:
+                current[-1] = current[-1].rstrip("\r\n")
+        elif current is not None and line.strip() == "":
+            current.append(" " + line)  # some tools strip the space of empty context lines
+    if not hunks:
+        raise PatchError("No hunks found (expected unified diff with '@@ -a,b +c,d @@' headers)")
+    return hunks
+
+
+def apply_unified_diff(path: str, diff: str) -> PatchResult:
+    """Apply a unified diff to ``path`` in one streaming pass."""
+    hunks = _parse_hunks(diff)
+    result = PatchResult(len(hunks), 0, 0)
+    with _atomic_rewrite(path) as (src, dst):
+        line_no = 0  # lines of the original consumed so far
+        for old_start, lines in hunks:
+            # Copy untouched lines up to the hunk (an empty old range starts *after* old_start)
+            start = old_start - 1 if any(l[0] in " -" for l in lines) else old_start
+            if start < line_no:
+                raise PatchError(f"Hunk at line {old_start} overlaps the previous hunk")
+            for _ in range(start - line_no):
+                line = src.readline()
+                if not line:
+                    raise PatchError(f"File ends before hunk at line {old_start}")
+                dst.write(line)
+            line_no = start
+
+            for line in lines:
+                tag, text = line[0], line[1:]
+                if tag == "+":
+                    dst.write(text)
+                    result.added += 1
+                    continue
+                original = src.readline()
+                line_no += 1
+                if not _same(original, text):
+                    raise PatchError(f"Line {line_no} does not match: expected {text.rstrip()!r}, "
+                                     f"found {original.rstrip()!r}")
+                if tag == " ":
+                    dst.write(original)
+                else:
+                    result.removed += 1
+
+        shutil.copyfileobj(src, dst)
+    return result
+
+
+def replace_lines(path: str, start: int, end: int, content: str) -> PatchResult:
+    """Replace lines ``start``..``end`` (1-based, inclusive) with ``content``.
+
+    ``end = start - 1`` inserts before line ``start`` without removing anything.
+    """
+    if start < 1 or end < start - 1:
+        raise PatchError("Invalid line range: need start >= 1 and end >= start - 1")
+    new_lines = content.splitlines(keepends=True)
+    if new_lines and not new_lines[-1].endswith("\n"):
+        new_lines[-1] += "\n"
+
+    result = PatchResult(1, len(new_lines), 0)
+    with _atomic_rewrite(path) as (src, dst):
+        for number in range(1, start):
+            line = src.readline()
+            if not line:
+                raise PatchError(f"File has only {number - 1} lines")
+            dst.write(line)
+        for _ in range(end - start + 1):
+            if src.readline():
+                result.removed += 1
+        dst.writelines(new_lines)
+        shutil.copyfileobj(src, dst)
+    return result
+
+
+def _resync(a: deque, b: deque) -> Optional[Tuple[int, int]]:
+    """Smallest (i, j) by i + j where a[i:] and b[j:] line up again, within the buffers."""
+    a_list, b_list = list(a), list(b)
+    positions = {}
+    for j, line in enumerate(b_list):
+        positions.setdefault(line, []).append(j)
+    best = None
+    for i, line in enumerate(a_list):
+        if best is not None and i >= best[0] + best[1]:
+            break
+        for j in positions.get(line, ()):
+            if best is not None and i + j >= best[0] + best[1]:
+                break
+            confirmed = all(
+                i + k >= len(a_list) or j + k >= len(b_list) or a_list[i + k] == b_list[j + k]
+                for k in range(1, RESYNC_CONFIRM)
+            )
+            if confirmed:
+                best = (i, j)
+                break
+    return best
+
+
+def stream_diff(path_a: str, path_b: str, context: int = 3, max_lines: int = 500) -> Tuple[str, bool]:
+    """Unified diff of two files with bounded memory; returns (diff text, truncated)."""
+    out: List[str] = [f"--- {path_a}\n", f"+++ {path_b}\n"]
+    emitted = 0
+    truncated = False
+    before: deque = deque(maxlen=context)  # (a_no, b_no, line) equal lines before a hunk
+    hunk: Optional[dict] = None
+
+    def close_hunk():
+        nonlocal hunk, emitted, truncated
+        if hunk is None:
+            return
+        body = hunk["lines"][:len(hunk["lines"]) - max(0, hunk["trailing"] - context)]
+        a_len = sum(1 for tag, _ in body if tag != "+")
+        b_len = sum(1 for tag, _ in body if tag != "-")
+        # An empty range is numbered by the line it follows
+        a_start = hunk["a_start"] - (a_len == 0)
+        b_start = hunk["b_start"] - (b_len == 0)
+        if emitted + len(body) > max_lines:
+            truncated = True
+        else:
+            out.append(f"@@ -{a_start},{a_len} +{b_start},{b_len} @@\n")
+            out.extend(tag + (line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+                       for tag, line in body)
+            emitted += len(body)
+        hunk = None
+
+    def change(removed: List[str], added: List[str], a_no: int, b_no: int):
+        nonlocal hunk
+        if hunk is None:
+            first_a = before[0][0] if before else a_no
+            first_b = before[0][1] if before else b_no
+            hunk = {"a_start": first_a, "b_start": first_b, "trailing": 0,
+                    "lines": [(" ", line) for _, _, line in before]}
+            before.clear()
+        hunk["lines"].extend(("-", line) for line in removed)
+        hunk["lines"].extend(("+", line) for line in added)
+        hunk["trailing"] = 0
+
+    encodings = []
+    for path in (path_a, path_b):
+        with open(path, "rb") as f:
+            encodings.append(_encoding(f.read(binary_view.SNIFF_BYTES)))
+    with open(path_a, "r", encoding=encodings[0], errors="replace", newline="") as fa, \
+            open(path_b, "r", encoding=encodings[1], errors="replace", newline="") as fb:
+        a_buf, b_buf = deque(), deque()
+        a_no = b_no = 1  # line number of a_buf[0] / b_buf[0]
+
+        def fill(buf, f, n):
+            if len(buf) < n:
+                buf.extend(islice(f, n - len(buf)))
+
+        while not truncated:
+            fill(a_buf, fa, 1)
+            fill(b_buf, fb, 1)
+            if not a_buf and not b_buf:
+                break
+            if a_buf and b_buf and a_buf[0] == b_buf[0]:
+                line = a_buf.popleft()
+                b_buf.popleft()
+                if hunk is not None:
+                    hunk["lines"].append((" ", line))
+                    hunk["trailing"] += 1
+                    if hunk["trailing"] > 2 * context:
+                        tail = hunk["lines"][-context:] if context else []
+                        close_hunk()
+                        before.extend((a_no - len(tail) + k + 1, b_no - len(tail) + k + 1, l)
+                                      for k, (_, l) in enumerate(tail))
+                else:
+                    before.append((a_no, b_no, line))
+                a_no += 1
+                b_no += 1
+                continue
+
+            fill(a_buf, fa, RESYNC_WINDOW)
+            fill(b_buf, fb, RESYNC_WINDOW)
+            point = _resync(a_buf, b_buf)
+            i, j = point if point is not None else (len(a_buf), len(b_buf))
+            removed = [a_buf.popleft() for _ in range(i)]
+            added = [b_buf.popleft() for _ in range(j)]
+            change(removed, added, a_no, b_no)
+            a_no += i
+            b_no += j
+
+    close_hunk()
+    if len(out) == 2:
+        return "", False
+    return "".join(out), truncated
@@ -0,0 +1,228 @@
+"""Persistent, incrementally updated semantic index over a workspace.
+
+Text files are split into line chunks, embedded locally with
+``agent_common.embeddings.HashingEmbedder`` and stored in a memory-mapped
+float32 matrix under ``<root>/.file_agent_index/``. Only files whose identity
+``(device, inode, mtime_ns, size)`` changed since the last refresh are
+re-embedded; rows of changed or deleted files are tombstoned and the matrix
+is compacted when too many rows are dead.
+
+Search is approximate nearest neighbour: every row also has a 32-bit
+random-hyperplane (SimHash) signature, rows are ranked by Hamming distance to
+the query signature, and only the closest candidates are scored exactly.
+Small indexes are scored exhaustively.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agent_common.embeddings import HashingEmbedder
+
+INDEX_DIR = ".file_agent_index"
+DIM = 512
+SIGNATURE_BITS = 32
+CHUNK_LINES = 30
+MAX_FILE_BYTES = 2 * 1024 * 1024
+EXACT_SEARCH_LIMIT = 5000      # below this many rows, score everything
+CANDIDATES = 2000              # rows scored exactly after Hamming ranking
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".rst", ".py", ".js", ".ts", ".tsx", ".jsx", ".json", ".jsonl", ".yaml", ".yml",
+    ".toml", ".ini", ".cfg", ".csv", ".tsv", ".html", ".css", ".sh", ".sql", ".java", ".go", ".rs",
+    ".c", ".h", ".cpp", ".hpp", ".rb", ".php", ".log", ".xml",
+}
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", INDEX_DIR, ".file_agent_journal"}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class SearchHit:
+    score: float
+    path: str
+    start_line: int
+    end_line: int
+    snippet: str
+
+
+def _chunks(path: str) -> List[Tuple[int, int, str]]:
+    """Split a text file into ``(start_line, end_line, text)`` chunks."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        lines = f.readlines()
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        text = "".join(lines[start:start + CHUNK_LINES])
+        if text.strip():
+            chunks.append((start + 1, min(start + CHUNK_LINES, len(lines)), text))
+    return chunks
+
+
+def _is_text(path: str) -> bool:
+    with open(path, "rb") as f:
+        return b"\0" not in f.read(8192)
+
+
+class SemanticIndex:
+    """Vector index of one workspace root."""
+
+    def __init__(self, root: str, embedder: Optional[HashingEmbedder] = None):
+        self.root = os.path.abspath(root)
+        self.dir = os.path.join(self.root, INDEX_DIR)
+        self.embedder = embedder or HashingEmbedder(DIM)
+        self.files: Dict[str, dict] = {}   # relpath -> {"key": [...], "rows": [row, ...]}
+        self.chunks: List[Optional[list]] = []  # row -> [relpath, start_line, end_line] or None if dead
+        self.vectors = np.zeros((0, DIM), dtype=np.float32)
+        self.signatures = np.zeros(0, dtype=np.uint32)
+        rng = np.random.default_rng(20250611)
+        self.planes = rng.standard_normal((SIGNATURE_BITS, DIM)).astype(np.float32)
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def _load(self) -> None:
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("dim") != DIM or meta.get("signature_bits") != SIGNATURE_BITS:
+            return
+        rows = len(meta["chunks"])
+        self.files, self.chunks = meta["files"], meta["chunks"]
+        if rows:
+            self.vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, DIM))
+            self.signatures = np.fromfile(self._path("signatures.u32"), dtype=np.uint32, count=rows)
+
+    def _save(self) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        # Write next to the live files and rename, so readers never see a partial index
+        for name, array in (("vectors.f32", self.vectors), ("signatures.u32", self.signatures)):
+            tmp = self._path(name + ".tmp")
+            np.ascontiguousarray(array).tofile(tmp)
+            os.replace(tmp, self._path(name))
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": DIM, "signature_bits": SIGNATURE_BITS, "files": self.files, "chunks": self.chunks}, f)
+        os.replace(tmp, self._path("meta.json"))
+        rows = len(self.chunks)
+        self.vectors = (np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, DIM))
+                        if rows else np.zeros((0, DIM), dtype=np.float32))
+
+    # -- indexing ------------------------------------------------------------
+
+    def _signature(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self.planes.T) > 0
+        weights = (1 << np.arange(SIGNATURE_BITS, dtype=np.uint64))
+        return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+    def _scan(self) -> Dict[str, list]:
+        """Current identity of every indexable file, keyed by path relative to the root."""
+        found = {}
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS and not entry.name.startswith(".trash-"):
+                                stack.append(entry.path)
+                        elif (entry.is_file(follow_symlinks=False)
+                              and os.path.splitext(entry.name)[1].lower() in TEXT_EXTENSIONS):
+                            st = entry.stat(follow_symlinks=False)
+                            if 0 < st.st_size <= MAX_FILE_BYTES:
+                                found[os.path.relpath(entry.path, self.root)] = [
+                                    st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size]
+            except OSError:
+                continue
+        return found
+
+    def refresh(self) -> Tuple[int, int]:
+        """Re-embed new and changed files, drop deleted ones; return (files embedded, files removed)."""
+        current = self._scan()
+        stale = [p for p, info in self.files.items() if current.get(p) != info["key"]]
+        changed = [p for p, key in current.items() if self.files.get(p, {}).get("key") != key]
+        if not stale and not changed:
+            return 0, 0
+
+        for path in stale:
+            for row in self.files.pop(path)["rows"]:
+                self.chunks[row] = None
+
+        new_vectors, new_chunks = [], []
+        for path in changed:
+            full = os.path.join(self.root, path)
+            try:
+                if not _is_text(full):
+                    continue
+                chunks = _chunks(full)
+            except OSError:
+                continue
+            start = len(self.chunks) + len(new_chunks)
+            self.files[path] = {"key": current[path], "rows": list(range(start, start + len(chunks)))}
+            new_chunks.extend([path, s, e] for s, e, _ in chunks)
+            new_vectors.append(self.embedder.embed_many([text for _, _, text in chunks]))
+
+        vectors = np.concatenate([np.asarray(self.vectors)] + new_vectors) if new_vectors else np.asarray(self.vectors)
+        self.chunks.extend(new_chunks)
+        self.signatures = np.concatenate([self.signatures, self._signature(vectors[len(self.signatures):])])
+        self.vectors = vectors
+
+        dead = sum(1 for c in self.chunks if c is None)
+        if dead > len(self.chunks) // 2:
+            self._compact()
+        self._save()
+        return len([p for p in changed if p in self.files]), len([p for p in stale if p not in current])
+
+    def _compact(self) -> None:
+        """Drop tombstoned rows and renumber the remaining ones."""
+        alive = np.array([c is not None for c in self.chunks], dtype=bool)
+        renumber = np.cumsum(alive) - 1
+        self.vectors = np.asarray(self.vectors)[alive]
+        self.signatures = self.signatures[alive]
+        self.chunks = [c for c in self.chunks if c is not None]
+        for info in self.files.values():
+            info["rows"] = [int(renumber[r]) for r in info["rows"]]
+
+    # -- search ----------------------------------------------------------------
+
+    def search(self, query: str, k: int = 5) -> List[SearchHit]:
+        """Return the ``k`` chunks most similar to ``query``."""
+        if not self.chunks:
+            return []
+        q = self.embedder.embed(query)
+        alive = np.fromiter((c is not None for c in self.chunks), dtype=bool, count=len(self.chunks))
+
+        if len(self.chunks) <= EXACT_SEARCH_LIMIT:
+            candidates = np.flatnonzero(alive)
+        else:
+            # Rank rows by Hamming distance between SimHash signatures, then score the closest exactly
+            xor = np.bitwise_xor(self.signatures, self._signature(q[None, :])[0])
+            distance = _POPCOUNT[xor.view(np.uint8)].reshape(-1, 4).sum(axis=1)
+            distance[~alive] = SIGNATURE_BITS + 1
+            candidates = np.argpartition(distance, min(CANDIDATES, len(distance) - 1))[:CANDIDATES]
+            candidates = candidates[alive[candidates]]
+
+        scores = np.asarray(self.vectors[candidates]) @ q
+        top = candidates[np.argsort(-scores)[:k]]
+        hits = []
+        for row, score in zip(top, np.sort(scores)[::-1][:k]):
+            path, start, end = self.chunks[row]
+            hits.append(SearchHit(float(score), path, start, end, self._snippet(path, start)))
+        return hits
+
+    def _snippet(self, path: str, start_line: int, max_chars: int = 240) -> str:
+        try:
+            with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                for number, line in enumerate(f, 1):
+                    if number >= start_line and line.strip():
+                        return line.strip()[:max_chars]
+        except OSError:
+            pass
+        return ""
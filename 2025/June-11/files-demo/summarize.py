@@ -0,0 +1,201 @@
+"""Token-budgeted views of large files for FileExplorerTool's ``read``.
+
+When a file does not fit the token budget, ``budgeted_view`` returns its head
+and tail, an outline of its structure and the byte offsets needed for a
+follow-up range read, instead of the whole content. Files are never loaded
+whole: head and tail are read with seeks, and outlines are built by streaming
+line scans.
+
+Outlines depend only on file content, so they are cached by file identity
+``(device, inode, mtime_ns, size)``.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from agent_common.tokens import count_tokens, truncate_to_tokens
+
+SCAN_CHUNK = 1024 * 1024
+MAX_OUTLINE_ENTRIES = 60
+MAX_JSON_PARSE_BYTES = 5 * 1024 * 1024
+
+_CODE_PATTERNS = {
+    "python": re.compile(rb"^\s*(?:async\s+)?(class|def)\s+(\w+)"),
+    "javascript": re.compile(rb"^\s*(?:export\s+)?(?:async\s+)?(class|function)\s+(\w+)"),
+    "markdown": re.compile(rb"^(#{1,6})\s+(.+)"),
+}
+_EXTENSIONS = {
+    ".py": "python", ".js": "javascript", ".ts": "javascript", ".jsx": "javascript", ".tsx": "javascript",
+    ".md": "markdown", ".markdown": "markdown",
+    ".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl",
+    ".csv": "csv", ".tsv": "csv",
+}
+
+
+@dataclass
+class Outline:
+    kind: str
+    lines: int
+    entries: List[str] = field(default_factory=list)
+
+
+def _scan_lines(path: str):
+    """Yield ``(line_number, byte_offset, line_bytes)`` without loading the file."""
+    offset = 0
+    number = 0
+    with open(path, "rb") as f:
+        for line in f:
+            number += 1
+            yield number, offset, line
+            offset += len(line)
+
+
+def _count_lines(path: str) -> int:
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(SCAN_CHUNK):
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    return count + (last != b"\n")
+
+
+def _describe_json(value, depth: int = 0) -> List[str]:
+    indent = "  " * depth
+    if isinstance(value, dict):
+        entries = []
+        for key, item in list(value.items())[:MAX_OUTLINE_ENTRIES]:
+            kind = type(item).__name__
+            size = f"[{len(item)}]" if isinstance(item, (list, dict)) else ""
+            entries.append(f"{indent}{key}: {kind}{size}")
+            if isinstance(item, dict) and depth < 1:
+                entries.extend(_describe_json(item, depth + 1))
+        return entries
+    if isinstance(value, list):
+        first = f", items like {type(value[0]).__name__}" if value else ""
+        entries = [f"{indent}list[{len(value)}]{first}"]
+        if value and isinstance(value[0], dict) and depth < 1:
+            entries.extend(_describe_json(value[0], depth + 1))
+        return entries
+    return [f"{indent}{type(value).__name__}"]
+
+
+def build_outline(path: str) -> Outline:
+    """Describe the structure of ``path`` by its type (code, Markdown, JSON, JSONL, CSV, text)."""
+    kind = _EXTENSIONS.get(os.path.splitext(path)[1].lower(), "text")
+    size = os.path.getsize(path)
+
+    if kind in _CODE_PATTERNS:
+        pattern = _CODE_PATTERNS[kind]
+        entries, lines = [], 0
+        for lines, offset, line in _scan_lines(path):
+            match = pattern.match(line)
+            if match and len(entries) < MAX_OUTLINE_ENTRIES:
+                label = match.group(0).decode("utf-8", "replace").strip()
+                entries.append(f"L{lines} @{offset}  {label}")
+        return Outline(kind, lines, entries)
+
+    if kind == "json" and size <= MAX_JSON_PARSE_BYTES:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return Outline(kind, _count_lines(path), _describe_json(json.load(f)))
+        except (ValueError, UnicodeDecodeError):
+            kind = "text"
+
+    if kind == "jsonl":
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            first = f.readline()
+        try:
+            entries = ["records like:"] + _describe_json(json.loads(first), 1)
+        except ValueError:
+            entries = []
+        return Outline(kind, _count_lines(path), entries)
+
+    if kind == "csv":
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            sample = f.read(64 * 1024)
+        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        rows = list(csv.reader(io.StringIO(sample), delimiter=delimiter))
+        lines = _count_lines(path)
+        entries = [f"columns ({len(rows[0])}): {', '.join(rows[0])}"] if rows else []
+        entries.append(f"~{max(lines - 1, 0)} data rows")
+        return Outline(kind, lines, entries)
+
+    return Outline(kind, _count_lines(path))
+
+
+class OutlineCache:
+    """Small LRU cache of outlines keyed by file identity."""
+
+    def __init__(self, max_entries: int = 256, on_lookup: Optional[Callable[[bool], None]] = None):
+        self._entries: "OrderedDict[tuple, Outline]" = OrderedDict()
+        self.max_entries = max_entries
+        self.on_lookup = on_lookup
+
+    def get(self, path: str) -> Outline:
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        outline = self._entries.get(key)
+        if self.on_lookup:
+            self.on_lookup(outline is not None)
+        if outline is None:
+            outline = build_outline(path)
+            self._entries[key] = outline
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return outline
+
+
+def read_range(path: str, offset: int, length: int, encoding: str = "utf-8") -> Tuple[str, int]:
+    """Read ``length`` bytes at ``offset``; return the text and the offset it ends at."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return data.decode(encoding, errors="replace"), offset + len(data)
+
+
+def budgeted_view(path: str, max_tokens: int, outlines: OutlineCache, encoding: str = "utf-8") -> str:
+    """Head, outline and tail of ``path`` within roughly ``max_tokens`` tokens."""
+    size = os.path.getsize(path)
+    outline = outlines.get(path)
+    # Whole outline entries only, up to a quarter of the budget
+    entries, outline_budget = [], 0
+    for entry in outline.entries:
+        cost = count_tokens(entry) + 1
+        if outline_budget + cost > max_tokens // 4:
+            entries.append(f"... {len(outline.entries) - len(entries)} more entries")
+            break
+        entries.append(entry)
+        outline_budget += cost
+    outline_text = "\n".join(entries)
+    head_budget = (max_tokens - outline_budget) * 2 // 3
+    tail_budget = max_tokens - outline_budget - head_budget
+
+    head, _ = read_range(path, 0, head_budget * 8, encoding)
+    head = truncate_to_tokens(head, head_budget)
+    head_end = len(head.encode(encoding, errors="replace"))
+    tail_start = max(head_end, size - tail_budget * 8)
+    tail, _ = read_range(path, tail_start, size - tail_start, encoding)
+    tail = truncate_to_tokens(tail, tail_budget, from_end=True)
+    # Encoding the tail on its own would count a byte-order mark it does not have
+    tail_start = size - len(tail.encode(encoding, errors="replace")) + len("".encode(encoding))
+
+    parts = [
+        f"📄 '{path}' is too large to show in full ({size} bytes, {outline.lines} lines, {outline.kind}); "
+        f"showing head, outline and tail within {max_tokens} tokens.",
+        f"Read more with {{\"action\": \"read\", \"path\": \"{path}\", \"offset\": {head_end}, \"length\": 8192}}.",
+        f"{'-' * 14} head: bytes 0-{head_end} {'-' * 14}",
+        head,
+    ]
+    if outline_text:
+        parts += [f"{'-' * 14} outline (L<line> @<byte offset>) {'-' * 14}", outline_text]
+    parts += [f"{'-' * 14} tail: bytes {tail_start}-{size} {'-' * 14}", tail, "-" * 40]
+    return "\n".join(parts)
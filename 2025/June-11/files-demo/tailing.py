@@ -0,0 +1,86 @@
+"""Cheap access to the end of growing files for FileExplorerTool.
+
+``tail_lines`` seeks to the end of the file and reads backwards block by
+block until it has enough lines, so the cost depends on N, not on file size.
+
+``follow`` returns only what was appended since a cursor. The cursor
+``"<inode>:<offset>"`` is returned by ``tail``/``follow`` and passed back on the
+next poll; a changed inode (log rotation) or a file shorter than the offset
+(truncation) restarts from the beginning of the current file.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+BLOCK_SIZE = 64 * 1024
+MAX_FOLLOW_BYTES = 1024 * 1024
+
+
+@dataclass
+class FollowResult:
+    text: str
+    cursor: str
+    note: str = ""
+    truncated: bool = False  # more data is waiting beyond max_bytes
+
+
+def make_cursor(st: os.stat_result, offset: int) -> str:
+    return f"{st.st_ino}:{offset}"
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        inode, offset = cursor.split(":")
+        return int(inode), int(offset)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r} (expected '<inode>:<offset>')")
+
+
+def tail_lines(path: str, n: int = 10, block_size: int = BLOCK_SIZE) -> Tuple[List[str], str]:
+    """Return the last ``n`` lines of ``path`` and a cursor pointing at its end."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        end = st.st_size
+        position = end
+        chunks = []
+        newlines = 0
+        # A trailing newline ends the last line rather than starting an empty one
+        wanted = n + 1
+        while position > 0 and newlines < wanted:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size)
+            newlines += chunk.count(b"\n")
+            chunks.append(chunk)
+
+    data = b"".join(reversed(chunks))
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return (lines[-n:] if n > 0 else []), make_cursor(st, end)
+
+
+def follow(path: str, cursor: Optional[str] = None, max_bytes: int = MAX_FOLLOW_BYTES) -> FollowResult:
+    """Return text appended to ``path`` since ``cursor`` (from the current end if no cursor)."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if cursor is None:
+            return FollowResult("", make_cursor(st, st.st_size), "following from the current end")
+
+        inode, offset = parse_cursor(cursor)
+        note = ""
+        if inode != st.st_ino:
+            offset, note = 0, "file was replaced (rotated); reading the new file from the start"
+        elif offset > st.st_size:
+            offset, note = 0, "file was truncated; reading from the start"
+
+        f.seek(offset)
+        data = f.read(max_bytes)
+        more = offset + len(data) < st.st_size
+        if more:
+            # Stop at the last complete line so the next poll starts on a line boundary
+            cut = data.rfind(b"\n")
+            if cut >= 0:
+                data = data[:cut + 1]
+
+    return FollowResult(data.decode("utf-8", errors="replace"), make_cursor(st, offset + len(data)), note, more)
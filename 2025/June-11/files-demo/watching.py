@@ -0,0 +1,511 @@
+"""Change events under a folder for FileExplorerTool's ``watch`` action.
+
+An agent waiting for new files used to call ``list`` in a loop, re-reading
+every directory each time. A :class:`TreeWatcher` instead asks the kernel to
+report changes (Linux inotify, through ``ctypes``): one watch per directory,
+added recursively and for directories created or moved in later. A background
+thread blocks in ``poll()`` on the inotify descriptor, so an idle tree costs
+nothing but the kernel's watch memory.
+
+Events go into a bounded buffer (``FILE_AGENT_WATCH_EVENTS``, default 10000)
+with increasing sequence numbers. ``changes(cursor)`` returns what happened
+after the cursor and a new cursor ``"<watcher>:<seq>"`` to pass back next time:
+
+* Coalesced per path, in order: created then modified is one ``created``,
+  created then deleted is nothing, deleted then created is ``modified``, and a
+  rename pair (``IN_MOVED_FROM``/``IN_MOVED_TO``) is one ``moved`` with its
+  source, even when the kernel delivers the pair in two reads (an
+  unmatched ``IN_MOVED_FROM`` waits ``MOVE_WAIT`` seconds for its
+  ``IN_MOVED_TO`` before it counts as a delete). Repeated writes to a file that nobody has seen yet update one event
+  instead of adding more, so a busy log cannot flood the buffer.
+* Debounced: with a ``timeout`` the call waits for the first change and then
+  until the tree has been quiet for ``FILE_AGENT_WATCH_DEBOUNCE`` seconds
+  (default 0.2), so a burst (an unpacked archive, a save that writes a temp
+  file and renames it) comes back as one answer.
+* Lossy only visibly: if the buffer wrapped past the cursor, the kernel queue
+  overflowed, or the cursor comes from an earlier watcher, the result says
+  so and the caller should ``list`` again.
+
+Where inotify is missing (other platforms), its watch limit is reached, or
+``FILE_AGENT_WATCH_BACKEND=polling`` asks for it (network filesystems, whose
+remote changes inotify does not see), the watcher falls back to polling: each call scans the tree (entry types from
+``scandir``, one stat per file) and diffs it against the previous scan,
+matching inodes to report moves. If the reader thread fails later, the
+watcher switches to polling the same way and says so in ``note``.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+MAX_EVENTS = int(os.getenv("FILE_AGENT_WATCH_EVENTS", "10000"))
+DEBOUNCE = float(os.getenv("FILE_AGENT_WATCH_DEBOUNCE", "0.2"))
+MAX_DEBOUNCE = 10 * DEBOUNCE  # a tree that never settles is reported anyway
+POLL_INTERVAL = 0.5  # seconds between scans while the polling fallback waits
+MOVE_WAIT = 0.1  # seconds an unmatched IN_MOVED_FROM waits for its IN_MOVED_TO
+MAX_TIMEOUT = 300.0
+
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".file_agent_index", ".file_agent_journal"}
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = (IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of NUL-padded name
+READ_SIZE = 64 * 1024
+
+
+@dataclass
+class Event:
+    seq: int
+    kind: str  # "created", "modified", "deleted" or "moved"
+    path: str  # relative to the watched folder
+    src: Optional[str] = None  # where a moved entry came from
+    time: float = 0.0
+
+
+@dataclass
+class Changes:
+    events: List[Tuple[str, str, Optional[str]]]  # (kind, path, src), in order of their last change
+    cursor: str
+    note: str = ""
+    more: bool = False  # stopped at ``limit``; call again with ``cursor``
+
+
+class _Inotify:
+    """Thin ctypes binding of inotify_init1/inotify_add_watch/inotify_rm_watch."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def remove(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)  # fails harmlessly if the kernel already dropped it
+
+    def read(self) -> List[Tuple[int, int, int, str]]:
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _fold(state: Dict[str, List], event: Event) -> None:
+    """Apply ``event`` to the per-path result: path -> [kind, src, last seq]."""
+    if event.kind == "moved":
+        # Pending changes below a moved directory now live under its new name
+        prefix = event.src + os.sep
+        for path in [path for path in state if path.startswith(prefix)]:
+            state[event.path + path[len(event.src):]] = state.pop(path)
+        previous = state.pop(event.src, None)
+        if previous is not None and previous[0] == "created":
+            state[event.path] = ["created", None, event.seq]
+            return
+        origin = previous[1] if previous is not None and previous[0] == "moved" else event.src
+        if origin == event.path:
+            state.pop(event.path, None)  # moved back where it was
+        else:
+            state[event.path] = ["moved", origin, event.seq]
+        return
+    previous = state.get(event.path)
+    kind = event.kind
+    if previous is not None:
+        if previous[0] == "created":
+            if kind == "deleted":
+                del state[event.path]  # came and went
+                return
+            kind = "created"
+        elif previous[0] == "deleted" and kind == "created":
+            kind = "modified"  # replaced
+        elif previous[0] == "moved" and kind == "modified":
+            previous[2] = event.seq
+            return
+    state[event.path] = [kind, None, event.seq]
+
+
+class TreeWatcher:
+    """Change events under ``root``; see the module docstring."""
+
+    def __init__(self, root: str, max_events: int = MAX_EVENTS, skip_dirs=SKIP_DIRS, backend: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.skip_dirs = skip_dirs
+        self.token = uuid.uuid4().hex[:8]
+        self.last_used = time.monotonic()
+        self._events: Deque[Event] = deque(maxlen=max_events)
+        self._seq = 0
+        self._delivered = 0  # highest seq handed to a caller; later events may still be merged
+        self._unseen: Dict[str, Event] = {}  # path -> its last undelivered event
+        self._lost_at = 0  # last seq before which events were dropped by the kernel
+        self._cond = threading.Condition()
+        self._closed = False
+        self._inotify: Optional[_Inotify] = None
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> directory, relative to root
+        self._moved_from: Dict[int, Tuple[str, bool, float]] = {}  # cookie -> (path, is_dir, when)
+        self._snapshot: Dict[str, Tuple[bool, int, int, int]] = {}
+        self.note = ""
+        self.backend = backend or os.getenv("FILE_AGENT_WATCH_BACKEND", "inotify")
+        if self.backend != "polling":
+            try:
+                self._inotify = _Inotify()
+                self._watch_tree("", report=False)
+                self._wake_r, self._wake_w = os.pipe()
+                threading.Thread(target=self._read_loop, name=f"watch:{self.root}", daemon=True).start()
+                self.backend = "inotify"
+            except (OSError, AttributeError) as e:
+                # No inotify (AttributeError: not in this libc) or out of watches (ENOSPC)
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+                self._dirs.clear()
+                self.backend = "polling"
+                self.note = f"inotify unavailable ({e}), polling"
+        if self.backend == "polling":
+            self._snapshot = self._scan()
+
+    def __repr__(self) -> str:
+        return f"TreeWatcher({self.root!r}, backend={self.backend!r})"
+
+    @property
+    def watches(self) -> int:
+        return len(self._dirs)
+
+    def close(self) -> None:
+        self._closed = True
+        if self._inotify is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass  # the reader thread already ended
+
+    # Recording -------------------------------------------------------------
+
+    def _record(self, kind: str, path: str, src: Optional[str] = None) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if kind == "modified":
+                last = self._unseen.get(path)
+                if last is not None and last.kind in ("created", "modified") and last.seq > self._delivered:
+                    last.time = now  # nobody has seen it: same answer, no new event
+                    self._cond.notify_all()
+                    return
+            self._seq += 1
+            event = Event(self._seq, kind, path, src, now)
+            self._events.append(event)
+            self._unseen[path] = event
+            self._cond.notify_all()
+
+    def _lost(self) -> None:
+        with self._cond:
+            self._lost_at = self._seq + 1
+
+    # inotify ----------------------------------------------------------------
+
+    def _watch_tree(self, rel: str, report: bool) -> None:
+        """Watch ``rel`` and every directory below it; with ``report``, record what is already there."""
+        stack = [rel]
+        while stack:
+            directory = stack.pop()
+            try:
+                wd = self._inotify.add(os.path.join(self.root, directory) if directory else self.root)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise  # out of watches: the caller falls back to polling
+                continue  # vanished or unreadable
+            self._dirs[wd] = directory
+            try:
+                with os.scandir(os.path.join(self.root, directory) if directory else self.root) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+            for entry in entries:
+                child = os.path.join(directory, entry.name) if directory else entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_dir and entry.name in self.skip_dirs:
+                    continue
+                if report:
+                    # Created before the watch on its parent existed
+                    self._record("created", child)
+                if is_dir:
+                    stack.append(child)
+
+    def _forget_tree(self, rel: str, remove: bool) -> None:
+        prefix = rel + os.sep
+        for wd, directory in list(self._dirs.items()):
+            if directory == rel or directory.startswith(prefix):
+                del self._dirs[wd]
+                if remove:
+                    self._inotify.remove(wd)
+
+    def _rename_tree(self, src: str, dst: str) -> None:
+        prefix = src + os.sep
+        for wd, directory in self._dirs.items():
+            if directory == src:
+                self._dirs[wd] = dst
+            elif directory.startswith(prefix):
+                self._dirs[wd] = dst + directory[len(src):]
+
+    def _read_loop(self) -> None:
+        try:
+            poller = select.poll()
+            poller.register(self._inotify.fd, select.POLLIN)
+            poller.register(self._wake_r, select.POLLIN)
+            while not self._closed:
+                # Blocks without a timeout (no work while nothing changes) unless a move waits for its pair
+                poller.poll(MOVE_WAIT * 1000 if self._moved_from else None)
+                if self._closed:
+                    break
+                try:
+                    self._handle(self._inotify.read())
+                except OSError as e:
+                    if e.errno != errno.ENOSPC:
+                        raise
+                    self._lost()  # out of watches for new directories: report the gap
+        except Exception as e:
+            # Without the thread nothing would ever be recorded again: poll instead
+            self._fall_back(e)
+        finally:
+            inotify, self._inotify = self._inotify, None
+            inotify.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _fall_back(self, error: Exception) -> None:
+        """Switch to polling after the reader thread failed; callers are told to resync."""
+        snapshot = self._scan()
+        with self._cond:
+            self._snapshot = snapshot
+            self._dirs.clear()
+            self._moved_from.clear()
+            self.backend = "polling"
+            self.note = f"inotify failed ({error!r}), polling"
+            self._lost_at = self._seq + 1
+            self._cond.notify_all()
+
+    def _handle(self, raw: List[Tuple[int, int, int, str]]) -> None:
+        moved_from = self._moved_from
+        for wd, mask, cookie, name in raw:
+            if mask & IN_Q_OVERFLOW:
+                self._lost()
+                self._watch_tree("", report=False)  # directories created meanwhile may be unwatched
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue  # events about a watched directory itself arrive at its parent too
+            path = os.path.join(directory, name) if directory else name
+            is_dir = bool(mask & IN_ISDIR)
+            if is_dir and name in self.skip_dirs:
+                continue
+            if mask & IN_CREATE:
+                self._record("created", path)
+                if is_dir:
+                    self._watch_tree(path, report=True)
+            elif mask & IN_MODIFY:
+                self._record("modified", path)
+            elif mask & IN_DELETE:
+                self._record("deleted", path)
+            elif mask & IN_MOVED_FROM:
+                moved_from[cookie] = (path, is_dir, time.monotonic())
+            elif mask & IN_MOVED_TO:
+                source = moved_from.pop(cookie, None)
+                if source is not None:
+                    self._record("moved", path, source[0])
+                    if is_dir:
+                        self._rename_tree(source[0], path)
+                else:
+                    # Moved in from outside the tree
+                    self._record("created", path)
+                    if is_dir:
+                        self._watch_tree(path, report=True)
+        expired = time.monotonic() - MOVE_WAIT
+        for cookie, (path, is_dir, when) in list(moved_from.items()):
+            if when > expired:
+                continue  # its IN_MOVED_TO may be in the next read
+            # Moved out of the tree (the kernel keeps watching it elsewhere, so drop those watches)
+            del moved_from[cookie]
+            self._record("deleted", path)
+            if is_dir:
+                self._forget_tree(path, remove=True)
+
+    # Polling fallback ---------------------------------------------------------
+
+    def _scan(self) -> Dict[str, Tuple[bool, int, int, int]]:
+        """rel path -> (is_dir, mtime_ns, size, inode) for everything under the root."""
+        snapshot = {}
+        stack = [""]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, directory) if directory else self.root) as entries:
+                    for entry in entries:
+                        child = os.path.join(directory, entry.name) if directory else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in self.skip_dirs:
+                                continue
+                            snapshot[child] = (True, 0, 0, entry.inode())
+                            stack.append(child)
+                        else:
+                            try:
+                                st = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            snapshot[child] = (False, st.st_mtime_ns, st.st_size, st.st_ino)
+            except OSError:
+                continue
+        return snapshot
+
+    def _rescan(self) -> None:
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+        gone = {path: info for path, info in previous.items() if path not in current}
+        by_inode = {info[3]: path for path, info in gone.items()}
+        moved_dirs = {}
+        # Parents come before their children in a scan, so a moved directory is seen first
+        for path, info in current.items():
+            old = previous.get(path)
+            if old is None:
+                source = by_inode.pop(info[3], None)
+                if source is not None and gone[source][0] == info[0]:
+                    del gone[source]
+                    if info[0]:
+                        moved_dirs[source] = path
+                    parent = moved_dirs.get(os.path.dirname(source))
+                    if parent is None or os.path.join(parent, os.path.basename(source)) != path:
+                        self._record("moved", path, source)  # not just carried along by its folder
+                else:
+                    self._record("created", path)
+            elif not info[0] and (old[1], old[2]) != (info[1], info[2]):
+                self._record("modified", path)
+        for path in gone:
+            self._record("deleted", path)
+
+    # Reading ----------------------------------------------------------------
+
+    def cursor(self) -> str:
+        return f"{self.token}:{self._seq}"
+
+    def changes(self, cursor: Optional[str] = None, timeout: float = 0.0, limit: int = 200) -> Changes:
+        """Changes after ``cursor`` (None: start watching now); waits up to ``timeout`` seconds for one."""
+        self.last_used = time.monotonic()
+        if self.backend == "polling":
+            self._rescan()
+        if cursor is None:
+            return Changes([], self.cursor(), self.note)
+        note = ""
+        try:
+            token, seq = cursor.rsplit(":", 1)
+            start = int(seq)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r} (expected the cursor a previous watch returned)")
+        if token != self.token:
+            # Another watcher (the agent restarted): its events are gone
+            note = "the watch was restarted, changes before it are missing; list the folder to resync"
+            start = 0
+
+        timeout = min(max(float(timeout or 0), 0.0), MAX_TIMEOUT)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= start and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self.backend == "polling":
+                    self._cond.release()
+                    try:
+                        time.sleep(min(POLL_INTERVAL, remaining))
+                        self._rescan()
+                    finally:
+                        self._cond.acquire()
+                else:
+                    self._cond.wait(remaining)
+            if self._seq > start and timeout:
+                self._settle()
+
+            if self._events and self._events[0].seq > start + 1 or self._lost_at > start:
+                note = "some changes were dropped (too many at once); list the folder to resync"
+            first = self._events[0].seq if self._events else self._seq + 1
+            state: Dict[str, List] = {}
+            last = start
+            more = False
+            for event in islice(self._events, max(start + 1 - first, 0), None):
+                if event.path not in state and (event.src is None or event.src not in state) and len(state) >= limit:
+                    more = True
+                    break
+                _fold(state, event)
+                last = event.seq
+            self._delivered = max(self._delivered, last)
+            self._unseen = {path: event for path, event in self._unseen.items() if event.seq > self._delivered}
+
+        events = [(kind, path, src) for path, (kind, src, _) in sorted(state.items(), key=lambda item: item[1][2])]
+        return Changes(events, f"{self.token}:{last}", note or self.note, more)
+
+    def _settle(self) -> None:
+        """Wait (holding the condition) until nothing changed for DEBOUNCE seconds, or MAX_DEBOUNCE passed."""
+        give_up = time.monotonic() + MAX_DEBOUNCE
+        while True:
+            newest = max(self._events[-1].time if self._events else 0.0,
+                         max((event.time for event in self._unseen.values()), default=0.0))
+            now = time.monotonic()
+            quiet = newest + DEBOUNCE - now
+            if quiet <= 0 or now >= give_up:
+                return
+            if self.backend == "polling":
+                self._cond.release()
+                try:
+                    time.sleep(min(quiet, POLL_INTERVAL))
+                    before = self._seq
+                    self._rescan()
+                finally:
+                    self._cond.acquire()
+                if self._seq == before:
+                    return
+            else:
+                self._cond.wait(min(quiet, give_up - now))
@@ -0,0 +1,277 @@
+"""Workspace-rooted path resolution for FileExplorerTool.
+
+Every path an action names is resolved against one workspace root
+(``FILE_AGENT_ROOT``, default: the working directory) before the handler
+touches it, and paths that would leave the root are refused:
+
+* ``..`` is resolved lexically, and absolute paths must lie under the root.
+* The remaining components are walked relative to directory descriptors
+  (``fstatat``/``openat`` with ``O_NOFOLLOW``), so a symlink is never followed
+  by the kernel behind our back. Symlinks met on the way are expanded by hand
+  and their targets must stay inside the root too; at most ``MAX_SYMLINKS``
+  are followed, as in the kernel.
+* The last component is not followed: the resolved path still names the link,
+  so deleting or moving it acts on the link. Its target is checked and gives
+  the reported kind, which is what ``os.path.isdir`` and friends would say.
+
+Components that do not exist yet are allowed (for create and write actions).
+
+Results (kind, device, inode) are cached in a bounded LRU keyed by the path
+relative to the root, for the current action only: the handler's own
+existence and type checks, and the walks for paths below one already
+resolved, start from there. The tool invalidates entries when its own
+actions change them.
+
+Limitation: this is a check, not a handle. Handlers reopen the returned
+path string, so another process that swaps a checked directory for a
+symlink between the check and the use can still redirect it. Keeping
+results for a single action keeps that window as short as the action.
+
+On platforms without ``dir_fd`` support (Windows), paths are checked with
+``os.path.realpath`` instead.
+"""
+
+import errno
+import os
+import stat
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+MAX_SYMLINKS = 40
+CACHE_ENTRIES = int(os.getenv("FILE_AGENT_PATH_CACHE", "4096"))
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_CLOEXEC", 0)
+_DIR_FD = {os.open, os.stat, os.readlink} <= os.supports_dir_fd
+
+
+class PathEscapeError(PermissionError):
+    """A path that resolves outside the workspace root."""
+
+
+class Resolved(NamedTuple):
+    """A path checked against the workspace.
+
+    ``path`` is what handlers pass to the OS: relative to the working
+    directory when the caller gave a relative path and the root is the
+    working directory, absolute otherwise. ``kind`` is ``"file"``, ``"dir"``,
+    ``"other"`` or None when the path does not exist.
+    """
+
+    path: str
+    rel: str
+    kind: Optional[str]
+    dev: int = 0
+    ino: int = 0
+
+
+def _kind(mode: int) -> str:
+    if stat.S_ISDIR(mode):
+        return "dir"
+    if stat.S_ISREG(mode):
+        return "file"
+    return "other"
+
+
+def _join(rel: str, name: str) -> str:
+    return name if rel == "." else rel + os.sep + name
+
+
+class Workspace:
+    """Resolves and caches paths under ``root``; see the module docstring."""
+
+    def __init__(self, root: str, entries: int = CACHE_ENTRIES):
+        self.given_root = os.path.abspath(root)
+        self.root = os.path.realpath(root)
+        self.entries = entries
+        self.hits = 0
+        self.misses = 0
+        # rel -> (Resolved, action it was resolved in)
+        self._cache: "OrderedDict[str, Tuple[Resolved, int]]" = OrderedDict()
+        # Lexical part of resolve (``..``, absolute paths): depends only on the string
+        self._lexical: Dict[str, str] = {}
+        self._action = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.root!r})"
+
+    def begin_action(self) -> None:
+        """Start a new tool action: forget what earlier actions resolved."""
+        with self._lock:
+            self._action += 1
+
+    def relative(self, path: str) -> str:
+        """``path`` relative to the root, with ``..`` resolved lexically; raises PathEscapeError."""
+        rel = self._lexical.get(path)
+        if rel is not None:
+            return rel
+        if "\0" in path:
+            raise PathEscapeError(f"Path contains a NUL byte: {path!r}")
+        absolute = os.path.normpath(path if os.path.isabs(path) else os.path.join(self.root, path))
+        for root in (self.root, self.given_root):
+            if absolute == root:
+                rel = "."
+            elif absolute.startswith(root.rstrip(os.sep) + os.sep):
+                rel = absolute[len(root.rstrip(os.sep)) + 1:]
+            else:
+                continue
+            if len(self._lexical) >= self.entries:
+                self._lexical.clear()
+            self._lexical[path] = rel
+            return rel
+        raise PathEscapeError(f"Path is outside the workspace {self.root}: {absolute}")
+
+    def resolve(self, path: str) -> Resolved:
+        """Check ``path`` against the workspace and return where it points.
+
+        The result is only valid when it is returned: see the limitation in
+        the module docstring.
+        """
+        rel = self.relative(path)
+        with self._lock:
+            resolved = self._lookup(rel)
+        if resolved is None:
+            self.misses += 1
+            resolved = self._walk(rel, 0) if _DIR_FD else self._realpath(rel)
+        else:
+            self.hits += 1
+        return resolved._replace(path=self._os_path(path, resolved.rel))
+
+    def kind(self, path: str) -> Optional[str]:
+        """``"file"``, ``"dir"``, ``"other"`` or None, from the cache where possible."""
+        return self.resolve(path).kind
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Forget ``path`` and everything cached below it, or the whole cache."""
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                return
+            try:
+                rel = self.relative(path)
+            except PathEscapeError:
+                return
+            entry = self._cache.pop(rel, None)
+            if rel == ".":
+                self._cache.clear()
+            elif entry is None or entry[0].kind == "dir":
+                # Only directories (or paths we know nothing about) have cached children
+                prefix = rel + os.sep
+                for key in [key for key in self._cache if key.startswith(prefix)]:
+                    del self._cache[key]
+
+    def _os_path(self, given: str, rel: str) -> str:
+        if not os.path.isabs(given) and os.getcwd() == self.root:
+            return rel
+        return self.root if rel == "." else os.path.join(self.root, rel)
+
+    # Cache ---------------------------------------------------------------
+
+    def _lookup(self, rel: str) -> Optional[Resolved]:
+        entry = self._cache.get(rel)
+        if entry is None:
+            return None
+        resolved, action = entry
+        if action != self._action:
+            del self._cache[rel]
+            return None
+        self._cache.move_to_end(rel)
+        return resolved
+
+    def _remember(self, resolved: Resolved) -> None:
+        with self._lock:
+            self._cache[resolved.rel] = (resolved, self._action)
+            self._cache.move_to_end(resolved.rel)
+            while len(self._cache) > self.entries:
+                self._cache.popitem(last=False)
+
+    def _cached_dir(self, parts) -> Tuple[int, str]:
+        """Deepest cached ancestor directory of ``parts``: (components consumed, rel)."""
+        with self._lock:
+            for i in range(len(parts) - 1, 0, -1):
+                rel = os.sep.join(parts[:i])
+                resolved = self._lookup(rel)
+                if resolved is not None and resolved.kind == "dir":
+                    return i, rel
+        return 0, "."
+
+    # Resolution ------------------------------------------------------------
+
+    def _walk(self, rel: str, hops: int) -> Resolved:
+        parts = [] if rel == "." else rel.split(os.sep)
+        start, current = self._cached_dir(parts)
+        fd = os.open(self.root if current == "." else os.path.join(self.root, current), _DIR_FLAGS)
+        try:
+            if not parts:
+                st = os.fstat(fd)
+                resolved = Resolved("", ".", "dir", st.st_dev, st.st_ino)
+                self._remember(resolved)
+                return resolved
+            for i in range(start, len(parts)):
+                name, last = parts[i], i == len(parts) - 1
+                try:
+                    st = os.stat(name, dir_fd=fd, follow_symlinks=False)
+                except FileNotFoundError:
+                    # Not created yet: the rest is taken as written
+                    missing = os.sep.join(parts[i:] if current == "." else [current] + parts[i:])
+                    resolved = Resolved("", missing, None)
+                    self._remember(resolved)
+                    return resolved
+                child = _join(current, name)
+                if stat.S_ISLNK(st.st_mode):
+                    hops += 1
+                    if hops > MAX_SYMLINKS:
+                        raise OSError(errno.ELOOP, "Too many levels of symbolic links", child)
+                    target = os.readlink(name, dir_fd=fd)
+                    base = self.root if current == "." else os.path.join(self.root, current)
+                    target_rel = self.relative(os.path.join(base, target))
+                    if last:
+                        # The link itself is the result (not cached); its target gives the kind
+                        target = self._walk(target_rel, hops)
+                        return Resolved("", child, target.kind, target.dev, target.ino)
+                    # Continue from the target; results are cached under the target's path
+                    return self._walk(os.path.join(target_rel, *parts[i + 1:]), hops)
+                kind = _kind(st.st_mode)
+                resolved = Resolved("", child, kind, st.st_dev, st.st_ino)
+                if last or kind != "dir":
+                    if not last:
+                        # A file in the middle of the path: nothing below it exists
+                        resolved = Resolved("", rel, None)
+                    self._remember(resolved)
+                    return resolved
+                self._remember(resolved)
+                next_fd = os.open(name, _DIR_FLAGS, dir_fd=fd)
+                os.close(fd)
+                fd, current = next_fd, child
+        finally:
+            os.close(fd)
+        raise AssertionError("unreachable")
+
+    def _realpath(self, rel: str) -> Resolved:
+        path = os.path.join(self.root, rel) if rel != "." else self.root
+        real = os.path.realpath(path)
+        self.relative(real)
+        try:
+            st = os.stat(real)
+        except OSError:
+            return Resolved("", rel, None)
+        resolved = Resolved("", rel, _kind(st.st_mode), st.st_dev, st.st_ino)
+        self._remember(resolved)
+        return resolved
+
+
+_workspaces: Dict[str, Workspace] = {}
+_workspaces_lock = threading.Lock()
+
+
+def open_workspace(root: Optional[str] = None) -> Workspace:
+    """The shared Workspace for ``root`` (default: ``FILE_AGENT_ROOT`` or the working directory)."""
+    root = root or os.getenv("FILE_AGENT_ROOT") or os.getcwd()
+    workspace = _workspaces.get(root)
+    if workspace is None:
+        with _workspaces_lock:
+            real = os.path.realpath(root)
+            workspace = next((w for w in _workspaces.values() if w.root == real), None) or Workspace(root)
+            _workspaces[root] = workspace
+    return workspace
@@ -0,0 +1,43 @@
+"""Put the June-11 demos on ``sys.path`` for their tests.
+
+The demo directories have hyphens in their names, so their modules are
+imported the way the scripts themselves import them: ``agent_common`` from
+the June-11 directory and the file-agent modules (``journal``, ``workspace``,
+...) from ``files-demo``. ``file_tool`` is a ``FileExplorerTool`` rooted in a
+temporary workspace, loaded like the benchmarks load it.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+DEMO_ROOT = Path(__file__).resolve().parent.parent
+
+for path in (DEMO_ROOT, DEMO_ROOT / "files-demo"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A temporary workspace root, also the working directory."""
+    monkeypatch.setenv("FILE_AGENT_ROOT", str(tmp_path))
+    monkeypatch.setenv("FILE_AGENT_HASH_CACHE", str(tmp_path / "hashes.json"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def file_tool(workspace):
+    if str(DEMO_ROOT / "benchmarks") not in sys.path:
+        sys.path.insert(0, str(DEMO_ROOT / "benchmarks"))
+    from demos import load_demo
+
+    return load_demo("files").FileExplorerTool()
+
+
+def run_action(tool, **request) -> str:
+    """Run one file-tool action given as keyword arguments."""
+    return tool._run(json.dumps(request))
@@ -0,0 +1,93 @@
+import base64
+import codecs
+
+import pytest
+
+from conftest import run_action
+
+import binary_view
+
+
+@pytest.mark.parametrize("block, encoding", [
+    (codecs.BOM_UTF32_LE + "hi".encode("utf-32-le"), "utf-32"),  # starts with the UTF-16 LE BOM
+    (codecs.BOM_UTF16_BE + "hi".encode("utf-16-be"), "utf-16"),
+    (codecs.BOM_UTF8 + b"hi", "utf-8-sig"),
+    ("plain text, no BOM at all\n".encode("utf-16-le"), "utf-16-le"),
+    ("na\xefve caf\xe9 r\xe9sum\xe9\n".encode("utf-8"), "utf-8"),
+    ("Der Stra\xdfenbahnfahrer tr\xe4gt eine gr\xfcne M\xfctze\n".encode("cp1252"), "cp1252"),
+    (b"", "utf-8"),
+])
+def test_sniff_text_encodings(block, encoding):
+    sniff = binary_view.sniff_bytes(block)
+    assert (sniff.binary, sniff.encoding) == (False, encoding)
+
+
+@pytest.mark.parametrize("block, description", [
+    (b"\x89PNG\r\n\x1a\n" + bytes(100), "PNG image"),
+    (b"\x7fELF\x02\x01\x01" + bytes(50), "ELF executable"),
+    (bytes(range(256)) * 4, "binary data"),
+])
+def test_sniff_binaries(block, description):
+    sniff = binary_view.sniff_bytes(block)
+    assert (sniff.binary, sniff.encoding, sniff.description) == (True, None, description)
+
+
+def test_hex_and_base64_windows():
+    data = b"GIF89a\x00\x01hello, world!\n"
+    assert binary_view.hex_window(data, offset=0x100).splitlines() == [
+        "00000100: 4749 4638 3961 0001 6865 6c6c 6f2c 2077  GIF89a..hello, w",
+        "00000110: 6f72 6c64 210a                           orld!.",
+    ]
+    encoded = binary_view.base64_window(bytes(range(256)))
+    assert max(len(line) for line in encoded.splitlines()) == 76
+    assert base64.b64decode(encoded.replace("\n", "")) == bytes(range(256))
+
+
+def test_read_window_is_capped_and_clamped(tmp_path, monkeypatch):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(bytes(range(256)) * 10)
+    monkeypatch.setattr(binary_view, "MAX_WINDOW_BYTES", 100)
+    assert binary_view.read_window(str(path), 250, 1000) == (bytes(range(250, 256)) + bytes(range(94)), 2560)
+    assert binary_view.read_window(str(path), 10_000, 10) == (b"", 2560)
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert binary_view.read_window(str(empty), 0, 10) == (b"", 0)
+
+
+def test_compile_query_folds_case_in_the_file_encoding():
+    regex = binary_view.compile_query("MÜNCHEN", "latin-1")
+    assert regex.search("Bahnhof M\xfcnchen Ost".encode("latin-1"))
+    assert not regex.search("Bahnhof M\xfcnchen Ost".encode("utf-8"))
+    assert binary_view.compile_query("MÜNCHEN", "utf-8").search("m\xfcnchen".encode("utf-8"))
+    assert not binary_view.compile_query("abc", ignore_case=False).search(b"ABC")
+    assert binary_view.compile_query("hex:de ad BE EF").search(b"..\xde\xad\xbe\xef..").start() == 2
+    with pytest.raises(ValueError):
+        binary_view.compile_query("hex:zz")
+    with pytest.raises(ValueError):
+        binary_view.compile_query("")
+
+
+def test_search_reports_lines_and_totals(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"".join(b"line %d ok\n" % i if i % 3 else b"line %d ERROR ERROR\n" % i for i in range(1, 31)))
+    matches, total = binary_view.search(str(path), binary_view.compile_query("error"), max_matches=2)
+    assert total == 10  # each matching line once
+    assert [(m.line_number, m.line) for m in matches] == [(3, b"line 3 ERROR ERROR"), (6, b"line 6 ERROR ERROR")]
+    assert path.read_bytes()[matches[1].offset:].startswith(b"ERROR")
+
+    matches, total = binary_view.search(str(path), binary_view.compile_query("hex:4552"), lines=False)
+    assert total == 20 and matches[0].line_number == 0
+
+
+def test_read_action_shows_binaries_and_decodes_legacy_text(file_tool, workspace):
+    (workspace / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(64)))
+    (workspace / "notes.txt").write_bytes("Gr\xfc\xdfe aus K\xf6ln, sch\xf6ne Stra\xdfe\n".encode("cp1252"))
+
+    shown = run_action(file_tool, action="read", path="logo.png")
+    assert "PNG image" in shown and "00000000: 8950 4e47" in shown
+    shown = run_action(file_tool, action="read", path="logo.png", format="base64", offset=8, length=4)
+    assert base64.b64encode(bytes(range(4))).decode() in shown
+
+    shown = run_action(file_tool, action="read", path="notes.txt")
+    assert "Grüße aus Köln" in shown and "cp1252" in shown
+    assert "Köln" in run_action(file_tool, action="query_file", path="notes.txt", query="KÖLN")
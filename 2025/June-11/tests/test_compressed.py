@@ -0,0 +1,78 @@
+import bz2
+import gzip
+import lzma
+import os
+
+import pytest
+
+import compressed
+
+LINES = [f"{i:05d} {'error' if i % 100 == 0 else 'ok'} request" for i in range(5000)]
+TEXT = ("\n".join(LINES) + "\n").encode()
+OPENERS = {"gzip": gzip.compress, "xz": lzma.compress, "bzip2": bz2.compress}
+
+
+@pytest.fixture(params=sorted(OPENERS))
+def packed(request, tmp_path):
+    # No telling extension: detection goes by magic bytes
+    path = tmp_path / "app.log.1"
+    path.write_bytes(OPENERS[request.param](TEXT))
+    return request.param, str(path)
+
+
+def test_detect_by_magic_bytes(packed, tmp_path):
+    kind, path = packed
+    assert compressed.detect(path) == kind
+    plain = tmp_path / "plain.gz"
+    plain.write_text("not really gzip")
+    assert compressed.detect(str(plain)) is None
+
+
+def test_lines_survive_chunk_boundaries(packed, monkeypatch):
+    monkeypatch.setattr(compressed, "CHUNK_SIZE", 7)
+    _, path = packed
+    assert list(compressed.iter_lines(path)) == LINES
+
+
+def test_read_text_with_offset(packed):
+    _, path = packed
+    text, truncated = compressed.read_text(path, max_bytes=100, offset=len(LINES[0]) + 1)
+    assert truncated
+    assert text == TEXT[len(LINES[0]) + 1:][:100].decode()
+
+
+def test_tail_lines(packed):
+    _, path = packed
+    assert compressed.tail_lines(path, 3) == LINES[-3:]
+
+
+def test_search_stops_after_max_matches(packed):
+    _, path = packed
+    matches, more = compressed.search(path, "ERROR", max_matches=5)
+    assert more
+    assert [m.line_number for m in matches] == [1, 101, 201, 301, 401]
+
+
+def test_grep_tree_searches_plain_and_compressed_files_in_order(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a.log").write_text("first match\nnothing\n")
+    (tmp_path / "b" / "c.log.gz").write_bytes(gzip.compress(b"second match\n"))
+    (tmp_path / "image.bin").write_bytes(b"match\0\0\0")
+    (tmp_path / ".file_agent_journal").mkdir()
+    (tmp_path / ".file_agent_journal" / "old.txt").write_text("match in the journal\n")
+
+    matches, searched, more = compressed.grep_tree(str(tmp_path), "MATCH")
+    assert [(os.path.basename(path), m.line) for path, m in matches] == [
+        ("a.log", "first match"), ("c.log.gz", "second match")]
+    assert not more
+
+
+def test_zstd_frames_are_decompressed_in_order(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    # Several independent frames, as concatenated rotations produce
+    frames = [compressor.compress(("\n".join(LINES[i:i + 1000]) + "\n").encode()) for i in range(0, 5000, 1000)]
+    path = tmp_path / "app.log.zst"
+    path.write_bytes(b"".join(frames))
+    assert len(compressed.zstd_frames(path.read_bytes())) == 5
+    assert list(compressed.iter_lines(str(path), workers=3)) == LINES
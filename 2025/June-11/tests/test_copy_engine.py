@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import copy_engine
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    # No reflinks, so the copy goes through copy_file_range and what follows
+    monkeypatch.setattr(copy_engine, "fcntl", None)
+    path = tmp_path / "source.bin"
+    path.write_bytes(os.urandom(200_000))
+    return path
+
+
+def test_copy_file_range_returning_zero_falls_back(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0, raising=False)
+    destination = tmp_path / "copy.bin"
+    result = copy_engine.copy_file(str(source), str(destination))
+    assert destination.read_bytes() == source.read_bytes()
+    assert result.method != "copy_file_range"
+
+
+def test_sendfile_returning_zero_falls_back_to_userspace(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0, raising=False)
+    monkeypatch.setattr(os, "sendfile", lambda *args: 0, raising=False)
+    destination = tmp_path / "copy.bin"
+    result = copy_engine.copy_file(str(source), str(destination))
+    assert destination.read_bytes() == source.read_bytes()
+    assert result.method == "userspace"
+    assert result.bytes_copied == source.stat().st_size
+
+
+def test_short_copy_is_restarted_from_the_beginning(source, tmp_path, monkeypatch):
+    real = os.copy_file_range
+    calls = []
+
+    def short_copy(src, dst, count, *args):
+        calls.append(count)
+        return real(src, dst, min(count, 1000)) if len(calls) == 1 else 0
+
+    monkeypatch.setattr(os, "copy_file_range", short_copy)
+    destination = tmp_path / "copy.bin"
+    copy_engine.copy_file(str(source), str(destination))
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_file_with_unknown_size_is_read(tmp_path):
+    if not os.path.exists("/proc/self/status"):
+        pytest.skip("no procfs")
+    destination = tmp_path / "status"
+    result = copy_engine.copy_file("/proc/self/status", str(destination), preserve_metadata=False)
+    assert result.bytes_copied > 0
+    assert b"Name:" in destination.read_bytes()
+
+
+def test_copy_tree_resume_skips_finished_files(tmp_path):
+    source = tmp_path / "src"
+    (source / "sub").mkdir(parents=True)
+    for name in ("a.txt", "sub/b.txt"):
+        (source / name).write_text(name)
+    destination = tmp_path / "dst"
+
+    first = copy_engine.copy_tree(str(source), str(destination))
+    assert first.files_copied == 2 and not first.errors
+    (source / "sub" / "c.txt").write_text("new")
+    second = copy_engine.copy_tree(str(source), str(destination), resume=True)
+    assert (second.files_copied, second.files_skipped) == (1, 2)
+    assert (destination / "sub" / "c.txt").read_text() == "new"
+    assert not list(destination.rglob("*" + copy_engine.PARTIAL_SUFFIX))
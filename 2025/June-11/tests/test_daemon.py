@@ -0,0 +1,104 @@
+import os
+import stat
+import tempfile
+import threading
+
+import pytest
+
+from agent_common import daemon
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="Unix sockets and user ids")
+
+
+@pytest.fixture
+def shared_tmp(tmp_path, monkeypatch):
+    """A stand-in for the shared temp directory, with no XDG_RUNTIME_DIR."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.delenv("AGENT_DAEMON_SOCKET", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def test_default_socket_lives_in_a_private_directory(shared_tmp):
+    path = daemon.socket_path()
+    directory = os.path.dirname(path)
+    assert os.path.dirname(directory) == str(shared_tmp)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def test_directory_open_to_others_is_refused(shared_tmp):
+    (shared_tmp / f"agents-{os.getuid()}").mkdir()
+    os.chmod(shared_tmp / f"agents-{os.getuid()}", 0o755)
+    with pytest.raises(daemon.DaemonUntrusted):
+        daemon.socket_path()
+
+
+def test_planted_symlink_directory_is_refused(shared_tmp):
+    target = shared_tmp / "elsewhere"
+    target.mkdir(mode=0o700)
+    (shared_tmp / f"agents-{os.getuid()}").symlink_to(target)
+    with pytest.raises(daemon.DaemonUntrusted):
+        daemon.socket_path()
+
+
+def test_log_does_not_follow_a_planted_symlink(tmp_path):
+    victim = tmp_path / "victim.txt"
+    victim.write_text("keep")
+    log = tmp_path / "agents.sock.log"
+    log.symlink_to(victim)
+    with pytest.raises(OSError):
+        daemon._open_log(str(log))
+    os.unlink(log)
+    os.link(victim, log)
+    with pytest.raises(daemon.DaemonUntrusted):
+        daemon._open_log(str(log))
+    assert victim.read_text() == "keep"
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "agents.sock")
+    server = daemon.AgentDaemon(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+
+
+def test_client_talks_to_a_daemon_of_the_same_user(server):
+    with daemon.DaemonClient(server, timeout=5) as client:
+        assert client.request({"op": "ping"})["pid"] == os.getpid()
+
+
+def test_client_refuses_a_daemon_of_another_user(server, monkeypatch):
+    real_uid = os.getuid()
+    monkeypatch.setattr(daemon.os, "getuid", lambda: real_uid + 1)
+    with pytest.raises(daemon.DaemonUntrusted):
+        daemon.DaemonClient(server, timeout=5)
+
+
+@pytest.fixture
+def tenant_agent(monkeypatch):
+    """An agent that answers with the scheduler tenant its requests would be made as."""
+    from agent_common.scheduler import current_context
+
+    monkeypatch.setitem(daemon.AGENTS, "tenant", ("", "os", lambda module: lambda q: current_context().tenant))
+
+
+def test_each_connection_is_its_own_scheduler_tenant(tenant_agent, server):
+    tenants = []
+    for _ in range(2):
+        with daemon.DaemonClient(server, timeout=5) as client:
+            tenants += [client.ask("tenant", "who am I?") for _ in range(2)]
+    assert tenants[0] == tenants[1] != tenants[2] == tenants[3]
+    assert tenants[0].startswith("connection-")
+
+
+def test_cli_session_is_its_own_scheduler_tenant(monkeypatch, capsys):
+    from agent_common.scheduler import current_context
+
+    monkeypatch.delenv("AGENT_TENANT", raising=False)
+    daemon.run_cli("basic", lambda question: current_context().tenant, lambda: None, ["hello"])
+    assert capsys.readouterr().out.strip() == f"basic-{os.getpid()}"
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import data_query  # noqa: E402
+from agent_common.expressions import ExpressionError  # noqa: E402
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    # 'code' is numeric in the first rows and mixed later on
+    path = tmp_path / "orders.csv"
+    rows = [f"{i % 3},{i},n{i}" for i in range(10)] + ["A1,,x", "1,5,y"]
+    path.write_text("code,qty,name\n" + "\n".join(rows) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_rows", [4, 5, 100])
+def test_groups_do_not_depend_on_chunk_types(mixed_csv, chunk_rows):
+    result = data_query.query(mixed_csv, select=["code", "sum(qty) as qty", "count()"], group_by=["code"],
+                              order_by="code", chunk_rows=chunk_rows)
+    assert result.rows == [(0, 18, 4), (1, 17, 4), (2, 15, 3), ("A1", None, 1)]
+
+
+@pytest.mark.parametrize("chunk_rows", [4, 100])
+def test_filters_do_not_depend_on_chunk_types(mixed_csv, chunk_rows):
+    result = data_query.query(mixed_csv, select=["qty"], where="code == 1", chunk_rows=chunk_rows)
+    assert result.rows == [(1,), (4,), (7,), (5,)]
+    assert (result.rows_scanned, result.rows_matched) == (12, 4)
+
+
+@pytest.mark.parametrize("chunk_rows", [3, 100])
+def test_jsonl_numbers_and_numeric_text_agree_across_chunks(tmp_path, chunk_rows):
+    path = tmp_path / "events.jsonl"
+    records = [{"id": i, "v": i * 1.5} for i in range(6)] + [{"id": "7", "v": "n/a", "tags": ["a"]}]
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    result = data_query.query(str(path), select=["id", "count()"], group_by=["id"], order_by="id",
+                              chunk_rows=chunk_rows)
+    assert result.rows == [(i, 1) for i in range(8) if i != 6]
+    result = data_query.query(str(path), select=["count(tags)"], chunk_rows=chunk_rows)
+    assert result.rows == [(1,)]
+
+
+def test_sum_of_text_is_an_error(mixed_csv):
+    with pytest.raises(ExpressionError, match="needs numbers"):
+        data_query.query(mixed_csv, select=["sum(code)"], chunk_rows=4)
+
+
+def test_oversized_expression_is_refused(mixed_csv):
+    with pytest.raises(ExpressionError, match="too large"):
+        data_query.query(mixed_csv, select=["(9**9999)**9999 as x"])
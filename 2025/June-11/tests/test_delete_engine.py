@@ -0,0 +1,73 @@
+import os
+import threading
+
+import pytest
+
+import delete_engine
+
+
+def make_tree(root, dirs=5, depth=3, files=4):
+    for i in range(dirs):
+        path = os.path.join(root, *(f"d{i}-{level}" for level in range(depth)))
+        os.makedirs(path)
+        for j in range(files):
+            with open(os.path.join(path, f"f{j}.txt"), "w") as f:
+                f.write("x")
+
+
+def test_rmtree_deletes_everything_and_counts_it(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(str(root))
+    progress = delete_engine.rmtree(str(root), workers=4)
+    assert not root.exists()
+    assert progress.done and not progress.errors
+    assert progress.files_deleted == 5 * 4
+    assert progress.dirs_deleted == 1 + 5 * 3
+
+
+def test_symlinks_are_unlinked_not_followed(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("keep")
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "link").symlink_to(outside, target_is_directory=True)
+    delete_engine.rmtree(str(root))
+    assert not root.exists()
+    assert (outside / "keep.txt").read_text() == "keep"
+
+
+@pytest.mark.skipif(not delete_engine.DIRFD_SUPPORTED, reason="needs dirfd-relative operations")
+def test_renaming_an_ancestor_does_not_redirect_the_delete(tmp_path, monkeypatch):
+    root = tmp_path / "tree"
+    make_tree(str(root), dirs=1, depth=3)
+    moved = tmp_path / "moved"
+    decoy = root / "d0-0" / "d0-1" / "d0-2"
+    real = delete_engine._empty_directory
+
+    def empty_then_swap(parent_fd, name, path, progress):
+        result = real(parent_fd, name, path, progress)
+        if name == "d0-0":
+            # Move the tree away and put a look-alike where it was
+            os.rename(root, moved)
+            decoy.mkdir(parents=True)
+            (decoy / "f0.txt").write_text("not yours")
+        return result
+
+    monkeypatch.setattr(delete_engine, "_empty_directory", empty_then_swap)
+    progress = delete_engine.rmtree(str(root), workers=1)
+    assert (decoy / "f0.txt").read_text() == "not yours"
+    assert progress.files_deleted == 4
+    assert list(moved.iterdir()) == []
+
+
+def test_trash_and_reap_returns_before_the_delete_finishes(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(str(root))
+    progress = delete_engine.trash_and_reap(str(root))
+    assert not root.exists()
+    assert os.path.basename(progress.path).startswith(delete_engine.TRASH_PREFIX)
+    for thread in threading.enumerate():
+        if thread.name == "reaper-tree":
+            thread.join(10)
+    assert progress.done and not os.path.exists(progress.path)
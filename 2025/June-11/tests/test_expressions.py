@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from agent_common.expressions import Expression, ExpressionError, evaluate
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 * (3 + 4)", 14),
+    ("2 ** 10", 1024),
+    ("2 ** 0.5 == sqrt(2)", True),
+    ("(-1) ** 10 ** 9", 1),
+    ("9 ** 9999 % 7", 1),
+    ("3 * 'ab'", "ababab"),
+    ("1 if 2 > 1 else 0", 1),
+])
+def test_evaluates(text, expected):
+    assert evaluate(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "(9**9999)**9999",
+    '("a"*10000)*10000',
+    "2 ** 100000",
+    "(2 ** 60000) * (2 ** 60000)",
+    "'a' * 60000 + 'b' * 60000",
+])
+def test_oversized_results_are_refused_quickly(text):
+    start = time.perf_counter()
+    with pytest.raises(ExpressionError, match="too large"):
+        evaluate(text)
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.parametrize("text", [
+    "().__class__",
+    "[x for x in range(3)]",
+    "lambda: 1",
+    "round(2.5, ndigits=1)",
+])
+def test_unsafe_syntax_is_rejected_before_evaluation(text):
+    with pytest.raises(ExpressionError):
+        Expression(text)
+
+
+def test_only_whitelisted_functions_can_be_called():
+    with pytest.raises(ExpressionError, match="Unknown function"):
+        evaluate("__import__('os')")
+
+
+def test_vectorized_string_repetition_is_bounded():
+    np = pytest.importorskip("numpy")
+    names = np.empty(1000, dtype=object)
+    names[:] = ["x" * 100] * 1000
+    with pytest.raises(ExpressionError, match="too large"):
+        Expression("name * 1000").evaluate({"name": names}, vectorized=True)
+    assert list(Expression("name * 2").evaluate({"name": names[:2]}, vectorized=True)) == ["x" * 200] * 2
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import hashing
+
+
+def key(n):
+    return (1, n, 0, 10)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = hashing.HashCache(str(tmp_path / "hashes.json"), max_entries=3)
+    for n in range(3):
+        cache.put(key(n), "blake2b", False, f"d{n}")
+    assert cache.get(key(0), "blake2b", False) == "d0"  # now the most recent
+    cache.put(key(3), "blake2b", False, "d3")
+    assert len(cache) == 3
+    assert cache.get(key(1), "blake2b", False) is None
+    assert cache.get(key(0), "blake2b", False) == "d0"
+
+
+def test_saved_cache_keeps_recency_and_bound(tmp_path):
+    path = str(tmp_path / "hashes.json")
+    cache = hashing.HashCache(path, max_entries=10)
+    for n in range(10):
+        cache.put(key(n), "blake2b", False, f"d{n}")
+    cache.get(key(0), "blake2b", False)
+    cache.save()
+
+    reloaded = hashing.HashCache(path, max_entries=5)
+    assert len(reloaded) == 5
+    assert reloaded.get(key(0), "blake2b", False) == "d0"
+    assert reloaded.get(key(5), "blake2b", False) is None
+
+
+def test_checkpoint_saves_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashing, "SAVE_BATCH", 3)
+    path = tmp_path / "hashes.json"
+    cache = hashing.HashCache(str(path))
+    for n in range(2):
+        cache.put(key(n), "blake2b", False, "d")
+        cache.checkpoint()
+    assert not path.exists()
+    cache.put(key(2), "blake2b", False, "d")
+    cache.checkpoint()
+    assert len(hashing.HashCache(str(path))) == 3
+
+
+def test_concurrent_saves_use_their_own_temp_files(tmp_path):
+    path = str(tmp_path / "hashes.json")
+    caches = [hashing.HashCache(path) for _ in range(8)]
+    for i, cache in enumerate(caches):
+        for n in range(200):
+            cache.put(key(n), "blake2b", False, str(i))
+    threads = [threading.Thread(target=cache.save) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(tmp_path) == ["hashes.json"]
+    assert len(hashing.HashCache(path)) == 200
+
+
+def test_find_duplicates_groups_identical_files(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/one.txt", "two.txt", "three.txt"):
+        (tmp_path / name).write_text("same content")
+    (tmp_path / "other.txt").write_text("different!!!")
+    os.link(tmp_path / "two.txt", tmp_path / "hardlink.txt")
+    hasher = hashing.Hasher(hashing.HashCache(str(tmp_path / "cache.json")))
+
+    groups = hasher.find_duplicates(str(tmp_path))
+    assert len(groups) == 1
+    size, digest, paths = groups[0]
+    assert size == len("same content")
+    assert len(paths) == 3  # the hard link is the same file as two.txt
+    assert digest == hasher.hash_file(str(tmp_path / "three.txt"))
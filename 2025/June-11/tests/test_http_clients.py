@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from agent_common.http_clients import HttpSettings, RetryTransport
+
+SETTINGS = HttpSettings(max_retries=3, backoff_base=0.0, backoff_max=0.0)
+
+
+def client(*outcomes):
+    """Client whose server answers with ``outcomes`` in turn (status codes or exceptions to raise)."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+    return httpx.Client(transport=RetryTransport(httpx.MockTransport(handler), SETTINGS)), calls
+
+
+@pytest.mark.parametrize("status", [408, 429, 503])
+def test_unprocessed_statuses_are_retried_for_posts(status):
+    http, calls = client(status, 200)
+    assert http.post("https://api.test/v1/chat").status_code == 200
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("status", [500, 502, 504])
+def test_server_errors_are_not_retried_for_posts(status):
+    http, calls = client(status, 200)
+    assert http.post("https://api.test/v1/chat").status_code == status
+    assert len(calls) == 1
+
+
+def test_server_errors_are_retried_for_idempotent_requests():
+    http, calls = client(502, 200)
+    assert http.get("https://api.test/v1/models").status_code == 200
+    http, calls = client(500, 200)
+    response = http.post("https://api.test/v1/chat", headers={"Idempotency-Key": "turn-1"})
+    assert response.status_code == 200 and len(calls) == 2
+
+
+def test_connect_errors_are_retried_for_posts():
+    http, calls = client(httpx.ConnectError("refused"), httpx.ConnectTimeout("slow"), 200)
+    assert http.post("https://api.test/v1/chat").status_code == 200
+    assert len(calls) == 3
+
+
+def test_dropped_connection_after_sending_a_post_is_not_retried():
+    http, calls = client(httpx.RemoteProtocolError("server disconnected"), 200)
+    with pytest.raises(httpx.RemoteProtocolError):
+        http.post("https://api.test/v1/chat")
+    assert len(calls) == 1
+    http, calls = client(httpx.RemoteProtocolError("server disconnected"), 200)
+    assert http.get("https://api.test/v1/models").status_code == 200
+
+
+def test_retries_stop_at_max_retries():
+    http, calls = client(429)
+    assert http.post("https://api.test/v1/chat").status_code == 429
+    assert len(calls) == SETTINGS.max_retries + 1
@@ -0,0 +1,162 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from conftest import run_action
+
+import hashing
+import journal
+
+
+def make_journal(path) -> journal.Journal:
+    hasher = hashing.Hasher(hashing.HashCache(str(path / "hashes.json")))
+    return journal.Journal(str(path / journal.JOURNAL_DIR), hasher=hasher)
+
+
+def test_undo_redo_round_trip(file_tool, workspace):
+    notes = workspace / "notes.txt"
+    assert run_action(file_tool, action="create_file", path="notes.txt", content="one\n").startswith("✅")
+    assert run_action(file_tool, action="update_file", path="notes.txt", content="two\n").startswith("✅")
+    assert run_action(file_tool, action="write_file", path="notes.txt", content="three\n").startswith("✅")
+    assert run_action(file_tool, action="move_file", source="notes.txt", destination="moved.txt").startswith("✅")
+    assert run_action(file_tool, action="delete_file", path="moved.txt").startswith("✅")
+
+    states = []
+    for _ in range(5):
+        states.append((notes.exists() and notes.read_text(), (workspace / "moved.txt").exists()))
+        assert run_action(file_tool, action="undo").startswith("✅")
+    assert not notes.exists()
+    assert states == [(False, False), (False, True), ("three\n", False), ("one\ntwo\n", False), ("one\n", False)]
+
+    assert run_action(file_tool, action="redo", steps=5).startswith("✅")
+    assert not notes.exists() and not (workspace / "moved.txt").exists()
+    assert run_action(file_tool, action="undo", steps=2).startswith("✅")
+    assert notes.read_text() == "three\n"
+
+
+def test_undo_refuses_a_path_changed_outside_the_journal(file_tool, workspace):
+    run_action(file_tool, action="create_file", path="a.txt", content="old\n")
+    run_action(file_tool, action="write_file", path="a.txt", content="new\n")
+    with open(workspace / "a.txt", "a") as f:
+        f.write("edited by hand\n")
+    assert "changed since" in run_action(file_tool, action="undo")
+    assert (workspace / "a.txt").read_text() == "new\nedited by hand\n"
+
+
+def test_snapshot_survives_in_place_writes(workspace):
+    target = workspace / "data.txt"
+    target.write_text("original\n")
+    log = make_journal(workspace)
+
+    # A failed action that would have renamed over the file: its hardlink must not
+    # stay in the store, or the append below would change the object in place
+    assert log.run("patch", [str(target)], lambda: "❌ no", snapshot="link") == "❌ no"
+    with open(target, "a") as f:
+        f.write("appended\n")
+    assert os.stat(target).st_nlink == 1
+
+    copy = workspace / "copy.txt"
+    copy.write_text("original\n")
+    log.run("write_file", [str(copy)], lambda: copy.write_text("rewritten\n") and "✅ ok")
+    log.undo()
+    assert copy.read_text() == "original\n"
+
+
+def test_move_onto_a_file_is_undone(workspace):
+    (workspace / "a.txt").write_text("a\n")
+    (workspace / "b.txt").write_text("b\n")
+    log = make_journal(workspace)
+    log.move(str(workspace / "a.txt"), str(workspace / "b.txt"))
+    assert (workspace / "b.txt").read_text() == "a\n"
+    log.undo()
+    assert (workspace / "a.txt").read_text() == "a\n"
+    assert (workspace / "b.txt").read_text() == "b\n"
+
+
+def test_large_trees_are_not_journaled(workspace, monkeypatch):
+    monkeypatch.setenv("FILE_AGENT_JOURNAL_MAX_TREE", "5")
+    log = make_journal(workspace)
+    small, large = workspace / "small", workspace / "large" / "nested"
+    small.mkdir()
+    large.mkdir(parents=True)
+    for i in range(5):
+        (large / f"{i}.txt").write_text("x")
+    assert log.remove_tree(str(small))
+    assert not log.remove_tree(str(workspace / "large"))
+    assert (workspace / "large").is_dir()
+
+
+def test_delete_folder_uses_the_delete_engine_for_background_and_large_trees(file_tool, workspace, monkeypatch):
+    monkeypatch.setenv("FILE_AGENT_JOURNAL_MAX_TREE", "3")
+    for name, files in (("kept", 2), ("large", 5), ("background", 2)):
+        (workspace / name).mkdir()
+        for i in range(files):
+            (workspace / name / f"{i}.txt").write_text("x")
+
+    assert "undo" in run_action(file_tool, action="delete_folder", path="kept", recursive=True)
+    assert "5 files" in run_action(file_tool, action="delete_folder", path="large", recursive=True)
+    assert "background" in run_action(file_tool, action="delete_folder", path="background", recursive=True,
+                                      background=True)
+    for thread in threading.enumerate():
+        if thread.name == "reaper-background":
+            thread.join(10)
+
+    assert run_action(file_tool, action="undo").startswith("✅")
+    assert (workspace / "kept" / "1.txt").exists()
+    assert not (workspace / "large").exists() and not (workspace / "background").exists()
+
+
+@pytest.mark.parametrize("request_", [
+    {"action": "delete_folder", "path": journal.JOURNAL_DIR, "recursive": True},
+    {"action": "write_file", "path": os.path.join(journal.JOURNAL_DIR, "journal.jsonl"), "content": ""},
+    {"action": "move_file", "source": "a.txt", "destination": os.path.join(journal.JOURNAL_DIR, "a.txt")},
+    {"action": "write_file", "path": "log-link", "content": ""},
+])
+def test_the_journal_directory_is_off_limits(file_tool, workspace, request_):
+    run_action(file_tool, action="create_file", path="a.txt", content="a\n")
+    os.symlink(os.path.join(journal.JOURNAL_DIR, "journal.jsonl"), workspace / "log-link")
+    assert "undo journal" in run_action(file_tool, **request_)
+    assert (workspace / journal.JOURNAL_DIR / "journal.jsonl").stat().st_size > 0
+    assert run_action(file_tool, action="undo").startswith("✅")
+    assert not (workspace / "a.txt").exists()
+
+
+def test_journal_is_recreated_after_its_directory_is_removed(file_tool, workspace):
+    run_action(file_tool, action="create_file", path="a.txt", content="a\n")
+    shutil.rmtree(workspace / journal.JOURNAL_DIR)
+    assert run_action(file_tool, action="write_file", path="a.txt", content="b\n").startswith("✅")
+    assert run_action(file_tool, action="undo").startswith("✅")
+    assert (workspace / "a.txt").read_text() == "a\n"
+    assert run_action(file_tool, action="undo") == "📭 Nothing to undo"  # the older history went with it
+
+
+@pytest.mark.parametrize("request_", [
+    {"action": "write_file", "path": "link.txt", "content": "new\n"},
+    {"action": "update_file", "path": "link.txt", "content": "new\n"},
+    {"action": "update_file", "path": "link.txt", "content": "new\n", "mode": "prepend"},
+    {"action": "patch", "path": "link.txt", "start_line": 1, "content": "new"},
+    {"action": "copy_file", "source": "other.txt", "destination": "link.txt"},
+])
+def test_writes_through_a_symlink_are_undone_on_its_target(file_tool, workspace, request_):
+    (workspace / "target.txt").write_text("old\n")
+    (workspace / "other.txt").write_text("other\n")
+    os.symlink("target.txt", workspace / "link.txt")
+    assert run_action(file_tool, **request_).startswith("✅")
+    assert (workspace / "target.txt").read_text() != "old\n"
+
+    assert run_action(file_tool, action="undo").startswith("✅")
+    assert (workspace / "target.txt").read_text() == "old\n"
+    assert os.readlink(workspace / "link.txt") == "target.txt"
+    assert run_action(file_tool, action="redo").startswith("✅")
+    assert (workspace / "target.txt").read_text() != "old\n"
+
+
+def test_deleting_a_symlink_is_undone_on_the_link(file_tool, workspace):
+    (workspace / "target.txt").write_text("old\n")
+    os.symlink("target.txt", workspace / "link.txt")
+    assert run_action(file_tool, action="delete_file", path="link.txt").startswith("✅")
+    assert run_action(file_tool, action="undo").startswith("✅")
+    assert os.readlink(workspace / "link.txt") == "target.txt"
+    assert (workspace / "target.txt").read_text() == "old\n"
@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+
+from conftest import DEMO_ROOT
+
+pytest.importorskip("numpy")
+
+from agent_common.memory import INITIAL_CAPACITY, ConversationMemory  # noqa: E402
+
+FACT = ("My dog is called Biscuit and she is a beagle", "Biscuit is a lovely name for a beagle!")
+
+
+def chat(memory, count, start=0):
+    for i in range(start, start + count):
+        memory.add(f"Question {i} about list comprehensions", f"Answer {i} with an example")
+
+
+def test_an_old_fact_is_recalled_past_the_initial_capacity():
+    memory = ConversationMemory(recent=3, top_k=2)
+    memory.add(*FACT)
+    chat(memory, 2 * INITIAL_CAPACITY)
+    assert len(memory) == 2 * INITIAL_CAPACITY + 1 and len(memory._vectors) >= len(memory)
+
+    recalled, recent = memory.context("What breed is my dog Biscuit?")
+    assert recalled[0].user == FACT[0] and len(recalled) <= 2
+    assert [e.user for e in recent] == [f"Question {i} about list comprehensions"
+                                        for i in range(2 * INITIAL_CAPACITY - 3, 2 * INITIAL_CAPACITY)]
+
+
+def test_recent_exchanges_are_not_recalled_twice():
+    memory = ConversationMemory(recent=2, top_k=4)
+    memory.add(*FACT)
+    chat(memory, 1)
+    assert memory.recall("my dog Biscuit") == []
+    chat(memory, 1, start=1)
+    assert [index for _, index in memory.recall("my dog Biscuit")] == [0]
+
+
+def test_unrelated_exchanges_are_left_out():
+    memory = ConversationMemory(recent=0, top_k=4, min_score=0.15)
+    memory.add(*FACT)
+    chat(memory, 5)
+    recalled, recent = memory.context("beagle")
+    assert [e.user for e in recalled] == [FACT[0]] and recent == []
+
+
+def test_recalled_exchanges_keep_conversation_order():
+    memory = ConversationMemory(recent=1, top_k=3, min_score=0.0)
+    chat(memory, 5)
+    recalled, _ = memory.context("Question 3 about list comprehensions")
+    indexes = [int(e.user.split()[1]) for e in recalled]
+    assert indexes == sorted(indexes) and 3 in indexes
+
+
+def test_memory_survives_a_restart(tmp_path):
+    path = str(tmp_path / "memory.jsonl")
+    memory = ConversationMemory(recent=1, path=path)
+    memory.add(*FACT)
+    chat(memory, 3)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"user": "torn')  # an interrupted write
+
+    reloaded = ConversationMemory(recent=1, path=path)
+    assert reloaded.exchanges == memory.exchanges
+    assert reloaded.context("my dog Biscuit")[0][0].user == FACT[0]
+
+    reloaded.clear()
+    assert len(reloaded) == 0 and not (tmp_path / "memory.jsonl").exists()
+    assert len(ConversationMemory(path=path)) == 0
+
+
+def test_basic_agent_prompt_holds_recalled_and_recent_turns(monkeypatch):
+    pytest.importorskip("langchain")
+    monkeypatch.delenv("BASIC_AGENT_MEMORY_FILE", raising=False)
+    sys.path.insert(0, str(DEMO_ROOT / "benchmarks"))
+    from demos import load_demo
+
+    agent = load_demo("basic").BasicAgent(llm=object(), recent_turns=2, recall_k=2)
+    agent.memory.add(*FACT)
+    chat(agent.memory, 10)
+    history = agent._history("What breed is Biscuit?")
+    assert history[0].type == "system" and FACT[0] in history[0].content
+    assert [m.content for m in history[1:]] == ["Question 8 about list comprehensions", "Answer 8 with an example",
+                                                "Question 9 about list comprehensions", "Answer 9 with an example"]
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import output
+
+
+def listing(rows, **kwargs) -> output.Table:
+    return output.Table(["name", "size"], rows, "📁 Contents:", lambda row: f"📄 {row[0]} ({row[1]} bytes)",
+                        **kwargs)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("✅ Created file: a.txt", ("ok", "Created file: a.txt")),
+    ("❌ File not found: a.txt", ("error", "File not found: a.txt")),
+    ("⚠️ File already exists: a.txt", ("warning", "File already exists: a.txt")),
+    ("📭 No matches", ("empty", "No matches")),
+    ("🔍 Found 3 matches", ("ok", "Found 3 matches")),
+])
+def test_split_status(text, expected):
+    assert output.split_status(text) == expected
+
+
+def test_table_in_every_format():
+    rows = [("a.txt", 12), ("tab\there", 3)]
+    table = lambda: listing(iter(rows), note="... and 5 more", details={"path": "docs"})
+
+    assert output.render(table()) == "📁 Contents:\n📄 a.txt (12 bytes)\n📄 tab\there (3 bytes)\n... and 5 more"
+
+    lines = output.render(table(), "json", {"action": "list"}).split("\n")
+    assert json.loads(lines[0]) == {"status": "ok", "action": "list", "path": "docs", "note": "and 5 more",
+                                    "fields": ["name", "size"]}
+    assert [json.loads(line) for line in lines[1:]] == [["a.txt", 12], ["tab\there", 3]]
+
+    assert output.render(table(), "tsv").split("\n") == [
+        "ok\tand 5 more\tpath=docs", "name\tsize", "a.txt\t12", "tab\\there\t3"]
+
+
+def test_empty_table_uses_its_empty_message():
+    table = lambda: listing(iter(()), empty="📭 Folder is empty")
+    assert output.render(table()) == "📭 Folder is empty"
+    assert json.loads(output.render(table(), "json")) == {"status": "empty", "message": "Folder is empty"}
+    assert output.render(table(), "tsv") == "empty\tFolder is empty"
+
+
+def test_framed_file_body():
+    body = "line 1\n\tindented\n"
+    message = f"📄 notes.txt:\n{output.RULE}\n{body}\n{output.RULE}\n📏 2 lines"
+    assert json.loads(output.render(message, "json")) == {
+        "status": "ok", "message": "notes.txt", "note": "2 lines", "content": body}
+    first, rest = output.render(message, "tsv").split("\n", 1)
+    assert first == "ok\tnotes.txt\tnote=2 lines"
+    assert rest == body
+
+
+def test_errors_raised_by_rows_are_rendered_as_errors():
+    def rows():
+        yield ("a.txt", 1)
+        raise OSError("disk gone")
+
+    assert output.render(listing(rows(), error="Error listing"), "json") == \
+        '{"status":"error","message":"Error listing: disk gone"}'
+
+
+def test_check_format():
+    assert output.check_format("JSON") == "json"
+    assert output.check_format(None) == output.DEFAULT_FORMAT
+    with pytest.raises(ValueError):
+        output.check_format("xml")
@@ -0,0 +1,82 @@
+import os
+import stat
+
+import pytest
+
+import patching
+
+
+def round_trip(tmp_path, old: bytes, new: bytes):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_bytes(old)
+    b.write_bytes(new)
+    diff, truncated = patching.stream_diff(str(a), str(b))
+    assert diff and not truncated
+    result = patching.apply_unified_diff(str(a), diff)
+    assert a.read_bytes() == new
+    return result
+
+
+def test_diff_then_patch_round_trip(tmp_path):
+    old = "".join(f"line {i}\n" for i in range(1, 400)).encode()
+    new = old.replace(b"line 10\n", b"line ten\n").replace(b"line 300\n", b"").replace(
+        b"line 399\n", b"line 399\nline 400")
+    result = round_trip(tmp_path, old, new)
+    assert (result.hunks, result.added, result.removed) == (3, 2, 2)
+
+
+def test_round_trip_keeps_crlf_line_endings(tmp_path):
+    round_trip(tmp_path, b"one\r\ntwo\r\nthree\r\n", b"one\r\n2\r\nthree\r\n")
+
+
+def test_round_trip_latin1(tmp_path):
+    old = "caf\xe9 cr\xe8me\nna\xefve\nfa\xe7ade\n".encode("latin-1")
+    new = "caf\xe9 cr\xe8me\nna\xefvet\xe9\nfa\xe7ade\n".encode("latin-1")
+    round_trip(tmp_path, old, new)
+
+
+def test_round_trip_keeps_undecodable_bytes(tmp_path):
+    old = b"header\nraw \xff\xfe bytes\nmiddle\ntrailer\n"
+    new = b"header\nraw \xff\xfe bytes\nchanged\ntrailer\n"
+    round_trip(tmp_path, old, new)
+
+
+def test_round_trip_utf16(tmp_path):
+    round_trip(tmp_path, "alpha\nbeta\ngamma\n".encode("utf-16"), "alpha\nBETA\ngamma\n".encode("utf-16"))
+
+
+def test_replace_lines(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_text("1\n2\n3\n4\n")
+    result = patching.replace_lines(str(path), 2, 3, "two\nthree")
+    assert path.read_text() == "1\ntwo\nthree\n4\n"
+    assert (result.added, result.removed) == (2, 2)
+
+
+def test_mismatch_leaves_the_file_untouched(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_text("a\nb\nc\n")
+    with pytest.raises(patching.PatchError):
+        patching.apply_unified_diff(str(path), "@@ -2,1 +2,1 @@\n-x\n+y\n")
+    assert path.read_text() == "a\nb\nc\n"
+    assert os.listdir(tmp_path) == ["f.txt"]
+
+
+def test_unencodable_text_is_a_patch_error(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes("caf\xe9\nna\xefve\n".encode("latin-1"))
+    with pytest.raises(patching.PatchError, match="cannot be written"):
+        patching.replace_lines(str(path), 1, 1, "中文")
+    assert path.read_bytes() == "caf\xe9\nna\xefve\n".encode("latin-1")
+
+
+def test_patch_keeps_symlink_and_mode(tmp_path):
+    target = tmp_path / "target.sh"
+    target.write_text("#!/bin/sh\necho old\n")
+    target.chmod(0o750)
+    link = tmp_path / "link.sh"
+    link.symlink_to(target)
+    patching.replace_lines(str(link), 2, 2, "echo new")
+    assert link.is_symlink()
+    assert target.read_text() == "#!/bin/sh\necho new\n"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o750
@@ -0,0 +1,114 @@
+import json
+import sys
+import uuid
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from conftest import DEMO_ROOT
+
+from agent_common.instrumentation import TOKEN_BUCKETS, MetricsRegistry, make_callback_handler
+from agent_common.prompts import ActionCatalog, PromptAssembler, ToolAction
+
+sys.path.insert(0, str(DEMO_ROOT / "benchmarks"))
+
+CATALOG = ActionCatalog([
+    ToolAction("read", "Reads a file", "requires 'path'", ("show", "open")),
+    ToolAction("delete_file", "Deletes a file", "requires 'path'", ("delete", "remove")),
+    ToolAction("grep_tree", "Searches a directory", "requires 'path' and 'query'", ("search", "find text")),
+    ToolAction("help", "Lists actions"),
+], preamble="File tool. Input is JSON.", example='{"action": "read", "path": "a.txt"}')
+
+
+def test_summary_is_one_line_per_action_and_full_adds_details():
+    assert CATALOG.summary().splitlines() == [
+        "File tool. Input is JSON.", "- read: Reads a file", "- delete_file: Deletes a file",
+        "- grep_tree: Searches a directory", "- help: Lists actions", 'Example: {"action": "read", "path": "a.txt"}']
+    assert "- read: Reads a file. requires 'path'" in CATALOG.full()
+    assert len(CATALOG.summary()) < len(CATALOG.full())
+
+
+def test_relevant_actions_rank_names_above_keywords():
+    assert [a.name for a in CATALOG.relevant("please delete file old.txt")] == ["delete_file"]
+    # Equal scores keep catalogue order
+    assert [a.name for a in CATALOG.relevant("find text 'todo', then show me notes.txt and remove it")] == [
+        "read", "delete_file", "grep_tree"]
+    assert [a.name for a in CATALOG.relevant("grep_tree for todo, then show it")] == ["grep_tree", "read"]
+    assert [a.name for a in CATALOG.relevant("use grep_tree, or read", limit=1)] == ["read"]
+    assert CATALOG.relevant("what time is it?") == []
+    # Single-word keywords match whole words only
+    assert CATALOG.relevant("the showroom is open late")[0].name == "read"
+    assert all(a.name != "read" for a in CATALOG.relevant("showroom"))
+
+
+def test_details_only_for_relevant_actions():
+    assert CATALOG.details_for("remove a.txt") == "Relevant actions:\n- delete_file: requires 'path'"
+    assert CATALOG.details_for("hello") == ""
+    assert CATALOG.details_for("help") == ""  # no details to add
+
+
+def test_assembler_keeps_the_prefix_stable():
+    assembler = PromptAssembler("You manage files.", CATALOG)
+    fingerprint = assembler.fingerprint
+    first = assembler.messages("show a.txt")
+    second = assembler.messages("delete b.txt", history=[HumanMessage("show a.txt"), AIMessage("done")])
+    assert isinstance(first[0], SystemMessage) and first[0].content == second[0].content
+    assert [m.type for m in second] == ["system", "human", "ai", "human"]
+    assert second[-1].content == "delete b.txt\n\nRelevant actions:\n- delete_file: requires 'path'"
+    assert assembler.user_turn("hello") == "hello"
+    assert assembler.fingerprint == fingerprint
+    assert PromptAssembler("You manage files!", CATALOG).fingerprint != fingerprint
+
+
+class RecordingHandler(BaseCallbackHandler):
+    def __init__(self):
+        self.prompts = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompts.append(messages[0])
+
+
+def test_files_agent_sends_a_stable_prefix_and_per_request_details(workspace):
+    from demos import load_demo
+    from fakes import ScriptedChatModel
+
+    files = load_demo("files")
+    agent = files.FilesAgent(llm=ScriptedChatModel(), mode="tools", router=None)
+    recorder = RecordingHandler()
+    agent._callbacks = [recorder]
+    (workspace / "a.txt").write_text("alpha\n")
+    agent._ask_agent("read " + json.dumps({"action": "read", "path": "a.txt"}))
+    agent._ask_agent("hash " + json.dumps({"action": "hash_file", "path": "a.txt"}))
+
+    first, second = recorder.prompts[0], recorder.prompts[2]
+    assert first[0].content == second[0].content and first[0].type == "system"
+    assert "- read:" in first[-1].content and "- hash_file:" not in first[-1].content
+    assert "- hash_file:" in second[-1].content
+    # The tool description sent with every call is the compact one
+    assert files.FileExplorerTool.description == files.FILE_ACTIONS.summary()
+
+
+def test_callback_counts_prompt_and_cached_tokens():
+    registry = MetricsRegistry()
+    handler = make_callback_handler("files", registry)
+
+    def call(usage):
+        run_id = uuid.uuid4()
+        handler.on_chat_model_start({}, [[HumanMessage("word " * 400)]], run_id=run_id,
+                                    invocation_params={"model_name": "m"})
+        result = LLMResult(generations=[[ChatGeneration(message=AIMessage("ok"))]],
+                           llm_output={"token_usage": usage} if usage is not None else None)
+        handler.on_llm_end(result, run_id=run_id)
+
+    call({"prompt_tokens": 1500, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 1024}})
+    call(None)  # no usage reported: counted locally
+
+    labels = dict(agent="files", model="m")
+    assert registry.counter("agent_llm_tokens_total", kind="cached", **labels) == 1024
+    prompt = registry.counter("agent_llm_tokens_total", kind="prompt", **labels)
+    assert 1500 + 300 <= prompt <= 1500 + 500
+    histogram = registry.histogram("agent_llm_prompt_tokens", **labels)
+    assert histogram.buckets == TOKEN_BUCKETS and histogram.count == 2
+    assert histogram.quantile(1.0) == 2048
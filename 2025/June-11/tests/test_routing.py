@@ -0,0 +1,105 @@
+import json
+import sys
+
+import pytest
+
+from conftest import DEMO_ROOT
+
+pytest.importorskip("langchain_core")
+sys.path.insert(0, str(DEMO_ROOT / "benchmarks"))
+
+from agent_common.instrumentation import MetricsRegistry  # noqa: E402
+from agent_common.routing import ModelRouter, classify, low_confidence  # noqa: E402
+from fakes import ScriptedChatModel  # noqa: E402
+
+
+def test_classify_routes_easy_and_hard_turns():
+    assert classify("2 + 2").route == "small"
+    assert classify('{"action": "list"}').route == "small"
+    assert classify("Explain and compare the trade-offs of both designs step by step").route == "large"
+
+
+@pytest.mark.parametrize("answer, unsure", [
+    ("", True), ("I'm not sure what you mean", True), ("Error: timeout", True),
+    ("The file has 3 lines", False), ("Done. An error log was created", False),
+])
+def test_low_confidence(answer, unsure):
+    assert low_confidence(answer) is unsure
+
+
+def make_router(small_answer="I'm not sure."):
+    router = ModelRouter("test", {"small": "s", "large": "l"}, llms={}, registry=MetricsRegistry())
+    routes = []
+
+    def call(route, callbacks):
+        routes.append(route)
+        callbacks[0].on_tool_start({"name": "tool"}, "", inputs={"action": "write"}, run_id=None)
+        return small_answer if route == "small" else "done"
+
+    return router, routes, call
+
+
+def test_unsure_answer_is_escalated_when_tools_may_repeat():
+    router, routes, call = make_router()
+    result = router.run("hi", call)
+    assert routes == ["small", "large"]
+    assert result.escalated and result.output == "done"
+
+
+def test_unsure_answer_is_kept_after_a_call_that_must_not_repeat():
+    router, routes, call = make_router()
+    result = router.run("hi", call, repeatable=lambda name, args: args["action"] != "write")
+    assert routes == ["small"]
+    assert not result.escalated and result.output == "I'm not sure."
+    assert result.tool_calls == [("tool", {"action": "write"})]
+
+
+@pytest.fixture
+def files_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("FILE_AGENT_ROOT", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    from demos import load_demo
+
+    files = load_demo("files")
+    small = ScriptedChatModel(model_name="gpt-4.1-mini", unsure_rate=1.0)
+    large = ScriptedChatModel(model_name="gpt-4")
+    router = ModelRouter("files", {"small": small.model_name, "large": large.model_name},
+                         llms={"small": small, "large": large}, registry=MetricsRegistry())
+    return files.FilesAgent(llm=large, mode="tools", router=router), large
+
+
+def test_files_agent_does_not_repeat_a_write_when_the_answer_is_unsure(files_agent, tmp_path):
+    agent, large = files_agent
+    request = {"action": "update_file", "path": "log.txt", "content": "entry\n", "mode": "append"}
+    (tmp_path / "log.txt").write_text("")
+    agent._ask_agent("note this " + json.dumps(request))
+    assert (tmp_path / "log.txt").read_text() == "entry\n"
+    assert large.calls == 0
+
+
+def test_files_agent_escalates_an_unsure_read(files_agent, tmp_path):
+    agent, large = files_agent
+    (tmp_path / "notes.txt").write_text("hello\n")
+    agent._ask_agent("show me " + json.dumps({"action": "read", "path": "notes.txt"}))
+    assert large.calls > 0
+
+
+def test_basic_agent_escalates_to_a_stronger_model(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.delenv("AGENT_ROUTER", raising=False)
+    monkeypatch.delenv("AGENT_ROUTER_BASIC_SMALL", raising=False)
+    monkeypatch.delenv("AGENT_ROUTER_BASIC_LARGE", raising=False)
+    from demos import load_demo
+
+    agent = load_demo("basic").BasicAgent()
+    # The larger model of the same family, not an older one (gpt-3.5-turbo is weaker than gpt-4.1-nano)
+    small, large = agent.router.models["small"], agent.router.models["large"]
+    assert (small, large) == ("gpt-4.1-nano", "gpt-4.1")
+
+    # The prompt asks for honest "I don't know"s; those must go up to the large model
+    small_llm = ScriptedChatModel(model_name=small, unsure_rate=1.0)
+    large_llm = ScriptedChatModel(model_name=large)
+    agent.router._llms = {"small": small_llm, "large": large_llm}
+    agent.router._registry = MetricsRegistry()
+    agent.chat("What is a list comprehension?")
+    assert small_llm.calls == 1 and large_llm.calls == 1
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from agent_common import scheduler
+from agent_common.scheduler import (DeadlineExceeded, RateLimits, RequestContext, RequestScheduler, TokenBucket,
+                                    request_context)
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)  # 1 per second, at most 2 at once
+    now = time.monotonic()
+    assert bucket.capacity == 2 and bucket.wait_time(2, now) == 0
+    bucket.take(2, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 1) == 0
+
+
+def test_oversized_requests_wait_for_a_full_bucket_and_pauses_hold_everything():
+    bucket = TokenBucket(per_minute=600, burst_seconds=1)  # capacity 10
+    now = time.monotonic()
+    assert bucket.wait_time(50, now) == 0
+    bucket.take(50, now)
+    assert bucket.wait_time(50, now) == pytest.approx(1.0)
+    bucket.pause(3.0, now + 5)
+    assert bucket.wait_time(1, now + 5) == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize("per_minute", [0, -1])
+def test_bucket_refuses_rates_it_cannot_refill_at(per_minute):
+    with pytest.raises(ValueError):
+        TokenBucket(per_minute)
+
+
+def test_zero_limits_mean_unlimited():
+    limits = RateLimits(requests_per_minute=0, tokens_per_minute=0)
+    scheduler_ = RequestScheduler("test", limits)
+    assert scheduler_.requests is None and scheduler_.tokens is None
+    for _ in range(3):
+        scheduler_.release(scheduler_.acquire(10_000), 200)
+
+
+@pytest.mark.parametrize("kwargs", [{"requests_per_minute": -5}, {"concurrency": 0},
+                                    {"concurrency": 8, "max_concurrency": 4}, {"burst_seconds": 0}])
+def test_invalid_limits_are_refused(kwargs):
+    with pytest.raises(ValueError):
+        RateLimits(**kwargs)
+
+
+def test_zero_in_the_environment_means_unlimited(monkeypatch):
+    monkeypatch.setenv("AGENT_RATE_API_EXAMPLE_COM_RPM", "0")
+    monkeypatch.setenv("AGENT_RATE_API_EXAMPLE_COM_TPM", "1200")
+    scheduler_ = RequestScheduler("api.example.com", RateLimits.from_env("api.example.com"))
+    assert scheduler_.requests is None and scheduler_.tokens.rate == 20
+
+
+def test_acquire_takes_from_both_buckets():
+    scheduler_ = RequestScheduler("test", RateLimits(requests_per_minute=60, tokens_per_minute=6000,
+                                                     burst_seconds=10))
+    permit = scheduler_.acquire(400, RequestContext(tenant="a"))
+    assert (permit.tenant, permit.tokens) == ("a", 400) and scheduler_.in_flight == 1
+    assert scheduler_.requests.level == pytest.approx(9, abs=0.01)
+    assert scheduler_.tokens.level == pytest.approx(600, abs=1)
+    scheduler_.release(permit, 200)
+    assert scheduler_.in_flight == 0
+
+
+def test_request_that_cannot_make_its_deadline_is_dropped_at_once():
+    scheduler_ = RequestScheduler("test", RateLimits(requests_per_minute=60, burst_seconds=1))
+    scheduler_.release(scheduler_.acquire(), 200)  # the bucket is now empty for a second
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="past its deadline"):
+        scheduler_.acquire(context=RequestContext(deadline=start + 0.2))
+    assert time.monotonic() - start < 0.1
+    assert not scheduler_._priorities  # nothing left queued
+    # Without a deadline it waits its turn
+    scheduler_.release(scheduler_.acquire(), 200)
+    assert time.monotonic() - start > 0.5
+
+
+def test_deadline_passing_while_queued_behind_others():
+    scheduler_ = RequestScheduler("test", RateLimits(concurrency=1, max_concurrency=1))
+    first = scheduler_.acquire()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="deadline passed while queued"):
+        scheduler_.acquire(context=RequestContext(deadline=start + 0.1))
+    assert 0.05 < time.monotonic() - start < 1.0
+    scheduler_.release(first, 200)
+    scheduler_.release(scheduler_.acquire(), 200)
+
+
+def test_request_context_nests_and_keeps_the_earliest_deadline():
+    with request_context(tenant="a", timeout=5) as outer:
+        with request_context(priority=1, timeout=60) as inner:
+            assert (inner.tenant, inner.priority, inner.deadline) == ("a", 1, outer.deadline)
+            assert scheduler.current_context() is inner
+    assert scheduler.current_context().deadline is None
+
+
+def test_tenants_take_turns():
+    scheduler_ = RequestScheduler("test", RateLimits(concurrency=1, max_concurrency=1))
+    blocker = scheduler_.acquire()
+    order, threads = [], []
+
+    def request(tenant):
+        permit = scheduler_.acquire(context=RequestContext(tenant=tenant))
+        order.append(tenant)
+        scheduler_.release(permit, 200)
+
+    for tenant in ["heavy"] * 3 + ["light"]:
+        threads.append(threading.Thread(target=request, args=(tenant,)))
+        threads[-1].start()
+        time.sleep(0.05)  # queued in this order
+    scheduler_.release(blocker, 200)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["heavy", "light", "heavy", "heavy"]
+
+
+def test_concurrency_grows_on_fast_responses_and_backs_off():
+    scheduler_ = RequestScheduler("test", RateLimits(concurrency=4, max_concurrency=5))
+    scheduler_._adapt(0.1)
+    assert scheduler_.concurrency == pytest.approx(4.25)  # additive increase: +1/limit
+    for _ in range(20):
+        scheduler_._adapt(0.1)
+    assert scheduler_.concurrency == 5  # capped
+    scheduler_._adapt(1.0)  # far slower than the best seen
+    assert scheduler_.concurrency == pytest.approx(4.5)
+
+
+def test_throttled_response_halves_concurrency_and_pauses_for_retry_after():
+    scheduler_ = RequestScheduler("test", RateLimits(requests_per_minute=600, concurrency=8))
+    scheduler_.release(scheduler_.acquire(), 429, httpx.Headers({"retry-after": "2"}))
+    assert scheduler_.concurrency == 4
+    assert scheduler_.requests.paused_until - time.monotonic() == pytest.approx(2.0, abs=0.1)
+    scheduler_.release(scheduler_.acquire(context=RequestContext(deadline=time.monotonic() + 5)), 503)
+    assert scheduler_.concurrency == 2
+
+
+def test_remaining_headers_lower_the_buckets():
+    scheduler_ = RequestScheduler("test", RateLimits(requests_per_minute=600, tokens_per_minute=60_000))
+    scheduler_.release(scheduler_.acquire(), 200,
+                       httpx.Headers({"x-ratelimit-remaining-requests": "3", "x-ratelimit-remaining-tokens": "x"}))
+    assert scheduler_.requests.level == pytest.approx(3, abs=0.1)
+    assert scheduler_.tokens.level > 1000
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import semantic_index
+from agent_common.embeddings import HashingEmbedder, tokenize
+
+TOPICS = {
+    "billing.py": "def charge_invoice(customer, amount):\n    refund policy for invoices and payment retries\n",
+    "auth.md": "# Login\nPasswords are hashed; sessions expire after idle timeout and tokens rotate.\n",
+    "deploy.txt": "Kubernetes rollout: build the container image, push to the registry, apply manifests.\n",
+}
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("parseHttpResponse read_file_range 42") == [
+        "parsehttpresponse", "parse", "http", "response", "read_file_range", "read", "file", "range", "42"]
+
+
+def test_embeddings_are_normalised_and_rank_related_text_higher():
+    embedder = HashingEmbedder(256)
+    query = embedder.embed("invoice refund")
+    assert np.isclose(np.linalg.norm(query), 1.0)
+    assert np.array_equal(query, embedder.embed("invoice refund"))
+    related, unrelated = embedder.embed_many([TOPICS["billing.py"], TOPICS["deploy.txt"]])
+    assert query @ related > query @ unrelated
+    assert embedder.embed_many([]).shape == (0, 256)
+
+
+@pytest.fixture
+def root(tmp_path):
+    for name, text in TOPICS.items():
+        (tmp_path / name).write_text(text)
+    (tmp_path / "image.txt").write_bytes(b"\x00\x01binary")
+    return tmp_path
+
+
+def top_path(index, query):
+    return index.search(query, k=1)[0].path
+
+
+def test_search_finds_the_relevant_file(root):
+    index = semantic_index.SemanticIndex(str(root))
+    assert index.refresh() == (3, 0)  # the binary file is skipped
+    assert top_path(index, "refund policy for invoices") == "billing.py"
+    assert top_path(index, "session timeout for login") == "auth.md"
+    hit = index.search("container registry", k=1)[0]
+    assert (hit.path, hit.start_line, hit.snippet) == ("deploy.txt", 1, TOPICS["deploy.txt"].strip())
+
+
+def test_refresh_only_re_embeds_changes_and_persists(root):
+    index = semantic_index.SemanticIndex(str(root))
+    index.refresh()
+    assert index.refresh() == (0, 0)
+
+    (root / "deploy.txt").write_text("Terraform plans the cloud network and load balancers.\n")
+    (root / "auth.md").unlink()
+    assert index.refresh() == (1, 1)
+
+    reloaded = semantic_index.SemanticIndex(str(root))
+    assert reloaded.refresh() == (0, 0)
+    assert top_path(reloaded, "terraform load balancer") == "deploy.txt"
+    assert all(hit.path != "auth.md" for hit in reloaded.search("login passwords", k=5))
+
+
+def test_compaction_keeps_rows_mapped_to_their_files(root):
+    index = semantic_index.SemanticIndex(str(root))
+    index.refresh()
+    for round_ in range(2):  # the second round leaves 4 of 7 rows dead
+        (root / "billing.py").write_text(TOPICS["billing.py"] + f"# revision {round_}\n")
+        (root / "deploy.txt").write_text(TOPICS["deploy.txt"] + f"revision {round_}\n")
+        index.refresh()
+    assert all(chunk is not None for chunk in index.chunks)  # dead rows were dropped
+    assert len(index.chunks) == len(index.vectors) == len(index.signatures) == 3
+    assert top_path(index, "invoice refund") == "billing.py"
+
+
+def test_approximate_search_agrees_with_exact_search(root, monkeypatch):
+    for i in range(40):
+        (root / f"filler{i}.txt").write_text(f"unrelated filler paragraph number {i} about gardening and soup\n")
+    index = semantic_index.SemanticIndex(str(root))
+    index.refresh()
+    exact = top_path(index, "invoice refund payment")
+    monkeypatch.setattr(semantic_index, "EXACT_SEARCH_LIMIT", 5)
+    monkeypatch.setattr(semantic_index, "CANDIDATES", 20)
+    assert top_path(index, "invoice refund payment") == exact == "billing.py"
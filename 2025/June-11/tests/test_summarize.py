@@ -0,0 +1,82 @@
+import json
+
+from conftest import run_action
+
+import summarize
+from agent_common import tokens
+
+
+def test_token_helpers():
+    text = "The quick brown fox jumps over the lazy dog. " * 50
+    total = tokens.count_tokens(text)
+    assert 0 < total < len(text)
+    head = tokens.truncate_to_tokens(text, 10)
+    tail = tokens.truncate_to_tokens(text, 10, from_end=True)
+    assert text.startswith(head) and text.endswith(tail)
+    assert tokens.count_tokens(head) <= 10 and tokens.count_tokens(tail) <= 10
+    assert tokens.truncate_to_tokens(text, 0) == "" and tokens.truncate_to_tokens("short", 100) == "short"
+
+
+def test_python_outline_offsets_point_at_the_definitions(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text("import os\n\n\nclass Reader:\n    def read(self):\n        pass\n\n\nasync def main():\n    pass\n")
+    outline = summarize.build_outline(str(source))
+    assert (outline.kind, outline.lines) == ("python", 10)
+    data = source.read_bytes()
+    for entry, label in zip(outline.entries, ("class Reader", "def read", "async def main")):
+        position, offset, text = entry.split(None, 2)
+        assert text == label
+        assert data[int(offset[1:]):].lstrip().startswith(label.encode())
+
+
+def test_structured_outlines(tmp_path):
+    (tmp_path / "notes.md").write_text("# Title\ntext\n## Section\n")
+    (tmp_path / "data.csv").write_text("id,name,price\n1,a,2\n2,b,3\n")
+    (tmp_path / "config.json").write_text(json.dumps({"server": {"port": 80}, "users": [1, 2]}))
+    (tmp_path / "events.jsonl").write_text('{"id": 1, "tags": []}\n{"id": 2, "tags": []}\n')
+
+    assert [e.split(None, 2)[2] for e in summarize.build_outline(str(tmp_path / "notes.md")).entries] == \
+        ["# Title", "## Section"]
+    assert summarize.build_outline(str(tmp_path / "data.csv")).entries == ["columns (3): id, name, price",
+                                                                          "~2 data rows"]
+    assert summarize.build_outline(str(tmp_path / "config.json")).entries == ["server: dict[1]", "  port: int",
+                                                                             "users: list[2]"]
+    assert summarize.build_outline(str(tmp_path / "events.jsonl")).entries == ["records like:", "  id: int",
+                                                                              "  tags: list[0]"]
+
+
+def test_outline_cache_is_keyed_by_file_identity(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text("def a():\n    pass\n")
+    lookups = []
+    cache = summarize.OutlineCache(on_lookup=lookups.append)
+    assert len(cache.get(str(source)).entries) == 1
+    assert len(cache.get(str(source)).entries) == 1
+    with open(source, "a") as f:
+        f.write("def b():\n    pass\n")
+    assert len(cache.get(str(source)).entries) == 2
+    assert lookups == [False, True, False]
+
+
+def test_budgeted_view_fits_the_budget_and_keeps_both_ends(tmp_path):
+    big = tmp_path / "big.py"
+    big.write_text("".join(f"def function_{i}():\n    return {i}\n\n" for i in range(5000)))
+    view = summarize.budgeted_view(str(big), 500, summarize.OutlineCache())
+    assert tokens.count_tokens(view) < 700  # the budget plus the fixed header lines
+    assert "def function_0():" in view and "return 4999" in view
+    assert "more entries" in view
+
+    # The follow-up read it suggests continues right after the head
+    suggested = json.loads(view.splitlines()[1][len("Read more with "):-1])
+    head = view.split("-\n", 1)[1].split("\n" + "-" * 14)[0]
+    assert big.read_text().startswith(head)
+    assert suggested["offset"] == len(head.encode())
+
+
+def test_read_action_uses_the_budget(file_tool, workspace):
+    (workspace / "small.txt").write_text("hello\n")
+    (workspace / "big.txt").write_text("word " * 20000)
+    assert "hello" in run_action(file_tool, action="read", path="small.txt")
+    assert "too large to show in full" in run_action(file_tool, action="read", path="big.txt", max_tokens=300)
+    ranged = run_action(file_tool, action="read", path="big.txt", offset=5, length=10)
+    assert ranged.startswith("📄 Bytes 5-15") and "word word " in ranged
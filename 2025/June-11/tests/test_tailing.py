@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import tailing
+
+
+def write_lines(path, count, start=0):
+    with open(path, "a") as f:
+        f.writelines(f"line {i}\n" for i in range(start, start + count))
+
+
+def test_tail_lines_across_blocks(tmp_path):
+    log = tmp_path / "app.log"
+    write_lines(log, 1000)
+    lines, cursor = tailing.tail_lines(str(log), 5, block_size=16)
+    assert lines == [f"line {i}" for i in range(995, 1000)]
+    assert cursor == f"{os.stat(log).st_ino}:{os.path.getsize(log)}"
+
+
+@pytest.mark.parametrize("content, n, expected", [
+    ("a\nb\nc", 2, ["b", "c"]),  # no trailing newline
+    ("a\nb\n", 10, ["a", "b"]),  # fewer lines than asked for
+    ("a\nb\n", 0, []),
+    ("", 3, []),
+])
+def test_tail_lines_edges(tmp_path, content, n, expected):
+    log = tmp_path / "app.log"
+    log.write_text(content)
+    assert tailing.tail_lines(str(log), n, block_size=2)[0] == expected
+
+
+def test_follow_returns_only_appended_text(tmp_path):
+    log = tmp_path / "app.log"
+    write_lines(log, 3)
+    first = tailing.follow(str(log))
+    assert first.text == "" and "current end" in first.note
+    write_lines(log, 2, start=3)
+    second = tailing.follow(str(log), first.cursor)
+    assert second.text == "line 3\nline 4\n" and not second.truncated
+    assert tailing.follow(str(log), second.cursor).text == ""
+
+
+def test_follow_restarts_after_rotation_and_truncation(tmp_path):
+    log = tmp_path / "app.log"
+    write_lines(log, 3)
+    cursor = tailing.follow(str(log)).cursor
+
+    os.rename(log, tmp_path / "app.log.1")
+    write_lines(log, 1, start=100)
+    rotated = tailing.follow(str(log), cursor)
+    assert rotated.text == "line 100\n" and "rotated" in rotated.note
+
+    log.write_text("")
+    write_lines(log, 1, start=200)
+    truncated = tailing.follow(str(log), rotated.cursor.split(":")[0] + ":999")
+    assert truncated.text == "line 200\n" and "truncated" in truncated.note
+
+
+def test_follow_stops_at_a_line_boundary_when_capped(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("")
+    cursor = tailing.follow(str(log)).cursor
+    write_lines(log, 10)
+    parts = []
+    while True:
+        result = tailing.follow(str(log), cursor, max_bytes=20)
+        parts.append(result.text)
+        cursor = result.cursor
+        if not result.truncated:
+            break
+    assert all(part.endswith("\n") for part in parts) and len(parts) > 1
+    assert "".join(parts) == "".join(f"line {i}\n" for i in range(10))
+
+
+def test_invalid_cursor(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("x\n")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        tailing.follow(str(log), "not-a-cursor")
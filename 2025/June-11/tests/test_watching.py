@@ -0,0 +1,135 @@
+import os
+import time
+
+import pytest
+
+import watching
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watch(request, tmp_path):
+    watcher = watching.TreeWatcher(str(tmp_path), backend=request.param)
+    if watcher.backend != request.param:
+        pytest.skip(watcher.note)
+    yield watcher, tmp_path
+    watcher.close()
+
+
+def changes(watcher, cursor, **kwargs):
+    result = watcher.changes(cursor, timeout=2, **kwargs)
+    return sorted(result.events), result
+
+
+def test_writes_to_a_new_file_are_one_created(watch):
+    watcher, root = watch
+    cursor = watcher.changes().cursor
+    with open(root / "log.txt", "w") as f:
+        for i in range(50):
+            f.write(f"line {i}\n")
+            f.flush()
+    assert changes(watcher, cursor)[0] == [("created", "log.txt", None)]
+
+
+def test_modifications_of_an_existing_file_are_one_modified(watch):
+    watcher, root = watch
+    (root / "data.txt").write_text("x")
+    cursor = watcher.changes(watcher.changes().cursor, timeout=1).cursor
+    for size in range(2, 6):
+        (root / "data.txt").write_text("x" * size)
+    assert changes(watcher, cursor)[0] == [("modified", "data.txt", None)]
+
+
+def test_created_then_deleted_is_nothing_and_deleted_then_created_is_modified(watch):
+    watcher, root = watch
+    (root / "kept.txt").write_text("old")
+    cursor = watcher.changes(watcher.changes().cursor, timeout=1).cursor
+    (root / "temp.txt").write_text("tmp")
+    (root / "temp.txt").unlink()
+    (root / "kept.txt").unlink()
+    (root / "kept.txt").write_text("new contents")
+    (root / "marker.txt").write_text("")
+    events, _ = changes(watcher, cursor)
+    assert ("created", "marker.txt", None) in events
+    assert not [event for event in events if event[1] == "temp.txt"]
+    assert ("modified", "kept.txt", None) in events
+
+
+def test_moved_directory_is_one_event(watch):
+    watcher, root = watch
+    (root / "inbox" / "sub").mkdir(parents=True)
+    (root / "inbox" / "sub" / "a.txt").write_text("a")
+    cursor = watcher.changes(watcher.changes().cursor, timeout=1).cursor
+    os.rename(root / "inbox", root / "archive")
+    events, result = changes(watcher, cursor)
+    assert events == [("moved", "archive", "inbox")]
+
+    # Still watched under the new name
+    (root / "archive" / "sub" / "b.txt").write_text("b")
+    events, _ = changes(watcher, result.cursor)
+    assert events == [("created", os.path.join("archive", "sub", "b.txt"), None)]
+
+
+def test_limit_reports_more_and_the_cursor_continues(watch):
+    watcher, root = watch
+    cursor = watcher.changes().cursor
+    for i in range(5):
+        (root / f"{i}.txt").write_text("x")
+    events, result = changes(watcher, cursor, limit=3)
+    assert len(events) == 3 and result.more
+    rest = watcher.changes(result.cursor)
+    assert len(rest.events) == 2 and not rest.more
+
+
+def inotify_watcher(tmp_path):
+    """A watcher whose reader thread is stopped, so events can be fed to ``_handle`` by hand."""
+    watcher = watching.TreeWatcher(str(tmp_path), backend="inotify")
+    if watcher.backend != "inotify":
+        pytest.skip(watcher.note)
+    watcher.close()
+    while watcher._inotify is not None:
+        time.sleep(0.01)
+    watcher._inotify = watching._Inotify()  # for the watch removals; the old descriptors are gone with it
+    return watcher, {directory: wd for wd, directory in watcher._dirs.items()}
+
+
+def test_rename_split_across_reads_is_one_move(tmp_path):
+    (tmp_path / "a" / "sub").mkdir(parents=True)
+    watcher, wds = inotify_watcher(tmp_path)
+    cursor = watcher.cursor()
+    watcher._handle([(wds[""], watching.IN_MOVED_FROM | watching.IN_ISDIR, 7, "a")])
+    watcher._handle([(wds[""], watching.IN_MOVED_TO | watching.IN_ISDIR, 7, "b")])
+    assert watcher.changes(cursor).events == [("moved", "b", "a")]
+    assert watcher._dirs[wds[os.path.join("a", "sub")]] == os.path.join("b", "sub")
+
+
+def test_unmatched_move_becomes_a_delete_after_a_while(tmp_path, monkeypatch):
+    (tmp_path / "a" / "sub").mkdir(parents=True)
+    watcher, wds = inotify_watcher(tmp_path)
+    cursor = watcher.cursor()
+    watcher._handle([(wds[""], watching.IN_MOVED_FROM | watching.IN_ISDIR, 7, "a")])
+    assert watcher.changes(cursor).events == []
+    monkeypatch.setattr(watching, "MOVE_WAIT", 0.0)
+    watcher._handle([])
+    assert watcher.changes(cursor).events == [("deleted", "a", None)]
+    assert os.path.join("a", "sub") not in watcher._dirs.values()
+
+
+def test_reader_failure_falls_back_to_polling(tmp_path):
+    watcher = watching.TreeWatcher(str(tmp_path), backend="inotify")
+    if watcher.backend != "inotify":
+        pytest.skip(watcher.note)
+
+    def broken(raw):
+        raise RuntimeError("bad event")
+
+    watcher._handle = broken
+    cursor = watcher.cursor()
+    (tmp_path / "first.txt").write_text("x")
+    result = watcher.changes(cursor, timeout=2)
+    assert watcher.backend == "polling"
+    assert "inotify failed" in watcher.note and "bad event" in watcher.note
+    assert "dropped" in result.note
+
+    (tmp_path / "second.txt").write_text("x")
+    assert watcher.changes(result.cursor).events == [("created", "second.txt", None)]
+    watcher.close()
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import workspace
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    (root / "docs").mkdir(parents=True)
+    (root / "docs" / "a.txt").write_text("a")
+    outside.mkdir()
+    (outside / "secret.txt").write_text("secret")
+    return root, outside
+
+
+@pytest.mark.parametrize("path", ["..", "../outside/secret.txt", "docs/../../outside", "docs/../..//etc/passwd"])
+def test_dotdot_escapes_are_refused(tree, path):
+    root, _ = tree
+    with pytest.raises(workspace.PathEscapeError):
+        workspace.Workspace(str(root)).resolve(path)
+
+
+def test_absolute_paths_must_be_under_the_root(tree):
+    root, outside = tree
+    ws = workspace.Workspace(str(root))
+    assert ws.resolve(str(root / "docs" / "a.txt")).kind == "file"
+    with pytest.raises(workspace.PathEscapeError):
+        ws.resolve(str(outside / "secret.txt"))
+
+
+def test_dotdot_inside_the_root_is_resolved_lexically(tree):
+    root, _ = tree
+    resolved = workspace.Workspace(str(root)).resolve("docs/../docs/./a.txt")
+    assert (resolved.rel, resolved.kind) == (os.path.join("docs", "a.txt"), "file")
+
+
+def test_symlinks_out_of_the_root_are_refused(tree):
+    root, outside = tree
+    os.symlink(str(outside), root / "dir-link")
+    os.symlink(str(outside / "secret.txt"), root / "file-link")
+    os.symlink("../../outside", root / "docs" / "relative-link")
+    ws = workspace.Workspace(str(root))
+    for path in ("dir-link", "dir-link/secret.txt", "file-link", "docs/relative-link/secret.txt",
+                 "dir-link/new.txt"):
+        with pytest.raises(workspace.PathEscapeError):
+            ws.resolve(path)
+
+
+def test_symlinks_inside_the_root_are_followed_but_not_the_last_one(tree):
+    root, _ = tree
+    os.symlink("docs", root / "link")
+    os.symlink("link/a.txt", root / "a-link")
+    ws = workspace.Workspace(str(root))
+    assert ws.resolve("link/a.txt").rel == os.path.join("docs", "a.txt")
+    # The link itself is returned (deleting it removes the link), with its target's kind
+    resolved = ws.resolve("a-link")
+    assert (resolved.rel, resolved.kind) == ("a-link", "file")
+
+
+def test_symlink_loops_are_refused(tree):
+    root, _ = tree
+    os.symlink("loop-b", root / "loop-a")
+    os.symlink("loop-a", root / "loop-b")
+    with pytest.raises(OSError):
+        workspace.Workspace(str(root)).resolve("loop-a/x")
+
+
+def test_missing_paths_are_allowed(tree):
+    root, _ = tree
+    resolved = workspace.Workspace(str(root)).resolve("new/dir/file.txt")
+    assert (resolved.rel, resolved.kind) == (os.path.join("new", "dir", "file.txt"), None)
+
+
+def test_results_are_not_reused_by_the_next_action(tree):
+    root, outside = tree
+    ws = workspace.Workspace(str(root))
+    ws.begin_action()
+    assert ws.resolve("docs/a.txt").kind == "file"
+    assert ws.resolve("docs/a.txt").kind == "file"
+    assert ws.hits == 1
+
+    # Swapped for a symlink out of the root by someone else before the next action
+    os.rename(root / "docs", root / "old-docs")
+    os.symlink(str(outside), root / "docs")
+    ws.begin_action()
+    with pytest.raises(workspace.PathEscapeError):
+        ws.resolve("docs/a.txt")
@@ -1,39 +1,116 @@
 import os
+import sys
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.agents import initialize_agent, AgentType
-from langchain.tools.tavily_search import TavilySearchResults
 
 # Load environment variables
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="gpt-4.1",
-    temperature=0.1,
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
+# Shared helpers for the June-11 demos (HTTP client pool, ...) live in ../agent_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# LangChain, the OpenAI client and Tavily are imported lazily: the LLM, the
+# search tool and the agent are built on first use by the get_* functions below,
+# and share one pooled HTTP client (see agent_common/http_clients.py).
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Return the shared OpenAI chat model."""
+    from agent_common.http_clients import make_chat_model
+
+    return make_chat_model(model="gpt-4.1", temperature=0.1)
 
 # Tavily Search Tool
-search = TavilySearchResults(api_key=os.getenv("TAVILY_API_KEY"))
+@lru_cache(maxsize=None)
+def get_search():
+    """Return the shared Tavily search tool."""
+    from agent_common.http_clients import make_search_tool
+
+    return make_search_tool()
+
+
+def get_tools():
+    return [get_search()]
+
+
+def build_agent(llm=None, tools=None, verbose=True, mode=None):
+    """Build an agent executor; defaults to the shared LLM and tools.
+
+    Uses native tool calling unless ``mode`` (or ``$AGENT_MODE``) is "react".
+    """
+    from agent_common.tool_calling import build_executor
+
+    return build_executor(
+        llm if llm is not None else get_llm(),
+        tools if tools is not None else get_tools(),
+        verbose=verbose,
+        mode=mode,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_agent():
+    """Return the shared agent executor, building it on first use."""
+    return build_agent()
 
-tools = [search]
 
-agent = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True
-)
+@lru_cache(maxsize=None)
+def get_router():
+    """Model router (easy questions go to gpt-4.1-mini), or None if AGENT_ROUTER=0."""
+    from agent_common.http_clients import make_chat_model
+    from agent_common.routing import ModelRouter
+
+    return ModelRouter.from_env("web_search", small="gpt-4.1-mini", large="gpt-4.1",
+                                factory=lambda model: make_chat_model(model=model, temperature=0.1))
+
+
+@lru_cache(maxsize=None)
+def get_routed_agent(route):
+    """Agent executor on the router's model for ``route``."""
+    return build_agent(llm=get_router().llm(route))
+
+
+def answer(question: str) -> str:
+    """Answer one question, on the model the router picks for it."""
+    router = get_router()
+    if router is None:
+        return get_agent().invoke({"input": question}, config={"callbacks": get_callbacks()})["output"]
+    return router.run(question, lambda route, callbacks: get_routed_agent(route).invoke(
+        {"input": question}, config={"callbacks": get_callbacks() + callbacks})["output"]).output
+
+
+@lru_cache(maxsize=None)
+def get_callbacks():
+    """Callback handlers passed on each run; they record per-step latency and tokens."""
+    from agent_common.instrumentation import make_callback_handler
+
+    return [make_callback_handler("web_search")]
+
+
+def __getattr__(name):
+    # Keep the old module-level names (llm, search, tools, agent) importable.
+    lazy_globals = {"llm": get_llm, "search": get_search, "tools": get_tools, "agent": get_agent}
+    if name in lazy_globals:
+        return lazy_globals[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
+    # One-shot questions: python basic_web_search_agent.py [--daemon] "question"
+    from agent_common.daemon import run_cli
+
+    run_cli("web_search", answer, chat)
+
+
+def chat():
     print("Web Search Agent - Type 'exit' to quit")
     while True:
         user_input = input("\nYou: ")
         if user_input.lower() == "exit":
             print("Goodbye!")
             break
-        response = agent.invoke({"input": user_input})
-        print(f"\nAgent: {response['output']}")
+        print(f"\nAgent: {answer(user_input)}")
 
 if __name__ == "__main__":
     main()